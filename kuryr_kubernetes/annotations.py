@@ -0,0 +1,155 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Access to the versioned objects stored in K8s resource annotations.
+
+Handlers see the same annotation on every event of a resource until it is
+rewritten, so the decoded objects are kept in a bounded LRU cache keyed by the
+resource's selfLink and the annotation key. A cached object is only used if
+the annotation string is unchanged, and a clone of it is returned so that
+handlers can modify it freely.
+"""
+
+import collections
+import time
+
+from oslo_versionedobjects import base as ovo_base
+
+from kuryr_kubernetes import config
+from kuryr_kubernetes.objects import codec as obj_codec
+
+
+def _clone_value(value):
+    if isinstance(value, ovo_base.VersionedObject):
+        return clone(value)
+    elif isinstance(value, list):
+        return [_clone_value(v) for v in value]
+    elif isinstance(value, dict):
+        return {k: _clone_value(v) for k, v in value.items()}
+    return value
+
+
+def clone(obj):
+    """Returns a copy of the versioned object.
+
+    Nested objects, lists and dicts are copied while the other field values
+    (strings, numbers, IP addresses) are shared, as versioned objects replace
+    them on assignment rather than modifying them. This is several times
+    faster than `obj_clone()`, which deep-copies every value.
+    """
+    new = obj.__class__.__new__(obj.__class__)
+    new.__dict__.update(obj.__dict__)
+    new._changed_fields = set(obj._changed_fields)
+    for name in obj.fields:
+        # NOTE: field values are stored by oslo.versionedobjects as '_obj_'
+        # prefixed attributes
+        attr = '_obj_' + name
+        if attr in obj.__dict__:
+            new.__dict__[attr] = _clone_value(obj.__dict__[attr])
+    return new
+
+
+class AnnotationCache(object):
+    """Bounded LRU cache of the decoded annotations."""
+
+    def __init__(self, size):
+        self._size = size
+        self._entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.decode_time = 0.0
+        self.saved_time = 0.0
+
+    def get(self, resource, key, cls):
+        """Returns the object stored in the resource's annotation.
+
+        :param resource: K8s resource dict
+        :param key: annotation key
+        :param cls: versioned object class (or base class) expected
+        :return: versioned object or None if the annotation is missing
+        """
+        metadata = resource['metadata']
+        try:
+            annotation = metadata['annotations'][key]
+        except KeyError:
+            return None
+
+        cache_key = (metadata.get('selfLink'), key)
+        entry = self._entries.pop(cache_key, None)
+        if entry is not None and entry[0] == annotation:
+            self._entries[cache_key] = entry
+            start = time.time()
+            obj = clone(entry[1])
+            self.hits += 1
+            self.saved_time += max(entry[2] - (time.time() - start), 0)
+            return obj
+
+        start = time.time()
+        obj = obj_codec.loads(cls, annotation)
+        duration = time.time() - start
+        self.misses += 1
+        self.decode_time += duration
+
+        if cache_key[0] and self._size > 0:
+            if len(self._entries) >= self._size:
+                self._entries.popitem(last=False)
+            self._entries[cache_key] = (annotation, clone(obj), duration)
+        return obj
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'decode_time': self.decode_time,
+            'saved_time': self.saved_time,
+        }
+
+
+_CACHE = None
+
+
+def _get_cache():
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = AnnotationCache(config.CONF.kubernetes.annotation_cache_size)
+    return _CACHE
+
+
+def reset():
+    """Drops the cached objects and the statistics, e.g. after a fork."""
+    global _CACHE
+    _CACHE = None
+
+
+def get_object(resource, key, cls):
+    """Returns the versioned object stored in the resource's annotation.
+
+    :param resource: K8s resource dict
+    :param key: annotation key
+    :param cls: versioned object class (or base class) expected
+    :return: versioned object or None if the annotation is missing
+    """
+    return _get_cache().get(resource, key, cls)
+
+
+def get_stats():
+    """Returns the annotation cache statistics.
+
+    :return: dict with the number of cached entries, the cache hits and
+             misses, the time spent decoding annotations and the decoding
+             time saved by the cache (in seconds)
+    """
+    return _get_cache().stats()
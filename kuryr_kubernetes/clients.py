@@ -13,15 +13,143 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import threading
+import time
+
 from kuryr.lib import utils
 
 from kuryr_kubernetes import config
 from kuryr_kubernetes import k8s_client
+from kuryr_kubernetes import metrics
 
 _clients = {}
 _NEUTRON_CLIENT = 'neutron-client'
 _KUBERNETES_CLIENT = 'kubernetes-client'
 
+_NEUTRON_DURATION = metrics.histogram(
+    'kuryr_neutron_request_duration_seconds',
+    "Duration of the Neutron API calls", ['method'])
+_NEUTRON_ERRORS = metrics.counter(
+    'kuryr_neutron_request_errors_total',
+    "Neutron API calls that raised an exception", ['method', 'exception'])
+_NEUTRON_WAIT = metrics.histogram(
+    'kuryr_neutron_request_wait_seconds',
+    "Time the Neutron API calls waited for the rate and concurrency limits",
+    ['method'])
+_NEUTRON_IN_FLIGHT = metrics.gauge(
+    'kuryr_neutron_requests_in_flight',
+    "Neutron API calls in progress")
+
+
+class _TokenBucket(object):
+    """Token bucket rate limiter.
+
+    Allows `burst` calls at once and `rate` calls per second on average.
+    """
+
+    def __init__(self, rate, burst):
+        self._rate = rate
+        self._burst = burst
+        self._tokens = burst
+        self._last = time.time()
+
+    def acquire(self):
+        while True:
+            now = time.time()
+            self._tokens = min(self._burst, self._tokens +
+                               (now - self._last) * self._rate)
+            self._last = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            time.sleep((1 - self._tokens) / self._rate)
+
+
+class _NeutronClientProxy(object):
+    """Neutron client that instruments and limits the API calls.
+
+    Wraps the public methods of the Neutron client and passes all the other
+    attributes through. Each call is timed and its failures are counted per
+    method, and the calls are throttled to at most `rate_limit` per second
+    (with bursts of `rate_limit_burst`) and `max_concurrent_requests` in
+    progress, so that a burst of events cannot overload Neutron.
+    """
+
+    def __init__(self, client, rate_limit=0, rate_limit_burst=1,
+                 max_concurrent_requests=0):
+        self._client = client
+        self._methods = {}
+        self._stats = {}
+        self._in_flight = 0
+        self._bucket = None
+        self._semaphore = None
+        if rate_limit:
+            self._bucket = _TokenBucket(rate_limit, rate_limit_burst)
+        if max_concurrent_requests:
+            self._semaphore = threading.BoundedSemaphore(
+                max_concurrent_requests)
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+        try:
+            return self._methods[name]
+        except KeyError:
+            method = self._methods[name] = self._wrap(name, attr)
+            return method
+
+    def get_call_stats(self):
+        """Returns the statistics of the Neutron API calls per method.
+
+        :return: dict mapping the client method names to dicts with the
+                 number of calls ('calls') and failed calls ('errors'), the
+                 ratio of failed calls ('error_rate') and the total time
+                 spent in the calls ('time') and waiting for the rate and
+                 concurrency limits ('wait_time'), in seconds
+        """
+        return {name: dict(stats,
+                           error_rate=float(stats['errors']) / stats['calls'])
+                for name, stats in self._stats.items() if stats['calls']}
+
+    def _throttle(self):
+        if self._bucket:
+            self._bucket.acquire()
+        if self._semaphore:
+            self._semaphore.acquire()
+
+    def _wrap(self, name, method):
+        labels = (name,)
+        stats = self._stats[name] = {'calls': 0, 'errors': 0, 'time': 0.0,
+                                     'wait_time': 0.0}
+
+        def wrapper(*args, **kwargs):
+            start = time.time()
+            self._throttle()
+            try:
+                wait = time.time() - start
+                stats['wait_time'] += wait
+                _NEUTRON_WAIT.observe(wait, labels)
+                self._in_flight += 1
+                _NEUTRON_IN_FLIGHT.set(self._in_flight)
+                start += wait
+                return method(*args, **kwargs)
+            except Exception as ex:
+                stats['errors'] += 1
+                _NEUTRON_ERRORS.inc((name, ex.__class__.__name__))
+                raise
+            finally:
+                duration = time.time() - start
+                stats['calls'] += 1
+                stats['time'] += duration
+                _NEUTRON_DURATION.observe(duration, labels)
+                self._in_flight -= 1
+                _NEUTRON_IN_FLIGHT.set(self._in_flight)
+                if self._semaphore:
+                    self._semaphore.release()
+        wrapper.__name__ = name
+        return wrapper
+
 
 def get_neutron_client():
     return _clients[_NEUTRON_CLIENT]
@@ -31,13 +159,27 @@ def get_kubernetes_client():
     return _clients[_KUBERNETES_CLIENT]
 
 
+def authenticate_neutron_client():
+    """Fetches the token and endpoint the Neutron client sends requests with.
+
+    They are otherwise fetched by its first request.
+    """
+    httpclient = get_neutron_client().httpclient
+    httpclient.get_token()
+    httpclient.get_endpoint()
+
+
 def setup_clients():
     setup_neutron_client()
     setup_kubernetes_client()
 
 
 def setup_neutron_client():
-    _clients[_NEUTRON_CLIENT] = utils.get_neutron_client()
+    _clients[_NEUTRON_CLIENT] = _NeutronClientProxy(
+        utils.get_neutron_client(),
+        rate_limit=config.CONF.neutron.rate_limit,
+        rate_limit_burst=config.CONF.neutron.rate_limit_burst,
+        max_concurrent_requests=config.CONF.neutron.max_concurrent_requests)
 
 
 def setup_kubernetes_client():
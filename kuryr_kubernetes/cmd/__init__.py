@@ -14,15 +14,20 @@
 
 import logging as sys_logging
 
-from oslo_reports import guru_meditation_report as gmr
 
-from kuryr_kubernetes import version
+def setup_guru_meditation_report():
+    # NOTE: oslo.reports pulls in oslo.config and friends, so it is imported
+    # here to keep it out of the short-lived commands (e.g. CNI VERSION)
+    from oslo_reports import guru_meditation_report as gmr
 
-# During the call to gmr.TextGuruMeditation.setup_autorun(), Guru Meditation
-# Report tries to start logging. Set a handler here to accommodate this.
-logger = sys_logging.getLogger(None)
-if not logger.handlers:
-    logger.addHandler(sys_logging.StreamHandler())
+    from kuryr_kubernetes import version
 
-_version_string = version.version_info.release_string()
-gmr.TextGuruMeditation.setup_autorun(version=_version_string)
+    # During the call to gmr.TextGuruMeditation.setup_autorun(), Guru
+    # Meditation Report tries to start logging. Set a handler here to
+    # accommodate this.
+    logger = sys_logging.getLogger(None)
+    if not logger.handlers:
+        logger.addHandler(sys_logging.StreamHandler())
+
+    version_string = version.version_info.release_string()
+    gmr.TextGuruMeditation.setup_autorun(version=version_string)
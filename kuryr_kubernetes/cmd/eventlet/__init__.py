@@ -16,3 +16,7 @@
 import eventlet
 
 eventlet.monkey_patch()
+
+from kuryr_kubernetes import cmd  # noqa: E402
+
+cmd.setup_guru_meditation_report()
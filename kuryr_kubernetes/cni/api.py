@@ -14,16 +14,20 @@
 #    under the License.
 
 import abc
-import six
+import json
+import logging
 import traceback
 
-from kuryr.lib._i18n import _
-from oslo_log import log as logging
-from oslo_serialization import jsonutils
+import six
 
+from kuryr_kubernetes.cni import result as cni_result
 from kuryr_kubernetes import constants as k_const
 from kuryr_kubernetes import exceptions as k_exc
 
+# NOTE: this module is on the import path of every kuryr-cni invocation, so
+# it sticks to the stdlib logging/json modules instead of oslo.log and
+# oslo.serialization. Once the K8s plugin calls config.setup_logging(), the
+# stdlib logger is configured by oslo.log anyway.
 LOG = logging.getLogger(__name__)
 _CNI_TIMEOUT = 60
 
@@ -65,29 +69,45 @@ class CNIPlugin(object):
     def delete(self, params):
         raise NotImplementedError()
 
+    def check(self, params):
+        """Verifies that the container networking is still in place.
+
+        Only called for CNI 0.4.0+ requests. Raises an exception if the
+        container interface described by `params.config.prevResult` is
+        missing or misconfigured.
+        """
+        raise NotImplementedError()
+
 
 class CNIRunner(object):
 
-    # TODO(ivc): extend SUPPORTED_VERSIONS and format output based on
-    # requested params.CNI_VERSION and/or params.config.cniVersion
     VERSION = '0.3.0'
-    SUPPORTED_VERSIONS = ['0.3.0']
+    SUPPORTED_VERSIONS = ['0.3.0', '0.3.1', '0.4.0']
+    CHECK_VERSIONS = ['0.4.0']
 
     def __init__(self, plugin):
         self._plugin = plugin
+        self._version = self.VERSION
 
     def run(self, env, fin, fout):
         try:
-            params = CNIParameters(env, jsonutils.load(fin))
+            params = CNIParameters(env, json.load(fin))
+
+            if params.CNI_COMMAND == 'VERSION':
+                self._write_version(fout)
+                return
 
+            self._version = self._get_version(params)
             if params.CNI_COMMAND == 'ADD':
                 vif = self._plugin.add(params)
-                self._write_vif(fout, vif)
+                self._write_vif(fout, vif, params)
             elif params.CNI_COMMAND == 'DEL':
                 self._plugin.delete(params)
-            elif params.CNI_COMMAND == 'VERSION':
-                self._write_version(fout)
+            elif (params.CNI_COMMAND == 'CHECK' and
+                    self._version in self.CHECK_VERSIONS):
+                self._plugin.check(params)
             else:
+                from kuryr.lib._i18n import _
                 raise k_exc.CNIError(_("unknown CNI_COMMAND: %s")
                                      % params.CNI_COMMAND)
         except Exception as ex:
@@ -95,11 +115,18 @@ class CNIRunner(object):
             self._write_exception(fout, str(ex))
             return 1
 
+    def _get_version(self, params):
+        version = params.config.get('cniVersion', self.VERSION)
+        if version not in self.SUPPORTED_VERSIONS:
+            from kuryr.lib._i18n import _
+            raise k_exc.CNIError(_("unsupported CNI version: %s") % version)
+        return version
+
     def _write_dict(self, fout, dct):
-        output = {'cniVersion': self.VERSION}
+        output = {'cniVersion': self._version}
         output.update(dct)
         LOG.debug("CNI output: %s", output)
-        jsonutils.dump(output, fout, sort_keys=True)
+        json.dump(output, fout, sort_keys=True)
 
     def _write_exception(self, fout, msg):
         self._write_dict(fout, {
@@ -111,26 +138,7 @@ class CNIRunner(object):
     def _write_version(self, fout):
         self._write_dict(fout, {'supportedVersions': self.SUPPORTED_VERSIONS})
 
-    def _write_vif(self, fout, vif):
-        result = {}
-        nameservers = []
-
-        for subnet in vif.network.subnets.objects:
-            nameservers.extend(subnet.dns)
-
-            ip = subnet.ips.objects[0].address
-            cni_ip = result.setdefault("ip%s" % ip.version, {})
-            cni_ip['ip'] = "%s/%s" % (ip, subnet.cidr.prefixlen)
-
-            if subnet.gateway:
-                cni_ip['gateway'] = str(subnet.gateway)
-
-            if subnet.routes.objects:
-                cni_ip['routes'] = [
-                    {'dst': str(route.cidr), 'gw': str(route.gateway)}
-                    for route in subnet.routes.objects]
-
-        if nameservers:
-            result['dns'] = {'nameservers': nameservers}
-
-        self._write_dict(fout, result)
+    def _write_vif(self, fout, vif, params):
+        self._write_dict(fout, cni_result.encode_vif(
+            vif, self._version, params.CNI_IFNAME,
+            getattr(params, 'CNI_NETNS', None)))
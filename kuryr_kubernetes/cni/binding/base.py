@@ -13,19 +13,60 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import abc
+import errno
+
 import os_vif
 import pyroute2
+import six
 from stevedore import driver as stv_driver
 
+from kuryr_kubernetes import tracing
+
 _BINDING_NAMESPACE = 'kuryr_kubernetes.cni.binding'
+_BINDING_DRIVERS = {}
 _IPDB = {}
 
 
+@six.add_metaclass(abc.ABCMeta)
+class BaseBindingDriver(object):
+    """Interface to attach ports to pods."""
+
+    @abc.abstractmethod
+    def connect(self, vif, ifname, netns):
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def disconnect(self, vif, ifname, netns):
+        raise NotImplementedError()
+
+    def is_connected(self, vif, ifname, netns):
+        """Checks if the VIF is already connected to the container.
+
+        `connect` is skipped along with `os_vif.plug` if this method returns
+        'True' (e.g. when kubelet retries the CNI ADD command). Implementing
+        drivers should only rely on the cached IPDB state returned by
+        `get_ipdb` so that the check does not require additional netlink
+        requests.
+
+        :param vif: VIF object
+        :param ifname: name of the interface inside the container
+        :param netns: path to the container network namespace
+        :return: 'True' if the container interface is fully configured
+        """
+        return get_container_iface(vif, ifname, netns) is not None
+
+
 def _get_binding_driver(vif):
-    mgr = stv_driver.DriverManager(namespace=_BINDING_NAMESPACE,
-                                   name=type(vif).__name__,
-                                   invoke_on_load=True)
-    return mgr.driver
+    name = type(vif).__name__
+    try:
+        return _BINDING_DRIVERS[name]
+    except KeyError:
+        mgr = stv_driver.DriverManager(namespace=_BINDING_NAMESPACE,
+                                       name=name,
+                                       invoke_on_load=True)
+        _BINDING_DRIVERS[name] = mgr.driver
+        return mgr.driver
 
 
 def get_ipdb(netns=None):
@@ -40,27 +81,66 @@ def get_ipdb(netns=None):
     return ipdb
 
 
+def get_container_iface(vif, ifname, netns):
+    """Returns the container interface if it is present with the VIF's MAC.
+
+    :return: IPDB interface or None
+    """
+    interfaces = get_ipdb(netns).interfaces
+    if ifname not in interfaces:
+        return None
+    iface = interfaces[ifname]
+    if str(iface.address).lower() != str(vif.address).lower():
+        return None
+    return iface
+
+
+def _has_route(routes, dst):
+    try:
+        routes[dst]
+    except KeyError:
+        return False
+    return True
+
+
+def _add_route(routes, gateway, dst):
+    if _has_route(routes, dst):
+        return
+    try:
+        routes.add(gateway=gateway, dst=dst).commit()
+    except pyroute2.NetlinkError as ex:
+        if ex.code != errno.EEXIST:
+            raise
+
+
 def _configure_l3(vif, ifname, netns):
     with get_ipdb(netns).interfaces[ifname] as iface:
         for subnet in vif.network.subnets.objects:
             for fip in subnet.ips.objects:
+                if (str(fip.address), subnet.cidr.prefixlen) in iface.ipaddr:
+                    continue
                 iface.add_ip(str(fip.address), mask=str(subnet.cidr.netmask))
 
     routes = get_ipdb(netns).routes
     for subnet in vif.network.subnets.objects:
         for route in subnet.routes.objects:
-            routes.add(gateway=str(route.gateway),
-                       dst=str(route.cidr)).commit()
+            _add_route(routes, str(route.gateway), str(route.cidr))
         if subnet.gateway:
-            routes.add(gateway=str(subnet.gateway),
-                       dst='default').commit()
+            _add_route(routes, str(subnet.gateway), 'default')
 
 
 def connect(vif, instance_info, ifname, netns=None):
     driver = _get_binding_driver(vif)
-    os_vif.plug(vif, instance_info)
-    driver.connect(vif, ifname, netns)
-    _configure_l3(vif, ifname, netns)
+    uid = instance_info.uuid
+    # NOTE: kubelet retries CNI ADD on failures (e.g. timeouts), so the
+    # expensive plugging is skipped if the previous attempt has already
+    # completed it and only the missing L3 configuration is applied
+    if not driver.is_connected(vif, ifname, netns):
+        with tracing.span('cni.plug', uid, vif_type=type(vif).__name__):
+            os_vif.plug(vif, instance_info)
+            driver.connect(vif, ifname, netns)
+    with tracing.span('cni.configure_l3', uid):
+        _configure_l3(vif, ifname, netns)
 
 
 def disconnect(vif, instance_info, ifname, netns=None):
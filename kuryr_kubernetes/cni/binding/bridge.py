@@ -19,13 +19,19 @@ from kuryr_kubernetes.cni.binding import base as b_base
 from kuryr_kubernetes import linux_net_utils as net_utils
 
 
-class BaseBridgeDriver(object):
+class BaseBridgeDriver(b_base.BaseBindingDriver):
     def connect(self, vif, ifname, netns):
         host_ifname = vif.vif_name
 
         c_ipdb = b_base.get_ipdb(netns)
         h_ipdb = b_base.get_ipdb()
 
+        # NOTE: a previous attempt may have failed after creating the veth
+        # pair, e.g. before its host end was moved out of the container
+        # namespace or attached. As is_connected() returned False, remove
+        # what is left of it and start over.
+        self._remove_veth(c_ipdb, h_ipdb, ifname, host_ifname)
+
         with c_ipdb.create(ifname=ifname, peer=host_ifname,
                            kind='veth') as c_iface:
             c_iface.mtu = vif.network.mtu
@@ -43,6 +49,26 @@ class BaseBridgeDriver(object):
     def disconnect(self, vif, ifname, netns):
         pass
 
+    def is_connected(self, vif, ifname, netns):
+        return self._get_host_iface(vif, ifname, netns) is not None
+
+    def _remove_veth(self, c_ipdb, h_ipdb, ifname, host_ifname):
+        for ipdb, name in ((c_ipdb, ifname), (c_ipdb, host_ifname),
+                           (h_ipdb, host_ifname)):
+            if name in ipdb.interfaces:
+                # NOTE: removing either end removes the whole veth pair
+                with ipdb.interfaces[name] as iface:
+                    iface.remove()
+                return
+
+    def _get_host_iface(self, vif, ifname, netns):
+        if b_base.get_container_iface(vif, ifname, netns) is None:
+            return None
+        h_interfaces = b_base.get_ipdb().interfaces
+        if vif.vif_name not in h_interfaces:
+            return None
+        return h_interfaces[vif.vif_name]
+
 
 class BridgeDriver(BaseBridgeDriver):
     def connect(self, vif, ifname, netns):
@@ -55,6 +81,14 @@ class BridgeDriver(BaseBridgeDriver):
         with h_ipdb.interfaces[bridge_name] as h_br:
             h_br.add_port(host_ifname)
 
+    def is_connected(self, vif, ifname, netns):
+        h_iface = self._get_host_iface(vif, ifname, netns)
+        if h_iface is None:
+            return False
+        h_interfaces = b_base.get_ipdb().interfaces
+        return (vif.bridge_name in h_interfaces and
+                h_iface.master == h_interfaces[vif.bridge_name].index)
+
     def disconnect(self, vif, ifname, netns):
         # NOTE(ivc): veth pair is destroyed automatically along with the
         # container namespace
@@ -73,3 +107,9 @@ class VIFOpenVSwitchDriver(BaseBridgeDriver):
     def disconnect(self, vif, ifname, netns):
         super(VIFOpenVSwitchDriver, self).disconnect(vif, ifname, netns)
         net_utils.delete_ovs_vif_port(vif.bridge_name, vif.vif_name)
+
+    def is_connected(self, vif, ifname, netns):
+        h_iface = self._get_host_iface(vif, ifname, netns)
+        # NOTE: ports plugged into OpenVSwitch are enslaved to the
+        # 'ovs-system' datapath device
+        return h_iface is not None and bool(h_iface.master)
@@ -18,7 +18,7 @@ from kuryr_kubernetes.cni.binding import base as b_base
 from kuryr_kubernetes import config
 
 
-class VlanDriver(object):
+class VlanDriver(b_base.BaseBindingDriver):
     def connect(self, vif, ifname, netns):
         h_ipdb = b_base.get_ipdb()
         c_ipdb = b_base.get_ipdb(netns)
@@ -18,8 +18,8 @@ import six
 
 from os_vif import objects as obj_vif
 from oslo_log import log as logging
-from oslo_serialization import jsonutils
 
+from kuryr_kubernetes import annotations
 from kuryr_kubernetes.cni.binding import base as b_base
 from kuryr_kubernetes import constants as k_const
 from kuryr_kubernetes.handlers import dispatch as k_dis
@@ -49,13 +49,10 @@ class CNIHandlerBase(k8s_base.ResourceEventHandler):
 
     def _get_vif(self, pod):
         # TODO(ivc): same as VIFHandler._get_vif
-        try:
-            annotations = pod['metadata']['annotations']
-            vif_annotation = annotations[k_const.K8S_ANNOTATION_VIF]
-        except KeyError:
+        vif = annotations.get_object(pod, k_const.K8S_ANNOTATION_VIF,
+                                     obj_vif.vif.VIFBase)
+        if vif is None:
             return None
-        vif_dict = jsonutils.loads(vif_annotation)
-        vif = obj_vif.vif.VIFBase.obj_from_primitive(vif_dict)
         LOG.debug("Got VIF from annotation: %r", vif)
         return vif
 
@@ -0,0 +1,116 @@
+# Copyright (c) 2016 Mirantis, Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import sys
+
+from kuryr.lib._i18n import _
+import os_vif
+
+from kuryr_kubernetes import clients
+from kuryr_kubernetes.cni import api as cni_api
+from kuryr_kubernetes.cni.binding import base as b_base
+from kuryr_kubernetes.cni import handlers as h_cni
+from kuryr_kubernetes import cmd
+from kuryr_kubernetes import config
+from kuryr_kubernetes import constants as k_const
+from kuryr_kubernetes import exceptions as k_exc
+from kuryr_kubernetes import objects
+from kuryr_kubernetes import tracing
+from kuryr_kubernetes import watcher as k_watcher
+
+
+class K8sCNIPlugin(cni_api.CNIPlugin):
+
+    def add(self, params):
+        self._setup(params)
+        self._pipeline.register(h_cni.AddHandler(params, self._done))
+        self._watcher.start()
+        return self._vif
+
+    def delete(self, params):
+        self._setup(params)
+        self._pipeline.register(h_cni.DelHandler(params, self._done))
+        self._watcher.start()
+
+    def check(self, params):
+        # NOTE: CHECK only verifies the container side against the result
+        # returned by ADD, so it neither needs the K8s API nor os-vif.
+        try:
+            prev_result = params.config['prevResult']
+        except KeyError:
+            raise k_exc.CNIError(_("prevResult is required for CHECK"))
+
+        ifname = params.CNI_IFNAME
+        for idx, iface in enumerate(prev_result.get('interfaces', [])):
+            if iface.get('name') == ifname:
+                break
+        else:
+            raise k_exc.CNIError(_("interface %s not found in prevResult")
+                                 % ifname)
+
+        interfaces = b_base.get_ipdb(params.CNI_NETNS).interfaces
+        if ifname not in interfaces:
+            raise k_exc.CNIError(_("interface %s is missing") % ifname)
+        container_iface = interfaces[ifname]
+        if str(container_iface.address).lower() != iface['mac'].lower():
+            raise k_exc.CNIError(_("interface %(ifname)s has MAC %(mac)s")
+                                 % {'ifname': ifname,
+                                    'mac': container_iface.address})
+
+        for ip in prev_result.get('ips', []):
+            if ip.get('interface') != idx:
+                continue
+            address, prefixlen = ip['address'].split('/')
+            if (address, int(prefixlen)) not in container_iface.ipaddr:
+                raise k_exc.CNIError(_("address %(ip)s is missing on "
+                                       "%(ifname)s")
+                                     % {'ip': ip['address'],
+                                        'ifname': ifname})
+
+    def _done(self, vif):
+        self._vif = vif
+        self._watcher.stop()
+
+    def _setup(self, params):
+        args = ['--config-file', params.config.kuryr_conf]
+
+        try:
+            if params.config.debug:
+                args.append('-d')
+        except AttributeError:
+            pass
+
+        cmd.setup_guru_meditation_report()
+
+        # TODO(vikasc): Should be done using dynamically loadable OVO types
+        # plugin.
+        objects.register_locally_defined_vifs()
+
+        config.init(args)
+        config.setup_logging()
+        tracing.setup('kuryr-cni')
+        os_vif.initialize()
+        ovs = os_vif._EXT_MANAGER['ovs'].obj
+        ovs_mod = sys.modules[ovs.__module__]
+        ovs_mod.linux_net.privsep.vif_plug.start(ovs_mod.linux_net.privsep.priv_context.Method.FORK)
+        clients.setup_kubernetes_client()
+        self._pipeline = h_cni.CNIPipeline()
+        self._watcher = k_watcher.Watcher(self._pipeline)
+        self._watcher.add(
+            "%(base)s/namespaces/%(namespace)s/pods"
+            "?fieldSelector=metadata.name=%(pod)s" % {
+                'base': k_const.K8S_API_BASE,
+                'namespace': params.args.K8S_POD_NAMESPACE,
+                'pod': params.args.K8S_POD_NAME})
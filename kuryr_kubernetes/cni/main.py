@@ -13,77 +13,48 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import logging
 import os
 import signal
 import sys
 
-import os_vif
-from oslo_log import log as logging
-
-from kuryr_kubernetes import clients
 from kuryr_kubernetes.cni import api as cni_api
-from kuryr_kubernetes.cni import handlers as h_cni
-from kuryr_kubernetes import config
 from kuryr_kubernetes import constants as k_const
-from kuryr_kubernetes import objects
-from kuryr_kubernetes import watcher as k_watcher
 
+# NOTE: kuryr-cni is exec'd by the kubelet for every CNI command, so this
+# module only imports what VERSION needs. The K8s plugin (os-vif, oslo.*,
+# pyroute2, the K8s client, ...) is loaded by LazyK8sCNIPlugin on the first
+# ADD/DEL.
 LOG = logging.getLogger(__name__)
 _CNI_TIMEOUT = 180
 
 
-class K8sCNIPlugin(cni_api.CNIPlugin):
-
-    def add(self, params):
-        self._setup(params)
-        self._pipeline.register(h_cni.AddHandler(params, self._done))
-        self._watcher.start()
-        return self._vif
+class LazyK8sCNIPlugin(cni_api.CNIPlugin):
 
-    def delete(self, params):
-        self._setup(params)
-        self._pipeline.register(h_cni.DelHandler(params, self._done))
-        self._watcher.start()
+    def __init__(self):
+        self._plugin = None
 
-    def _done(self, vif):
-        self._vif = vif
-        self._watcher.stop()
+    def _get_plugin(self):
+        if self._plugin is None:
+            from kuryr_kubernetes.cni import k8s_cni
+            self._plugin = k8s_cni.K8sCNIPlugin()
+        return self._plugin
 
-    def _setup(self, params):
-        args = ['--config-file', params.config.kuryr_conf]
+    def add(self, params):
+        return self._get_plugin().add(params)
 
-        try:
-            if params.config.debug:
-                args.append('-d')
-        except AttributeError:
-            pass
+    def delete(self, params):
+        return self._get_plugin().delete(params)
 
-        config.init(args)
-        config.setup_logging()
-        os_vif.initialize()
-        ovs = os_vif._EXT_MANAGER['ovs'].obj
-        ovs_mod = sys.modules[ovs.__module__]
-        ovs_mod.linux_net.privsep.vif_plug.start(ovs_mod.linux_net.privsep.priv_context.Method.FORK)
-        clients.setup_kubernetes_client()
-        self._pipeline = h_cni.CNIPipeline()
-        self._watcher = k_watcher.Watcher(self._pipeline)
-        self._watcher.add(
-            "%(base)s/namespaces/%(namespace)s/pods"
-            "?fieldSelector=metadata.name=%(pod)s" % {
-                'base': k_const.K8S_API_BASE,
-                'namespace': params.args.K8S_POD_NAMESPACE,
-                'pod': params.args.K8S_POD_NAME})
+    def check(self, params):
+        return self._get_plugin().check(params)
 
 
 def run():
     # REVISIT(ivc): current CNI implementation provided by this package is
     # experimental and its primary purpose is to enable development of other
     # components (e.g. functional tests, service/LBaaSv2 support)
-
-    # TODO(vikasc): Should be done using dynamically loadable OVO types plugin.
-    objects.register_locally_defined_vifs()
-
-    runner = cni_api.CNIRunner(K8sCNIPlugin())
+    runner = cni_api.CNIRunner(LazyK8sCNIPlugin())
 
     def _timeout(signum, frame):
         runner._write_dict(sys.stdout, {
@@ -0,0 +1,103 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Encoding of os-vif VIFs into CNI results.
+
+CNI 0.3.0 results keep the 'ip4'/'ip6' layout kuryr-cni has always returned,
+which only carries a single address per IP version. CNI 0.3.1 and 0.4.0
+results use the 'interfaces'/'ips'/'routes' layout and list every fixed IP of
+every subnet of the VIF.
+"""
+
+LEGACY_VERSIONS = ('0.3.0',)
+
+
+def _get_gateway(subnet):
+    # NOTE: os_vif_util leaves the gateway unset for subnets without one
+    if subnet.obj_attr_is_set('gateway') and subnet.gateway:
+        return str(subnet.gateway)
+    return None
+
+
+def _encode_legacy(vif, ifname, netns):
+    result = {}
+    nameservers = []
+
+    for subnet in vif.network.subnets.objects:
+        nameservers.extend(str(dns) for dns in subnet.dns)
+
+        ip = subnet.ips.objects[0].address
+        cni_ip = result.setdefault("ip%s" % ip.version, {})
+        cni_ip['ip'] = "%s/%s" % (ip, subnet.cidr.prefixlen)
+
+        gateway = _get_gateway(subnet)
+        if gateway:
+            cni_ip['gateway'] = gateway
+
+        if subnet.routes.objects:
+            cni_ip['routes'] = [
+                {'dst': str(route.cidr), 'gw': str(route.gateway)}
+                for route in subnet.routes.objects]
+
+    if nameservers:
+        result['dns'] = {'nameservers': nameservers}
+
+    return result
+
+
+def _encode(vif, ifname, netns):
+    iface = {'name': ifname, 'mac': str(vif.address)}
+    if netns:
+        iface['sandbox'] = netns
+    ips = []
+    routes = []
+    nameservers = []
+
+    for subnet in vif.network.subnets.objects:
+        nameservers.extend(str(dns) for dns in subnet.dns)
+        prefixlen = subnet.cidr.prefixlen
+        gateway = _get_gateway(subnet)
+
+        for fip in subnet.ips.objects:
+            cni_ip = {
+                'version': str(fip.address.version),
+                'address': "%s/%s" % (fip.address, prefixlen),
+                'interface': 0,
+            }
+            if gateway:
+                cni_ip['gateway'] = gateway
+            ips.append(cni_ip)
+
+        routes.extend({'dst': str(route.cidr), 'gw': str(route.gateway)}
+                      for route in subnet.routes.objects)
+
+    result = {'interfaces': [iface], 'ips': ips}
+    if routes:
+        result['routes'] = routes
+    if nameservers:
+        result['dns'] = {'nameservers': nameservers}
+
+    return result
+
+
+def encode_vif(vif, version, ifname, netns=None):
+    """Returns the CNI result for the VIF.
+
+    :param vif: os-vif VIF object
+    :param version: CNI version of the result
+    :param ifname: name of the interface inside the container
+    :param netns: path to the container network namespace
+    :return: CNI result without 'cniVersion'
+    """
+    if version in LEGACY_VERSIONS:
+        return _encode_legacy(vif, ifname, netns)
+    return _encode(vif, ifname, netns)
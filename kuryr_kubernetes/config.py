@@ -10,6 +10,7 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 import os
+import socket
 import sys
 
 from kuryr.lib._i18n import _
@@ -71,6 +72,50 @@ k8s_opts = [
         help=_("The driver that provides LoadBalancers for Kubernetes "
                "Endpoints"),
         default='lbaasv2'),
+    cfg.StrOpt('annotation_format',
+        help=_("The format of the VIF and LBaaS annotations written by the "
+               "controller. 'compact' stores the versioned objects without "
+               "repeating their envelope for every nested object, "
+               "'legacy' can be read by older kuryr-cni and "
+               "kuryr-controller versions. Both formats are always "
+               "readable."),
+        choices=['legacy', 'compact'],
+        default='legacy'),
+    cfg.StrOpt('lbaas_state_storage',
+        help=_("Where the LBaaSServiceSpec and LBaaSState of Services are "
+               "stored. 'annotation' stores them in annotations of the "
+               "Endpoints, 'crd' stores them in the spec and status of "
+               "KuryrLoadBalancer custom resources, which avoids updating "
+               "the Endpoints (and notifying all their watchers) on every "
+               "load balancer change. The KuryrLoadBalancer "
+               "CustomResourceDefinition must be created before enabling "
+               "'crd'."),
+        choices=['annotation', 'crd'],
+        default='annotation'),
+    cfg.IntOpt('controller_workers',
+        help=_("The number of worker processes the controller handles the "
+               "K8s events in, the controller process then only watches "
+               "the K8s resources and passes each event to a worker by the "
+               "hash of the namespace and name of its object. Each worker "
+               "has its own Neutron client, so the [neutron] rate_limit and "
+               "max_concurrent_requests apply to each of them. 0 handles "
+               "the events in the controller process."),
+        default=0,
+        min=0),
+    cfg.IntOpt('warm_up_timeout',
+        help=_("The maximum number of seconds the controller spends at "
+               "startup, before watching the K8s resources, loading the "
+               "drivers and looking up the Neutron token, subnets and "
+               "security groups they use, so that the first events do not "
+               "wait for them. 0 disables the warm-up."),
+        default=60,
+        min=0),
+    cfg.IntOpt('annotation_cache_size',
+        help=_("The number of decoded VIF and LBaaS annotations kept in "
+               "memory to avoid decoding unchanged annotations on every "
+               "event. 0 disables the cache."),
+        default=1024,
+        min=0),
 ]
 
 neutron_defaults = [
@@ -87,17 +132,201 @@ neutron_defaults = [
         help=_("Neutron subnet ID for k8s worker node vms.")),
     cfg.StrOpt('service_subnet',
         help=_("Default Neutron subnet ID for Kubernetes services")),
+    cfg.StrOpt('resource_description',
+        help=_("Description set on the Neutron ports and load balancers "
+               "created by the controller, which tells them apart from the "
+               "resources of other Kuryr clusters and services sharing the "
+               "project. It should be unique per cluster. Only the "
+               "resources with this description are reported as leaked by "
+               "the reconciler and deleted by the garbage collector, which "
+               "is disabled if it is not set.")),
 ]
 
+neutron_client_opts = [
+    cfg.FloatOpt('rate_limit',
+        help=_("The maximum average number of Neutron API requests per "
+               "second sent by each controller process. With "
+               "[kubernetes] controller_workers the limit applies to each "
+               "worker, so the controller may send up to the number of "
+               "workers times this rate. 0 disables the limit."),
+        default=0,
+        min=0),
+    cfg.IntOpt('rate_limit_burst',
+        help=_("The number of Neutron API requests that can be sent at "
+               "once by each controller process before rate_limit "
+               "applies"),
+        default=10,
+        min=1),
+    cfg.IntOpt('max_concurrent_requests',
+        help=_("The maximum number of Neutron API requests in progress at "
+               "the same time in each controller process. With "
+               "[kubernetes] controller_workers the limit applies to each "
+               "worker, so the controller may have up to the number of "
+               "workers times this number of requests in progress. 0 "
+               "disables the limit."),
+        default=0,
+        min=0),
+]
+
+metrics_opts = [
+    cfg.PortOpt('port',
+        help=_("The port the controller serves its metrics on, in the "
+               "Prometheus text format at '/metrics'. 0 disables the "
+               "metrics endpoint."),
+        default=0),
+    cfg.StrOpt('host',
+        help=_("The address the metrics endpoint listens on"),
+        default='0.0.0.0'),
+]
+
+tracing_opts = [
+    cfg.StrOpt('trace_file',
+        help=_("The file the pod networking trace spans are appended to, "
+               "one OTLP JSON export request per line. Tracing is disabled "
+               "if it is not set.")),
+]
+
+profiler_opts = [
+    cfg.IntOpt('duration',
+        help=_("The number of seconds the stacks are sampled for on SIGUSR1 "
+               "and on '/debug/profile' of the metrics endpoint when no "
+               "'seconds' are given."),
+        default=30,
+        min=1),
+    cfg.IntOpt('max_duration',
+        help=_("The maximum number of seconds a profile can be requested "
+               "for on the metrics endpoint."),
+        default=300,
+        min=1),
+    cfg.FloatOpt('interval',
+        help=_("The number of seconds between two samples of the stacks."),
+        default=0.01,
+        min=0.001),
+    cfg.BoolOpt('all_greenthreads',
+        help=_("Also sample the stacks of the greenthreads that are waiting, "
+               "for a wall-clock profile rather than a CPU profile. "
+               "Sampling is then much more expensive."),
+        default=False),
+    cfg.StrOpt('output_dir',
+        help=_("The directory the profiles taken on SIGUSR1 are written "
+               "to."),
+        default='/tmp'),
+]
+
+sharding_opts = [
+    cfg.BoolOpt('enabled',
+        help=_("Shard the K8s objects between the controller replicas "
+               "running with this option: each object is handled by the "
+               "replica it is assigned to by consistent hashing of its "
+               "key. Replicas join and leave by holding a lease in a "
+               "ConfigMap."),
+        default=False),
+    cfg.StrOpt('replica_id',
+        help=_("The unique identifier of this controller replica, used in "
+               "an annotation key. Defaults to the host name, i.e. the pod "
+               "name."),
+        default=socket.gethostname(),
+        sample_default='<host name>'),
+    cfg.StrOpt('namespace',
+        help=_("The namespace of the ConfigMap holding the leases of the "
+               "replicas."),
+        default='kube-system'),
+    cfg.StrOpt('config_map',
+        help=_("The name of the ConfigMap holding the leases of the "
+               "replicas. It is created if it does not exist."),
+        default='kuryr-controller-shards'),
+    cfg.StrOpt('shard_by',
+        help=_("What the objects are assigned to replicas by: their "
+               "namespace, or their namespace and name (the Service, "
+               "Endpoints and KuryrLoadBalancer of the same name are kept "
+               "together)."),
+        choices=('namespace', 'object'),
+        default='namespace'),
+    cfg.IntOpt('lease_duration',
+        help=_("The number of seconds after which a replica that did not "
+               "renew its lease is considered gone and its objects are "
+               "taken over by the other replicas. It is also how long a "
+               "replica waits after the members changed before it takes "
+               "the objects it gained over, so that the other replicas "
+               "have observed the change and stopped handling them."),
+        default=15,
+        min=1),
+    cfg.IntOpt('renew_interval',
+        help=_("The number of seconds between two renewals of the lease of "
+               "the replica. It should be a fraction of the "
+               "lease_duration."),
+        default=5,
+        min=1),
+    cfg.IntOpt('virtual_nodes',
+        help=_("The number of points of each replica on the hash ring. "
+               "More points spread the objects more evenly."),
+        default=100,
+        min=1),
+]
+
+reconciler_opts = [
+    cfg.IntOpt('interval',
+        help=_("The number of seconds between two full resyncs of the K8s "
+               "objects with Neutron, which queue the objects the "
+               "controller failed to converge and report the leaked ports "
+               "and load balancers. 0 disables the resyncs."),
+        default=0,
+        min=0),
+    cfg.FloatOpt('rate',
+        help=_("The maximum number of divergent objects a resync queues "
+               "per second, so that it does not compete with the live "
+               "events."),
+        default=10.0,
+        min=0.1),
+]
+
+garbage_collector_opts = [
+    cfg.BoolOpt('enabled',
+        help=_("Delete the Kuryr ports, trunk subports and load balancers "
+               "no K8s object refers to, as found by the resyncs of "
+               "[reconciler]interval. Only the resources with the "
+               "[neutron_defaults]resource_description description are "
+               "deleted, it is required."),
+        default=False),
+    cfg.BoolOpt('dry_run',
+        help=_("Only log the leaked resources that would be deleted."),
+        default=True),
+    cfg.IntOpt('batch_size',
+        help=_("The maximum number of leaked ports and load balancers "
+               "deleted after each resync."),
+        default=50,
+        min=1),
+    cfg.FloatOpt('rate',
+        help=_("The maximum number of Neutron deletions per second."),
+        default=5.0,
+        min=0.1),
+]
+
+namespace_subnet_opts = [
+    cfg.StrOpt('pod_subnet_pool',
+        help=_("Neutron subnet pool ID the subnets of the namespaces are "
+               "allocated from by the 'namespace' pod_subnets driver.")),
+    cfg.StrOpt('pod_router',
+        help=_("Neutron router ID the subnets of the namespaces are "
+               "attached to by the 'namespace' pod_subnets driver.")),
+]
 
 CONF = cfg.CONF
 CONF.register_opts(kuryr_k8s_opts)
 CONF.register_opts(k8s_opts, group='kubernetes')
 CONF.register_opts(neutron_defaults, group='neutron_defaults')
+CONF.register_opts(metrics_opts, group='metrics')
+CONF.register_opts(tracing_opts, group='tracing')
+CONF.register_opts(profiler_opts, group='profiler')
+CONF.register_opts(sharding_opts, group='sharding')
+CONF.register_opts(reconciler_opts, group='reconciler')
+CONF.register_opts(garbage_collector_opts, group='garbage_collector')
+CONF.register_opts(namespace_subnet_opts, group='namespace_subnet')
 
 CONF.register_opts(lib_config.core_opts)
 CONF.register_opts(lib_config.binding_opts, 'binding')
 lib_config.register_neutron_opts(CONF)
+CONF.register_opts(neutron_client_opts, group='neutron')
 
 logging.register_options(CONF)
 
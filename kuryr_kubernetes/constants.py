@@ -15,11 +15,14 @@
 
 K8S_API_BASE = '/api/v1'
 K8S_API_NAMESPACES = K8S_API_BASE + '/namespaces'
+K8S_API_CRD = '/apis/openstack.org/v1'
+K8S_API_CRD_KURYRLOADBALANCERS = K8S_API_CRD + '/kuryrloadbalancers'
 
 K8S_OBJ_NAMESPACE = 'Namespace'
 K8S_OBJ_POD = 'Pod'
 K8S_OBJ_SERVICE = 'Service'
 K8S_OBJ_ENDPOINTS = 'Endpoints'
+K8S_OBJ_KURYRLOADBALANCER = 'KuryrLoadBalancer'
 
 K8S_POD_STATUS_PENDING = 'Pending'
 
@@ -27,6 +30,7 @@ K8S_ANNOTATION_PREFIX = 'openstack.org/kuryr'
 K8S_ANNOTATION_VIF = K8S_ANNOTATION_PREFIX + '-vif'
 K8S_ANNOTATION_LBAAS_SPEC = K8S_ANNOTATION_PREFIX + '-lbaas-spec'
 K8S_ANNOTATION_LBAAS_STATE = K8S_ANNOTATION_PREFIX + '-lbaas-state'
+K8S_ANNOTATION_NAMESPACE_SUBNET = K8S_ANNOTATION_PREFIX + '-namespace-subnet'
 
 K8S_OS_VIF_NOOP_PLUGIN = "noop"
 
@@ -74,6 +74,14 @@ class DriverBase(object):
                                 'type': cls})
         return driver
 
+    def warm_up(self):
+        """Preloads what the driver needs to handle the first events.
+
+        Called once by the controller before it starts watching the K8s
+        resources, so that the first objects do not wait for the Neutron
+        lookups. The default implementation does nothing.
+        """
+
 
 @six.add_metaclass(abc.ABCMeta)
 class PodProjectDriver(DriverBase):
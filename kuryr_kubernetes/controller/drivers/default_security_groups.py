@@ -14,14 +14,34 @@
 #    under the License.
 
 from oslo_config import cfg
+from oslo_log import log as logging
 
+from kuryr_kubernetes import clients
 from kuryr_kubernetes import config
 from kuryr_kubernetes.controller.drivers import base
 
+LOG = logging.getLogger(__name__)
+
+
+def _check_security_groups():
+    sg_list = config.CONF.neutron_defaults.pod_security_groups
+    if not sg_list:
+        return
+    neutron = clients.get_neutron_client()
+    found = set(sg['id'] for sg in neutron.list_security_groups(
+        id=sg_list, fields='id')['security_groups'])
+    missing = set(sg_list) - found
+    if missing:
+        LOG.warning("Security groups %s of [neutron_defaults] "
+                    "pod_security_groups not found", sorted(missing))
+
 
 class DefaultPodSecurityGroupsDriver(base.PodSecurityGroupsDriver):
     """Provides security groups for Pod based on a configuration option."""
 
+    def warm_up(self):
+        _check_security_groups()
+
     def get_security_groups(self, pod, project_id):
         sg_list = config.CONF.neutron_defaults.pod_security_groups
 
@@ -39,6 +59,9 @@ class DefaultPodSecurityGroupsDriver(base.PodSecurityGroupsDriver):
 class DefaultServiceSecurityGroupsDriver(base.ServiceSecurityGroupsDriver):
     """Provides security groups for Service based on a configuration option."""
 
+    def warm_up(self):
+        _check_security_groups()
+
     def get_security_groups(self, service, project_id):
         # NOTE(ivc): use the same option as DefaultPodSecurityGroupsDriver
         sg_list = config.CONF.neutron_defaults.pod_security_groups
@@ -22,7 +22,6 @@ from kuryr_kubernetes import os_vif_util
 
 
 def _get_subnet(subnet_id):
-    # TODO(ivc): add caching (e.g. oslo.cache with dict backend)
     neutron = clients.get_neutron_client()
 
     n_subnet = neutron.show_subnet(subnet_id).get('subnet')
@@ -36,9 +35,28 @@ def _get_subnet(subnet_id):
     return network
 
 
+def _get_cached_subnet(cache, subnet_id):
+    # NOTE: the subnets are looked up once per process, so changes of the
+    # configured subnets require a restart. The networks are shared by all
+    # the objects, the os_vif_util functions copy them before modifying them
+    try:
+        return cache[subnet_id]
+    except KeyError:
+        network = cache[subnet_id] = _get_subnet(subnet_id)
+        return network
+
+
 class DefaultPodSubnetDriver(base.PodSubnetsDriver):
     """Provides subnet for Pod port based on a configuration option."""
 
+    def __init__(self):
+        self._subnets = {}
+
+    def warm_up(self):
+        subnet_id = config.CONF.neutron_defaults.pod_subnet
+        if subnet_id:
+            _get_cached_subnet(self._subnets, subnet_id)
+
     def get_subnets(self, pod, project_id):
         subnet_id = config.CONF.neutron_defaults.pod_subnet
 
@@ -50,12 +68,20 @@ class DefaultPodSubnetDriver(base.PodSubnetsDriver):
             raise cfg.RequiredOptError('pod_subnet',
                                        cfg.OptGroup('neutron_defaults'))
 
-        return {subnet_id: _get_subnet(subnet_id)}
+        return {subnet_id: _get_cached_subnet(self._subnets, subnet_id)}
 
 
 class DefaultServiceSubnetDriver(base.ServiceSubnetsDriver):
     """Provides subnet for Service's LBaaS based on a configuration option."""
 
+    def __init__(self):
+        self._subnets = {}
+
+    def warm_up(self):
+        subnet_id = config.CONF.neutron_defaults.service_subnet
+        if subnet_id:
+            _get_cached_subnet(self._subnets, subnet_id)
+
     def get_subnets(self, service, project_id):
         subnet_id = config.CONF.neutron_defaults.service_subnet
 
@@ -67,4 +93,4 @@ class DefaultServiceSubnetDriver(base.ServiceSubnetsDriver):
             raise cfg.RequiredOptError('service_subnet',
                                        cfg.OptGroup('neutron_defaults'))
 
-        return {subnet_id: _get_subnet(subnet_id)}
+        return {subnet_id: _get_cached_subnet(self._subnets, subnet_id)}
@@ -22,6 +22,7 @@ from kuryr_kubernetes import clients
 from kuryr_kubernetes.controller.drivers import base
 from kuryr_kubernetes import exceptions as k_exc
 from kuryr_kubernetes import os_vif_util as ovu
+from kuryr_kubernetes import utils
 
 
 LOG = logging.getLogger(__name__)
@@ -56,7 +57,7 @@ class GenericPodVIFDriver(base.PodVIFDriver):
         port = neutron.show_port(vif.id).get('port')
 
         if port['status'] != kl_const.PORT_STATUS_ACTIVE:
-            raise k_exc.ResourceNotReady(vif)
+            raise k_exc.PortNotReady(vif)
 
         vif.active = True
 
@@ -69,6 +70,7 @@ class GenericPodVIFDriver(base.PodVIFDriver):
                          'device_id': self._get_device_id(pod),
                          'admin_state_up': True,
                          'binding:host_id': self._get_host_id(pod)}
+        utils.set_resource_description(port_req_body)
 
         if security_groups:
             port_req_body['security_groups'] = security_groups
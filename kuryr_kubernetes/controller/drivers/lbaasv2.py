@@ -25,6 +25,7 @@ from kuryr_kubernetes import clients
 from kuryr_kubernetes.controller.drivers import base
 from kuryr_kubernetes import exceptions as k_exc
 from kuryr_kubernetes.objects import lbaas as obj_lbaas
+from kuryr_kubernetes import utils
 
 LOG = logging.getLogger(__name__)
 _ACTIVATION_TIMEOUT = 300
@@ -113,12 +114,13 @@ class LBaaSv2Driver(base.LBaaSDriver):
 
     def _create_loadbalancer(self, loadbalancer):
         neutron = clients.get_neutron_client()
-        response = neutron.create_loadbalancer({'loadbalancer': {
-            'name': loadbalancer.name,
-            'project_id': loadbalancer.project_id,
-            'tenant_id': loadbalancer.project_id,
-            'vip_address': str(loadbalancer.ip),
-            'vip_subnet_id': loadbalancer.subnet_id}})
+        request = {'name': loadbalancer.name,
+                   'project_id': loadbalancer.project_id,
+                   'tenant_id': loadbalancer.project_id,
+                   'vip_address': str(loadbalancer.ip),
+                   'vip_subnet_id': loadbalancer.subnet_id}
+        utils.set_resource_description(request)
+        response = neutron.create_loadbalancer({'loadbalancer': request})
         loadbalancer.id = response['loadbalancer']['id']
         return loadbalancer
 
@@ -273,7 +275,7 @@ class LBaaSv2Driver(base.LBaaSDriver):
             except n_exc.StateInvalidClient:
                 continue
 
-        raise k_exc.ResourceNotReady(obj)
+        raise k_exc.LoadBalancerNotReady(obj)
 
     def _release(self, loadbalancer, obj, delete, *args, **kwargs):
         for remaining in self._provisioning_timer(_ACTIVATION_TIMEOUT):
@@ -286,7 +288,7 @@ class LBaaSv2Driver(base.LBaaSDriver):
             except n_exc.NotFound:
                 return
 
-        raise k_exc.ResourceNotReady(obj)
+        raise k_exc.LoadBalancerNotReady(obj)
 
     def _wait_for_provisioning(self, loadbalancer, timeout):
         neutron = clients.get_neutron_client()
@@ -304,7 +306,7 @@ class LBaaSv2Driver(base.LBaaSDriver):
                           {'status': status, 'lb': loadbalancer,
                            'rem': remaining})
 
-        raise k_exc.ResourceNotReady(loadbalancer)
+        raise k_exc.LoadBalancerNotReady(loadbalancer)
 
     def _provisioning_timer(self, timeout):
         # REVISIT(ivc): consider integrating with Retry
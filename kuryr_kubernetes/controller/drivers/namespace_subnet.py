@@ -0,0 +1,268 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Per-namespace Neutron networks and subnets for the Pods.
+
+Each namespace gets its own network and subnet, named after it, with the
+subnet allocated from `[namespace_subnet]pod_subnet_pool` and attached to
+`[namespace_subnet]pod_router`, so that the ports of the Pods are spread
+over as many networks as there are namespaces.
+
+The subnet of a namespace is recorded in the
+`openstack.org/kuryr-namespace-subnet` annotation of the Namespace, written
+on the condition that the Namespace did not change since it was read without
+it. Should several controller processes create a subnet for the same
+namespace concurrently, only one of them annotates it, and the others delete
+their networks and use the annotated subnet.
+
+The namespace to subnet map is held in memory: it is rebuilt when the
+controller starts, from a single listing of the Namespaces, of the subnets
+of the pool and of their networks, and the subnets of the new namespaces are
+added to it when they are first needed, so that resolving the subnet of a
+Pod is a dictionary lookup.
+"""
+
+import threading
+
+from neutronclient.common import exceptions as n_exc
+from oslo_config import cfg
+from oslo_log import log as logging
+
+from kuryr_kubernetes import clients
+from kuryr_kubernetes import config
+from kuryr_kubernetes import constants
+from kuryr_kubernetes.controller.drivers import base
+from kuryr_kubernetes import exceptions as k_exc
+from kuryr_kubernetes import os_vif_util
+
+LOG = logging.getLogger(__name__)
+
+_PREFIX = 'ns/'
+_NET_SUFFIX = '-net'
+_SUBNET_SUFFIX = '-subnet'
+
+
+def _get_network_name(namespace):
+    return '%s%s%s' % (_PREFIX, namespace, _NET_SUFFIX)
+
+
+def _get_subnet_name(namespace):
+    return '%s%s%s' % (_PREFIX, namespace, _SUBNET_SUFFIX)
+
+
+def _get_namespace_path(namespace):
+    return '%s/namespaces/%s' % (constants.K8S_API_BASE, namespace)
+
+
+def _get_annotated_subnet(k8s_namespace):
+    return k8s_namespace['metadata'].get('annotations', {}).get(
+        constants.K8S_ANNOTATION_NAMESPACE_SUBNET)
+
+
+def _get_oldest(n_subnets):
+    return min(n_subnets, key=lambda s: (s.get('created_at') or '', s['id']))
+
+
+def _to_osvif_network(n_subnet, n_network):
+    network = os_vif_util.neutron_to_osvif_network(n_network)
+    network.subnets.objects.append(
+        os_vif_util.neutron_to_osvif_subnet(n_subnet))
+    return network
+
+
+class NamespacePodSubnetDriver(base.PodSubnetsDriver):
+    """Provides a subnet for the Pods of each namespace.
+
+    The subnets of the namespaces are created when their first Pod needs
+    one and are not deleted with the namespaces, a namespace created again
+    gets its former subnet back if it was created by this version of the
+    driver.
+    """
+
+    def __init__(self):
+        self._subnets = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def warm_up(self):
+        self._load_subnets()
+
+    def get_subnets(self, pod, project_id):
+        namespace = pod['metadata']['namespace']
+        try:
+            subnet_id, network = self._subnets[namespace]
+        except KeyError:
+            # NOTE: the subnets of different namespaces are resolved
+            # concurrently, only the Pods of the same namespace wait for each
+            # other
+            with self._get_lock(namespace):
+                if namespace not in self._subnets:
+                    self._subnets[namespace] = self._get_or_create_subnet(
+                        namespace, project_id)
+                subnet_id, network = self._subnets[namespace]
+                # NOTE: the lock is only dropped once the subnet is
+                # resolved, the Pods still waiting for it then find the
+                # subnet and the later ones do not need it. As long as the
+                # subnet fails to resolve, they all wait for the same lock.
+                with self._lock:
+                    self._locks.pop(namespace, None)
+        return {subnet_id: network}
+
+    def _get_lock(self, namespace):
+        with self._lock:
+            return self._locks.setdefault(namespace, threading.Lock())
+
+    def _get_subnet_pool(self):
+        subnet_pool = config.CONF.namespace_subnet.pod_subnet_pool
+        if not subnet_pool:
+            raise cfg.RequiredOptError('pod_subnet_pool',
+                                       cfg.OptGroup('namespace_subnet'))
+        return subnet_pool
+
+    def _load_subnets(self):
+        subnet_pool = self._get_subnet_pool()
+        k8s = clients.get_kubernetes_client()
+        subnet_ids = {}
+        for k8s_namespace in k8s.get('%s/namespaces' % constants.K8S_API_BASE
+                                     ).get('items', []):
+            subnet_id = _get_annotated_subnet(k8s_namespace)
+            if subnet_id:
+                subnet_ids[k8s_namespace['metadata']['name']] = subnet_id
+        if not subnet_ids:
+            LOG.info("Loaded the subnets of 0 namespaces")
+            return
+
+        neutron = clients.get_neutron_client()
+        n_subnets = {n_subnet['id']: n_subnet for n_subnet
+                     in neutron.list_subnets(
+                         subnetpool_id=subnet_pool)['subnets']}
+        n_networks = {n_network['id']: n_network
+                      for n_network in neutron.list_networks(
+                          id=list(set(n_subnet['network_id'] for n_subnet
+                                      in n_subnets.values())))['networks']}
+        subnets = {}
+        for namespace, subnet_id in subnet_ids.items():
+            n_subnet = n_subnets.get(subnet_id)
+            n_network = n_subnet and n_networks.get(n_subnet['network_id'])
+            if n_network:
+                subnets[namespace] = (n_subnet['id'],
+                                      _to_osvif_network(n_subnet, n_network))
+        with self._lock:
+            for namespace, subnet in subnets.items():
+                self._subnets.setdefault(namespace, subnet)
+        LOG.info("Loaded the subnets of %d namespaces", len(subnets))
+
+    def _find_subnet(self, neutron, namespace):
+        n_subnets = neutron.list_subnets(
+            name=_get_subnet_name(namespace),
+            subnetpool_id=self._get_subnet_pool())['subnets']
+        return _get_oldest(n_subnets) if n_subnets else None
+
+    def _get_or_create_subnet(self, namespace, project_id):
+        k8s = clients.get_kubernetes_client()
+        neutron = clients.get_neutron_client()
+        path = _get_namespace_path(namespace)
+        k8s_namespace = k8s.get(path)
+        subnet_id = _get_annotated_subnet(k8s_namespace)
+        n_subnet = None
+        if subnet_id:
+            try:
+                n_subnet = neutron.show_subnet(subnet_id)['subnet']
+            except n_exc.NotFound:
+                LOG.warning("Subnet %s of namespace %s not found, claiming "
+                            "another one", subnet_id, namespace)
+        if n_subnet is None:
+            n_subnet = self._claim_subnet(k8s, neutron, path, k8s_namespace,
+                                          project_id)
+        n_network = neutron.show_network(n_subnet['network_id'])['network']
+        return n_subnet['id'], _to_osvif_network(n_subnet, n_network)
+
+    def _claim_subnet(self, k8s, neutron, path, k8s_namespace, project_id):
+        """Annotates the Namespace with a found or new subnet.
+
+        The Namespace may be annotated with a subnet that no longer exists,
+        which is replaced.
+
+        :returns: the subnet the Namespace is annotated with, which is the
+                  one of another controller process if it won the race
+        """
+        namespace = k8s_namespace['metadata']['name']
+        stale_subnet_id = _get_annotated_subnet(k8s_namespace)
+        # NOTE: the subnet may have been created by a controller process that
+        # failed to annotate the Namespace
+        n_subnet = self._find_subnet(neutron, namespace)
+        created = n_subnet is None
+        if created:
+            n_subnet = self._create_subnet(neutron, namespace, project_id)
+        try:
+            k8s.annotate(path, {
+                constants.K8S_ANNOTATION_NAMESPACE_SUBNET: n_subnet['id']},
+                resource_version=k8s_namespace['metadata']['resourceVersion'])
+        except k_exc.K8sClientException:
+            subnet_id = _get_annotated_subnet(k8s.get(path))
+            if not subnet_id or subnet_id in (stale_subnet_id,
+                                              n_subnet['id']):
+                raise
+            LOG.debug("Namespace %s was annotated with subnet %s "
+                      "concurrently, dropping subnet %s", namespace,
+                      subnet_id, n_subnet['id'])
+            if created:
+                self._delete_subnet(neutron, n_subnet)
+            return neutron.show_subnet(subnet_id)['subnet']
+
+        self._add_router_interface(neutron, n_subnet, created)
+        if created:
+            LOG.info("Created subnet %s (%s) for namespace %s",
+                     n_subnet['id'], n_subnet['cidr'], namespace)
+        return n_subnet
+
+    def _add_router_interface(self, neutron, n_subnet, created):
+        router_id = config.CONF.namespace_subnet.pod_router
+        if not router_id:
+            return
+        try:
+            neutron.add_interface_router(router_id,
+                                         {'subnet_id': n_subnet['id']})
+        except (n_exc.BadRequest, n_exc.Conflict):
+            # NOTE: a subnet found by name already has its interface if it
+            # belonged to a Namespace of the same name deleted since
+            if created:
+                raise
+            LOG.debug("Subnet %s is already attached to router %s",
+                      n_subnet['id'], router_id)
+
+    def _create_subnet(self, neutron, namespace, project_id):
+        n_network = neutron.create_network({'network': {
+            'name': _get_network_name(namespace),
+            'project_id': project_id}})['network']
+        try:
+            return neutron.create_subnet({'subnet': {
+                'name': _get_subnet_name(namespace),
+                'network_id': n_network['id'],
+                'project_id': project_id,
+                'subnetpool_id': self._get_subnet_pool(),
+                'ip_version': 4}})['subnet']
+        except n_exc.NeutronClientException:
+            LOG.exception("Failed to create the subnet of namespace %s",
+                          namespace)
+            self._delete_network(neutron, n_network['id'])
+            raise
+
+    def _delete_subnet(self, neutron, n_subnet):
+        # NOTE: deleting the network deletes its subnet
+        self._delete_network(neutron, n_subnet['network_id'])
+
+    def _delete_network(self, neutron, network_id):
+        try:
+            neutron.delete_network(network_id)
+        except n_exc.NeutronClientException:
+            LOG.exception("Failed to delete network %s", network_id)
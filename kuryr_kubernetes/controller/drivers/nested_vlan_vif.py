@@ -25,6 +25,7 @@ from kuryr_kubernetes import constants as const
 from kuryr_kubernetes.controller.drivers import generic_vif
 from kuryr_kubernetes import exceptions as k_exc
 from kuryr_kubernetes import os_vif_util as ovu
+from kuryr_kubernetes import utils
 
 
 LOG = logging.getLogger(__name__)
@@ -70,6 +71,7 @@ class NestedVlanPodVIFDriver(generic_vif.GenericPodVIFDriver):
                          'fixed_ips': ovu.osvif_to_neutron_fixed_ips(subnets),
                          'device_owner': kl_const.DEVICE_OWNER,
                          'admin_state_up': True}
+        utils.set_resource_description(port_req_body)
 
         if security_groups:
             port_req_body['security_groups'] = security_groups
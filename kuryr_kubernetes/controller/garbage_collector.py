@@ -0,0 +1,251 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Garbage collection of the Neutron resources leaked by the controller.
+
+A controller that stops between creating a port (or a load balancer) and
+annotating the K8s object with it leaks that resource, as nothing refers to
+it any more. The :class:`kuryr_kubernetes.controller.reconciler.Reconciler`
+finds the Kuryr ports and load balancers no object refers to; after each of
+its passes, the garbage collector deletes up to
+`[garbage_collector]batch_size` of them, at most `[garbage_collector]rate`
+Neutron deletions per second.
+
+Only the ports and load balancers created by the controllers of this cluster
+are deleted: the ports need the Kuryr `device_owner` and both need the
+`[neutron_defaults]resource_description` description, without which the
+garbage collector is disabled. A load balancer whose Endpoints or Service
+still exist is left alone, as it may still be built: its LBaaSState is only
+written once its listeners, pools and members are created. Then:
+
+* the leaked trunk subports are removed from their trunks first, with one
+  request per trunk, found in a single listing of the trunks,
+* the pools (and with them their members) and listeners of the leaked load
+  balancers, found in a single listing of each, are released before the
+  load balancers, through the LBaaS driver that waits for them to be
+  provisioned.
+
+With `[garbage_collector]dry_run`, the resources are only reported. With
+sharding, only the leader collects the garbage.
+"""
+
+import time
+
+from kuryr.lib import constants as kl_const
+from neutronclient.common import exceptions as n_exc
+from oslo_log import log as logging
+
+from kuryr_kubernetes import clients
+from kuryr_kubernetes import config
+from kuryr_kubernetes import constants
+from kuryr_kubernetes.controller.drivers import base as drv_base
+from kuryr_kubernetes import exceptions as k_exc
+from kuryr_kubernetes.objects import lbaas as obj_lbaas
+from kuryr_kubernetes import utils
+
+LOG = logging.getLogger(__name__)
+
+
+def _get_loadbalancer_ids(obj):
+    # NOTE: the LBaaSv2 API lists the load balancers of the listeners and
+    # pools, while they are created with a single 'loadbalancer_id'
+    ids = [lb['id'] for lb in obj.get('loadbalancers', [])]
+    if obj.get('loadbalancer_id'):
+        ids.append(obj['loadbalancer_id'])
+    return ids
+
+
+def _get_endpoints(loadbalancer):
+    # NOTE: the LBaaS driver names the load balancers after their Endpoints
+    namespace, name = loadbalancer.name.split('/')
+    return {'metadata': {'namespace': namespace, 'name': name}}
+
+
+def _is_collectable_port(port):
+    return (port.get('device_owner') == kl_const.DEVICE_OWNER and
+            utils.is_cluster_resource(port))
+
+
+def _is_collectable_loadbalancer(loadbalancer):
+    parts = (loadbalancer.get('name') or '').split('/')
+    return (len(parts) == 2 and all(parts) and
+            utils.is_cluster_resource(loadbalancer))
+
+
+class GarbageCollector(object):
+    """Deletes batches of the leaked Neutron ports and load balancers.
+
+    :param is_leader: callable returning whether this controller replica
+                      collects the garbage, by default it always does
+    """
+
+    def __init__(self, is_leader=None):
+        conf = config.CONF.garbage_collector
+        self._dry_run = conf.dry_run
+        self._batch_size = conf.batch_size
+        self._rate = conf.rate
+        self._is_leader = is_leader
+        self._stats = {'sweeps': 0, 'ports': 0, 'loadbalancers': 0,
+                       'failures': 0}
+
+    def stats(self):
+        """Returns the number of sweeps, deleted resources and failures."""
+        return dict(self._stats)
+
+    def collect(self, ports, loadbalancers):
+        """Deletes a batch of the leaked resources.
+
+        :param ports: dict of the leaked Neutron ports by ID
+        :param loadbalancers: dict of the leaked Neutron load balancers by ID
+        :returns: dict with the lists of the IDs of the 'ports' and
+                  'loadbalancers' deleted (or that would have been in
+                  dry-run mode) or None if this replica is not collecting
+        """
+        if self._is_leader is not None and not self._is_leader():
+            return None
+        port_ids = sorted(port_id for port_id, port in ports.items()
+                          if _is_collectable_port(port))[:self._batch_size]
+        lb_ids = sorted(lb_id for lb_id, lb in loadbalancers.items()
+                        if _is_collectable_loadbalancer(lb))[
+            :self._batch_size - len(port_ids)]
+        if lb_ids:
+            k8s = clients.get_kubernetes_client()
+            lb_ids = [lb_id for lb_id in lb_ids
+                      if not self._is_in_use(k8s, loadbalancers[lb_id])]
+        report = {'ports': port_ids, 'loadbalancers': lb_ids}
+        if not port_ids and not lb_ids:
+            return report
+
+        if self._dry_run:
+            for port_id in port_ids:
+                LOG.info("Dry run: would delete leaked port %s (%s)",
+                         port_id, ports[port_id].get('name'))
+            for lb_id in lb_ids:
+                LOG.info("Dry run: would delete leaked load balancer %s "
+                         "(%s)", lb_id, loadbalancers[lb_id].get('name'))
+            return report
+
+        self._stats['sweeps'] += 1
+        neutron = clients.get_neutron_client()
+        report['ports'] = self._delete_ports(neutron, port_ids)
+        report['loadbalancers'] = self._delete_loadbalancers(
+            neutron, [loadbalancers[lb_id] for lb_id in lb_ids])
+        LOG.info("Deleted %d leaked ports and %d leaked load balancers",
+                 len(report['ports']), len(report['loadbalancers']))
+        return report
+
+    def _is_in_use(self, k8s, loadbalancer):
+        """Returns whether the Endpoints or Service of the LB may exist."""
+        namespace, name = loadbalancer['name'].split('/')
+        for collection in ('endpoints', 'services'):
+            try:
+                k8s.get('%s/namespaces/%s/%s/%s' % (
+                    constants.K8S_API_BASE, namespace, collection, name))
+            except k_exc.K8sResourceNotFound:
+                continue
+            except k_exc.K8sClientException:
+                LOG.warning("Failed to check the %s of load balancer %s, "
+                            "keeping it", collection, loadbalancer['id'])
+                return True
+            LOG.debug("Load balancer %s (%s) is still in use, keeping it",
+                      loadbalancer['id'], loadbalancer['name'])
+            return True
+        return False
+
+    def _throttle(self):
+        time.sleep(1.0 / self._rate)
+
+    def _get_trunk_subports(self, neutron, port_ids):
+        try:
+            trunks = neutron.list_trunks()['trunks']
+        except n_exc.NeutronClientException:
+            LOG.debug("Failed to list the trunks, assuming none")
+            return {}
+        subports = {}
+        for trunk in trunks:
+            for subport in trunk.get('sub_ports', []):
+                if subport['port_id'] in port_ids:
+                    subports.setdefault(trunk['id'], []).append(
+                        {'port_id': subport['port_id']})
+        return subports
+
+    def _delete_ports(self, neutron, port_ids):
+        failed = set()
+        for trunk_id, subports in self._get_trunk_subports(
+                neutron, set(port_ids)).items():
+            try:
+                neutron.trunk_remove_subports(trunk_id,
+                                              {'sub_ports': subports})
+            except n_exc.NeutronClientException:
+                LOG.exception("Failed to remove the leaked subports %s from "
+                              "trunk %s", subports, trunk_id)
+                failed.update(subport['port_id'] for subport in subports)
+            self._throttle()
+
+        deleted = []
+        for port_id in port_ids:
+            if port_id in failed:
+                self._stats['failures'] += 1
+                continue
+            try:
+                neutron.delete_port(port_id)
+            except n_exc.PortNotFoundClient:
+                pass
+            except n_exc.NeutronClientException:
+                LOG.exception("Failed to delete the leaked port %s", port_id)
+                self._stats['failures'] += 1
+                continue
+            finally:
+                self._throttle()
+            deleted.append(port_id)
+            self._stats['ports'] += 1
+        return deleted
+
+    def _delete_loadbalancers(self, neutron, loadbalancers):
+        if not loadbalancers:
+            return []
+        lbs = {lb['id']: obj_lbaas.LBaaSLoadBalancer(id=lb['id'],
+                                                     name=lb['name'])
+               for lb in loadbalancers}
+        children = {lb_id: [] for lb_id in lbs}
+        for pool in neutron.list_lbaas_pools()['pools']:
+            for lb_id in _get_loadbalancer_ids(pool):
+                if lb_id in children:
+                    children[lb_id].append(obj_lbaas.LBaaSPool(
+                        id=pool['id'], loadbalancer_id=lb_id))
+        for listener in neutron.list_listeners()['listeners']:
+            for lb_id in _get_loadbalancer_ids(listener):
+                if lb_id in children:
+                    children[lb_id].append(obj_lbaas.LBaaSListener(
+                        id=listener['id'], loadbalancer_id=lb_id))
+
+        drv_lbaas = drv_base.LBaaSDriver.get_instance()
+        deleted = []
+        for lb_id, lb in sorted(lbs.items()):
+            endpoints = _get_endpoints(lb)
+            try:
+                for obj in children[lb_id]:
+                    if isinstance(obj, obj_lbaas.LBaaSPool):
+                        drv_lbaas.release_pool(endpoints, lb, obj)
+                    else:
+                        drv_lbaas.release_listener(endpoints, lb, obj)
+                    self._throttle()
+                drv_lbaas.release_loadbalancer(endpoints, lb)
+                self._throttle()
+            except Exception:
+                LOG.exception("Failed to delete the leaked load balancer %s",
+                              lb_id)
+                self._stats['failures'] += 1
+                continue
+            deleted.append(lb_id)
+            self._stats['loadbalancers'] += 1
+        return deleted
@@ -15,18 +15,48 @@
 
 from kuryr.lib._i18n import _
 from oslo_log import log as logging
-from oslo_serialization import jsonutils
 
+from kuryr_kubernetes import annotations
 from kuryr_kubernetes import clients
+from kuryr_kubernetes import config
 from kuryr_kubernetes import constants as k_const
 from kuryr_kubernetes.controller.drivers import base as drv_base
 from kuryr_kubernetes import exceptions as k_exc
 from kuryr_kubernetes.handlers import k8s_base
+from kuryr_kubernetes.objects import codec as obj_codec
 from kuryr_kubernetes.objects import lbaas as obj_lbaas
 
 LOG = logging.getLogger(__name__)
 
 
+def _use_crd():
+    return config.CONF.kubernetes.lbaas_state_storage == 'crd'
+
+
+def _get_crd_link(resource):
+    metadata = resource['metadata']
+    return "%(crd)s/namespaces/%(namespace)s/kuryrloadbalancers/%(name)s" % {
+        'crd': k_const.K8S_API_CRD,
+        'namespace': metadata['namespace'],
+        'name': metadata['name']}
+
+
+def _get_crd(resource):
+    """Returns the KuryrLoadBalancer of the resource or an empty dict."""
+    k8s = clients.get_kubernetes_client()
+    try:
+        return k8s.get(_get_crd_link(resource))
+    except k_exc.K8sResourceNotFound:
+        return {}
+
+
+def _get_crd_object(crd, field, obj_cls):
+    primitive = crd.get(field)
+    if not primitive:
+        return None
+    return obj_codec.from_primitive(obj_cls, primitive)
+
+
 class LBaaSSpecHandler(k8s_base.ResourceEventHandler):
     """LBaaSSpecHandler handles K8s Service events.
 
@@ -151,32 +181,49 @@ class LBaaSSpecHandler(k8s_base.ResourceEventHandler):
         else:
             lbaas_spec.obj_reset_changes(recursive=True)
             LOG.debug("Setting LBaaSServiceSpec annotation: %r", lbaas_spec)
-            annotation = jsonutils.dumps(lbaas_spec.obj_to_primitive(),
-                                         sort_keys=True)
+            annotation = obj_codec.dumps(lbaas_spec)
         svc_link = service['metadata']['selfLink']
-        ep_link = self._get_endpoints_link(service)
         k8s = clients.get_kubernetes_client()
 
-        try:
-            k8s.annotate(ep_link,
-                         {k_const.K8S_ANNOTATION_LBAAS_SPEC: annotation})
-        except k_exc.K8sClientException:
-            # REVISIT(ivc): only raise ResourceNotReady for NotFound
-            raise k_exc.ResourceNotReady(ep_link)
+        if _use_crd():
+            self._set_crd_lbaas_spec(service, lbaas_spec)
+        else:
+            ep_link = self._get_endpoints_link(service)
+            try:
+                k8s.annotate(ep_link,
+                             {k_const.K8S_ANNOTATION_LBAAS_SPEC: annotation})
+            except k_exc.K8sClientException:
+                # REVISIT(ivc): only raise ResourceNotReady for NotFound
+                raise k_exc.ResourceNotReady(ep_link)
 
         k8s.annotate(svc_link,
                      {k_const.K8S_ANNOTATION_LBAAS_SPEC: annotation},
                      resource_version=service['metadata']['resourceVersion'])
 
+    def _set_crd_lbaas_spec(self, service, lbaas_spec):
+        k8s = clients.get_kubernetes_client()
+        crd_link = _get_crd_link(service)
+        spec = obj_codec.to_primitive(lbaas_spec) if lbaas_spec else None
+
+        try:
+            k8s.patch_crd('spec', crd_link, spec)
+        except k_exc.K8sResourceNotFound:
+            metadata = service['metadata']
+            k8s.post(crd_link.rsplit('/', 1)[0], {
+                'apiVersion': 'openstack.org/v1',
+                'kind': k_const.K8S_OBJ_KURYRLOADBALANCER,
+                'metadata': {'name': metadata['name'],
+                             'namespace': metadata['namespace']},
+                'spec': spec,
+            })
+
     def _get_lbaas_spec(self, service):
         # TODO(ivc): same as '_set_lbaas_spec'
-        try:
-            annotations = service['metadata']['annotations']
-            annotation = annotations[k_const.K8S_ANNOTATION_LBAAS_SPEC]
-        except KeyError:
+        obj = annotations.get_object(service,
+                                     k_const.K8S_ANNOTATION_LBAAS_SPEC,
+                                     obj_lbaas.LBaaSServiceSpec)
+        if obj is None:
             return None
-        obj_dict = jsonutils.loads(annotation)
-        obj = obj_lbaas.LBaaSServiceSpec.obj_from_primitive(obj_dict)
         LOG.debug("Got LBaaSServiceSpec from annotation: %r", obj)
         return obj
 
@@ -196,12 +243,27 @@ class LoadBalancerHandler(k8s_base.ResourceEventHandler):
         self._drv_pod_project = drv_base.PodProjectDriver.get_instance()
         self._drv_pod_subnets = drv_base.PodSubnetsDriver.get_instance()
 
+    def prefilter(self, event):
+        # NOTE: the checks of '_should_ignore' that do not require decoding
+        # the LBaaSServiceSpec
+        if event.get('type') == 'DELETED':
+            return True
+        endpoints = event['object']
+        if not _use_crd():
+            annotations = endpoints['metadata'].get('annotations', {})
+            if k_const.K8S_ANNOTATION_LBAAS_SPEC not in annotations:
+                return False
+        return self._has_pods(endpoints)
+
     def on_present(self, endpoints):
-        lbaas_spec = self._get_lbaas_spec(endpoints)
+        # NOTE: with the CRD storage, the KuryrLoadBalancer is only fetched
+        # once for both the spec and the state
+        crd = _get_crd(endpoints) if _use_crd() else None
+        lbaas_spec = self._get_lbaas_spec(endpoints, crd)
         if self._should_ignore(endpoints, lbaas_spec):
             return
 
-        lbaas_state = self._get_lbaas_state(endpoints)
+        lbaas_state = self._get_lbaas_state(endpoints, crd)
         if not lbaas_state:
             lbaas_state = obj_lbaas.LBaaSState()
 
@@ -220,12 +282,21 @@ class LoadBalancerHandler(k8s_base.ResourceEventHandler):
 
     def on_deleted(self, endpoints):
         lbaas_state = self._get_lbaas_state(endpoints)
-        if not lbaas_state:
-            return
-        # NOTE(ivc): deleting pool deletes its members
-        lbaas_state.members = []
-        self._sync_lbaas_members(endpoints, lbaas_state,
-                                 obj_lbaas.LBaaSServiceSpec())
+        if lbaas_state:
+            # NOTE(ivc): deleting pool deletes its members
+            lbaas_state.members = []
+            self._sync_lbaas_members(endpoints, lbaas_state,
+                                     obj_lbaas.LBaaSServiceSpec())
+
+        if _use_crd():
+            # NOTE: the KuryrLoadBalancer is only removed once the Neutron
+            # resources it tracks are released, so it is not garbage
+            # collected along with the Service.
+            k8s = clients.get_kubernetes_client()
+            try:
+                k8s.delete(_get_crd_link(endpoints))
+            except k_exc.K8sResourceNotFound:
+                pass
 
     def _should_ignore(self, endpoints, lbaas_spec):
         return not(lbaas_spec and
@@ -453,15 +524,17 @@ class LoadBalancerHandler(k8s_base.ResourceEventHandler):
         lbaas_state.loadbalancer = lb
         return changed
 
-    def _get_lbaas_spec(self, endpoints):
+    def _get_lbaas_spec(self, endpoints, crd=None):
         # TODO(ivc): same as '_get_lbaas_state'
-        try:
-            annotations = endpoints['metadata']['annotations']
-            annotation = annotations[k_const.K8S_ANNOTATION_LBAAS_SPEC]
-        except KeyError:
+        if _use_crd():
+            if crd is None:
+                crd = _get_crd(endpoints)
+            return _get_crd_object(crd, 'spec', obj_lbaas.LBaaSServiceSpec)
+        obj = annotations.get_object(endpoints,
+                                     k_const.K8S_ANNOTATION_LBAAS_SPEC,
+                                     obj_lbaas.LBaaSServiceSpec)
+        if obj is None:
             return None
-        obj_dict = jsonutils.loads(annotation)
-        obj = obj_lbaas.LBaaSServiceSpec.obj_from_primitive(obj_dict)
         LOG.debug("Got LBaaSServiceSpec from annotation: %r", obj)
         return obj
 
@@ -473,21 +546,84 @@ class LoadBalancerHandler(k8s_base.ResourceEventHandler):
         else:
             lbaas_state.obj_reset_changes(recursive=True)
             LOG.debug("Setting LBaaSState annotation: %r", lbaas_state)
-            annotation = jsonutils.dumps(lbaas_state.obj_to_primitive(),
-                                         sort_keys=True)
+            annotation = obj_codec.dumps(lbaas_state)
         k8s = clients.get_kubernetes_client()
+        if _use_crd():
+            k8s.patch_crd('status', _get_crd_link(endpoints),
+                          obj_codec.to_primitive(lbaas_state)
+                          if lbaas_state else None)
+            return
+        # NOTE: unlike the LBaaSServiceSpec update of the Endpoints, the
+        # LBaaSState update does not require any further handling
         k8s.annotate(endpoints['metadata']['selfLink'],
                      {k_const.K8S_ANNOTATION_LBAAS_STATE: annotation},
-                     resource_version=endpoints['metadata']['resourceVersion'])
+                     resource_version=endpoints['metadata']['resourceVersion'],
+                     suppress_echo=True)
 
-    def _get_lbaas_state(self, endpoints):
+    def _get_lbaas_state(self, endpoints, crd=None):
         # TODO(ivc): same as '_set_lbaas_state'
-        try:
-            annotations = endpoints['metadata']['annotations']
-            annotation = annotations[k_const.K8S_ANNOTATION_LBAAS_STATE]
-        except KeyError:
+        if _use_crd():
+            if crd is None:
+                crd = _get_crd(endpoints)
+            return _get_crd_object(crd, 'status', obj_lbaas.LBaaSState)
+        obj = annotations.get_object(endpoints,
+                                     k_const.K8S_ANNOTATION_LBAAS_STATE,
+                                     obj_lbaas.LBaaSState)
+        if obj is None:
             return None
-        obj_dict = jsonutils.loads(annotation)
-        obj = obj_lbaas.LBaaSState.obj_from_primitive(obj_dict)
         LOG.debug("Got LBaaSState from annotation: %r", obj)
         return obj
+
+
+class KuryrLoadBalancerHandler(LoadBalancerHandler):
+    """KuryrLoadBalancerHandler handles KuryrLoadBalancer events.
+
+    With `[kubernetes]lbaas_state_storage = crd`, LBaaSSpecHandler stores the
+    LBaaSServiceSpec in a KuryrLoadBalancer custom resource instead of the
+    Endpoints annotations, so changes to the spec no longer produce Endpoints
+    events. KuryrLoadBalancerHandler reacts to those changes by handling the
+    corresponding Endpoints like LoadBalancerHandler does.
+
+    The KuryrLoadBalancers are also modified by the LBaaSState updates of
+    the handler itself, so only the events that change the spec handled
+    last are acted upon.
+    """
+
+    OBJECT_KIND = k_const.K8S_OBJ_KURYRLOADBALANCER
+
+    def __init__(self):
+        super(KuryrLoadBalancerHandler, self).__init__()
+        self._specs = {}
+
+    def prefilter(self, event):
+        return True
+
+    def on_present(self, loadbalancer_crd):
+        metadata = loadbalancer_crd['metadata']
+        key = (metadata['namespace'], metadata['name'])
+        spec = loadbalancer_crd.get('spec')
+        if key in self._specs and self._specs[key] == spec:
+            LOG.debug("Spec of KuryrLoadBalancer %s/%s unchanged", *key)
+            return
+        ep_link = "%(base)s/namespaces/%(namespace)s/endpoints/%(name)s" % {
+            'base': k_const.K8S_API_BASE,
+            'namespace': metadata['namespace'],
+            'name': metadata['name']}
+        k8s = clients.get_kubernetes_client()
+        try:
+            endpoints = k8s.get(ep_link)
+        except k_exc.K8sResourceNotFound:
+            LOG.debug("Endpoints %s not found", ep_link)
+            return
+        # NOTE: the status of the event may be older than the stored one,
+        # e.g. when the event was queued while the previous one was being
+        # handled, so the current KuryrLoadBalancer is fetched to not write
+        # an outdated LBaaSState back
+        super(KuryrLoadBalancerHandler, self).on_present(endpoints)
+        self._specs[key] = spec
+
+    def on_deleted(self, loadbalancer_crd):
+        # NOTE: LoadBalancerHandler deletes KuryrLoadBalancers once the
+        # Endpoints are deleted and the Neutron resources released.
+        metadata = loadbalancer_crd['metadata']
+        self._specs.pop((metadata['namespace'], metadata['name']), None)
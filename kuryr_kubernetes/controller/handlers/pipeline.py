@@ -13,12 +13,18 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from kuryr_kubernetes import annotations
+from kuryr_kubernetes import clients
+from kuryr_kubernetes import constants
 from kuryr_kubernetes import exceptions
 from kuryr_kubernetes.handlers import asynchronous as h_async
 from kuryr_kubernetes.handlers import dispatch as h_dis
+from kuryr_kubernetes.handlers import echo as h_echo
 from kuryr_kubernetes.handlers import k8s_base as h_k8s
 from kuryr_kubernetes.handlers import logging as h_log
+from kuryr_kubernetes.handlers import metrics as h_metrics
 from kuryr_kubernetes.handlers import retry as h_retry
+from kuryr_kubernetes.handlers import shard as h_shard
 
 
 class ControllerPipeline(h_dis.EventPipeline):
@@ -35,7 +41,11 @@ class ControllerPipeline(h_dis.EventPipeline):
 
       - failing handlers (i.e. ones that raise `Exception`s) are retried
         until either the handler succeeds or a finite amount of time passes,
-        in which case the most recent exception is logged
+        in which case the most recent exception is logged; retries are put
+        back into the event queue after a delay rather than blocking it, and
+        are dropped if a newer event for the same object arrives; the retry
+        interval depends on the type of the failure and adapts to the time
+        it usually takes to be resolved
 
       - in case there are multiple handlers registered for the same resource
         type, all such handlers are considered independent (i.e. if one
@@ -46,17 +56,103 @@ class ControllerPipeline(h_dis.EventPipeline):
 
       - events for the same Kubernetes object are handled sequentially in
         the order of arrival
+
+      - events caused by the handlers' own annotation updates are dropped
+        before they are queued (see
+        :class:`kuryr_kubernetes.handlers.echo.EchoFilter`)
+
+      - events rejected by the `prefilter` of all the handlers registered for
+        them are dropped before they are queued (see
+        :class:`kuryr_kubernetes.handlers.dispatch.Prefilter`)
+
+      - with `owns`, the events of the objects this controller replica does
+        not own are dropped first (see
+        :class:`kuryr_kubernetes.handlers.shard.ShardFilter`)
     """
 
-    def __init__(self, thread_group):
+    def __init__(self, thread_group, owns=None):
         self._tg = thread_group
+        self._owns = owns
+        self._shard_filter = None
+        self._echo_filter = None
+        self._prefilter = None
+        self._async = None
         super(ControllerPipeline, self).__init__()
 
+    def register(self, consumer):
+        super(ControllerPipeline, self).register(consumer)
+        for key_fn, key in consumer.consumes.items():
+            self._prefilter.register(key_fn, key, consumer)
+
+    def get_shard_stats(self):
+        """Returns the number of dropped and passed shard filter events."""
+        if self._shard_filter is None:
+            return {'dropped': 0, 'passed': 0}
+        return self._shard_filter.stats()
+
+    def get_echo_stats(self):
+        """Returns the number of suppressed and passed echo filter events."""
+        return self._echo_filter.stats()
+
+    def get_prefilter_stats(self):
+        """Returns the statistics of the handlers' prefilters."""
+        return self._prefilter.stats()
+
+    def get_retry_stats(self):
+        """Returns the statistics of the rescheduled handler retries."""
+        return self._async.retry_stats()
+
+    def get_queue_stats(self):
+        """Returns the number of queued events and of active groups."""
+        return self._async.queue_stats()
+
+    def get_annotate_stats(self):
+        """Returns the annotate statistics of the K8s client per kind."""
+        return clients.get_kubernetes_client().get_annotate_stats()
+
+    def get_annotation_cache_stats(self):
+        """Returns the statistics of the annotation cache."""
+        return annotations.get_stats()
+
     def _wrap_consumer(self, consumer):
-        # TODO(ivc): tune retry interval/timeout
         return h_log.LogExceptions(h_retry.Retry(
-            consumer, exceptions=exceptions.ResourceNotReady))
+            h_metrics.Instrumented(consumer),
+            exceptions=exceptions.ResourceNotReady,
+            requeue=self._async.requeue, policies=_get_retry_policies()))
 
     def _wrap_dispatcher(self, dispatcher):
-        return h_log.LogExceptions(h_async.Async(dispatcher, self._tg,
-                                                 h_k8s.object_link))
+        # NOTE: EchoFilter has to see all the events of a resource to
+        # recognize echoes, so it is placed before the Prefilter
+        self._async = h_async.Async(dispatcher, self._tg, _group_by)
+        self._prefilter = h_dis.Prefilter(self._async)
+        self._echo_filter = h_echo.EchoFilter(self._prefilter)
+        if self._owns is None:
+            return h_log.LogExceptions(self._echo_filter)
+        self._shard_filter = h_shard.ShardFilter(self._echo_filter,
+                                                 self._owns)
+        return h_log.LogExceptions(self._shard_filter)
+
+
+def _get_retry_policies():
+    # NOTE: ports usually become ACTIVE within a second or two, while load
+    # balancers take tens of seconds to provision (after LBaaSv2Driver has
+    # already waited for them for up to its own activation timeout)
+    return {
+        exceptions.PortNotReady: h_retry.RetryPolicy(
+            interval=1, min_interval=0.5, max_interval=3),
+        exceptions.LoadBalancerNotReady: h_retry.RetryPolicy(
+            interval=10, min_interval=3, max_interval=60),
+    }
+
+
+def _group_by(event):
+    # NOTE: KuryrLoadBalancer events are grouped with the events of the
+    # Endpoints of the same name, so that both are handled serially rather
+    # than updating the same load balancer concurrently
+    if h_k8s.object_kind(event) == constants.K8S_OBJ_KURYRLOADBALANCER:
+        metadata = event['object']['metadata']
+        return "%(base)s/namespaces/%(namespace)s/endpoints/%(name)s" % {
+            'base': constants.K8S_API_BASE,
+            'namespace': metadata['namespace'],
+            'name': metadata['name']}
+    return h_k8s.object_link(event)
@@ -15,13 +15,15 @@
 
 from os_vif import objects as obj_vif
 from oslo_log import log as logging
-from oslo_serialization import jsonutils
 
+from kuryr_kubernetes import annotations
 from kuryr_kubernetes import clients
 from kuryr_kubernetes import constants
 from kuryr_kubernetes.controller.drivers import base as drivers
 from kuryr_kubernetes import exceptions as k_exc
 from kuryr_kubernetes.handlers import k8s_base
+from kuryr_kubernetes.objects import codec as obj_codec
+from kuryr_kubernetes import tracing
 
 LOG = logging.getLogger(__name__)
 
@@ -45,6 +47,12 @@ class VIFHandler(k8s_base.ResourceEventHandler):
         self._drv_sg = drivers.PodSecurityGroupsDriver.get_instance()
         self._drv_vif = drivers.PodVIFDriver.get_instance()
 
+    def prefilter(self, event):
+        pod = event['object']
+        if self._is_host_network(pod):
+            return False
+        return event.get('type') == 'DELETED' or self._is_pending(pod)
+
     def on_present(self, pod):
         if self._is_host_network(pod) or not self._is_pending(pod):
             # REVISIT(ivc): consider an additional configurable check that
@@ -54,23 +62,32 @@ class VIFHandler(k8s_base.ResourceEventHandler):
             return
 
         vif = self._get_vif(pod)
+        uid = tracing.get_uid(pod)
 
         if not vif:
-            project_id = self._drv_project.get_project(pod)
-            security_groups = self._drv_sg.get_security_groups(pod, project_id)
-            subnets = self._drv_subnets.get_subnets(pod, project_id)
-            vif = self._drv_vif.request_vif(pod, project_id, subnets,
-                                            security_groups)
+            with tracing.span('vif.get_project', uid):
+                project_id = self._drv_project.get_project(pod)
+            with tracing.span('vif.get_security_groups', uid):
+                security_groups = self._drv_sg.get_security_groups(
+                    pod, project_id)
+            with tracing.span('vif.get_subnets', uid):
+                subnets = self._drv_subnets.get_subnets(pod, project_id)
+            with tracing.span('vif.request_vif', uid):
+                vif = self._drv_vif.request_vif(pod, project_id, subnets,
+                                                security_groups)
             try:
-                self._set_vif(pod, vif)
+                with tracing.span('vif.annotate', uid, active=False):
+                    self._set_vif(pod, vif)
             except k_exc.K8sClientException as ex:
                 LOG.debug("Failed to set annotation: %s", ex)
                 # FIXME(ivc): improve granularity of K8sClient exceptions:
                 # only resourceVersion conflict should be ignored
                 self._drv_vif.release_vif(pod, vif)
         elif not vif.active:
-            self._drv_vif.activate_vif(pod, vif)
-            self._set_vif(pod, vif)
+            with tracing.span('vif.activate_vif', uid):
+                self._drv_vif.activate_vif(pod, vif)
+            with tracing.span('vif.annotate', uid, active=True):
+                self._set_vif(pod, vif)
 
     def on_deleted(self, pod):
         if self._is_host_network(pod):
@@ -101,21 +118,21 @@ class VIFHandler(k8s_base.ResourceEventHandler):
         else:
             vif.obj_reset_changes(recursive=True)
             LOG.debug("Setting VIF annotation: %r", vif)
-            annotation = jsonutils.dumps(vif.obj_to_primitive(),
-                                         sort_keys=True)
+            annotation = obj_codec.dumps(vif)
         k8s = clients.get_kubernetes_client()
+        # NOTE: the event caused by the annotation of an inactive VIF is
+        # needed to activate it, while nothing is left to do for an active
+        # one
         k8s.annotate(pod['metadata']['selfLink'],
                      {constants.K8S_ANNOTATION_VIF: annotation},
-                     resource_version=pod['metadata']['resourceVersion'])
+                     resource_version=pod['metadata']['resourceVersion'],
+                     suppress_echo=bool(vif and vif.active))
 
     def _get_vif(self, pod):
         # TODO(ivc): same as '_set_vif'
-        try:
-            annotations = pod['metadata']['annotations']
-            vif_annotation = annotations[constants.K8S_ANNOTATION_VIF]
-        except KeyError:
+        vif = annotations.get_object(pod, constants.K8S_ANNOTATION_VIF,
+                                     obj_vif.vif.VIFBase)
+        if vif is None:
             return None
-        vif_dict = jsonutils.loads(vif_annotation)
-        vif = obj_vif.vif.VIFBase.obj_from_primitive(vif_dict)
         LOG.debug("Got VIF from annotation: %r", vif)
         return vif
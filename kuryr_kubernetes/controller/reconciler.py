@@ -0,0 +1,284 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Periodic full resync of the K8s objects with Neutron.
+
+Events can be lost (e.g. a watch restarted, a worker restarted or a handler
+gave up retrying), leaving objects the pipeline never converges. Every
+`[reconciler]interval` seconds, the reconciler lists the Pods, Services and
+Endpoints (and KuryrLoadBalancers) in one request per collection, and the
+Kuryr ports (by `device_owner`) and the load balancers in one Neutron
+request each. It then compares them in memory:
+
+* divergent objects are those the handlers would act upon if they got an
+  event for them: pending Pods without an active VIF, Services without a
+  LBaaSServiceSpec and Endpoints with a spec but without a LBaaSState,
+* stale objects are those whose annotations refer to a port or load
+  balancer that is gone from Neutron,
+* leaked ports and load balancers are those of this cluster (see
+  `[neutron_defaults]resource_description`) that no object refers to,
+* in-flight load balancers are those no object refers to yet, but whose
+  Endpoints or Service still exist: the LBaaSState is only written once the
+  listeners, pools and members of the load balancer are created.
+
+Only the objects found divergent with the same resourceVersion by two
+consecutive passes are queued, as ADDED events, so that the objects the live
+pipeline is handling are left alone. They are queued at most
+`[reconciler]rate` per second so that the resync does not compete with the
+live events. The leaks are likewise only reported once seen by two passes,
+as a port is created before the annotation of its Pod refers to it, and
+passed to the garbage collector if any (see
+:mod:`kuryr_kubernetes.controller.garbage_collector`). Stale objects are
+only reported, as the handlers trust their annotations.
+"""
+
+import time
+
+from os_vif.objects import vif as osv_vif
+from oslo_log import log as logging
+
+from kuryr.lib import constants as kl_const
+from kuryr_kubernetes import annotations
+from kuryr_kubernetes import clients
+from kuryr_kubernetes import config
+from kuryr_kubernetes import constants
+from kuryr_kubernetes.objects import codec as obj_codec
+from kuryr_kubernetes.objects import lbaas as obj_lbaas
+from kuryr_kubernetes import utils
+
+LOG = logging.getLogger(__name__)
+
+
+def _get_key(obj):
+    metadata = obj['metadata']
+    return '%s/%s' % (metadata.get('namespace', ''), metadata['name'])
+
+
+def _get_crd_state(crd):
+    if not crd.get('status'):
+        return None
+    return obj_codec.from_primitive(obj_lbaas.LBaaSState, crd['status'])
+
+
+def _has_pods(endpoints):
+    return any(address.get('targetRef', {}).get('kind') == 'Pod'
+               for subset in endpoints.get('subsets', [])
+               for address in subset.get('addresses', []))
+
+
+class Reconciler(object):
+    """Queues the K8s objects that diverge from Neutron.
+
+    :param handler: handler the divergent objects are passed to as ADDED
+                    events
+    :param owns: callable returning whether the controller replica owns the
+                 object of an event, the other objects are not queued (see
+                 :class:`kuryr_kubernetes.handlers.shard.ShardFilter`)
+    :param collector: :class:`kuryr_kubernetes.controller.garbage_collector.
+                      GarbageCollector` the leaked resources are passed to
+                      after each pass
+    """
+
+    def __init__(self, handler, owns=None, collector=None):
+        conf = config.CONF.reconciler
+        self._interval = conf.interval
+        self._rate = conf.rate
+        self._handler = handler
+        self._owns = owns
+        self._collector = collector
+        self._running = False
+        self._divergent = {}
+        self._port_candidates = set()
+        self._lb_candidates = set()
+        self.leaked_ports = {}
+        self.leaked_loadbalancers = {}
+        self._stats = {'runs': 0, 'failures': 0, 'queued': 0,
+                       'divergent': 0, 'stale': 0, 'in_flight': 0}
+
+    def start(self, thread_group):
+        self._running = True
+        thread_group.add_thread(self._run)
+
+    def stop(self):
+        self._running = False
+
+    def stats(self):
+        """Returns the statistics of the resyncs.
+
+        The number of runs, failed runs and queued objects since the start,
+        and the number of divergent, stale, in-flight and leaked objects of
+        the last run.
+        """
+        return dict(self._stats,
+                    leaked_ports=len(self.leaked_ports),
+                    leaked_loadbalancers=len(self.leaked_loadbalancers))
+
+    def _run(self):
+        while self._running:
+            time.sleep(self._interval)
+            if not self._running:
+                return
+            try:
+                self.reconcile()
+            except Exception:
+                self._stats['failures'] += 1
+                LOG.exception("Failed to reconcile the K8s objects")
+
+    def reconcile(self):
+        """Runs a resync pass and queues the divergent objects."""
+        start = time.time()
+        k8s = clients.get_kubernetes_client()
+        neutron = clients.get_neutron_client()
+        pods = self._list(k8s, '%s/pods' % constants.K8S_API_BASE)
+        services = self._list(k8s, '%s/services' % constants.K8S_API_BASE)
+        endpoints = self._list(k8s, '%s/endpoints' % constants.K8S_API_BASE)
+        crds = None
+        if config.CONF.kubernetes.lbaas_state_storage == 'crd':
+            crds = {_get_key(crd): crd for crd in self._list(
+                k8s, constants.K8S_API_CRD_KURYRLOADBALANCERS)}
+        ports = {port['id']: port for port in neutron.list_ports(
+            device_owner=kl_const.DEVICE_OWNER)['ports']}
+        loadbalancers = {lb['id']: lb for lb
+                         in neutron.list_loadbalancers()['loadbalancers']}
+
+        divergent = {}
+        stale = 0
+        used_ports = set()
+        for pod in pods:
+            vif = self._check_pod(pod, divergent)
+            if vif is not None:
+                used_ports.add(vif.id)
+                stale += vif.id not in ports
+        for service in services:
+            self._check_service(service, divergent)
+        used_lbs = set()
+        for ep in endpoints:
+            state = self._check_endpoints(ep, crds, divergent)
+            if state is not None and state.loadbalancer:
+                lb_id = state.loadbalancer.id
+                used_lbs.add(lb_id)
+                stale += lb_id not in loadbalancers
+        if crds is not None:
+            # NOTE: a KuryrLoadBalancer outlives its Endpoints until its load
+            # balancer is released
+            for crd in crds.values():
+                state = _get_crd_state(crd)
+                if state is not None and state.loadbalancer:
+                    used_lbs.add(state.loadbalancer.id)
+
+        events = [event for link, (version, event) in divergent.items()
+                  if self._divergent.get(link) == version]
+        self._divergent = {link: version
+                           for link, (version, _) in divergent.items()}
+        leaked_ports = set(port_id for port_id, port in ports.items()
+                           if port_id not in used_ports and
+                           utils.is_cluster_resource(port))
+        self.leaked_ports = {port_id: ports[port_id] for port_id
+                             in leaked_ports & self._port_candidates}
+        self._port_candidates = leaked_ports
+        # NOTE: the LBaaS driver names the load balancers after their
+        # Endpoints, which share the name of their Service
+        live = set(_get_key(obj) for obj in services + endpoints)
+        leaked_lbs = set()
+        in_flight = 0
+        for lb_id, lb in loadbalancers.items():
+            if lb_id in used_lbs or not utils.is_cluster_resource(lb):
+                continue
+            if lb.get('name') in live:
+                in_flight += 1
+            else:
+                leaked_lbs.add(lb_id)
+        self.leaked_loadbalancers = {lb_id: loadbalancers[lb_id] for lb_id
+                                     in leaked_lbs & self._lb_candidates}
+        self._lb_candidates = leaked_lbs
+        self._stats['runs'] += 1
+        self._stats['divergent'] = len(divergent)
+        self._stats['stale'] = stale
+        self._stats['in_flight'] = in_flight
+
+        LOG.info("Reconciled %d pods, %d services, %d endpoints, %d ports "
+                 "and %d load balancers in %.3fs: %d divergent, %d stale, "
+                 "%d in-flight load balancers, %d leaked ports, %d leaked "
+                 "load balancers, queueing %d",
+                 len(pods), len(services), len(endpoints), len(ports),
+                 len(loadbalancers), time.time() - start, len(divergent),
+                 stale, in_flight, len(self.leaked_ports),
+                 len(self.leaked_loadbalancers), len(events))
+        self._queue(events)
+        if self._collector is not None and self._running:
+            self._collector.collect(self.leaked_ports,
+                                    self.leaked_loadbalancers)
+
+    def _list(self, k8s, path):
+        resources = k8s.get(path)
+        kind = resources.get('kind', '')
+        if kind.endswith('List'):
+            kind = kind[:-len('List')]
+        items = resources.get('items', [])
+        for obj in items:
+            obj.setdefault('kind', kind)
+        return items
+
+    def _add(self, obj, divergent):
+        event = {'type': 'ADDED', 'object': obj}
+        if self._owns is not None and not self._owns(event):
+            return
+        metadata = obj['metadata']
+        divergent[metadata['selfLink']] = (metadata['resourceVersion'],
+                                           event)
+
+    def _queue(self, events):
+        for event in events:
+            if not self._running:
+                return
+            self._handler(event)
+            self._stats['queued'] += 1
+            time.sleep(1.0 / self._rate)
+
+    def _check_pod(self, pod, divergent):
+        """Returns the VIF of the pod, if any."""
+        if pod['spec'].get('hostNetwork', False):
+            return None
+        vif = annotations.get_object(pod, constants.K8S_ANNOTATION_VIF,
+                                     osv_vif.VIFBase)
+        if (pod['spec'].get('nodeName') and
+                pod.get('status', {}).get('phase') ==
+                constants.K8S_POD_STATUS_PENDING and
+                not (vif and vif.active)):
+            self._add(pod, divergent)
+        return vif
+
+    def _check_service(self, service, divergent):
+        spec = service['spec']
+        if (spec.get('type') != 'ClusterIP' or
+                spec.get('clusterIP') in (None, '', 'None')):
+            return
+        if constants.K8S_ANNOTATION_LBAAS_SPEC not in service['metadata'].get(
+                'annotations', {}):
+            self._add(service, divergent)
+
+    def _check_endpoints(self, endpoints, crds, divergent):
+        """Returns the LBaaSState of the endpoints, if any."""
+        if crds is None:
+            ep_annotations = endpoints['metadata'].get('annotations', {})
+            has_spec = constants.K8S_ANNOTATION_LBAAS_SPEC in ep_annotations
+            state = annotations.get_object(
+                endpoints, constants.K8S_ANNOTATION_LBAAS_STATE,
+                obj_lbaas.LBaaSState)
+        else:
+            crd = crds.get(_get_key(endpoints), {})
+            has_spec = bool(crd.get('spec'))
+            state = _get_crd_state(crd)
+        if has_spec and _has_pods(endpoints) and not (
+                state and state.loadbalancer):
+            self._add(endpoints, divergent)
+        return state
@@ -13,8 +13,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import signal
 import sys
+import time
 
+import eventlet
 import os_vif
 from oslo_log import log as logging
 from oslo_service import service
@@ -22,14 +25,187 @@ from oslo_service import service
 from kuryr_kubernetes import clients
 from kuryr_kubernetes import config
 from kuryr_kubernetes import constants
+from kuryr_kubernetes.controller.drivers import base as drv_base
+from kuryr_kubernetes.controller import garbage_collector
 from kuryr_kubernetes.controller.handlers import lbaas as h_lbaas
 from kuryr_kubernetes.controller.handlers import pipeline as h_pipeline
 from kuryr_kubernetes.controller.handlers import vif as h_vif
+from kuryr_kubernetes.controller import reconciler
+from kuryr_kubernetes.controller import sharding
+from kuryr_kubernetes.controller import workers
+from kuryr_kubernetes import metrics
 from kuryr_kubernetes import objects
+from kuryr_kubernetes import profiler
+from kuryr_kubernetes import tracing
 from kuryr_kubernetes import watcher
 
 LOG = logging.getLogger(__name__)
 
+_ANNOTATE_STATS = ('patches', 'conflicts', 'retries')
+_RETRY_STATS = ('scheduled', 'superseded', 'requeued')
+_RECONCILER_STATS = ('divergent', 'stale', 'in_flight', 'leaked_ports',
+                     'leaked_loadbalancers')
+_WARM_UP_DRIVERS = (drv_base.PodProjectDriver, drv_base.PodSubnetsDriver,
+                    drv_base.PodSecurityGroupsDriver, drv_base.PodVIFDriver,
+                    drv_base.ServiceProjectDriver,
+                    drv_base.ServiceSubnetsDriver,
+                    drv_base.ServiceSecurityGroupsDriver,
+                    drv_base.LBaaSDriver)
+
+
+def _run_warm_up_task(durations, name, func, *args):
+    start = time.time()
+    try:
+        func(*args)
+    except Exception:
+        LOG.warning("Failed to warm %s up", name, exc_info=True)
+    durations[name] = time.time() - start
+
+
+def _load_drivers(drivers):
+    # NOTE: the drivers are loaded one at a time, the greenthreads importing
+    # the same modules concurrently would see them partially initialized
+    for cls in _WARM_UP_DRIVERS:
+        try:
+            drivers.append((cls.ALIAS, cls.get_instance()))
+        except Exception:
+            LOG.warning("Failed to load the %s driver", cls.ALIAS,
+                        exc_info=True)
+
+
+def warm_up(timeout):
+    """Preloads the drivers and the Neutron resources they use.
+
+    The Neutron client is authenticated first, so that the drivers do not
+    all fetch a token, then the drivers are loaded one after the other and
+    warmed up in parallel (see :meth:`kuryr_kubernetes.controller.drivers.
+    base.DriverBase.warm_up`). The failed tasks are retried by the handlers
+    when they need them.
+
+    :param timeout: seconds after which the tasks still running are left to
+                    complete in the background
+    :returns: dict of the seconds each completed task took, by task name,
+              with the whole warm-up as 'total'
+    """
+    start = time.time()
+    durations = {}
+    tasks = ['neutron_token', 'drivers']
+    with eventlet.Timeout(timeout, False):
+        _run_warm_up_task(durations, 'neutron_token',
+                          clients.authenticate_neutron_client)
+        drivers = []
+        _run_warm_up_task(durations, 'drivers', _load_drivers, drivers)
+        tasks.extend(alias for alias, driver in drivers)
+        pool = eventlet.GreenPool()
+        for alias, driver in drivers:
+            pool.spawn_n(_run_warm_up_task, durations, alias, driver.warm_up)
+        pool.waitall()
+    durations = dict(durations, total=time.time() - start)
+
+    pending = [task for task in tasks if task not in durations]
+    if pending:
+        LOG.warning("Warm-up timed out after %ss, still running: %s",
+                    timeout, ', '.join(pending))
+    LOG.info("Warmed up in %.3fs (%s)", durations['total'],
+             ', '.join('%s: %.3fs' % (task, durations[task])
+                       for task in tasks if task in durations))
+    return durations
+
+
+def _register_metrics(pipeline, shards=None, reconciler=None,
+                      collector=None):
+    """Exposes the statistics collected by the pipeline and the clients."""
+    def _annotate_stats(name):
+        return lambda: {(kind, ): stats.get(name, 0)
+                        for kind, stats
+                        in pipeline.get_annotate_stats().items()}
+
+    for name in _ANNOTATE_STATS:
+        metrics.counter('kuryr_k8s_annotate_%s_total' % name,
+                        "Annotation updates: %s" % name,
+                        ['kind']).set_function(_annotate_stats(name))
+
+    metrics.gauge('kuryr_event_queue_depth',
+                  "Events waiting in the handler queues").set_function(
+        lambda: {(): pipeline.get_queue_stats()['events']})
+    metrics.gauge('kuryr_event_queue_groups',
+                  "Objects with a handler queue").set_function(
+        lambda: {(): pipeline.get_queue_stats()['groups']})
+    metrics.counter('kuryr_events_dropped_total',
+                    "Events dropped before being queued",
+                    ['stage']).set_function(
+        lambda: {('shard', ): pipeline.get_shard_stats()['dropped'],
+                 ('echo', ): pipeline.get_echo_stats()['suppressed'],
+                 ('prefilter', ): pipeline.get_prefilter_stats()['dropped']})
+    metrics.counter('kuryr_handler_retries_total',
+                    "Handler retries by outcome", ['result']).set_function(
+        lambda: {(name, ): pipeline.get_retry_stats()[name]
+                 for name in _RETRY_STATS})
+    metrics.gauge('kuryr_handler_retries_pending',
+                  "Handler retries waiting for their delay").set_function(
+        lambda: {(): pipeline.get_retry_stats()['pending']})
+    metrics.counter('kuryr_annotation_cache_total',
+                    "Annotation cache lookups", ['result']).set_function(
+        lambda: {(name, ): pipeline.get_annotation_cache_stats()[name]
+                 for name in ('hits', 'misses')})
+    if shards is not None:
+        _register_shard_metrics(shards)
+    if reconciler is not None:
+        _register_reconciler_metrics(reconciler)
+    if collector is not None:
+        _register_collector_metrics(collector)
+
+
+def _register_shard_metrics(shards):
+    metrics.gauge('kuryr_shard_members',
+                  "Controller replicas sharing the objects").set_function(
+        lambda: {(): shards.stats()['members']})
+    metrics.gauge('kuryr_shard_leader',
+                  "Whether this replica is the leader").set_function(
+        lambda: {(): int(shards.stats()['leader'])})
+    metrics.counter('kuryr_shard_rebalances_total',
+                    "Changes of the replicas sharing the objects"
+                    ).set_function(
+        lambda: {(): shards.stats()['rebalances']})
+
+
+def _register_reconciler_metrics(reconciler):
+    metrics.counter('kuryr_reconciler_runs_total',
+                    "Resyncs of the K8s objects with Neutron by outcome",
+                    ['result']).set_function(
+        lambda: {('success', ): reconciler.stats()['runs'],
+                 ('failure', ): reconciler.stats()['failures']})
+    metrics.counter('kuryr_reconciler_queued_total',
+                    "Divergent objects queued by the resyncs").set_function(
+        lambda: {(): reconciler.stats()['queued']})
+    metrics.gauge('kuryr_reconciler_objects',
+                  "Objects out of sync found by the last resync",
+                  ['state']).set_function(
+        lambda: {(name, ): reconciler.stats()[name]
+                 for name in _RECONCILER_STATS})
+
+
+def _register_collector_metrics(collector):
+    metrics.counter('kuryr_gc_deleted_total',
+                    "Leaked Neutron resources deleted",
+                    ['kind']).set_function(
+        lambda: {(kind, ): collector.stats()[kind]
+                 for kind in ('ports', 'loadbalancers')})
+    metrics.counter('kuryr_gc_failures_total',
+                    "Leaked Neutron resources that failed to be deleted"
+                    ).set_function(
+        lambda: {(): collector.stats()['failures']})
+
+
+def _create_pipeline(thread_group, owns=None):
+    pipeline = h_pipeline.ControllerPipeline(thread_group, owns)
+    pipeline.register(h_vif.VIFHandler())
+    pipeline.register(h_lbaas.LBaaSSpecHandler())
+    pipeline.register(h_lbaas.LoadBalancerHandler())
+    if config.CONF.kubernetes.lbaas_state_storage == 'crd':
+        pipeline.register(h_lbaas.KuryrLoadBalancerHandler())
+    return pipeline
+
 
 class KuryrK8sService(service.Service):
     """Kuryr-Kubernetes controller Service."""
@@ -38,21 +214,83 @@ class KuryrK8sService(service.Service):
         super(KuryrK8sService, self).__init__()
 
         objects.register_locally_defined_vifs()
-        pipeline = h_pipeline.ControllerPipeline(self.tg)
-        self.watcher = watcher.Watcher(pipeline, self.tg)
+        self.shards = None
+        owns = None
+        if config.CONF.sharding.enabled:
+            self.shards = sharding.ShardManager()
+            owns = self.shards.owns
+        self.workers = None
+        if config.CONF.kubernetes.controller_workers:
+            self.workers = workers.WorkerPool(
+                config.CONF.kubernetes.controller_workers, _create_pipeline,
+                owns)
+            self.pipeline = self.workers
+            metrics.REGISTRY.add_collector(self.workers.get_metric_snapshots)
+            profiler.add_collector(self.workers.profile)
+        else:
+            self.pipeline = _create_pipeline(self.tg, owns)
+        self.watcher = watcher.Watcher(self.pipeline, self.tg)
         # TODO(ivc): pluggable resource/handler registration
-        for resource in ["pods", "services", "endpoints"]:
-            self.watcher.add("%s/%s" % (constants.K8S_API_BASE, resource))
-        pipeline.register(h_vif.VIFHandler())
-        pipeline.register(h_lbaas.LBaaSSpecHandler())
-        pipeline.register(h_lbaas.LoadBalancerHandler())
+        self.resources = ["%s/%s" % (constants.K8S_API_BASE, resource)
+                          for resource in ["pods", "services", "endpoints"]]
+        if config.CONF.kubernetes.lbaas_state_storage == 'crd':
+            self.resources.append(constants.K8S_API_CRD_KURYRLOADBALANCERS)
+        for path in self.resources:
+            self.watcher.add(path)
+        self.reconciler = None
+        self.collector = None
+        if config.CONF.garbage_collector.enabled:
+            if not config.CONF.reconciler.interval:
+                LOG.warning("The garbage collector requires the resyncs of "
+                            "[reconciler]interval, it is disabled")
+            elif not config.CONF.neutron_defaults.resource_description:
+                LOG.warning("The garbage collector requires "
+                            "[neutron_defaults]resource_description to tell "
+                            "the resources of this cluster, it is disabled")
+            else:
+                self.collector = garbage_collector.GarbageCollector(
+                    self.shards.is_leader if self.shards else None)
+        if config.CONF.reconciler.interval:
+            self.reconciler = reconciler.Reconciler(self.pipeline, owns,
+                                                    self.collector)
+        _register_metrics(self.pipeline, self.shards, self.reconciler,
+                          self.collector)
+        self.metrics_server = None
 
     def start(self):
         LOG.info("Service '%s' starting", self.__class__.__name__)
         super(KuryrK8sService, self).start()
+        if config.CONF.kubernetes.warm_up_timeout:
+            # NOTE: the workers inherit the drivers loaded and warmed up by
+            # the controller process, but fetch their own Neutron token
+            durations = warm_up(config.CONF.kubernetes.warm_up_timeout)
+            metrics.gauge('kuryr_warm_up_seconds',
+                          "Duration of the startup warm-up tasks",
+                          ['task']).set_function(
+                lambda: {(task, ): duration
+                         for task, duration in durations.items()})
+        if self.workers:
+            # NOTE: the workers are forked before any server socket is
+            # opened, so that they do not inherit it
+            self.workers.start(self.tg, self.resources)
+        if config.CONF.metrics.port:
+            self.metrics_server = metrics.MetricsServer(
+                config.CONF.metrics.host, config.CONF.metrics.port)
+            self.metrics_server.add_route('/debug/profile',
+                                          profiler.handle_request)
+            self.tg.add_thread(self.metrics_server.serve_forever)
+        signal.signal(signal.SIGUSR1, self._on_profile_signal)
+        if self.shards:
+            self.shards.start(self.tg, self.pipeline, self.resources)
         self.watcher.start()
+        if self.reconciler:
+            self.reconciler.start(self.tg)
         LOG.info("Service '%s' started", self.__class__.__name__)
 
+    def _on_profile_signal(self, signum, frame):
+        self.tg.add_thread(profiler.profile_to_file,
+                           config.CONF.profiler.duration, 'kuryr-controller')
+
     def wait(self):
         super(KuryrK8sService, self).wait()
         LOG.info("Service '%s' stopped", self.__class__.__name__)
@@ -60,6 +298,14 @@ class KuryrK8sService(service.Service):
     def stop(self, graceful=False):
         LOG.info("Service '%s' stopping", self.__class__.__name__)
         self.watcher.stop()
+        if self.reconciler:
+            self.reconciler.stop()
+        if self.shards:
+            self.shards.stop()
+        if self.workers:
+            self.workers.stop()
+        if self.metrics_server:
+            self.metrics_server.shutdown()
         super(KuryrK8sService, self).stop(graceful)
 
 
@@ -67,6 +313,7 @@ def start():
     config.init(sys.argv[1:])
     config.setup_logging()
     clients.setup_clients()
+    tracing.setup('kuryr-controller')
     os_vif.initialize()
     kuryrk8s_launcher = service.launch(config.CONF, KuryrK8sService())
     kuryrk8s_launcher.wait()
@@ -0,0 +1,289 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Sharding of the K8s objects between active controller replicas.
+
+Each replica holds a lease, an annotation of the `[sharding]config_map`
+ConfigMap that it renews every `[sharding]renew_interval` seconds. The
+replicas whose lease changed within the last `[sharding]lease_duration`
+seconds are the members of a consistent hash ring that assigns each object,
+by its namespace or by its namespace and name, to one of them. Each replica
+only queues and handles the events of the objects assigned to it (see
+:class:`kuryr_kubernetes.handlers.shard.ShardFilter`).
+
+When the members change, only the objects of the replicas that joined or
+left move. A replica stops handling the objects it loses as soon as it
+observes the change, but only takes the objects it gains over
+`[sharding]lease_duration` seconds later, once every other member has
+renewed its lease and observed the change too, so that two replicas never
+handle the same object. The objects taken over are replayed, as a new watch
+would. A replica alone in the ring has nobody to wait for and takes the
+objects over at once. A replica that stops gracefully gives its lease up so
+that its objects are taken over at the next renewal of the others plus
+`[sharding]lease_duration`, otherwise they are after twice that. A replica
+that fails to renew its lease for `[sharding]lease_duration` stops handling
+any object.
+
+The leases are expired by comparing them with the previously observed ones
+on the local clock, so the clocks of the replicas do not need to be in
+sync. The member with the lowest ID is the leader, which removes the expired
+leases and runs the tasks that only one replica should run.
+"""
+
+import bisect
+import hashlib
+import time
+
+from oslo_log import log as logging
+from oslo_serialization import jsonutils
+
+from kuryr_kubernetes import clients
+from kuryr_kubernetes import config
+from kuryr_kubernetes import constants
+from kuryr_kubernetes import exceptions as exc
+
+LOG = logging.getLogger(__name__)
+
+_MEMBER_PREFIX = constants.K8S_ANNOTATION_PREFIX + '-shard-member.'
+
+
+def _hash(key):
+    return int(hashlib.md5(key.encode('utf-8')).hexdigest()[:16], 16)
+
+
+class HashRing(object):
+    """Consistent hash ring of the members with `virtual_nodes` points each.
+    """
+
+    def __init__(self, members, virtual_nodes):
+        self.members = frozenset(members)
+        points = sorted((_hash('%s#%d' % (member, i)), member)
+                        for member in self.members
+                        for i in range(virtual_nodes))
+        self._hashes = [point[0] for point in points]
+        self._members = [point[1] for point in points]
+
+    def get(self, key):
+        """Returns the member the key is assigned to or None if no members.
+        """
+        if not self._hashes:
+            return None
+        idx = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._members[idx]
+
+
+class ShardManager(object):
+    """Holds the lease of the replica and assigns the objects to replicas."""
+
+    def __init__(self):
+        conf = config.CONF.sharding
+        self.replica_id = conf.replica_id
+        self._shard_by = conf.shard_by
+        self._lease_duration = conf.lease_duration
+        self._renew_interval = conf.renew_interval
+        self._virtual_nodes = conf.virtual_nodes
+        self._collection = '%s/namespaces/%s/configmaps' % (
+            constants.K8S_API_BASE, conf.namespace)
+        self._name = conf.config_map
+        self._path = '%s/%s' % (self._collection, self._name)
+        self._key = _MEMBER_PREFIX + self.replica_id
+
+        self._ring = HashRing((), self._virtual_nodes)
+        # NOTE: the rings since the last one that all the members observed,
+        # an object is only owned while all of them assign it to us
+        self._rings = [self._ring]
+        self._changed = None
+        self._observed = {}
+        self._renewals = 0
+        self._renewed = None
+        self._rebalances = 0
+        self._running = False
+        self._handler = None
+        self._resources = ()
+
+    def start(self, thread_group, handler, resources):
+        """Joins the replicas and keeps the lease renewed in `thread_group`.
+
+        The lease is acquired before returning, so that the replica owns its
+        objects before watching them if it is alone, otherwise the objects
+        are replayed once taken over.
+
+        :param thread_group: `oslo_service.threadgroup.ThreadGroup`
+        :param handler: handler the objects taken over are replayed to as
+                        ADDED events
+        :param resources: paths of the K8s resource collections to replay
+        """
+        self._ensure_config_map()
+        self._running = True
+        # NOTE: the objects are not replayed on the first sync, the watches
+        # list them all when they start
+        self._sync()
+        self._handler = handler
+        self._resources = list(resources)
+        thread_group.add_thread(self._run)
+
+    def stop(self):
+        """Gives the lease up for the other replicas to take over."""
+        self._running = False
+        k8s = clients.get_kubernetes_client()
+        try:
+            k8s.annotate(self._path, {self._key: None})
+        except exc.K8sClientException:
+            LOG.warning("Failed to release the lease of replica %s",
+                        self.replica_id)
+
+    def owns(self, event):
+        """Returns whether the object of the event is assigned to us."""
+        return self._owns_key(self._get_key(event.get('object', {})),
+                              self._rings)
+
+    def is_leader(self):
+        return all(ring.members and min(ring.members) == self.replica_id
+                   for ring in self._rings)
+
+    def stats(self):
+        """Returns the number of members, the leadership and rebalances."""
+        return {'members': len(self._ring.members),
+                'leader': self.is_leader(),
+                'rebalances': self._rebalances}
+
+    def _owns_key(self, key, rings):
+        return all(ring.get(key) == self.replica_id for ring in rings)
+
+    def _get_key(self, obj):
+        metadata = obj.get('metadata', {})
+        namespace = metadata.get('namespace', '')
+        if self._shard_by == 'namespace':
+            return namespace
+        return '%s/%s' % (namespace, metadata.get('name', ''))
+
+    def _ensure_config_map(self):
+        k8s = clients.get_kubernetes_client()
+        try:
+            k8s.get(self._path)
+        except exc.K8sResourceNotFound:
+            try:
+                k8s.post(self._collection, {
+                    'apiVersion': 'v1',
+                    'kind': 'ConfigMap',
+                    'metadata': {'name': self._name}})
+            except exc.K8sClientException:
+                # NOTE: another replica may have created it meanwhile, if
+                # not, renewing the lease fails
+                LOG.debug("Failed to create %s", self._path)
+
+    def _run(self):
+        while self._running:
+            time.sleep(self._renew_interval)
+            if not self._running:
+                return
+            try:
+                self._sync()
+            except Exception:
+                LOG.exception("Failed to update the shard members")
+
+    def _sync(self):
+        now = time.time()
+        k8s = clients.get_kubernetes_client()
+        self._renewals += 1
+        lease = jsonutils.dumps({'holder': self.replica_id,
+                                 'renewTime': now,
+                                 'renewals': self._renewals}, sort_keys=True)
+        try:
+            annotations = k8s.annotate(self._path, {self._key: lease})
+        except exc.K8sClientException:
+            LOG.warning("Failed to renew the lease of replica %s",
+                        self.replica_id)
+            annotations = None
+        else:
+            self._renewed = now
+            self._observe(annotations, now)
+
+        members = set(member for member, (_, observed)
+                      in self._observed.items()
+                      if now - observed <= self._lease_duration)
+        members.discard(self.replica_id)
+        if (self._renewed is not None and
+                now - self._renewed <= self._lease_duration):
+            members.add(self.replica_id)
+        self._update_ring(members, now)
+
+        if annotations is not None and self.is_leader():
+            self._expire(now)
+
+    def _observe(self, annotations, now):
+        leases = {key[len(_MEMBER_PREFIX):]: value
+                  for key, value in annotations.items()
+                  if key.startswith(_MEMBER_PREFIX)}
+        for member in set(self._observed) - set(leases):
+            del self._observed[member]
+        for member, lease in leases.items():
+            observed = self._observed.get(member)
+            if observed is None or observed[0] != lease:
+                self._observed[member] = (lease, now)
+
+    def _expire(self, now):
+        expired = {_MEMBER_PREFIX + member: None
+                   for member, (_, observed) in self._observed.items()
+                   if now - observed > self._lease_duration}
+        if not expired:
+            return
+        LOG.info("Removing the expired shard leases %s", sorted(expired))
+        k8s = clients.get_kubernetes_client()
+        try:
+            k8s.annotate(self._path, expired)
+        except exc.K8sClientException:
+            LOG.warning("Failed to remove the expired shard leases")
+
+    def _update_ring(self, members, now):
+        if members != self._ring.members:
+            LOG.info("Shard members changed from %s to %s",
+                     sorted(self._ring.members), sorted(members))
+            self._ring = HashRing(members, self._virtual_nodes)
+            self._rings.append(self._ring)
+            self._rebalances += 1
+            self._changed = now
+        if len(self._rings) == 1:
+            return
+        # NOTE: the other members observe the change at their next renewal,
+        # until then they may still handle the objects we gain
+        if (members - {self.replica_id} and
+                now - self._changed < self._lease_duration):
+            return
+        old_rings = self._rings
+        self._rings = [self._ring]
+        if self._handler is not None and self.replica_id in members:
+            self._replay(old_rings)
+
+    def _replay(self, old_rings):
+        """Replays the objects taken over from other replicas."""
+        k8s = clients.get_kubernetes_client()
+        replayed = 0
+        for path in self._resources:
+            try:
+                resources = k8s.get(path)
+            except exc.K8sClientException:
+                LOG.exception("Failed to list %s to take its objects over",
+                              path)
+                continue
+            kind = resources.get('kind', '')
+            if kind.endswith('List'):
+                kind = kind[:-len('List')]
+            for obj in resources.get('items', []):
+                key = self._get_key(obj)
+                if (self._ring.get(key) != self.replica_id or
+                        self._owns_key(key, old_rings)):
+                    continue
+                obj.setdefault('kind', kind)
+                self._handler({'type': 'ADDED', 'object': obj})
+                replayed += 1
+        LOG.info("Took %d objects over", replayed)
@@ -0,0 +1,425 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Multi-process handling of the K8s events.
+
+With `[kubernetes]controller_workers`, the controller process only watches
+the K8s resources and passes each event to one of the worker processes it
+forks, chosen by the hash of the namespace and name of the object. Each
+worker runs its own handler pipeline and clients, so the handlers, the
+(de)serialization of the annotations and the driver calls of the workers run
+on different cores.
+
+The events of an object are always passed to the same worker, whose pipeline
+handles them in order. The Service, Endpoints and KuryrLoadBalancer of the
+same name are passed to the same worker too.
+
+The workers write their annotations to K8s themselves, so that the echo of
+an update is recognized by the worker that made it. They report the
+statistics of their pipeline, annotation updates, annotation cache and
+Neutron calls, and the values of their metrics (e.g. the handler and Neutron
+call durations), back to the controller process every `_REPORT_INTERVAL`
+seconds, where they are aggregated (see `WorkerPool.get_queue_stats` and
+friends) and added to the metrics of the controller process. A worker that
+exits is restarted and the current state of its objects is replayed to it,
+as the events it had queued are lost. The profiles of the controller process
+include the workers, which profile themselves on its request (see
+`WorkerPool.profile`).
+"""
+
+import os
+import pickle
+import signal
+import socket
+import struct
+import threading
+import time
+import zlib
+
+import eventlet
+from oslo_log import log as logging
+from oslo_service import threadgroup
+
+from kuryr_kubernetes import annotations
+from kuryr_kubernetes import clients
+from kuryr_kubernetes import exceptions as exc
+from kuryr_kubernetes.handlers import base
+from kuryr_kubernetes.handlers import shard as h_shard
+from kuryr_kubernetes import metrics
+from kuryr_kubernetes import profiler
+from kuryr_kubernetes import tracing
+
+LOG = logging.getLogger(__name__)
+
+_HEADER = struct.Struct('!I')
+_REPORT_INTERVAL = 1
+# NOTE: seconds the profiles of the workers may arrive after the requested
+# duration
+_PROFILE_TIMEOUT = 10
+# NOTE: same as the ThreadGroup of oslo_service.service.Service, as Async
+# runs a greenthread per object
+_THREADS = 1000
+
+_DEFAULT_STATS = {
+    'queue': {'events': 0, 'groups': 0},
+    'echo': {'suppressed': 0, 'passed': 0},
+    'prefilter': {'events': 0, 'dropped': 0, 'consumers': {}},
+    'retry': {'scheduled': 0, 'superseded': 0, 'requeued': 0, 'pending': 0,
+              'delays': {}},
+    'annotate': {},
+    'annotation_cache': {'size': 0, 'hits': 0, 'misses': 0,
+                         'decode_time': 0.0, 'saved_time': 0.0},
+    'neutron': {},
+}
+
+
+def _send(sock, obj):
+    data = pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def _recv(rfile):
+    """Returns the next object read from the file or None on EOF."""
+    header = rfile.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        return None
+    size, = _HEADER.unpack(header)
+    data = rfile.read(size)
+    if len(data) < size:
+        return None
+    return pickle.loads(data)
+
+
+def _add(total, stats):
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            _add(total.setdefault(key, {}), value)
+        else:
+            total[key] = total.get(key, 0) + value
+    return total
+
+
+def get_key(event):
+    """Returns the key the events are distributed to the workers by."""
+    metadata = event.get('object', {}).get('metadata', {})
+    return '%s/%s' % (metadata.get('namespace', ''), metadata.get('name', ''))
+
+
+class _Worker(object):
+    def __init__(self, index):
+        self.index = index
+        self.pid = None
+        self.sock = None
+        self.lock = threading.Lock()
+        self.stats = {}
+        self.profile = None
+
+
+class WorkerPool(base.EventHandler):
+    """Passes the events to worker processes by the hash of their object.
+
+    `WorkerPool` replaces the
+    :class:`kuryr_kubernetes.controller.handlers.pipeline.ControllerPipeline`
+    of the controller process and provides the same statistics, aggregated
+    from the reports of the workers.
+
+    :param count: number of worker processes
+    :param create_pipeline: callable creating the pipeline of a worker from
+                            its `oslo_service.threadgroup.ThreadGroup`
+    :param owns: callable returning whether the controller replica owns the
+                 object of an event, the events of the other objects are
+                 dropped (see :class:`kuryr_kubernetes.handlers.shard.
+                 ShardFilter`)
+    :param setup: callable setting the clients up in each worker
+    """
+
+    def __init__(self, count, create_pipeline, owns=None,
+                 setup=clients.setup_clients):
+        self._create_pipeline = create_pipeline
+        self._setup = setup
+        self._workers = [_Worker(index) for index in range(count)]
+        self._shard_filter = None
+        self._handler = self._dispatch
+        if owns is not None:
+            self._shard_filter = h_shard.ShardFilter(self._dispatch, owns)
+            self._handler = self._shard_filter
+        self._tg = None
+        self._resources = ()
+        self._running = False
+
+    def start(self, thread_group, resources=()):
+        """Forks the workers and reads their reports in `thread_group`.
+
+        :param thread_group: `oslo_service.threadgroup.ThreadGroup`
+        :param resources: paths of the K8s resource collections to replay to
+                          the workers that are restarted
+        """
+        self._tg = thread_group
+        self._resources = list(resources)
+        self._running = True
+        for worker in self._workers:
+            self._spawn(worker)
+
+    def stop(self):
+        """Stops the workers and waits for them to exit."""
+        self._running = False
+        for worker in self._workers:
+            if worker.pid is None:
+                continue
+            worker.sock.close()
+            try:
+                os.kill(worker.pid, signal.SIGTERM)
+                os.waitpid(worker.pid, 0)
+            except OSError:
+                pass
+            worker.pid = None
+
+    def __call__(self, event):
+        self._handler(event)
+
+    def _get_worker(self, event):
+        return self._workers[zlib.crc32(get_key(event).encode('utf-8')) %
+                             len(self._workers)]
+
+    def _dispatch(self, event):
+        if not self._running:
+            return
+        worker = self._get_worker(event)
+        # NOTE: the time the event was received by the watcher is passed
+        # along with it, so that the worker records the time it was queued
+        received = tracing.pop_received(event)
+        with worker.lock:
+            try:
+                _send(worker.sock, (event, received))
+            except (IOError, OSError):
+                LOG.error("Failed to pass an event to worker %d, it is "
+                          "dropped", worker.index)
+
+    def _spawn(self, worker):
+        sock, child_sock = socket.socketpair()
+        pid = os.fork()
+        if pid == 0:
+            # NOTE: the child must not use the hub of the parent, which
+            # shares its epoll instance and has the greenthreads of the
+            # parent scheduled
+            eventlet.hubs.use_hub()
+            status = 0
+            try:
+                sock.close()
+                for other in self._workers:
+                    if other.sock is not None:
+                        other.sock.close()
+                _run_worker(child_sock, self._create_pipeline, self._setup)
+            except BaseException:
+                LOG.exception("Worker %d failed", worker.index)
+                status = 1
+            os._exit(status)
+
+        child_sock.close()
+        worker.pid = pid
+        worker.sock = sock
+        worker.stats = {}
+        LOG.info("Started worker %d with PID %d", worker.index, pid)
+        self._tg.add_thread(self._read_reports, worker, sock)
+
+    def _read_reports(self, worker, sock):
+        rfile = sock.makefile('rb')
+        while True:
+            try:
+                report = _recv(rfile)
+            except (IOError, OSError):
+                report = None
+            if report is None:
+                break
+            if 'profile' in report:
+                waiter, worker.profile = worker.profile, None
+                if waiter is not None:
+                    waiter.send(report['profile'])
+                continue
+            worker.stats = report
+        if not self._running or worker.sock is not sock:
+            return
+        LOG.error("Worker %d with PID %d exited, restarting it",
+                  worker.index, worker.pid)
+        sock.close()
+        try:
+            os.waitpid(worker.pid, 0)
+        except OSError:
+            pass
+        self._spawn(worker)
+        self._replay(worker)
+
+    def _replay(self, worker):
+        """Replays the objects of a restarted worker."""
+        k8s = clients.get_kubernetes_client()
+        replayed = 0
+        for path in self._resources:
+            try:
+                resources = k8s.get(path)
+            except exc.K8sClientException:
+                LOG.exception("Failed to list %s to replay its objects to "
+                              "worker %d", path, worker.index)
+                continue
+            kind = resources.get('kind', '')
+            if kind.endswith('List'):
+                kind = kind[:-len('List')]
+            for obj in resources.get('items', []):
+                event = {'type': 'ADDED', 'object': obj}
+                if self._get_worker(event) is not worker:
+                    continue
+                obj.setdefault('kind', kind)
+                self._handler(event)
+                replayed += 1
+        LOG.info("Replayed %d objects to worker %d", replayed, worker.index)
+
+    def profile(self, duration):
+        """Profiles the workers for `duration` seconds.
+
+        :return: list of ('worker-<index>', profile in the collapsed stacks
+                 format) tuples of the workers that returned their profile
+        """
+        waiters = []
+        for worker in self._workers:
+            if worker.pid is None:
+                continue
+            waiter = worker.profile = eventlet.Event()
+            with worker.lock:
+                try:
+                    _send(worker.sock, {'profile': duration})
+                except (IOError, OSError):
+                    LOG.error("Failed to request a profile from worker %d",
+                              worker.index)
+                    continue
+            waiters.append((worker, waiter))
+
+        deadline = time.time() + duration + _PROFILE_TIMEOUT
+        profiles = []
+        for worker, waiter in waiters:
+            collapsed = waiter.wait(max(0, deadline - time.time()))
+            if collapsed is None:
+                LOG.warning("No profile received from worker %d",
+                            worker.index)
+                continue
+            profiles.append(('worker-%d' % worker.index, collapsed))
+        return profiles
+
+    def _get_stats(self, name):
+        total = {}
+        _add(total, _DEFAULT_STATS[name])
+        for worker in self._workers:
+            _add(total, worker.stats.get(name, {}))
+        return total
+
+    def get_shard_stats(self):
+        """Returns the number of dropped and passed shard filter events."""
+        if self._shard_filter is None:
+            return {'dropped': 0, 'passed': 0}
+        return self._shard_filter.stats()
+
+    def get_echo_stats(self):
+        """Returns the number of suppressed and passed echo filter events."""
+        return self._get_stats('echo')
+
+    def get_prefilter_stats(self):
+        """Returns the statistics of the handlers' prefilters."""
+        return self._get_stats('prefilter')
+
+    def get_retry_stats(self):
+        """Returns the statistics of the rescheduled handler retries."""
+        return self._get_stats('retry')
+
+    def get_queue_stats(self):
+        """Returns the number of queued events and of active groups."""
+        return self._get_stats('queue')
+
+    def get_annotate_stats(self):
+        """Returns the annotate statistics of the workers per kind."""
+        return self._get_stats('annotate')
+
+    def get_annotation_cache_stats(self):
+        """Returns the statistics of the annotation caches of the workers.
+        """
+        return self._get_stats('annotation_cache')
+
+    def get_metric_snapshots(self):
+        """Returns the values of the metrics of the workers.
+
+        See `kuryr_kubernetes.metrics.Registry.add_collector`.
+        """
+        return [worker.stats['metrics'] for worker in self._workers
+                if 'metrics' in worker.stats]
+
+    def get_neutron_call_stats(self):
+        """Returns the statistics of the workers' Neutron calls per method.
+        """
+        stats = self._get_stats('neutron')
+        for method in stats.values():
+            method['error_rate'] = float(method['errors']) / method['calls']
+        return stats
+
+
+def _report(send, pipeline):
+    neutron = clients.get_neutron_client()
+    while True:
+        time.sleep(_REPORT_INTERVAL)
+        call_stats = neutron.get_call_stats()
+        for stats in call_stats.values():
+            del stats['error_rate']
+        send({'queue': pipeline.get_queue_stats(),
+              'echo': pipeline.get_echo_stats(),
+              'prefilter': pipeline.get_prefilter_stats(),
+              'retry': pipeline.get_retry_stats(),
+              'annotate': pipeline.get_annotate_stats(),
+              'annotation_cache': pipeline.get_annotation_cache_stats(),
+              'neutron': call_stats,
+              'metrics': metrics.REGISTRY.snapshot()})
+
+
+def _profile(send, duration):
+    # NOTE: None is sent if a profile is already running
+    send({'profile': profiler.profile(duration)})
+
+
+def _run_worker(sock, create_pipeline, setup):
+    # NOTE: the signals are handled by the controller process, which stops
+    # the workers, and the workers exit when their socket is closed. The
+    # workers are profiled on the requests of the controller process.
+    for signum in (signal.SIGTERM, signal.SIGHUP):
+        signal.signal(signum, signal.SIG_DFL)
+    for signum in (signal.SIGINT, signal.SIGUSR1):
+        signal.signal(signum, signal.SIG_IGN)
+    # NOTE: the values inherited from the controller process are reported
+    # by it
+    metrics.REGISTRY.clear()
+    annotations.reset()
+    profiler.reset()
+    setup()
+    tg = threadgroup.ThreadGroup(_THREADS)
+    pipeline = create_pipeline(tg)
+    lock = threading.Lock()
+
+    def send(obj):
+        with lock:
+            _send(sock, obj)
+
+    tg.add_thread(_report, send, pipeline)
+    rfile = sock.makefile('rb')
+    while True:
+        message = _recv(rfile)
+        if message is None:
+            return
+        if isinstance(message, dict):
+            tg.add_thread(_profile, send, message['profile'])
+            continue
+        event, received = message
+        tracing.set_received(event, received)
+        pipeline(event)
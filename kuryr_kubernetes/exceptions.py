@@ -18,6 +18,12 @@ class K8sClientException(Exception):
     pass
 
 
+class K8sResourceNotFound(K8sClientException):
+    def __init__(self, resource):
+        super(K8sResourceNotFound, self).__init__("Resource not "
+                                                  "found: %r" % resource)
+
+
 class IntegrityError(RuntimeError):
     pass
 
@@ -28,6 +34,14 @@ class ResourceNotReady(Exception):
                                                % resource)
 
 
+class PortNotReady(ResourceNotReady):
+    """The Neutron port is not ACTIVE yet."""
+
+
+class LoadBalancerNotReady(ResourceNotReady):
+    """The Neutron load balancer is not done provisioning yet."""
+
+
 class CNIError(Exception):
     pass
 
@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import bisect
+import heapq
 import itertools
 from six.moves import queue as six_queue
 import time
@@ -21,12 +23,21 @@ from oslo_log import log as logging
 
 
 from kuryr_kubernetes.handlers import base
+from kuryr_kubernetes import tracing
 
 LOG = logging.getLogger(__name__)
 
 DEFAULT_QUEUE_DEPTH = 100
 DEFAULT_GRACE_PERIOD = 5
 STALE_PERIOD = 0.5
+RETRY_TICK = 0.1
+RETRY_DELAY_BUCKETS = (1, 2, 5, 10, 30, 60, 120, float('inf'))
+
+
+class _Requeued(object):
+    def __init__(self, handler, event):
+        self.handler = handler
+        self.event = event
 
 
 class Async(base.EventHandler):
@@ -37,6 +48,12 @@ class Async(base.EventHandler):
     *unrelated* events (based on the result of `group_by`(`event`) function)
     and handles *unrelated* events concurrently while *related* events are
     handled serially and in the same order they arrived to `Async`.
+
+    `Async` also serves as a delay queue for retries: `requeue` puts a
+    `handler` call for an event back into the event's queue after a delay,
+    without blocking the queue in the meantime. A pending retry is dropped
+    if a newer event arrives for the same group, as the newer event is
+    handled from scratch.
     """
 
     def __init__(self, handler, thread_group, group_by,
@@ -48,9 +65,23 @@ class Async(base.EventHandler):
         self._queue_depth = queue_depth
         self._grace_period = grace_period
         self._queues = {}
+        self._retries = {}
+        self._retry_heap = []
+        self._retry_seq = itertools.count()
+        self._retry_thread = None
+        self._retry_stats = {'scheduled': 0, 'superseded': 0, 'requeued': 0}
+        self._retry_delays = [0] * len(RETRY_DELAY_BUCKETS)
 
     def __call__(self, event):
         group = self._group_by(event)
+        superseded = self._retries.pop(group, None)
+        if superseded:
+            LOG.debug("Dropping %(count)s pending retries for %(group)s",
+                      {'count': len(superseded), 'group': group})
+            self._retry_stats['superseded'] += len(superseded)
+        self._put(group, event)
+
+    def _put(self, group, item):
         try:
             queue = self._queues[group]
         except KeyError:
@@ -58,7 +89,72 @@ class Async(base.EventHandler):
             self._queues[group] = queue
             thread = self._thread_group.add_thread(self._run, group, queue)
             thread.link(self._done, group)
-        queue.put(event)
+        queue.put(item)
+
+    def requeue(self, event, handler, delay):
+        """Calls `handler` for the `event` from its queue after `delay`.
+
+        The call is dropped if a newer event for the same group is queued
+        before it is made.
+
+        :param event: event to pass to `handler`
+        :param handler: callable that is expected to not raise exceptions
+        :param delay: delay in seconds
+        """
+        group = self._group_by(event)
+        queue = self._queues.get(group)
+        if queue is not None and not queue.empty():
+            self._retry_stats['superseded'] += 1
+            return
+
+        item = _Requeued(handler, event)
+        self._retries.setdefault(group, []).append(item)
+        heapq.heappush(self._retry_heap, (time.time() + delay,
+                                          next(self._retry_seq), group, item))
+        self._retry_stats['scheduled'] += 1
+        self._retry_delays[bisect.bisect_left(RETRY_DELAY_BUCKETS,
+                                              delay)] += 1
+        if self._retry_thread is None:
+            self._retry_thread = self._thread_group.add_thread(
+                self._run_retries)
+
+    def _run_retries(self):
+        try:
+            while self._retry_heap:
+                now = time.time()
+                while self._retry_heap and self._retry_heap[0][0] <= now:
+                    _, _, group, item = heapq.heappop(self._retry_heap)
+                    pending = self._retries.get(group, [])
+                    if item not in pending:
+                        continue
+                    pending.remove(item)
+                    if not pending:
+                        del self._retries[group]
+                    self._retry_stats['requeued'] += 1
+                    self._put(group, item)
+                time.sleep(RETRY_TICK)
+        finally:
+            self._retry_thread = None
+
+    def queue_stats(self):
+        """Returns the number of queued events and of active groups."""
+        return {'events': sum(q.qsize() for q in self._queues.values()),
+                'groups': len(self._queues)}
+
+    def retry_stats(self):
+        """Returns the retry statistics.
+
+        :return: dict with the number of retries scheduled ('scheduled'),
+                 dropped in favour of a newer event ('superseded'), put back
+                 into their queue ('requeued') and still waiting
+                 ('pending'), and the distribution of the retry delays
+                 ('delays', mapping the upper bound of each delay bucket in
+                 seconds to the number of retries)
+        """
+        stats = dict(self._retry_stats)
+        stats['pending'] = sum(len(p) for p in self._retries.values())
+        stats['delays'] = dict(zip(RETRY_DELAY_BUCKETS, self._retry_delays))
+        return stats
 
     def _run(self, group, queue):
         LOG.debug("Asynchronous handler started processing %s", group)
@@ -96,7 +192,11 @@ class Async(base.EventHandler):
                 event = queue.get()
                 if queue.empty():
                     time.sleep(STALE_PERIOD)
-            self._handler(event)
+            if isinstance(event, _Requeued):
+                event.handler(event.event)
+            else:
+                tracing.dequeued(event)
+                self._handler(event)
 
     def _done(self, thread, group):
         LOG.debug("Asynchronous handler stopped processing %s", group)
@@ -14,6 +14,8 @@
 #    under the License.
 
 import abc
+import collections
+import itertools
 import six
 
 from oslo_log import log as logging
@@ -22,6 +24,8 @@ from kuryr_kubernetes.handlers import base as h_base
 
 LOG = logging.getLogger(__name__)
 
+_OTHER = object()
+
 
 class Dispatcher(h_base.EventHandler):
     """Dispatches events to registered handlers.
@@ -29,10 +33,18 @@ class Dispatcher(h_base.EventHandler):
     Dispatcher serves as both multiplexer and filter for dispatching events
     to multiple registered handlers based on the event content and
     predicates provided during the handler registration.
+
+    The handlers to call are looked up in an index that is rebuilt on each
+    `register` call and maps the combination of the `key_fn` results (with
+    unregistered keys replaced by a placeholder) to the tuple of handlers,
+    so that dispatching an event only costs one `key_fn` call and one dict
+    lookup per `key_fn`. With a single `key_fn` (e.g. `object_kind` for all
+    the K8s handlers), the index maps its results directly.
     """
 
     def __init__(self):
         self._registry = {}
+        self._build_index()
 
     def register(self, key_fn, key, handler):
         """Adds handler to the registry.
@@ -51,19 +63,113 @@ class Dispatcher(h_base.EventHandler):
         key_group = self._registry.setdefault(key_fn, {})
         handlers = key_group.setdefault(key, [])
         handlers.append(handler)
+        self._build_index()
+
+    def _build_index(self):
+        self._key_groups = tuple(self._registry.items())
+        self._index = {}
+        if len(self._key_groups) == 1:
+            self._key_fn, key_group = self._key_groups[0]
+            for key, handlers in key_group.items():
+                self._index[key] = tuple(
+                    h for i, h in enumerate(handlers) if h not in handlers[:i])
+            return
+
+        self._key_fn = None
+        for keys in itertools.product(*[list(key_group) + [_OTHER]
+                                        for _, key_group in self._key_groups]):
+            handlers = []
+            for key, (_, key_group) in zip(keys, self._key_groups):
+                for handler in key_group.get(key, ()):
+                    if handler not in handlers:
+                        handlers.append(handler)
+            self._index[keys] = tuple(handlers)
 
     def __call__(self, event):
-        handlers = set()
-
-        for key_fn, key_group in self._registry.items():
-            key = key_fn(event)
-            handlers.update(key_group.get(key, ()))
+        if self._key_fn is not None:
+            handlers = self._index.get(self._key_fn(event), ())
+        else:
+            keys = []
+            for key_fn, key_group in self._key_groups:
+                key = key_fn(event)
+                keys.append(key if key in key_group else _OTHER)
+            handlers = self._index[tuple(keys)]
 
         LOG.debug("%s handler(s) available", len(handlers))
         for handler in handlers:
             handler(event)
 
 
+class Prefilter(h_base.EventHandler):
+    """Drops events that none of the registered consumers would act on.
+
+    Prefilter is meant to be placed before the costly stages of the
+    pipeline (e.g. `Async`) and only passes an event to `handler` if the
+    `prefilter` of at least one of the consumers registered for it accepts
+    the event. Events not matching any registered predicates are passed
+    unchanged, as the `Dispatcher` is the one deciding what to do with them.
+    """
+
+    def __init__(self, handler):
+        self._handler = handler
+        self._registry = {}
+        self._events = 0
+        self._dropped = 0
+        self._consumer_stats = collections.defaultdict(collections.Counter)
+
+    def register(self, key_fn, key, consumer):
+        """Adds the consumer's prefilter to the registry.
+
+        :param key_fn: function that will be called for each event to
+                       determine the event `key`
+        :param key: value to match against the result of `key_fn` function
+                    that determines if the `consumer` prefilter should be
+                    evaluated for an event
+        :param consumer: `EventConsumer`-type object
+        """
+        key_group = self._registry.setdefault(key_fn, {})
+        consumers = key_group.setdefault(key, [])
+        consumers.append(consumer)
+
+    def __call__(self, event):
+        self._events += 1
+        if self._accepts(event):
+            self._handler(event)
+        else:
+            self._dropped += 1
+            LOG.debug("Event dropped by prefilters")
+
+    def _accepts(self, event):
+        consumers = [consumer
+                     for key_fn, key_group in self._registry.items()
+                     for consumer in key_group.get(key_fn(event), ())]
+        if not consumers:
+            return True
+        for consumer in consumers:
+            stats = self._consumer_stats[consumer.__class__.__name__]
+            stats['checked'] += 1
+            if consumer.prefilter(event):
+                return True
+            stats['rejected'] += 1
+        return False
+
+    def stats(self):
+        """Returns the prefilter statistics.
+
+        :return: dict with the number of events received ('events') and
+                 dropped ('dropped') and, per consumer class name, the number
+                 of events its prefilter was evaluated for ('checked') and
+                 rejected ('rejected')
+        """
+        return {
+            'events': self._events,
+            'dropped': self._dropped,
+            'consumers': {name: {'checked': stats['checked'],
+                                 'rejected': stats['rejected']}
+                          for name, stats in self._consumer_stats.items()},
+        }
+
+
 @six.add_metaclass(abc.ABCMeta)
 class EventConsumer(h_base.EventHandler):
     """Consumes events matching specified predicates.
@@ -81,6 +187,18 @@ class EventConsumer(h_base.EventHandler):
         """
         raise NotImplementedError()
 
+    def prefilter(self, event):
+        """Cheap check of whether the event may require handling.
+
+        Pipelines may evaluate `prefilter` before queuing the event and drop
+        the event if no consumer accepts it, so it should only reject events
+        the consumer would certainly do nothing for.
+
+        :param event: event matching the `consumes` predicates
+        :return: False if the event can be dropped
+        """
+        return True
+
 
 @six.add_metaclass(abc.ABCMeta)
 class EventPipeline(h_base.EventHandler):
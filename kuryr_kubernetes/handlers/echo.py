@@ -0,0 +1,74 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import collections
+
+from oslo_log import log as logging
+
+from kuryr_kubernetes import clients
+from kuryr_kubernetes.handlers import base
+from kuryr_kubernetes.handlers import k8s_base
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_MAX_TRACKED = 4096
+
+
+class EchoFilter(base.EventHandler):
+    """Drops the events caused by the controller's own annotation updates.
+
+    When a handler updates a resource with `K8sClient.annotate` and
+    `suppress_echo`, K8s sends a MODIFIED event for the updated resource
+    (the echo) that the handlers have nothing to do for. `EchoFilter` drops
+    that event before it is passed to `handler` if it has the
+    'resourceVersion' resulting from the update and the previous event for
+    the resource had the 'resourceVersion' the update was based on, i.e. if
+    the resource was not changed by anyone else in between.
+    """
+
+    def __init__(self, handler, max_tracked=DEFAULT_MAX_TRACKED):
+        self._handler = handler
+        self._max_tracked = max_tracked
+        self._versions = collections.OrderedDict()
+        self._suppressed = 0
+        self._passed = 0
+
+    def __call__(self, event):
+        if self._is_echo(event):
+            self._suppressed += 1
+            LOG.debug("Suppressed echo event for %s",
+                      k8s_base.object_link(event))
+            return
+        self._passed += 1
+        self._handler(event)
+
+    def _is_echo(self, event):
+        link = k8s_base.object_link(event)
+        if link is None:
+            return False
+        version = event['object']['metadata'].get('resourceVersion')
+
+        last_version = self._versions.pop(link, None)
+        if event.get('type') != 'DELETED':
+            self._versions[link] = version
+            if len(self._versions) > self._max_tracked:
+                self._versions.popitem(last=False)
+
+        k8s = clients.get_kubernetes_client()
+        written = k8s.pop_written_version(link)
+        return (event.get('type') == 'MODIFIED' and
+                last_version is not None and
+                written == (last_version, version))
+
+    def stats(self):
+        """Returns the number of suppressed and passed events."""
+        return {'suppressed': self._suppressed, 'passed': self._passed}
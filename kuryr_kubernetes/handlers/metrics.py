@@ -0,0 +1,48 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import time
+
+from kuryr_kubernetes import metrics
+from kuryr_kubernetes.handlers import base
+from kuryr_kubernetes.handlers import k8s_base
+
+_DURATION = metrics.histogram(
+    'kuryr_handler_duration_seconds',
+    "Duration of the handler calls (each retry counted separately)",
+    ['handler', 'kind'])
+_ERRORS = metrics.counter(
+    'kuryr_handler_errors_total',
+    "Handler calls that raised an exception",
+    ['handler', 'kind', 'exception'])
+
+
+class Instrumented(base.EventHandler):
+    """Records the duration and the failures of the `handler` calls."""
+
+    def __init__(self, handler, name=None):
+        self._handler = handler
+        self._name = name or handler.__class__.__name__
+
+    def __repr__(self):
+        return repr(self._handler)
+
+    def __call__(self, event):
+        kind = k8s_base.object_kind(event)
+        start = time.time()
+        try:
+            self._handler(event)
+        except Exception as ex:
+            _ERRORS.inc((self._name, kind, ex.__class__.__name__))
+            raise
+        finally:
+            _DURATION.observe(time.time() - start, (self._name, kind))
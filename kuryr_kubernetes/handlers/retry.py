@@ -13,6 +13,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import functools
 import itertools
 import random
 import time
@@ -27,6 +28,58 @@ LOG = logging.getLogger(__name__)
 
 DEFAULT_TIMEOUT = 180
 DEFAULT_INTERVAL = 3
+DEFAULT_FACTOR = 1.25
+
+
+class RetryPolicy(object):
+    """Retry parameters for a type of failure.
+
+    `RetryPolicy` provides `Retry` with the `timeout` and the base `interval`
+    of the exponential backoff. If `min_interval` or `max_interval` differ
+    from `interval`, the base interval adapts to the outcome of the first
+    retries: it is divided by `factor` when the failure was gone by the
+    first retry and multiplied by it otherwise, within the
+    [`min_interval`, `max_interval`] range. The base interval thus converges
+    to the median time it takes for the failure to go away, so that failures
+    that are usually resolved quickly (e.g. a Neutron port becoming ACTIVE)
+    are retried sooner and slow ones (e.g. a load balancer being
+    provisioned) are polled less often.
+
+    NOTE: the time it took for a retried handler to succeed can not be used
+    instead, as it is always at least the delay already applied, so that the
+    interval could only grow.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, interval=DEFAULT_INTERVAL,
+                 min_interval=None, max_interval=None,
+                 factor=DEFAULT_FACTOR):
+        self.timeout = timeout
+        self.interval = interval
+        self._min_interval = interval if min_interval is None else min_interval
+        self._max_interval = interval if max_interval is None else max_interval
+        self._factor = factor
+        self._observations = 0
+        self._ready = 0
+
+    def observe(self, ready):
+        """Records the outcome of the first retry of a failure.
+
+        :param ready: whether the failure was gone by the first retry, made
+                      `interval` seconds after the failure
+        """
+        self._observations += 1
+        if ready:
+            self._ready += 1
+            self.interval = max(self.interval / self._factor,
+                                self._min_interval)
+        else:
+            self.interval = min(self.interval * self._factor,
+                                self._max_interval)
+
+    def stats(self):
+        return {'interval': self.interval,
+                'observations': self._observations,
+                'ready': self._ready}
 
 
 class Retry(base.EventHandler):
@@ -44,28 +97,103 @@ class Retry(base.EventHandler):
     `handler` is retried for the same `event` (expected backoff E(c) =
     interval * 2 ** c / 2).
 
+    The `timeout` and `interval` can be overridden per exception type with
+    `policies`, a dict mapping exception classes to `RetryPolicy` objects.
+    The policy of the most specific class of the raised exception is used,
+    and is updated with the outcome of the first retry, i.e. whether it did
+    not fail with an exception of the same policy. The first retry is made
+    after exactly the base interval, as the backoff has no random factor for
+    the first attempt.
+
+    If `requeue` is specified (e.g. `Async.requeue`), `Retry` does not sleep
+    between the attempts but schedules the next attempt with
+    `requeue(event, handler, delay)` and returns, so that the caller is not
+    blocked and newer events can supersede the retry. The exceptions risen by
+    the rescheduled attempts are logged, as there is no caller to raise them
+    to.
+
     [1] https://en.wikipedia.org/wiki/Exponential_backoff
     """
 
     def __init__(self, handler, exceptions=Exception,
-                 timeout=DEFAULT_TIMEOUT, interval=DEFAULT_INTERVAL):
+                 timeout=DEFAULT_TIMEOUT, interval=DEFAULT_INTERVAL,
+                 requeue=None, policies=None):
         self._handler = handler
         self._exceptions = exceptions
-        self._timeout = timeout
-        self._interval = interval
+        self._default_policy = RetryPolicy(timeout=timeout, interval=interval)
+        self._policies = policies or {}
+        self._requeue = requeue
 
     def __call__(self, event):
-        deadline = time.time() + self._timeout
+        start = time.time()
+        if self._requeue:
+            self._attempt(event, 1, start)
+            return
+        policy = None
         for attempt in itertools.count(1):
             try:
                 self._handler(event)
-                break
             except self._exceptions:
                 with excutils.save_and_reraise_exception() as ex:
-                    if self._sleep(deadline, attempt, ex.value):
+                    failed_policy = self._get_policy(ex.value)
+                    if attempt == 2:
+                        policy.observe(failed_policy is not policy)
+                    policy = failed_policy
+                    if self._sleep(start + policy.timeout, attempt, ex.value):
                         ex.reraise = False
+            else:
+                if attempt == 2:
+                    policy.observe(True)
+                return
+
+    def _get_policy(self, exception):
+        for cls in type(exception).__mro__:
+            try:
+                return self._policies[cls]
+            except KeyError:
+                continue
+        return self._default_policy
+
+    def get_policy_stats(self):
+        """Returns the statistics of the retry policies per exception name."""
+        stats = {cls.__name__: policy.stats()
+                 for cls, policy in self._policies.items()}
+        stats['default'] = self._default_policy.stats()
+        return stats
+
+    def _attempt(self, event, attempt, start, policy=None):
+        try:
+            self._handler(event)
+        except self._exceptions:
+            with excutils.save_and_reraise_exception() as ex:
+                failed_policy = self._get_policy(ex.value)
+                if attempt == 2:
+                    policy.observe(failed_policy is not policy)
+                interval = self._get_interval(
+                    start + failed_policy.timeout, attempt, ex.value)
+                if interval:
+                    ex.reraise = False
+                    self._requeue(event, functools.partial(
+                        self._retry, attempt=attempt + 1, start=start,
+                        policy=failed_policy), interval)
+        else:
+            if attempt == 2:
+                policy.observe(True)
+
+    def _retry(self, event, attempt, start, policy):
+        try:
+            self._attempt(event, attempt, start, policy)
+        except Exception:
+            LOG.exception("Failed to handle event %s", event)
 
     def _sleep(self, deadline, attempt, exception):
+        interval = self._get_interval(deadline, attempt, exception)
+        if interval:
+            time.sleep(interval)
+        return interval
+
+    def _get_interval(self, deadline, attempt, exception):
+        policy = self._get_policy(exception)
         now = time.time()
         seconds_left = deadline - now
 
@@ -73,21 +201,21 @@ class Retry(base.EventHandler):
             LOG.debug("Handler %s failed (attempt %s; %s), "
                       "timeout exceeded (%s seconds)",
                       self._handler, attempt, exceptions.format_msg(exception),
-                      self._timeout)
+                      policy.timeout)
             return 0
 
-        interval = random.randint(1, 2 ** attempt - 1) * self._interval
+        base_interval = policy.interval
+        interval = random.randint(1, 2 ** attempt - 1) * base_interval
 
         if interval > seconds_left:
             interval = seconds_left
 
-        if interval < self._interval:
-            interval = self._interval
+        if interval < base_interval:
+            interval = base_interval
 
         LOG.debug("Handler %s failed (attempt %s; %s), "
                   "retrying in %s seconds",
                   self._handler, attempt, exceptions.format_msg(exception),
                   interval)
 
-        time.sleep(interval)
         return interval
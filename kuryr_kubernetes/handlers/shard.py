@@ -0,0 +1,49 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from oslo_log import log as logging
+
+from kuryr_kubernetes.handlers import base
+from kuryr_kubernetes.handlers import k8s_base
+
+LOG = logging.getLogger(__name__)
+
+
+class ShardFilter(base.EventHandler):
+    """Drops the events of the objects owned by other controller replicas.
+
+    `ShardFilter` is meant to be the first stage of the pipeline, so that a
+    replica does not track, queue or handle the objects of the other shards.
+
+    :param handler: the handler the events of the owned objects are passed to
+    :param owns: callable returning whether this replica owns the object of
+                 the event passed to it
+    """
+
+    def __init__(self, handler, owns):
+        self._handler = handler
+        self._owns = owns
+        self._passed = 0
+        self._dropped = 0
+
+    def __call__(self, event):
+        if self._owns(event):
+            self._passed += 1
+            self._handler(event)
+        else:
+            self._dropped += 1
+            LOG.debug("Event for %s dropped, owned by another shard",
+                      k8s_base.object_link(event))
+
+    def stats(self):
+        """Returns the number of dropped and passed events."""
+        return {'dropped': self._dropped, 'passed': self._passed}
@@ -12,9 +12,10 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import collections
 import contextlib
-import itertools
 import os
+import threading
 
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
@@ -26,6 +27,14 @@ from kuryr_kubernetes import exceptions as exc
 
 LOG = logging.getLogger(__name__)
 
+_MAX_WRITTEN_VERSIONS = 4096
+_MAX_CONFLICT_RETRIES = 3
+
+
+def _has_conflicts(annotations, retrieved_annotations):
+    return any(retrieved_annotations.get(k, v) != v
+               for k, v in annotations.items())
+
 
 class K8sClient(object):
     # REVISIT(ivc): replace with python-k8sclient if it could be extended
@@ -38,9 +47,10 @@ class K8sClient(object):
         ca_crt_file = config.CONF.kubernetes.ssl_ca_crt_file
         self.verify_server = config.CONF.kubernetes.ssl_verify_server_crt
         token_file = config.CONF.kubernetes.token_file
+        self.token = None
         if token_file:
             with open(token_file, 'r') as f:
-            	self.token = f.readline().rstrip('\n')
+                self.token = f.readline().rstrip('\n')
         else:
             if cert_file and not os.path.exists(cert_file):
                 raise RuntimeError(
@@ -60,59 +70,196 @@ class K8sClient(object):
 
         self.cert = (cert_file, key_file)
 
+        self._annotate_lock = threading.Lock()
+        self._annotate_stats = collections.defaultdict(collections.Counter)
+        self._written_versions = collections.OrderedDict()
+
+    def _get_headers(self, headers=None):
+        headers = dict(headers or {})
+        if self.token:
+            headers['Authorization'] = 'Bearer %s' % self.token
+        return headers
+
+    def _raise_from_response(self, path, response):
+        if response.status_code == requests.codes.not_found:
+            raise exc.K8sResourceNotFound(path)
+        raise exc.K8sClientException(response.text)
+
     def get(self, path):
         LOG.debug("Get %(path)s", {'path': path})
         url = self._base_url + path
         response = requests.get(url, cert=self.cert,
                                 verify=self.verify_server,
-                                headers={'Authorization': 'Bearer %s' % self.token})
+                                headers=self._get_headers())
         if not response.ok:
-            raise exc.K8sClientException(response.text)
+            self._raise_from_response(path, response)
+        return response.json()
+
+    def post(self, path, body):
+        """Creates a K8s API resource.
+
+        :param path: path of the resource collection
+        :param body: resource dict
+        :return: created resource dict
+        """
+        LOG.debug("Post %(path)s: %(body)s", {'path': path, 'body': body})
+        url = self._base_url + path
+        response = requests.post(url, data=jsonutils.dumps(body),
+                                 headers=self._get_headers({
+                                     'Content-Type': 'application/json',
+                                     'Accept': 'application/json'}),
+                                 cert=self.cert, verify=self.verify_server)
+        if not response.ok:
+            self._raise_from_response(path, response)
+        return response.json()
+
+    def patch_crd(self, field, path, data):
+        """Replaces a top-level field (e.g. 'spec') of a custom resource.
+
+        The field is replaced as a whole with a JSON patch 'add' operation,
+        so unlike a merge patch no stale nested keys are left behind and no
+        'resourceVersion' is required. Custom resources are only written by
+        Kuryr, so last-writer-wins is the expected behaviour.
+
+        :param field: name of the top-level field
+        :param path: path of the custom resource
+        :param data: new value of the field
+        :return: updated resource dict
+        """
+        LOG.debug("Patch %(path)s: %(field)s", {'path': path,
+                                                'field': field})
+        url = self._base_url + path
+        response = requests.patch(url, data=jsonutils.dumps([{
+            'op': 'add', 'path': '/%s' % field, 'value': data}]),
+            headers=self._get_headers({
+                'Content-Type': 'application/json-patch+json',
+                'Accept': 'application/json'}),
+            cert=self.cert, verify=self.verify_server)
+        if not response.ok:
+            self._raise_from_response(path, response)
         return response.json()
 
-    def annotate(self, path, annotations, resource_version=None):
+    def delete(self, path):
+        """Deletes a K8s API resource.
+
+        :raises K8sResourceNotFound: if the resource does not exist
+        """
+        LOG.debug("Delete %(path)s", {'path': path})
+        url = self._base_url + path
+        response = requests.delete(url, headers=self._get_headers(),
+                                   cert=self.cert, verify=self.verify_server)
+        if not response.ok:
+            self._raise_from_response(path, response)
+        return response.json()
+
+    def annotate(self, path, annotations, resource_version=None,
+                 suppress_echo=False):
         """Pushes a resource annotation to the K8s API resource
 
         The annotate operation is made with a PATCH HTTP request of kind:
         application/merge-patch+json as described in:
 
         https://github.com/kubernetes/community/blob/master/contributors/devel/api-conventions.md#patch-operations  # noqa
+
+        On a 'resourceVersion' conflict, the resource is retrieved and the
+        PATCH is retried with its new 'resourceVersion' if none of the
+        annotations being set is present with another value, i.e. the
+        conflict was caused by changes of other fields. The PATCH is retried
+        at most `_MAX_CONFLICT_RETRIES` times, then K8sClientException is
+        raised, as it is on a conflict on the annotations themselves.
+
+        With `suppress_echo`, the 'resourceVersion' of the updated resource
+        is recorded along with the `resource_version` it was based on, so
+        that the event caused by the update (its echo) can be recognized with
+        `pop_written_version` and dropped. It should only be set if the echo
+        does not require handling by any of the handlers.
         """
         LOG.debug("Annotate %(path)s: %(names)s", {
             'path': path, 'names': list(annotations)})
+
         url = self._base_url + path
-        while itertools.count(1):
+        stats = self._get_annotate_stats(path)
+        headers = self._get_headers({
+            'Content-Type': 'application/merge-patch+json',
+            'Accept': 'application/json',
+        })
+
+        retries = 0
+        while True:
             data = jsonutils.dumps({
                 "metadata": {
                     "annotations": annotations,
                     "resourceVersion": resource_version,
                 }
             }, sort_keys=True)
-            response = requests.patch(url, data=data, headers={
-                'Content-Type': 'application/merge-patch+json',
-                'Accept': 'application/json',
-                'Authorization': 'Bearer %s' % self.token
-            }, cert=self.cert, verify=self.verify_server)
+            stats['patches'] += 1
+            response = requests.patch(url, data=data, headers=headers,
+                                      cert=self.cert,
+                                      verify=self.verify_server)
             if response.ok:
-                return response.json()['metadata']['annotations']
-            if response.status_code == requests.codes.conflict:
+                metadata = response.json()['metadata']
+                if suppress_echo and resource_version is not None:
+                    self._set_written_version(
+                        path, resource_version,
+                        metadata.get('resourceVersion'))
+                return metadata['annotations']
+            if (response.status_code == requests.codes.conflict and
+                    resource_version is not None):
+                stats['conflicts'] += 1
                 resource = self.get(path)
-                new_version = resource['metadata']['resourceVersion']
                 retrieved_annotations = resource['metadata'].get(
                     'annotations', {})
 
-                for k, v in annotations.items():
-                    if v != retrieved_annotations.get(k, v):
-                        break
-                else:
+                if (retries < _MAX_CONFLICT_RETRIES and
+                        not _has_conflicts(annotations,
+                                           retrieved_annotations)):
                     # No conflicting annotations found. Retry patching
-                    resource_version = new_version
+                    stats['retries'] += 1
+                    retries += 1
+                    resource_version = resource['metadata']['resourceVersion']
                     continue
                 LOG.debug("Annotations for %(path)s already present: "
                           "%(names)s", {'path': path,
                                         'names': retrieved_annotations})
             raise exc.K8sClientException(response.text)
 
+    def _set_written_version(self, path, base_version, resource_version):
+        with self._annotate_lock:
+            self._written_versions.pop(path, None)
+            self._written_versions[path] = (base_version, resource_version)
+            if len(self._written_versions) > _MAX_WRITTEN_VERSIONS:
+                self._written_versions.popitem(last=False)
+
+    def pop_written_version(self, path):
+        """Returns and forgets the last update recorded for the resource.
+
+        Only the updates made by `annotate` with `suppress_echo` are
+        recorded.
+
+        :param path: path of the resource
+        :return: tuple of the 'resourceVersion' the update was based on and
+                 of the 'resourceVersion' resulting from the update or None
+        """
+        with self._annotate_lock:
+            return self._written_versions.pop(path, None)
+
+    def _get_annotate_stats(self, path):
+        parts = path.rstrip('/').split('/')
+        kind = parts[-2] if len(parts) > 1 else path
+        return self._annotate_stats[kind]
+
+    def get_annotate_stats(self):
+        """Returns the annotate statistics per resource kind.
+
+        :return: dict mapping resource kinds (e.g. 'pods') to dicts with
+                 the number of PATCH requests sent ('patches'), of
+                 'resourceVersion' conflicts ('conflicts'), of PATCH
+                 requests retried after a conflict ('retries')
+        """
+        with self._annotate_lock:
+            return {kind: dict(stats)
+                    for kind, stats in self._annotate_stats.items()}
+
     def watch(self, path):
         params = {'watch': 'true'}
         url = self._base_url + path
@@ -121,11 +268,11 @@ class K8sClient(object):
         while True:
             with contextlib.closing(
                     requests.get(url, params=params, stream=True,
-                    cert=self.cert, verify=self.verify_server,
-                    headers={'Authorization': 'Bearer %s' % self.token})) as response:
+                                 cert=self.cert, verify=self.verify_server,
+                                 headers=self._get_headers())) as response:
                 if not response.ok:
                     raise exc.K8sClientException(response.text)
-                for line in response.iter_lines(delimiter='\n'):
+                for line in response.iter_lines(delimiter=b'\n'):
                     line = line.strip()
                     if line:
                         yield jsonutils.loads(line)
@@ -49,9 +49,32 @@ def _create_ovs_vif_cmd(bridge, dev, iface_id, mac, instance_id):
     return cmd
 
 
+def create_ovs_vif_ports(ports):
+    """Plugs a batch of ports into OpenVSwitch with a single ovs-vsctl call.
+
+    :param ports: iterable of (bridge, dev, iface_id, mac, instance_id)
+                  tuples
+    """
+    cmd = []
+    for port in ports:
+        cmd += _create_ovs_vif_cmd(*port)
+    _ovs_vsctl(cmd)
+
+
+def delete_ovs_vif_ports(ports):
+    """Unplugs a batch of ports from OpenVSwitch with one ovs-vsctl call.
+
+    :param ports: iterable of (bridge, dev) tuples
+    """
+    cmd = []
+    for bridge, dev in ports:
+        cmd += ['--', '--if-exists', 'del-port', bridge, dev]
+    _ovs_vsctl(cmd)
+
+
 def create_ovs_vif_port(bridge, dev, iface_id, mac, instance_id):
-    _ovs_vsctl(_create_ovs_vif_cmd(bridge, dev, iface_id, mac, instance_id))
+    create_ovs_vif_ports([(bridge, dev, iface_id, mac, instance_id)])
 
 
 def delete_ovs_vif_port(bridge, dev):
-    _ovs_vsctl(['--', '--if-exists', 'del-port', bridge, dev])
+    delete_ovs_vif_ports([(bridge, dev)])
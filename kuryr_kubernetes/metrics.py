@@ -0,0 +1,332 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""In-process metrics exposed in the Prometheus text format.
+
+Metrics are registered once (usually at module import) and updated in place
+by the code they instrument, which only costs a dict lookup and an addition
+per update. Values that are already tracked elsewhere (e.g. the annotate
+statistics of `K8sClient`) are exposed with `set_function`, which computes
+them when the metrics are scraped.
+
+The metrics are served by `MetricsServer` on '/metrics' when the
+`[metrics]port` option is set.
+"""
+
+import bisect
+import collections
+import copy
+
+from oslo_log import log as logging
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
+from six.moves.urllib import parse
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+                   30, 60, 120)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+def _format_labels(labelnames, labels, extra=()):
+    pairs = list(zip(labelnames, labels)) + list(extra)
+    if not pairs:
+        return ''
+    return '{%s}' % ','.join(
+        '%s="%s"' % (name, str(value).replace('\\', '\\\\')
+                     .replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs)
+
+
+class _Metric(object):
+    TYPE = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._function = None
+
+    def set_function(self, function):
+        """Computes the values when the metrics are collected.
+
+        :param function: callable returning a dict mapping label value
+                         tuples to values
+        """
+        self._function = function
+
+    def clear(self):
+        self._values.clear()
+
+    def _merge(self, values, other):
+        for labels, value in other.items():
+            values[labels] = values.get(labels, 0) + value
+
+    def _collect(self, others):
+        values = self._values
+        if self._function is not None:
+            values = self._function()
+        if others:
+            values = copy.deepcopy(values)
+            for other in others:
+                self._merge(values, other)
+        return values
+
+    def _samples(self, values):
+        for labels, value in sorted(values.items()):
+            yield '%s%s %s' % (self.name,
+                               _format_labels(self.labelnames, labels),
+                               _format_value(value))
+
+    def render(self, others=()):
+        """Returns the metric in the Prometheus text exposition format.
+
+        :param others: values of the metric observed by other processes, to
+                       be added to the values of this process
+        """
+        return '\n'.join(
+            ['# HELP %s %s' % (self.name, self.documentation),
+             '# TYPE %s %s' % (self.name, self.TYPE)] +
+            list(self._samples(self._collect(others))))
+
+
+class Counter(_Metric):
+    """Monotonically increasing value."""
+
+    TYPE = 'counter'
+
+    def inc(self, labels=(), amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def get(self, labels=()):
+        return self._values.get(labels, 0)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+
+    TYPE = 'gauge'
+
+    def set(self, value, labels=()):
+        self._values[labels] = value
+
+    def get(self, labels=()):
+        return self._values.get(labels, 0)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values (e.g. durations) in buckets."""
+
+    TYPE = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, labels=()):
+        try:
+            counts = self._values[labels]
+        except KeyError:
+            # NOTE: one count per bucket, one for +Inf and the sum
+            counts = self._values[labels] = [0] * (len(self.buckets) + 2)
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def get(self, labels=()):
+        """Returns the number and the sum of the observed values."""
+        counts = self._values.get(labels)
+        if counts is None:
+            return 0, 0
+        return sum(counts[:-1]), counts[-1]
+
+    def set_function(self, function):
+        raise TypeError("Histogram %s can not be computed by a function, "
+                        "the values have to be observed" % self.name)
+
+    def _merge(self, values, other):
+        for labels, counts in other.items():
+            total = values.setdefault(labels, [0] * len(counts))
+            for i, count in enumerate(counts):
+                total[i] += count
+
+    def _samples(self, values):
+        for labels, counts in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),),
+                                    counts[:-1]):
+                cumulative += count
+                yield '%s_bucket%s %s' % (
+                    self.name,
+                    _format_labels(self.labelnames, labels,
+                                   [('le', _format_value(bound))]),
+                    _format_value(cumulative))
+            label_str = _format_labels(self.labelnames, labels)
+            yield '%s_sum%s %s' % (self.name, label_str,
+                                   _format_value(counts[-1]))
+            yield '%s_count%s %s' % (self.name, label_str,
+                                     _format_value(cumulative))
+
+
+class Registry(object):
+    """Collection of the metrics of a process."""
+
+    def __init__(self):
+        self._metrics = collections.OrderedDict()
+        self._collectors = []
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = cls(name, documentation, labelnames, **kwargs)
+            self._metrics[name] = metric
+        elif not isinstance(metric, cls) or (metric.labelnames !=
+                                             tuple(labelnames)):
+            raise ValueError("Metric %s already registered with a different "
+                             "type or labels" % name)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(),
+                  buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation,
+                                   labelnames, buckets=buckets)
+
+    def add_collector(self, collector):
+        """Adds the metrics observed by other processes to the rendered ones.
+
+        :param collector: callable returning a list of `snapshot` results of
+                          the registries of the other processes
+        """
+        self._collectors.append(collector)
+
+    def snapshot(self):
+        """Returns the observed values of the metrics by name.
+
+        The metrics computed by a function (see `set_function`) are not
+        included, the statistics they are computed from are process specific.
+        """
+        return {name: copy.deepcopy(metric._values)
+                for name, metric in self._metrics.items()
+                if metric._function is None and metric._values}
+
+    def clear(self):
+        """Drops the observed values, e.g. the ones inherited by a fork."""
+        for metric in self._metrics.values():
+            metric.clear()
+
+    def render(self):
+        """Returns the metrics in the Prometheus text exposition format."""
+        snapshots = []
+        for collector in self._collectors:
+            try:
+                snapshots.extend(collector())
+            except Exception:
+                LOG.exception("Failed to collect the metrics of %s",
+                              collector)
+        rendered = []
+        for metric in self._metrics.values():
+            try:
+                rendered.append(metric.render(
+                    [snapshot[metric.name] for snapshot in snapshots
+                     if metric.name in snapshot]))
+            except Exception:
+                LOG.exception("Failed to collect metric %s", metric.name)
+        return '\n'.join(rendered) + '\n'
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+
+class _RequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = parse.urlparse(self.path)
+        route = self.server.routes.get(url.path)
+        if route is None:
+            self._respond(404, 'text/plain', 'Not found\n')
+            return
+        try:
+            status, content_type, body = route(parse.parse_qs(url.query))
+        except Exception:
+            LOG.exception("Failed to handle request %s", self.path)
+            self._respond(500, 'text/plain', 'Internal error\n')
+            return
+        self._respond(status, content_type, body)
+
+    def _respond(self, status, content_type, body):
+        if not isinstance(body, bytes):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        LOG.debug("Metrics server: " + format, *args)
+
+
+class _HTTPServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class MetricsServer(object):
+    """HTTP server exposing the metrics on '/metrics'.
+
+    Other read-only endpoints can be added with `add_route`. Each request is
+    handled in its own thread (a greenthread once eventlet patched the
+    process), so a slow endpoint (e.g. a profile) does not delay the
+    scrapes.
+    """
+
+    def __init__(self, host, port, registry=REGISTRY):
+        self._server = _HTTPServer((host, port), _RequestHandler)
+        self._server.routes = {}
+        self.add_route('/metrics', lambda query: (
+            200, CONTENT_TYPE, registry.render()))
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def add_route(self, path, handler):
+        """Serves GET requests for `path`.
+
+        :param path: URL path
+        :param handler: callable receiving the parsed query string and
+                        returning a (status, content type, body) tuple
+        """
+        self._server.routes[path] = handler
+
+    def serve_forever(self):
+        LOG.info("Serving metrics on port %s", self.port)
+        self._server.serve_forever()
+
+    def shutdown(self):
+        self._server.shutdown()
+        self._server.server_close()
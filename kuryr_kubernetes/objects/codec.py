@@ -0,0 +1,126 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Serialization of versioned objects into K8s annotations.
+
+The 'legacy' format is the plain `obj_to_primitive()` output, which repeats
+the 'versioned_object.namespace/name/version/data/changes' envelope for every
+nested object along with its field names. The 'compact' format stores each
+(namespace, name, version, set fields) combination once in a class table and
+encodes every object as a '_' list of that table's index followed by the
+field values in the order of the table entry:
+
+    {"v": 1,
+     "c": [["os_vif", "VIFOpenVSwitch", "1.0", ["active", "address", ...]],
+           ["os_vif", "Network", "1.1", ["id", "subnets", ...]], ...],
+     "o": {"_": [0, true, "fa:16:3e:00:00:01", ..., {"_": [1, ...]}, ...]}}
+
+The compact format does not store changed fields, which are not meaningful
+for annotations. Both formats are accepted by `loads`.
+"""
+
+from oslo_serialization import jsonutils
+
+from kuryr_kubernetes import config
+
+FORMAT_LEGACY = 'legacy'
+FORMAT_COMPACT = 'compact'
+
+COMPACT_VERSION = 1
+
+_NAMESPACE = 'versioned_object.namespace'
+_NAME = 'versioned_object.name'
+_VERSION = 'versioned_object.version'
+_DATA = 'versioned_object.data'
+
+
+def _compact(value, classes, index):
+    if isinstance(value, dict):
+        if _NAME in value:
+            data = value[_DATA]
+            fields = sorted(data)
+            cls_key = (value[_NAMESPACE], value[_NAME], value[_VERSION],
+                       tuple(fields))
+            try:
+                node = [index[cls_key]]
+            except KeyError:
+                node = [len(classes)]
+                index[cls_key] = node[0]
+                classes.append(list(cls_key[:3]) + [fields])
+            node.extend(_compact(data[k], classes, index) for k in fields)
+            return {'_': node}
+        return {k: _compact(v, classes, index) for k, v in value.items()}
+    elif isinstance(value, list):
+        return [_compact(v, classes, index) for v in value]
+    return value
+
+
+def _expand(value, classes):
+    if isinstance(value, dict):
+        if '_' in value:
+            node = value['_']
+            namespace, name, version, fields = classes[node[0]]
+            return {
+                _NAMESPACE: namespace,
+                _NAME: name,
+                _VERSION: version,
+                _DATA: {k: _expand(v, classes)
+                        for k, v in zip(fields, node[1:])},
+            }
+        return {k: _expand(v, classes) for k, v in value.items()}
+    elif isinstance(value, list):
+        return [_expand(v, classes) for v in value]
+    return value
+
+
+def to_primitive(obj, fmt=None):
+    """Returns the versioned object as a JSON-serializable dict.
+
+    :param obj: versioned object
+    :param fmt: FORMAT_LEGACY or FORMAT_COMPACT, defaults to the
+                `[kubernetes]annotation_format` option
+    """
+    if fmt is None:
+        fmt = config.CONF.kubernetes.annotation_format
+    primitive = obj.obj_to_primitive()
+    if fmt == FORMAT_COMPACT:
+        classes = []
+        tree = _compact(primitive, classes, {})
+        return {'v': COMPACT_VERSION, 'c': classes, 'o': tree}
+    return primitive
+
+
+def from_primitive(cls, primitive):
+    if _NAME not in primitive:
+        primitive = _expand(primitive['o'], primitive['c'])
+    return cls.obj_from_primitive(primitive)
+
+
+def dumps(obj, fmt=None):
+    """Serializes the versioned object for an annotation.
+
+    :param obj: versioned object
+    :param fmt: FORMAT_LEGACY or FORMAT_COMPACT, defaults to the
+                `[kubernetes]annotation_format` option
+    :return: JSON string
+    """
+    return jsonutils.dumps(to_primitive(obj, fmt), sort_keys=True)
+
+
+def loads(cls, annotation):
+    """Deserializes an annotation in any of the supported formats.
+
+    :param cls: versioned object class (or base class) expected
+    :param annotation: JSON string
+    :return: versioned object
+    """
+    return from_primitive(cls, jsonutils.loads(annotation))
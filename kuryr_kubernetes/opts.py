@@ -19,6 +19,14 @@ from kuryr_kubernetes import config
 _kuryr_k8s_opts = [
     ('kubernetes', config.k8s_opts),
     ('kuryr-kubernetes', config.kuryr_k8s_opts),
+    ('neutron', config.neutron_client_opts),
+    ('metrics', config.metrics_opts),
+    ('tracing', config.tracing_opts),
+    ('profiler', config.profiler_opts),
+    ('sharding', config.sharding_opts),
+    ('reconciler', config.reconciler_opts),
+    ('garbage_collector', config.garbage_collector_opts),
+    ('namespace_subnet', config.namespace_subnet_opts),
 ]
 
 
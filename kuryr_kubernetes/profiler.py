@@ -0,0 +1,249 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Sampling profiler of the controller.
+
+Nothing runs until a profile is requested, either with SIGUSR1 (the profile
+is written to `[profiler]output_dir`) or on '/debug/profile?seconds=N' of the
+metrics endpoint (the profile is the response body). The stacks are then
+sampled every `[profiler]interval` seconds for the requested duration and
+the profile is returned in the collapsed format of the flamegraph tools
+('frame;frame;frame count' lines, outermost frame first):
+
+    flamegraph.pl kuryr-controller-1234-20180102T030405.collapsed > cpu.svg
+
+The sampler runs in a native thread (eventlet's original `threading`) so
+that it keeps sampling while a greenthread holds the CPU. With eventlet, the
+frame of an OS thread is the frame of the greenthread it is running, so the
+samples show where the CPU time goes. With `all_greenthreads`, the stacks of
+the greenthreads waiting (e.g. on I/O or in a sleep) are sampled as well,
+which profiles the wall-clock time at a higher cost.
+
+The profiles of other processes, i.e. the controller workers, are added to
+the profile with `add_collector`, prefixed with the name of their process.
+"""
+
+import collections
+import datetime
+import gc
+import os
+import sys
+
+from eventlet import greenthread
+from eventlet import patcher
+import greenlet
+from oslo_log import log as logging
+
+from kuryr_kubernetes import config
+
+LOG = logging.getLogger(__name__)
+
+_threading = patcher.original('threading')
+_time = patcher.original('time')
+
+# NOTE: the list of greenthreads is refreshed every _GREENLETS_PERIOD
+# seconds as walking the heap for them is far more expensive than a sample
+_GREENLETS_PERIOD = 1.0
+
+_lock = _threading.Lock()
+_active = None
+_collectors = []
+_frame_names = {}
+
+
+def _strip_path(filename):
+    for path in sorted(sys.path, key=len, reverse=True):
+        if path and filename.startswith(path + os.sep):
+            return filename[len(path) + 1:]
+    return filename
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    try:
+        return _frame_names[code]
+    except KeyError:
+        name = _frame_names[code] = '%s (%s:%d)' % (
+            code.co_name, _strip_path(code.co_filename), code.co_firstlineno)
+        return name
+
+
+def _collapse(frame):
+    stack = []
+    while frame is not None:
+        stack.append(_frame_name(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(stack))
+
+
+class SamplingProfiler(object):
+    """Samples the stacks of the threads and greenthreads of the process.
+
+    :param interval: seconds between the samples
+    :param all_greenthreads: also sample the greenthreads that are not
+                             running, for a wall-clock profile
+    """
+
+    def __init__(self, interval=0.01, all_greenthreads=False):
+        self._interval = interval
+        self._all_greenthreads = all_greenthreads
+        self._stacks = collections.Counter()
+        self._stopped = _threading.Event()
+        self._thread = None
+        self._greenlets = []
+        self._greenlets_time = 0
+        self.samples = 0
+
+    def start(self):
+        self._thread = _threading.Thread(target=self._run,
+                                         name='kuryr-profiler')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stops the sampling and returns the sample count of the stacks."""
+        self._stopped.set()
+        self._thread.join()
+        return self._stacks
+
+    def _run(self):
+        ident = _threading.current_thread().ident
+        while not self._stopped.is_set():
+            self.sample(skip=ident)
+            self._stopped.wait(self._interval)
+
+    def _get_greenlets(self):
+        now = _time.time()
+        if now - self._greenlets_time >= _GREENLETS_PERIOD:
+            self._greenlets = [g for g in gc.get_objects()
+                               if isinstance(g, greenlet.greenlet)]
+            self._greenlets_time = now
+        return self._greenlets
+
+    def sample(self, skip=None):
+        """Records the stacks running (and waiting) at this time."""
+        self.samples += 1
+        for ident, frame in sys._current_frames().items():
+            if ident != skip:
+                self._stacks[_collapse(frame)] += 1
+        if self._all_greenthreads:
+            for green in self._get_greenlets():
+                # NOTE: gr_frame is only set while the greenlet is switched
+                # out, the running ones were sampled with their OS thread
+                frame = green.gr_frame
+                if frame is not None:
+                    self._stacks[_collapse(frame)] += 1
+
+    def collapsed(self):
+        """Returns the profile in the collapsed stacks format."""
+        return ''.join('%s %d\n' % (stack, count)
+                       for stack, count in sorted(self._stacks.items()))
+
+
+def add_collector(collector):
+    """Adds the profiles of other processes to the profiles of this one.
+
+    :param collector: callable profiling the other processes for the
+                      duration it is passed and returning a list of (process
+                      name, profile in the collapsed stacks format) tuples
+    """
+    _collectors.append(collector)
+
+
+def reset():
+    """Forgets the running profile and the collectors, e.g. after a fork."""
+    global _active
+    with _lock:
+        _active = None
+    del _collectors[:]
+
+
+def _prefix(name, collapsed):
+    return ''.join('%s;%s' % (name, line)
+                   for line in collapsed.splitlines(True))
+
+
+def profile(duration, interval=None, all_greenthreads=None):
+    """Profiles the process for `duration` seconds.
+
+    Runs in a greenthread: it sleeps while the native sampler thread
+    samples and the collectors profile the other processes.
+
+    :returns: the profile in the collapsed stacks format or None if another
+              profile is running
+    """
+    global _active
+    conf = config.CONF.profiler
+    if interval is None:
+        interval = conf.interval
+    if all_greenthreads is None:
+        all_greenthreads = conf.all_greenthreads
+
+    with _lock:
+        if _active is not None:
+            return None
+        _active = SamplingProfiler(interval, all_greenthreads)
+    try:
+        LOG.info("Profiling for %s seconds", duration)
+        _active.start()
+        pending = [greenthread.spawn(collector, duration)
+                   for collector in _collectors]
+        greenthread.sleep(duration)
+        _active.stop()
+        LOG.info("Profiled %d samples", _active.samples)
+        collapsed = _active.collapsed()
+        for thread in pending:
+            try:
+                others = thread.wait()
+            except Exception:
+                LOG.exception("Failed to profile the other processes")
+                continue
+            for name, other in others:
+                collapsed += _prefix(name, other)
+        return collapsed
+    finally:
+        with _lock:
+            _active = None
+
+
+def profile_to_file(duration, service_name):
+    """Profiles the process and writes the profile to `[profiler]output_dir`.
+
+    :returns: the path of the profile or None if another profile is running
+    """
+    collapsed = profile(duration)
+    if collapsed is None:
+        LOG.warning("Profile already running, ignoring the request")
+        return None
+    path = os.path.join(config.CONF.profiler.output_dir, '%s-%d-%s.collapsed'
+                        % (service_name, os.getpid(),
+                           datetime.datetime.now().strftime('%Y%m%dT%H%M%S')))
+    with open(path, 'w') as f:
+        f.write(collapsed)
+    LOG.info("Profile written to %s", path)
+    return path
+
+
+def handle_request(query):
+    """Handles the '/debug/profile' requests of the metrics endpoint."""
+    try:
+        duration = float(query.get('seconds', [
+            config.CONF.profiler.duration])[0])
+    except ValueError:
+        return 400, 'text/plain', 'Invalid seconds\n'
+    if not 0 < duration <= config.CONF.profiler.max_duration:
+        return 400, 'text/plain', 'seconds must be in (0, %d]\n' % (
+            config.CONF.profiler.max_duration)
+    collapsed = profile(duration)
+    if collapsed is None:
+        return 409, 'text/plain', 'Profile already running\n'
+    return 200, 'text/plain', collapsed
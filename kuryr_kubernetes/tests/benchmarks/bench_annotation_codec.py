@@ -0,0 +1,76 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Benchmarks the annotation formats.
+
+Reports the size and the encode/decode time of an LBaaSState annotation with
+the given number of members in the 'legacy' and 'compact' formats:
+
+    python -m kuryr_kubernetes.tests.benchmarks.bench_annotation_codec
+"""
+
+import argparse
+import timeit
+import uuid
+
+from kuryr_kubernetes.objects import codec
+from kuryr_kubernetes.objects import lbaas as obj_lbaas
+
+
+def _lbaas_state(members):
+    project_id = uuid.uuid4().hex
+    subnet_id = str(uuid.uuid4())
+    lb = obj_lbaas.LBaaSLoadBalancer(
+        id=str(uuid.uuid4()), project_id=project_id, name='default/svc',
+        ip='10.0.0.10', subnet_id=subnet_id)
+    listener = obj_lbaas.LBaaSListener(
+        id=str(uuid.uuid4()), project_id=project_id, name='default/svc:80',
+        loadbalancer_id=lb.id, protocol='TCP', port=80)
+    pool = obj_lbaas.LBaaSPool(
+        id=str(uuid.uuid4()), project_id=project_id, name='default/svc:80',
+        loadbalancer_id=lb.id, listener_id=listener.id, protocol='TCP')
+    state = obj_lbaas.LBaaSState(
+        loadbalancer=lb, listeners=[listener], pools=[pool],
+        members=[obj_lbaas.LBaaSMember(
+            id=str(uuid.uuid4()), project_id=project_id,
+            name='default/pod-%d:8080' % i, pool_id=pool.id,
+            subnet_id=subnet_id, ip='10.1.%d.%d' % (i // 256, i % 256),
+            port=8080)
+            for i in range(members)])
+    state.obj_reset_changes(recursive=True)
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--members', type=int, default=500,
+                        help="number of LBaaSMembers in the LBaaSState")
+    parser.add_argument('--count', type=int, default=20,
+                        help="number of encode/decode iterations")
+    args = parser.parse_args()
+
+    state = _lbaas_state(args.members)
+    print("%-8s %10s %12s %12s" % ('format', 'bytes', 'encode', 'decode'))
+    for fmt in (codec.FORMAT_LEGACY, codec.FORMAT_COMPACT):
+        annotation = codec.dumps(state, fmt)
+        encode = timeit.timeit(lambda: codec.dumps(state, fmt),
+                               number=args.count)
+        decode = timeit.timeit(
+            lambda: codec.loads(obj_lbaas.LBaaSState, annotation),
+            number=args.count)
+        print("%-8s %10d %10.2fms %10.2fms" % (
+            fmt, len(annotation), 1e3 * encode / args.count,
+            1e3 * decode / args.count))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Benchmarks CNI binding driver lookup.
+
+Compares building a `stevedore.driver.DriverManager` for each lookup (i.e.
+scanning the entry points for every pod) with the cached lookup done by
+`kuryr_kubernetes.cni.binding.base._get_binding_driver`. Requires the
+kuryr-kubernetes package to be installed so that its entry points are
+registered:
+
+    python -m kuryr_kubernetes.tests.benchmarks.bench_binding_drivers
+"""
+
+import argparse
+import timeit
+
+from os_vif.objects import vif as osv_vif
+from stevedore import driver as stv_driver
+
+from kuryr_kubernetes.cni.binding import base as b_base
+
+
+def _scan(name):
+    return stv_driver.DriverManager(namespace=b_base._BINDING_NAMESPACE,
+                                    name=name,
+                                    invoke_on_load=True).driver
+
+
+def _report(name, seconds, count):
+    print("%-10s %10.2fus/lookup" % (name, 1e6 * seconds / count))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=1000,
+                        help="number of lookups")
+    args = parser.parse_args()
+
+    vif = osv_vif.VIFOpenVSwitch()
+    name = type(vif).__name__
+
+    _report('scan', timeit.timeit(lambda: _scan(name), number=args.count),
+            args.count)
+
+    b_base._BINDING_DRIVERS.clear()
+    _report('first', timeit.timeit(lambda: b_base._get_binding_driver(vif),
+                                   number=1), 1)
+    _report('cached', timeit.timeit(lambda: b_base._get_binding_driver(vif),
+                                    number=args.count), args.count)
+
+
+if __name__ == '__main__':
+    main()
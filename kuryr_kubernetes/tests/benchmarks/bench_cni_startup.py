@@ -0,0 +1,76 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Benchmarks kuryr-cni start-up.
+
+Measures the wall time of a CNI VERSION invocation in a fresh interpreter and
+lists the most expensive imports of the `kuryr_kubernetes.cmd.cni` entry
+point, as reported by `python -X importtime`:
+
+    python -m kuryr_kubernetes.tests.benchmarks.bench_cni_startup
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+_RUN_CNI = "from kuryr_kubernetes.cmd import cni; cni.run()"
+
+
+def _version(count):
+    env = dict(os.environ, CNI_COMMAND='VERSION', CNI_ARGS='IgnoreUnknown=1')
+    samples = []
+    for _ in range(count):
+        start = time.time()
+        proc = subprocess.Popen([sys.executable, '-c', _RUN_CNI], env=env,
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        proc.communicate(b'{}')
+        samples.append(time.time() - start)
+    return sorted(samples)
+
+
+def _import_times():
+    proc = subprocess.Popen([sys.executable, '-X', 'importtime', '-c',
+                             'import kuryr_kubernetes.cmd.cni'],
+                            stderr=subprocess.PIPE)
+    _, err = proc.communicate()
+    times = []
+    for line in err.decode().splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times.append((int(cumulative), name.strip()))
+    return sorted(times, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=10,
+                        help="number of VERSION invocations")
+    parser.add_argument('--top', type=int, default=15,
+                        help="number of imports to list")
+    args = parser.parse_args()
+
+    samples = _version(args.count)
+    print("VERSION: min %.1fms median %.1fms max %.1fms" % (
+        1e3 * samples[0], 1e3 * samples[len(samples) // 2],
+        1e3 * samples[-1]))
+
+    print("cumulative import time:")
+    for cumulative, name in _import_times()[:args.top]:
+        print("%10.1fms %s" % (cumulative / 1e3, name))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,423 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Benchmarks the controller under synthetic load.
+
+Runs `KuryrK8sService` against the fake K8s API server (in its own process,
+see `fake_k8s`) and the fake Neutron client (see `fake_neutron`), drives one
+of the scenarios and reports the throughput, the latency percentiles and the
+Neutron and K8s API calls made by the controller:
+
+  - pods: creates pods, from creation to the active VIF annotation
+  - services: creates services with their endpoints, from the service
+    creation to the LBaaS state annotation with all the members
+  - churn: creates services, then replaces one address of their endpoints
+    at a time in rounds, from the endpoints update to the LBaaS state in
+    sync
+
+With `--workers`, the events are handled in that many worker processes (see
+`kuryr_kubernetes.controller.workers`), each with its own copy of the fake
+Neutron.
+
+    python -m kuryr_kubernetes.tests.benchmarks.bench_controller pods \\
+        --count 5000
+    python -m kuryr_kubernetes.tests.benchmarks.bench_controller services \\
+        --count 500 --neutron-latency 0.05
+    python -m kuryr_kubernetes.tests.benchmarks.bench_controller churn \\
+        --count 50 --updates 500
+    python -m kuryr_kubernetes.tests.benchmarks.bench_controller pods \\
+        --count 5000 --neutron-latency 0 --workers 4
+"""
+
+import eventlet
+
+eventlet.monkey_patch()
+
+import argparse  # noqa: E402
+import subprocess  # noqa: E402
+import sys  # noqa: E402
+import time  # noqa: E402
+
+from os_vif import objects as obj_vif  # noqa: E402
+from oslo_serialization import jsonutils  # noqa: E402
+import netaddr  # noqa: E402
+import requests  # noqa: E402
+
+from kuryr_kubernetes import clients  # noqa: E402
+from kuryr_kubernetes import config  # noqa: E402
+from kuryr_kubernetes import constants  # noqa: E402
+from kuryr_kubernetes.controller import service  # noqa: E402
+from kuryr_kubernetes import objects  # noqa: E402
+from kuryr_kubernetes.objects import codec as obj_codec  # noqa: E402
+from kuryr_kubernetes.objects import lbaas as obj_lbaas  # noqa: E402
+from kuryr_kubernetes.tests.benchmarks import fake_neutron  # noqa: E402
+
+_NAMESPACE = 'bench'
+_NODES = 10
+_POLL_INTERVAL = 0.2
+
+
+class _FakeK8s(object):
+    """Runs the fake K8s API server and drives it."""
+
+    def __init__(self):
+        self._proc = subprocess.Popen(
+            [sys.executable, '-m',
+             'kuryr_kubernetes.tests.benchmarks.fake_k8s'],
+            stdout=subprocess.PIPE)
+        self.api_root = 'http://127.0.0.1:%d' % int(
+            self._proc.stdout.readline())
+        self._history_index = 0
+
+    def stop(self):
+        self._proc.terminate()
+        self._proc.wait()
+
+    def _url(self, kind, name=None):
+        url = '%s%s/%s/%s' % (self.api_root, constants.K8S_API_NAMESPACES,
+                              _NAMESPACE, kind)
+        return url + '/' + name if name else url
+
+    def create(self, kind, obj):
+        requests.post(self._url(kind), data=jsonutils.dumps(obj)
+                      ).raise_for_status()
+
+    def replace(self, kind, name, obj):
+        requests.put(self._url(kind, name), data=jsonutils.dumps(obj)
+                     ).raise_for_status()
+
+    def get_history(self):
+        """Returns the writes made since the previous call."""
+        response = requests.get(self.api_root + '/_bench/history',
+                                params={'since': self._history_index})
+        response.raise_for_status()
+        result = response.json()
+        self._history_index = result['next']
+        return result['history']
+
+    def get_stats(self):
+        return requests.get(self.api_root + '/_bench/stats').json()
+
+
+def _link(kind, name):
+    return '%s/%s/%s/%s' % (constants.K8S_API_NAMESPACES, _NAMESPACE, kind,
+                            name)
+
+
+class _Scenario(object):
+    """Creates objects and tracks how long the controller takes for each.
+
+    Subclasses issue the writes in `run` with `_expect` and recognize the
+    controller's writes that complete them in `_is_complete`.
+    """
+
+    def __init__(self, k8s, args):
+        self._k8s = k8s
+        self._args = args
+        self._pool = eventlet.GreenPool(args.concurrency)
+        self._expected = {}
+        self._issued = {}
+        self.latencies = []
+        self.superseded = 0
+        self.start = None
+        self.end = None
+
+    def _throttle(self, index):
+        if self._args.rate:
+            delay = self.start + float(index) / self._args.rate - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+    def _expect(self, link, expected):
+        """Tracks the write of `link` issued next."""
+        if link in self._expected:
+            self.superseded += 1
+        self._expected[link] = expected
+        self._issued.pop(link, None)
+
+    def _observe(self, history):
+        for t, verb, link, annotations in history:
+            if link not in self._expected:
+                continue
+            if verb in ('POST', 'PUT'):
+                self._issued.setdefault(link, t)
+            elif (verb == 'PATCH' and link in self._issued and
+                    self._is_complete(link, annotations or {})):
+                self.latencies.append(t - self._issued.pop(link))
+                del self._expected[link]
+                self.end = t
+
+    def _is_complete(self, link, annotations):
+        raise NotImplementedError()
+
+    def wait(self, timeout):
+        """Waits for the tracked writes to be completed by the controller.
+
+        :return: the number of writes that were not completed
+        """
+        deadline = time.time() + timeout
+        while True:
+            self._pool.waitall()
+            self._observe(self._k8s.get_history())
+            if not self._expected or time.time() > deadline:
+                return len(self._expected)
+            time.sleep(_POLL_INTERVAL)
+
+    def run(self):
+        raise NotImplementedError()
+
+
+class PodsScenario(_Scenario):
+
+    def run(self):
+        self.start = time.time()
+        for i in range(self._args.count):
+            self._throttle(i)
+            name = 'pod-%d' % i
+            self._expect(_link('pods', name), True)
+            self._pool.spawn_n(self._k8s.create, 'pods', {
+                'metadata': {'name': name},
+                'spec': {'nodeName': 'node-%d' % (i % _NODES)},
+                'status': {'phase': constants.K8S_POD_STATUS_PENDING}})
+
+    def _is_complete(self, link, annotations):
+        annotation = annotations.get(constants.K8S_ANNOTATION_VIF)
+        if not annotation:
+            return False
+        return obj_codec.loads(obj_vif.vif.VIFBase, annotation).active
+
+
+class ServicesScenario(_Scenario):
+
+    def __init__(self, k8s, args):
+        super(ServicesScenario, self).__init__(k8s, args)
+        self._addresses = netaddr.IPNetwork(fake_neutron.POD_CIDR)
+        self._address_index = self._addresses.size // 2
+        self._service_ips = netaddr.IPNetwork(
+            fake_neutron.SERVICE_CIDR).iter_hosts()
+        next(self._service_ips)
+        self.endpoints = {}
+
+    def _new_address(self):
+        self._address_index += 1
+        return str(self._addresses[self._address_index])
+
+    def _endpoints(self, name, addresses):
+        return {
+            'metadata': {'name': name},
+            'subsets': [{
+                'addresses': [{'ip': ip,
+                               'targetRef': {'kind': constants.K8S_OBJ_POD,
+                                             'name': '%s-%d' % (name, j),
+                                             'namespace': _NAMESPACE}}
+                              for j, ip in enumerate(addresses)],
+                'ports': [{'name': 'http', 'port': 8080,
+                           'protocol': 'TCP'}],
+            }],
+        }
+
+    def _create_service(self, name, addresses):
+        # NOTE: the endpoints exist before the service, as they are
+        # annotated with the service's LBaaS spec
+        self._k8s.create('endpoints', self._endpoints(name, addresses))
+        self._k8s.create('services', {
+            'metadata': {'name': name},
+            'spec': {'type': 'ClusterIP',
+                     'clusterIP': str(next(self._service_ips)),
+                     'ports': [{'name': 'http', 'port': 80,
+                                'protocol': 'TCP', 'targetPort': 8080}]}})
+
+    def run(self):
+        self.start = time.time()
+        for i in range(self._args.count):
+            self._throttle(i)
+            name = 'service-%d' % i
+            addresses = [self._new_address()
+                         for _ in range(self._args.pods_per_service)]
+            self.endpoints[name] = addresses
+            self._expect(_link('endpoints', name), set(addresses))
+            self._pool.spawn_n(self._create_service, name, addresses)
+
+    def _observe(self, history):
+        # NOTE: the services are tracked through their endpoints, which the
+        # controller annotates with the LBaaS state
+        super(ServicesScenario, self)._observe(
+            [[t, verb, link.replace('/services/', '/endpoints/'),
+              annotations]
+             for t, verb, link, annotations in history
+             if not (verb == 'POST' and '/endpoints/' in link)])
+
+    def _is_complete(self, link, annotations):
+        annotation = annotations.get(constants.K8S_ANNOTATION_LBAAS_STATE)
+        if not annotation:
+            return False
+        state = obj_codec.loads(obj_lbaas.LBaaSState, annotation)
+        return {str(m.ip) for m in state.members} == self._expected[link]
+
+
+class ChurnScenario(ServicesScenario):
+
+    def run(self):
+        super(ChurnScenario, self).run()
+        missing = self.wait(self._args.timeout)
+        if missing:
+            raise RuntimeError("%d services not ready" % missing)
+        self.latencies = []
+        self.start = time.time()
+
+        # NOTE: the endpoints are updated in rounds, one update per endpoints
+        # at a time, so that no update is superseded by the next one
+        names = sorted(self.endpoints)
+        for i in range(self._args.updates):
+            if i and not i % len(names):
+                self.wait(self._args.timeout)
+            self._throttle(i)
+            name = names[i % len(names)]
+            addresses = self.endpoints[name][1:] + [self._new_address()]
+            self.endpoints[name] = addresses
+            self._expect(_link('endpoints', name), set(addresses))
+            self._pool.spawn_n(self._k8s.replace, 'endpoints', name,
+                               self._endpoints(name, addresses))
+
+
+_SCENARIOS = {
+    'pods': PodsScenario,
+    'services': ServicesScenario,
+    'churn': ChurnScenario,
+}
+
+
+def _setup_controller(api_root, args):
+    config.init([], default_config_files=[])
+    conf = config.CONF
+    conf.set_override('api_root', api_root, 'kubernetes')
+    conf.set_override('project', fake_neutron.PROJECT_ID, 'neutron_defaults')
+    conf.set_override('pod_subnet', fake_neutron.POD_SUBNET_ID,
+                      'neutron_defaults')
+    conf.set_override('service_subnet', fake_neutron.SERVICE_SUBNET_ID,
+                      'neutron_defaults')
+    conf.set_override('pod_security_groups',
+                      [fake_neutron.SECURITY_GROUP_ID], 'neutron_defaults')
+    conf.set_override('ovs_bridge', 'br-int', 'neutron_defaults')
+    conf.set_override('controller_workers', args.workers, 'kubernetes')
+
+    clients.setup_kubernetes_client()
+    neutron = fake_neutron.FakeNeutron(
+        latency=args.neutron_latency,
+        failure_rate=args.neutron_failure_rate,
+        port_activation_delay=args.port_activation_delay,
+        lb_provisioning_delay=args.lb_provisioning_delay,
+        seed=args.seed)
+    # NOTE: the fake client is wrapped like the real one to get the same
+    # rate limiting and call statistics
+    clients._clients[clients._NEUTRON_CLIENT] = clients._NeutronClientProxy(
+        neutron,
+        rate_limit=conf.neutron.rate_limit,
+        rate_limit_burst=conf.neutron.rate_limit_burst,
+        max_concurrent_requests=conf.neutron.max_concurrent_requests)
+    # NOTE: with workers, the drivers registering the os-vif objects the
+    # VIF annotations are decoded to are only loaded by the workers
+    obj_vif.register_all()
+    objects.register_locally_defined_vifs()
+    return neutron
+
+
+def _percentile(values, p):
+    return values[min(int(len(values) * p), len(values) - 1)]
+
+
+def _report(scenario, missing, k8s_stats, call_stats):
+    latencies = sorted(scenario.latencies)
+    duration = (scenario.end or time.time()) - scenario.start
+    print("completed %d, not completed %d, superseded %d in %.2fs: "
+          "%.1f/s" % (len(latencies), missing, scenario.superseded,
+                      duration, len(latencies) / duration))
+    if latencies:
+        print("latency (s): p50 %.3f p90 %.3f p99 %.3f max %.3f" % (
+            _percentile(latencies, 0.5), _percentile(latencies, 0.9),
+            _percentile(latencies, 0.99), latencies[-1]))
+
+    print("%-24s %8s %8s %10s" % ('neutron call', 'calls', 'errors',
+                                  'time (s)'))
+    for name, stats in sorted(call_stats.items()):
+        print("%-24s %8d %8d %10.2f" % (name, stats['calls'],
+                                        stats['errors'], stats['time']))
+
+    print("%-24s %8s" % ('k8s request', 'count'))
+    for name, count in sorted(k8s_stats.items()):
+        print("%-24s %8d" % (name, count))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('scenario', choices=sorted(_SCENARIOS))
+    parser.add_argument('--count', type=int, default=1000,
+                        help="number of pods or services created")
+    parser.add_argument('--pods-per-service', type=int, default=3,
+                        help="number of endpoints addresses per service")
+    parser.add_argument('--updates', type=int, default=500,
+                        help="number of endpoints updates (churn)")
+    parser.add_argument('--rate', type=float, default=0,
+                        help="objects created or updated per second, 0 "
+                             "for as fast as possible")
+    parser.add_argument('--concurrency', type=int, default=20,
+                        help="number of concurrent K8s API writes")
+    parser.add_argument('--neutron-latency', type=float, default=0.01,
+                        help="mean latency of the Neutron calls (s)")
+    parser.add_argument('--neutron-failure-rate', type=float, default=0,
+                        help="probability of a Neutron call failing")
+    parser.add_argument('--port-activation-delay', type=float, default=0,
+                        help="time until the created ports are ACTIVE (s)")
+    parser.add_argument('--lb-provisioning-delay', type=float, default=0,
+                        help="time the load balancers are PENDING after "
+                             "each change (s)")
+    parser.add_argument('--timeout', type=float, default=600,
+                        help="time to wait for the controller (s)")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="seed of the Neutron latency and failures")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="number of controller worker processes, 0 "
+                             "handles the events in the watcher process")
+    args = parser.parse_args()
+
+    k8s = _FakeK8s()
+    try:
+        _setup_controller(k8s.api_root, args)
+        controller = service.KuryrK8sService()
+        if controller.workers:
+            # NOTE: the workers keep the fake Neutron client they inherit
+            controller.workers._setup = clients.setup_kubernetes_client
+        controller.start()
+        try:
+            scenario = _SCENARIOS[args.scenario](k8s, args)
+            k8s_stats = k8s.get_stats()
+            scenario.run()
+            missing = scenario.wait(args.timeout)
+            k8s_stats = {k: v - k8s_stats.get(k, 0)
+                         for k, v in k8s.get_stats().items()}
+            if controller.workers:
+                # NOTE: let the workers report their last calls
+                time.sleep(2)
+                call_stats = controller.workers.get_neutron_call_stats()
+            else:
+                call_stats = clients.get_neutron_client().get_call_stats()
+            _report(scenario, missing, k8s_stats, call_stats)
+        finally:
+            if controller.workers:
+                controller.workers.stop()
+            controller.tg.stop()
+    finally:
+        k8s.stop()
+
+
+if __name__ == '__main__':
+    main()
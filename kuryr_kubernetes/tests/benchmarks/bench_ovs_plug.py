@@ -0,0 +1,75 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Benchmarks OpenVSwitch port plugging throughput.
+
+Plugs and then unplugs a burst of ports (one per simulated pod) on a
+temporary bridge with ovs-vsctl. The benchmark must be run as root on a host
+running OpenVSwitch, e.g.:
+
+    python -m kuryr_kubernetes.tests.benchmarks.bench_ovs_plug \\
+        --count 200 --batch 1
+
+The ports are not backed by network devices, so the measured time only
+includes the ovs-vsctl overhead that Kuryr pays for each pod.
+"""
+
+import argparse
+import time
+import uuid
+
+from kuryr_kubernetes import linux_net_utils as net_utils
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _report(name, count, seconds):
+    print("%-8s %5d ports in %8.3fs: %8.1f ports/s, %7.2fms/port" % (
+        name, count, seconds, count / seconds, 1000 * seconds / count))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bridge', default='br-kuryr-bench')
+    parser.add_argument('--count', type=int, default=200,
+                        help="number of ports (pods) to plug")
+    parser.add_argument('--batch', type=int, default=1,
+                        help="number of ports plugged per ovs-vsctl call")
+    args = parser.parse_args()
+
+    net_utils._ovs_vsctl(['--may-exist', 'add-br', args.bridge])
+    try:
+        ports = [(args.bridge, 'kbench%05d' % i, str(uuid.uuid4()),
+                  'fa:16:3e:%02x:%02x:%02x' % (i >> 16, (i >> 8) & 0xff,
+                                               i & 0xff),
+                  str(uuid.uuid4()))
+                 for i in range(args.count)]
+
+        start = time.time()
+        for chunk in _chunks(ports, args.batch):
+            net_utils.create_ovs_vif_ports(chunk)
+        _report('plug', len(ports), time.time() - start)
+
+        start = time.time()
+        for chunk in _chunks(ports, args.batch):
+            net_utils.delete_ovs_vif_ports((bridge, dev)
+                                           for bridge, dev, _, _, _ in chunk)
+        _report('unplug', len(ports), time.time() - start)
+    finally:
+        net_utils._ovs_vsctl(['--if-exists', 'del-br', args.bridge])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,318 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Fake K8s API server for the benchmarks.
+
+Serves the subset of the K8s API used by Kuryr: lists and watches of the
+resource collections (all namespaces or one namespace, the watches
+optionally filtered by 'metadata.name'), GET, POST, PUT, merge-patch PATCH
+(with 'resourceVersion' preconditions) and DELETE of the namespaced objects.
+Objects are kept in memory and every write is recorded with its time so that
+the benchmarks can compute latencies from '/_bench/history'. Request counts
+are served on '/_bench/stats'.
+
+The server is meant to run in its own process so that it does not compete
+with the controller under test for the CPU:
+
+    python -m kuryr_kubernetes.tests.benchmarks.fake_k8s --port 8080
+"""
+
+import argparse
+import collections
+import itertools
+import sys
+import threading
+import time
+import uuid
+
+from oslo_serialization import jsonutils
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
+from six.moves.urllib import parse
+
+_KINDS = {
+    'pods': 'Pod',
+    'services': 'Service',
+    'endpoints': 'Endpoints',
+}
+_WATCH_TIMEOUT = 1
+
+
+class FakeK8sAPI(object):
+    """In-memory K8s resources and their events."""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self._objects = {}
+        self._events = collections.defaultdict(list)
+        self._versions = itertools.count(1)
+        self.history = []
+        self.requests = collections.Counter()
+
+    def _emit(self, kind, event_type, obj):
+        self._events[kind].append({'type': event_type, 'object': obj})
+        self.cond.notify_all()
+
+    def _record(self, verb, link, annotations=None):
+        self.history.append([time.time(), verb, link, annotations])
+
+    def get(self, link):
+        with self.cond:
+            return self._objects.get(link)
+
+    def create(self, prefix, namespace, kind, obj):
+        metadata = obj.setdefault('metadata', {})
+        metadata['namespace'] = namespace
+        link = '%s/namespaces/%s/%s/%s' % (prefix, namespace, kind,
+                                           metadata['name'])
+        with self.cond:
+            if link in self._objects:
+                return 409, {'message': 'already exists'}
+            obj.setdefault('kind', _KINDS.get(kind))
+            metadata['selfLink'] = link
+            metadata['uid'] = str(uuid.uuid4())
+            metadata['resourceVersion'] = str(next(self._versions))
+            self._objects[link] = obj
+            self._record('POST', link)
+            self._emit(kind, 'ADDED', obj)
+        return 201, obj
+
+    def replace(self, kind, link, obj):
+        with self.cond:
+            current = self._objects.get(link)
+            if current is None:
+                return 404, {'message': 'not found'}
+            version = obj['metadata'].get('resourceVersion')
+            if version and version != current['metadata']['resourceVersion']:
+                return 409, {'message': 'conflict'}
+            # NOTE: like K8s, the metadata of the object is kept
+            metadata = dict(current['metadata'])
+            metadata['resourceVersion'] = str(next(self._versions))
+            obj = dict(obj, metadata=metadata)
+            obj.setdefault('kind', current.get('kind'))
+            self._objects[link] = obj
+            self._record('PUT', link)
+            self._emit(kind, 'MODIFIED', obj)
+        return 200, obj
+
+    def patch(self, kind, link, patch):
+        patch_metadata = patch.get('metadata', {})
+        with self.cond:
+            current = self._objects.get(link)
+            if current is None:
+                return 404, {'message': 'not found'}
+            version = patch_metadata.get('resourceVersion')
+            if version and version != current['metadata']['resourceVersion']:
+                return 409, {'message': 'conflict'}
+            metadata = dict(current['metadata'])
+            annotations = dict(metadata.get('annotations', {}))
+            for key, value in patch_metadata.get('annotations', {}).items():
+                if value is None:
+                    annotations.pop(key, None)
+                else:
+                    annotations[key] = value
+            metadata['annotations'] = annotations
+            metadata['resourceVersion'] = str(next(self._versions))
+            obj = dict(current, metadata=metadata)
+            self._objects[link] = obj
+            self._record('PATCH', link, patch_metadata.get('annotations'))
+            self._emit(kind, 'MODIFIED', obj)
+        return 200, obj
+
+    def delete(self, kind, link):
+        with self.cond:
+            obj = self._objects.pop(link, None)
+            if obj is None:
+                return 404, {'message': 'not found'}
+            self._record('DELETE', link)
+            self._emit(kind, 'DELETED', obj)
+        return 200, obj
+
+    def list_events(self, kind, namespace=None, name=None):
+        """Returns the current objects as ADDED events and the log index."""
+        with self.cond:
+            events = [{'type': 'ADDED', 'object': obj}
+                      for obj in self._objects.values()
+                      if _matches(obj, kind, namespace, name)]
+            return events, len(self._events[kind])
+
+    def wait_events(self, kind, index, namespace=None, name=None):
+        """Waits for the events logged after `index`."""
+        with self.cond:
+            log = self._events[kind]
+            if len(log) <= index:
+                self.cond.wait(_WATCH_TIMEOUT)
+            events = [e for e in log[index:]
+                      if _matches(e['object'], kind, namespace, name)]
+            return events, len(log)
+
+
+def _matches(obj, kind, namespace, name):
+    metadata = obj['metadata']
+    return (metadata['selfLink'].split('/')[-2] == kind and
+            namespace in (None, metadata.get('namespace')) and
+            name in (None, metadata.get('name')))
+
+
+def _parse_path(path):
+    """Returns the prefix, namespace, kind and name of a resource path."""
+    parts = path.strip('/').split('/')
+    if 'namespaces' in parts:
+        idx = parts.index('namespaces')
+        prefix = '/' + '/'.join(parts[:idx])
+        rest = parts[idx + 1:] + [None, None]
+        return prefix, rest[0], rest[1], rest[2]
+    return '/' + '/'.join(parts[:-1]), None, parts[-1], None
+
+
+class _RequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _respond(self, status, body):
+        data = jsonutils.dump_as_bytes(body)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return jsonutils.loads(self.rfile.read(length))
+
+    def _count(self, kind):
+        with self.server.api.cond:
+            self.server.api.requests[self.command, kind] += 1
+
+    def do_GET(self):
+        url = parse.urlparse(self.path)
+        query = parse.parse_qs(url.query)
+        api = self.server.api
+        if url.path == '/_bench/history':
+            since = int(query.get('since', ['0'])[0])
+            with api.cond:
+                history = api.history[since:]
+            self._respond(200, {'history': history,
+                                'next': since + len(history)})
+            return
+        if url.path == '/_bench/stats':
+            with api.cond:
+                stats = ['%s %s' % key for key in api.requests]
+                self._respond(200, dict(zip(stats, api.requests.values())))
+            return
+
+        prefix, namespace, kind, name = _parse_path(url.path)
+        self._count(kind)
+        if query.get('watch') == ['true']:
+            field = query.get('fieldSelector', [''])[0]
+            if field.startswith('metadata.name='):
+                name = field[len('metadata.name='):]
+            self._watch(kind, namespace, name)
+            return
+        if name is None:
+            events, _ = api.list_events(kind, namespace)
+            self._respond(200, {
+                'kind': '%sList' % _KINDS.get(kind, ''),
+                'items': [event['object'] for event in events]})
+            return
+        obj = api.get(url.path)
+        if obj is None:
+            self._respond(404, {'message': 'not found'})
+        else:
+            self._respond(200, obj)
+
+    def _watch(self, kind, namespace, name):
+        # NOTE: like K8s, the events are sent in chunks, as clients only
+        # process the data of a plain streamed response once their read
+        # buffer is full
+        api = self.server.api
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        self.close_connection = True
+        events, index = api.list_events(kind, namespace, name)
+        try:
+            while not self.server.stopping:
+                if events:
+                    data = b''.join(jsonutils.dump_as_bytes(e) + b'\n'
+                                    for e in events)
+                    self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+                    self.wfile.flush()
+                events, index = api.wait_events(kind, index, namespace, name)
+            self.wfile.write(b'0\r\n\r\n')
+        except (IOError, OSError):
+            pass
+
+    def do_POST(self):
+        prefix, namespace, kind, _ = _parse_path(self.path)
+        self._count(kind)
+        self._respond(*self.server.api.create(prefix, namespace, kind,
+                                              self._read_body()))
+
+    def do_PUT(self):
+        _, _, kind, _ = _parse_path(self.path)
+        self._count(kind)
+        self._respond(*self.server.api.replace(kind, self.path,
+                                               self._read_body()))
+
+    def do_PATCH(self):
+        _, _, kind, _ = _parse_path(self.path)
+        self._count(kind)
+        self._respond(*self.server.api.patch(kind, self.path,
+                                             self._read_body()))
+
+    def do_DELETE(self):
+        _, _, kind, _ = _parse_path(self.path)
+        self._count(kind)
+        self._respond(*self.server.api.delete(kind, self.path))
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeK8sServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, host, port):
+        BaseHTTPServer.HTTPServer.__init__(self, (host, port),
+                                           _RequestHandler)
+        self.api = FakeK8sAPI()
+        self.stopping = False
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1',
+                        help="address to listen on")
+    parser.add_argument('--port', type=int, default=0,
+                        help="port to listen on, 0 picks a free port")
+    args = parser.parse_args()
+
+    server = FakeK8sServer(args.host, args.port)
+    # NOTE: the benchmarks read the port the server listens on from the
+    # first line of the output
+    sys.stdout.write('%d\n' % server.port)
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stopping = True
+
+
+if __name__ == '__main__':
+    main()
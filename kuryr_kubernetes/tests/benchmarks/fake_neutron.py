@@ -0,0 +1,276 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Fake Neutron client for the benchmarks.
+
+Implements the Neutron client methods used by the default controller
+drivers on in-memory ports and LBaaSv2 objects. Every call waits for the
+configured latency (green sleep under eventlet) and fails with the
+configured probability with ServiceUnavailable, ports become ACTIVE after
+`port_activation_delay` and load balancers are PENDING_UPDATE for
+`lb_provisioning_delay` after each change, so that the controller's retries
+and provisioning waits are exercised.
+"""
+
+import collections
+import functools
+import itertools
+import random
+import time
+import uuid
+
+import netaddr
+from neutronclient.common import exceptions as n_exc
+
+POD_SUBNET_ID = '6a1f2f4e-6d37-4c7a-9d4b-0c5f3b1e2a01'
+POD_CIDR = '10.0.0.0/16'
+SERVICE_SUBNET_ID = '6a1f2f4e-6d37-4c7a-9d4b-0c5f3b1e2a02'
+SERVICE_CIDR = '10.2.0.0/16'
+PROJECT_ID = '6a1f2f4e-6d37-4c7a-9d4b-0c5f3b1e2a03'
+SECURITY_GROUP_ID = '6a1f2f4e-6d37-4c7a-9d4b-0c5f3b1e2a04'
+
+
+def _api_call(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self._wait()
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _matches(obj, filters):
+    return all(str(obj.get(k)) == str(v) for k, v in filters.items())
+
+
+class _FakeHTTPClient(object):
+    def get_token(self):
+        return 'token'
+
+    def get_endpoint(self):
+        return 'http://neutron'
+
+
+class FakeNeutron(object):
+
+    def __init__(self, latency=0.0, failure_rate=0.0,
+                 port_activation_delay=0.0, lb_provisioning_delay=0.0,
+                 seed=None):
+        self._latency = latency
+        self._failure_rate = failure_rate
+        self._port_activation_delay = port_activation_delay
+        self._lb_provisioning_delay = lb_provisioning_delay
+        self._random = random.Random(seed)
+        self._macs = itertools.count(1)
+        self._networks = {}
+        self._subnets = {}
+        self._ips = {}
+        self._objects = collections.defaultdict(dict)
+        self.failures = 0
+        self.httpclient = _FakeHTTPClient()
+
+        for subnet_id, cidr in ((POD_SUBNET_ID, POD_CIDR),
+                                (SERVICE_SUBNET_ID, SERVICE_CIDR)):
+            network_id = str(uuid.uuid4())
+            cidr = netaddr.IPNetwork(cidr)
+            self._networks[network_id] = {'id': network_id,
+                                          'name': network_id,
+                                          'mtu': 1450}
+            self._subnets[subnet_id] = {'id': subnet_id,
+                                        'network_id': network_id,
+                                        'cidr': str(cidr),
+                                        'ip_version': 4,
+                                        'gateway_ip': str(cidr[1]),
+                                        'dns_nameservers': [],
+                                        'host_routes': []}
+            # NOTE: the upper half of the pod CIDR is left for the endpoints
+            # addresses generated by the benchmarks
+            self._ips[subnet_id] = itertools.islice(cidr.iter_hosts(), 1,
+                                                    cidr.size // 2)
+
+    def _wait(self):
+        if self._latency:
+            time.sleep(self._random.uniform(0.5, 1.5) * self._latency)
+        if self._failure_rate and self._random.random() < self._failure_rate:
+            self.failures += 1
+            raise n_exc.ServiceUnavailable(message='injected failure')
+
+    def _new_id(self):
+        return str(uuid.uuid4())
+
+    def _get(self, kind, obj_id, not_found=n_exc.NotFound):
+        try:
+            return self._objects[kind][obj_id]
+        except KeyError:
+            raise not_found(message='%s %s not found' % (kind, obj_id))
+
+    def _list(self, kind, filters):
+        return [dict(obj) for obj in self._objects[kind].values()
+                if _matches(obj, filters)]
+
+    @_api_call
+    def show_subnet(self, subnet_id):
+        return {'subnet': dict(self._subnets[subnet_id])}
+
+    @_api_call
+    def show_network(self, network_id):
+        return {'network': dict(self._networks[network_id])}
+
+    @_api_call
+    def list_security_groups(self, **filters):
+        return {'security_groups': [{'id': SECURITY_GROUP_ID}]}
+
+    @_api_call
+    def create_port(self, body):
+        port = dict(body['port'])
+        port['id'] = self._new_id()
+        port['mac_address'] = 'fa:16:3e:%02x:%02x:%02x' % tuple(
+            (next(self._macs) >> s) & 0xff for s in (16, 8, 0))
+        port['fixed_ips'] = [
+            {'subnet_id': ip['subnet_id'],
+             'ip_address': ip.get('ip_address') or str(
+                 next(self._ips[ip['subnet_id']]))}
+            for ip in port.get('fixed_ips', [])]
+        port['binding:vif_type'] = 'ovs'
+        port['binding:vif_details'] = {'port_filter': True}
+        port['active_at'] = time.time() + self._port_activation_delay
+        self._objects['port'][port['id']] = port
+        return {'port': self._show_port(port)}
+
+    def _show_port(self, port):
+        port = dict(port)
+        active = time.time() >= port.pop('active_at')
+        port['status'] = 'ACTIVE' if active else 'DOWN'
+        return port
+
+    @_api_call
+    def show_port(self, port_id):
+        return {'port': self._show_port(
+            self._get('port', port_id, n_exc.PortNotFoundClient))}
+
+    @_api_call
+    def list_ports(self, **filters):
+        return {'ports': [self._show_port(p)
+                          for p in self._list('port', filters)]}
+
+    @_api_call
+    def delete_port(self, port_id):
+        self._get('port', port_id, n_exc.PortNotFoundClient)
+        del self._objects['port'][port_id]
+
+    @_api_call
+    def list_trunks(self, **filters):
+        return {'trunks': []}
+
+    def _lb_status(self, lb):
+        if time.time() < lb['busy_until']:
+            return 'PENDING_UPDATE'
+        return 'ACTIVE'
+
+    def _update_lb(self, lb_id):
+        lb = self._get('loadbalancer', lb_id)
+        if self._lb_status(lb) != 'ACTIVE':
+            raise n_exc.StateInvalidClient(
+                message='load balancer %s is immutable' % lb_id)
+        lb['busy_until'] = time.time() + self._lb_provisioning_delay
+
+    def _create(self, kind, body, lb_id=None, unique=('name',)):
+        obj = dict(body)
+        for existing in self._objects[kind].values():
+            if all(existing.get(k) == obj.get(k) for k in unique):
+                raise n_exc.Conflict(message='%s exists' % kind)
+        if lb_id:
+            self._update_lb(lb_id)
+        obj['id'] = self._new_id()
+        self._objects[kind][obj['id']] = obj
+        return dict(obj)
+
+    def _delete(self, kind, obj_id, lb_id):
+        self._get(kind, obj_id)
+        self._update_lb(lb_id)
+        del self._objects[kind][obj_id]
+
+    @_api_call
+    def create_loadbalancer(self, body):
+        lb = self._create('loadbalancer', body['loadbalancer'])
+        lb['busy_until'] = time.time() + self._lb_provisioning_delay
+        self._objects['loadbalancer'][lb['id']] = lb
+        return {'loadbalancer': dict(lb)}
+
+    @_api_call
+    def show_loadbalancer(self, lb_id):
+        lb = dict(self._get('loadbalancer', lb_id))
+        lb['provisioning_status'] = self._lb_status(lb)
+        return {'loadbalancer': lb}
+
+    @_api_call
+    def list_loadbalancers(self, **filters):
+        return {'loadbalancers': self._list('loadbalancer', filters)}
+
+    @_api_call
+    def delete_loadbalancer(self, lb_id):
+        lb = self._get('loadbalancer', lb_id)
+        if self._lb_status(lb) != 'ACTIVE':
+            raise n_exc.StateInvalidClient(
+                message='load balancer %s is immutable' % lb_id)
+        del self._objects['loadbalancer'][lb_id]
+
+    @_api_call
+    def create_listener(self, body):
+        listener = body['listener']
+        return {'listener': self._create(
+            'listener', listener, listener['loadbalancer_id'],
+            unique=('loadbalancer_id', 'protocol', 'protocol_port'))}
+
+    @_api_call
+    def list_listeners(self, **filters):
+        return {'listeners': self._list('listener', filters)}
+
+    @_api_call
+    def delete_listener(self, listener_id):
+        listener = self._get('listener', listener_id)
+        self._delete('listener', listener_id, listener['loadbalancer_id'])
+
+    @_api_call
+    def create_lbaas_pool(self, body):
+        pool = dict(body['pool'])
+        pool['listeners'] = [{'id': pool['listener_id']}]
+        return {'pool': self._create('pool', pool, pool['loadbalancer_id'],
+                                     unique=('listener_id',))}
+
+    @_api_call
+    def list_lbaas_pools(self, **filters):
+        return {'pools': self._list('pool', filters)}
+
+    @_api_call
+    def delete_lbaas_pool(self, pool_id):
+        pool = self._get('pool', pool_id)
+        self._delete('pool', pool_id, pool['loadbalancer_id'])
+        for member in self._list('member', {'pool_id': pool_id}):
+            del self._objects['member'][member['id']]
+
+    @_api_call
+    def create_lbaas_member(self, pool_id, body):
+        pool = self._get('pool', pool_id)
+        member = dict(body['member'], pool_id=pool_id)
+        return {'member': self._create(
+            'member', member, pool['loadbalancer_id'],
+            unique=('pool_id', 'address', 'protocol_port'))}
+
+    @_api_call
+    def list_lbaas_members(self, pool_id, **filters):
+        return {'members': self._list('member',
+                                      dict(filters, pool_id=pool_id))}
+
+    @_api_call
+    def delete_lbaas_member(self, member_id, pool_id):
+        pool = self._get('pool', pool_id)
+        self._delete('member', member_id, pool['loadbalancer_id'])
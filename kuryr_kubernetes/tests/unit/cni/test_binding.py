@@ -0,0 +1,200 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import os
+
+import fixtures
+import mock
+
+from os_vif import objects as osv_objects
+from os_vif.objects import fixed_ip as osv_fixed_ip
+from os_vif.objects import network as osv_network
+from os_vif.objects import route as osv_route
+from os_vif.objects import subnet as osv_subnet
+from os_vif.objects import vif as osv_vif
+
+from kuryr_kubernetes.cni.binding import base as b_base
+from kuryr_kubernetes.cni.binding import bridge
+from kuryr_kubernetes.tests import base as test_base
+
+
+class TestBindingBase(test_base.TestCase):
+
+    def setUp(self):
+        super(TestBindingBase, self).setUp()
+        osv_objects.register_all()
+        self.subnet = osv_subnet.Subnet(
+            cidr='10.0.0.0/24',
+            gateway='10.0.0.1',
+            ips=osv_fixed_ip.FixedIPList(objects=[
+                osv_fixed_ip.FixedIP(address='10.0.0.5')]),
+            routes=osv_route.RouteList(objects=[
+                osv_route.Route(cidr='10.1.0.0/16', gateway='10.0.0.2')]))
+        self.vif = osv_vif.VIFOpenVSwitch(
+            address='fa:16:3e:00:00:01',
+            vif_name='tap0',
+            bridge_name='br-int',
+            network=osv_network.Network(subnets=osv_subnet.SubnetList(
+                objects=[self.subnet])))
+
+        self.c_iface = mock.MagicMock()
+        self.c_iface.__enter__.return_value = self.c_iface
+        self.c_iface.address = 'FA:16:3E:00:00:01'
+        self.c_iface.ipaddr = set()
+        self.h_iface = mock.Mock(master=None)
+        self.c_ipdb = mock.Mock(interfaces={'eth0': self.c_iface},
+                                routes=mock.MagicMock())
+        self.h_ipdb = mock.Mock(interfaces={'tap0': self.h_iface})
+        self.useFixture(fixtures.MockPatchObject(
+            b_base, 'get_ipdb',
+            lambda netns=None: self.c_ipdb if netns else self.h_ipdb))
+
+    def test_get_container_iface(self):
+        self.assertEqual(self.c_iface,
+                         b_base.get_container_iface(self.vif, 'eth0', 'ns'))
+
+    def test_get_container_iface_missing(self):
+        self.assertIsNone(b_base.get_container_iface(self.vif, 'eth1', 'ns'))
+
+    def test_get_container_iface_mac_mismatch(self):
+        self.c_iface.address = 'fa:16:3e:00:00:02'
+        self.assertIsNone(b_base.get_container_iface(self.vif, 'eth0', 'ns'))
+
+    def test_ovs_is_connected(self):
+        driver = bridge.VIFOpenVSwitchDriver()
+        self.assertFalse(driver.is_connected(self.vif, 'eth0', 'ns'))
+        self.h_iface.master = 5
+        self.assertTrue(driver.is_connected(self.vif, 'eth0', 'ns'))
+
+    def test_bridge_is_connected(self):
+        driver = bridge.BridgeDriver()
+        self.h_ipdb.interfaces['br-int'] = mock.Mock(index=7)
+        self.h_iface.master = 5
+        self.assertFalse(driver.is_connected(self.vif, 'eth0', 'ns'))
+        self.h_iface.master = 7
+        self.assertTrue(driver.is_connected(self.vif, 'eth0', 'ns'))
+
+    def _test_connect(self, driver):
+        self.h_iface = mock.MagicMock(master=None)
+        self.h_iface.__enter__.return_value = self.h_iface
+        c_peer = mock.MagicMock()
+        c_peer.__enter__.return_value = c_peer
+
+        def create(ifname, peer, kind):
+            self.c_ipdb.interfaces[ifname] = self.c_iface
+            self.c_ipdb.interfaces[peer] = c_peer
+            self.h_ipdb.interfaces[peer] = self.h_iface
+            return self.c_iface
+
+        self.c_ipdb.create = mock.Mock(side_effect=create)
+        driver.connect(self.vif, 'eth0', 'ns')
+
+        self.c_ipdb.create.assert_called_once_with(
+            ifname='eth0', peer='tap0', kind='veth')
+        self.c_iface.up.assert_called_once_with()
+        self.assertEqual(os.getpid(), c_peer.net_ns_pid)
+        self.h_iface.up.assert_called_once_with()
+
+    def test_connect_veth(self):
+        del self.c_ipdb.interfaces['eth0']
+        del self.h_ipdb.interfaces['tap0']
+        self._test_connect(bridge.BaseBridgeDriver())
+        self.c_iface.remove.assert_not_called()
+
+    def test_connect_partial_veth(self):
+        # NOTE: the veth pair of a failed attempt, whose host end was moved
+        # to the host but not attached, is removed and created again
+        stale_h_iface = mock.MagicMock()
+        stale_h_iface.__enter__.return_value = stale_h_iface
+        self.h_ipdb.interfaces['tap0'] = stale_h_iface
+        self._test_connect(bridge.BaseBridgeDriver())
+        self.c_iface.remove.assert_called_once_with()
+        stale_h_iface.remove.assert_not_called()
+
+    def test_connect_partial_veth_not_moved(self):
+        del self.c_ipdb.interfaces['eth0']
+        del self.h_ipdb.interfaces['tap0']
+        stale_c_peer = mock.MagicMock()
+        stale_c_peer.__enter__.return_value = stale_c_peer
+        self.c_ipdb.interfaces['tap0'] = stale_c_peer
+        self._test_connect(bridge.BaseBridgeDriver())
+        stale_c_peer.remove.assert_called_once_with()
+
+    def test_configure_l3(self):
+        routes = self.c_ipdb.routes
+        routes.__getitem__.side_effect = KeyError()
+
+        b_base._configure_l3(self.vif, 'eth0', 'ns')
+
+        self.c_iface.add_ip.assert_called_once_with(
+            '10.0.0.5', mask='255.255.255.0')
+        routes.add.assert_has_calls([
+            mock.call(gateway='10.0.0.2', dst='10.1.0.0/16'),
+            mock.call().commit(),
+            mock.call(gateway='10.0.0.1', dst='default'),
+            mock.call().commit()])
+
+    def test_configure_l3_already_configured(self):
+        self.c_iface.ipaddr = {('10.0.0.5', 24)}
+
+        b_base._configure_l3(self.vif, 'eth0', 'ns')
+
+        self.c_iface.add_ip.assert_not_called()
+        self.c_ipdb.routes.add.assert_not_called()
+
+    @mock.patch('os_vif.plug')
+    @mock.patch.object(b_base, '_configure_l3')
+    @mock.patch.object(b_base, '_get_binding_driver')
+    def test_connect(self, m_get_driver, m_configure_l3, m_plug):
+        m_driver = m_get_driver.return_value
+        m_driver.is_connected.return_value = False
+
+        inst = mock.Mock(uuid='uid')
+        b_base.connect(self.vif, inst, 'eth0', 'ns')
+
+        m_plug.assert_called_once_with(self.vif, inst)
+        m_driver.connect.assert_called_once_with(self.vif, 'eth0', 'ns')
+        m_configure_l3.assert_called_once_with(self.vif, 'eth0', 'ns')
+
+    @mock.patch('os_vif.plug')
+    @mock.patch.object(b_base, '_configure_l3')
+    @mock.patch.object(b_base, '_get_binding_driver')
+    def test_connect_already_connected(self, m_get_driver, m_configure_l3,
+                                       m_plug):
+        m_driver = m_get_driver.return_value
+        m_driver.is_connected.return_value = True
+
+        b_base.connect(self.vif, mock.Mock(uuid='uid'), 'eth0', 'ns')
+
+        m_plug.assert_not_called()
+        m_driver.connect.assert_not_called()
+        m_configure_l3.assert_called_once_with(self.vif, 'eth0', 'ns')
+
+
+class TestBindingDrivers(test_base.TestCase):
+
+    def setUp(self):
+        super(TestBindingDrivers, self).setUp()
+        self.useFixture(fixtures.MockPatchObject(b_base, '_BINDING_DRIVERS',
+                                                 {}))
+
+    @mock.patch('stevedore.driver.DriverManager')
+    def test_get_binding_driver(self, m_mgr):
+        vif = osv_vif.VIFOpenVSwitch()
+
+        driver = b_base._get_binding_driver(vif)
+        self.assertEqual(driver, b_base._get_binding_driver(vif))
+
+        self.assertEqual(m_mgr.return_value.driver, driver)
+        m_mgr.assert_called_once_with(namespace=b_base._BINDING_NAMESPACE,
+                                      name='VIFOpenVSwitch',
+                                      invoke_on_load=True)
@@ -0,0 +1,121 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import json
+import subprocess
+import sys
+
+import mock
+import six
+
+from kuryr_kubernetes.cni import api
+from kuryr_kubernetes.cni import main
+from kuryr_kubernetes.tests import base as test_base
+
+
+class TestCNIRunner(test_base.TestCase):
+
+    def _run(self, command, plugin=None, config=None):
+        fout = six.StringIO()
+        runner = api.CNIRunner(plugin or mock.Mock())
+        env = {'CNI_COMMAND': command, 'CNI_ARGS': 'foo=bar',
+               'CNI_IFNAME': 'eth0', 'CNI_NETNS': '/proc/1/ns/net'}
+        status = runner.run(env, six.StringIO(json.dumps(config or {})),
+                            fout)
+        return status, json.loads(fout.getvalue() or 'null')
+
+    def test_version(self):
+        status, output = self._run('VERSION')
+
+        self.assertIsNone(status)
+        self.assertEqual({'cniVersion': api.CNIRunner.VERSION,
+                          'supportedVersions':
+                              api.CNIRunner.SUPPORTED_VERSIONS}, output)
+
+    @mock.patch('kuryr_kubernetes.cni.result.encode_vif')
+    def test_add(self, m_encode_vif):
+        plugin = mock.Mock()
+        m_encode_vif.return_value = {'ips': []}
+
+        status, output = self._run('ADD', plugin, {'cniVersion': '0.3.1'})
+
+        self.assertIsNone(status)
+        self.assertEqual({'cniVersion': '0.3.1', 'ips': []}, output)
+        m_encode_vif.assert_called_once_with(plugin.add.return_value,
+                                             '0.3.1', 'eth0',
+                                             '/proc/1/ns/net')
+
+    def test_unsupported_version(self):
+        plugin = mock.Mock()
+
+        status, output = self._run('ADD', plugin, {'cniVersion': '0.1.0'})
+
+        self.assertEqual(1, status)
+        self.assertIn('0.1.0', output['msg'])
+        plugin.add.assert_not_called()
+
+    def test_check(self):
+        plugin = mock.Mock()
+
+        status, output = self._run('CHECK', plugin, {'cniVersion': '0.4.0'})
+
+        self.assertIsNone(status)
+        self.assertIsNone(output)
+        plugin.check.assert_called_once_with(mock.ANY)
+
+    def test_check_legacy_version(self):
+        plugin = mock.Mock()
+
+        status, output = self._run('CHECK', plugin, {'cniVersion': '0.3.1'})
+
+        self.assertEqual(1, status)
+        plugin.check.assert_not_called()
+
+    def test_unknown_command(self):
+        status, output = self._run('FOO')
+
+        self.assertEqual(1, status)
+        self.assertIn('FOO', output['msg'])
+
+
+class TestLazyK8sCNIPlugin(test_base.TestCase):
+
+    def test_version_does_not_load_plugin(self):
+        plugin = main.LazyK8sCNIPlugin()
+        runner = api.CNIRunner(plugin)
+
+        runner.run({'CNI_COMMAND': 'VERSION', 'CNI_ARGS': 'foo=bar'},
+                   six.StringIO('{}'), six.StringIO())
+
+        self.assertIsNone(plugin._plugin)
+
+    @mock.patch('kuryr_kubernetes.cni.k8s_cni.K8sCNIPlugin')
+    def test_add(self, m_k8s_plugin):
+        plugin = main.LazyK8sCNIPlugin()
+        params = mock.sentinel.params
+
+        self.assertEqual(m_k8s_plugin.return_value.add.return_value,
+                         plugin.add(params))
+        plugin.delete(params)
+
+        m_k8s_plugin.assert_called_once_with()
+        m_k8s_plugin.return_value.add.assert_called_once_with(params)
+        m_k8s_plugin.return_value.delete.assert_called_once_with(params)
+
+    def test_entry_point_imports(self):
+        code = ("import sys; import kuryr_kubernetes.cmd.cni; "
+                "print(','.join(m for m in ('os_vif', 'oslo_log', "
+                "'oslo_reports', 'pyroute2') if m in sys.modules))")
+
+        out = subprocess.check_output([sys.executable, '-c', code])
+
+        self.assertEqual('', out.decode().strip())
@@ -0,0 +1,71 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from os_vif import objects as osv_objects
+from os_vif.objects import fixed_ip as osv_fixed_ip
+from os_vif.objects import network as osv_network
+from os_vif.objects import route as osv_route
+from os_vif.objects import subnet as osv_subnet
+from os_vif.objects import vif as osv_vif
+
+from kuryr_kubernetes.cni import result
+from kuryr_kubernetes.tests import base as test_base
+
+
+class TestEncodeVIF(test_base.TestCase):
+
+    def setUp(self):
+        super(TestEncodeVIF, self).setUp()
+        osv_objects.register_all()
+        subnet_v4 = osv_subnet.Subnet(
+            cidr='10.0.0.0/24',
+            gateway='10.0.0.1',
+            dns=['10.0.0.2'],
+            ips=osv_fixed_ip.FixedIPList(objects=[
+                osv_fixed_ip.FixedIP(address='10.0.0.5'),
+                osv_fixed_ip.FixedIP(address='10.0.0.6')]),
+            routes=osv_route.RouteList(objects=[
+                osv_route.Route(cidr='10.1.0.0/16', gateway='10.0.0.3')]))
+        subnet_v6 = osv_subnet.Subnet(
+            cidr='fd00::/64',
+            dns=[],
+            ips=osv_fixed_ip.FixedIPList(objects=[
+                osv_fixed_ip.FixedIP(address='fd00::5')]),
+            routes=osv_route.RouteList(objects=[]))
+        self.vif = osv_vif.VIFOpenVSwitch(
+            id='4a2f25d5-3f5c-4e8a-9b59-25aa4a3a1a4e',
+            address='fa:16:3e:00:00:01',
+            network=osv_network.Network(subnets=osv_subnet.SubnetList(
+                objects=[subnet_v4, subnet_v6])))
+
+    def test_encode_legacy(self):
+        self.assertEqual({
+            'ip4': {'ip': '10.0.0.5/24',
+                    'gateway': '10.0.0.1',
+                    'routes': [{'dst': '10.1.0.0/16', 'gw': '10.0.0.3'}]},
+            'ip6': {'ip': 'fd00::5/64'},
+            'dns': {'nameservers': ['10.0.0.2']},
+        }, result.encode_vif(self.vif, '0.3.0', 'eth0', '/ns'))
+
+    def test_encode(self):
+        self.assertEqual({
+            'interfaces': [{'name': 'eth0', 'mac': 'fa:16:3e:00:00:01',
+                            'sandbox': '/ns'}],
+            'ips': [{'version': '4', 'address': '10.0.0.5/24',
+                     'gateway': '10.0.0.1', 'interface': 0},
+                    {'version': '4', 'address': '10.0.0.6/24',
+                     'gateway': '10.0.0.1', 'interface': 0},
+                    {'version': '6', 'address': 'fd00::5/64',
+                     'interface': 0}],
+            'routes': [{'dst': '10.1.0.0/16', 'gw': '10.0.0.3'}],
+            'dns': {'nameservers': ['10.0.0.2']},
+        }, result.encode_vif(self.vif, '0.4.0', 'eth0', '/ns'))
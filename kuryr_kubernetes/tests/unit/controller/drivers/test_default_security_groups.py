@@ -19,6 +19,7 @@ from oslo_config import cfg
 
 from kuryr_kubernetes.controller.drivers import default_security_groups
 from kuryr_kubernetes.tests import base as test_base
+from kuryr_kubernetes.tests.unit import kuryr_fixtures as k_fix
 
 
 class TestDefaultPodSecurityGroupsDriver(test_base.TestCase):
@@ -44,6 +45,31 @@ class TestDefaultPodSecurityGroupsDriver(test_base.TestCase):
         self.assertRaises(cfg.RequiredOptError, driver.get_security_groups,
                           pod, project_id)
 
+    @mock.patch.object(default_security_groups, 'LOG')
+    @mock.patch('kuryr_kubernetes.config.CONF')
+    def test_warm_up(self, m_cfg, m_log):
+        neutron = self.useFixture(k_fix.MockNeutronClient()).client
+        m_cfg.neutron_defaults.pod_security_groups = ['sg1', 'sg2']
+        neutron.list_security_groups.return_value = {
+            'security_groups': [{'id': 'sg1'}]}
+        driver = default_security_groups.DefaultPodSecurityGroupsDriver()
+
+        driver.warm_up()
+
+        neutron.list_security_groups.assert_called_once_with(
+            id=['sg1', 'sg2'], fields='id')
+        m_log.warning.assert_called_once_with(mock.ANY, ['sg2'])
+
+    @mock.patch('kuryr_kubernetes.config.CONF')
+    def test_warm_up_not_set(self, m_cfg):
+        neutron = self.useFixture(k_fix.MockNeutronClient()).client
+        m_cfg.neutron_defaults.pod_security_groups = []
+        driver = default_security_groups.DefaultPodSecurityGroupsDriver()
+
+        driver.warm_up()
+
+        neutron.list_security_groups.assert_not_called()
+
 
 class TestDefaultServiceSecurityGroupsDriver(test_base.TestCase):
 
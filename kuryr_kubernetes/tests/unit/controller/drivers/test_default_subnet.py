@@ -41,6 +41,33 @@ class TestDefaultPodSubnetDriver(test_base.TestCase):
         self.assertEqual({subnet_id: subnet}, subnets)
         m_get_subnet.assert_called_once_with(subnet_id)
 
+    @mock.patch('kuryr_kubernetes.controller.drivers'
+                '.default_subnet._get_subnet')
+    @mock.patch('kuryr_kubernetes.config.CONF')
+    def test_get_subnets_cached(self, m_cfg, m_get_subnet):
+        subnet_id = mock.sentinel.subnet_id
+        m_cfg.neutron_defaults.pod_subnet = subnet_id
+        m_get_subnet.return_value = mock.sentinel.subnet
+        driver = default_subnet.DefaultPodSubnetDriver()
+
+        driver.warm_up()
+        subnets = driver.get_subnets(mock.sentinel.pod,
+                                     mock.sentinel.project_id)
+
+        self.assertEqual({subnet_id: mock.sentinel.subnet}, subnets)
+        m_get_subnet.assert_called_once_with(subnet_id)
+
+    @mock.patch('kuryr_kubernetes.controller.drivers'
+                '.default_subnet._get_subnet')
+    @mock.patch('kuryr_kubernetes.config.CONF')
+    def test_warm_up_not_set(self, m_cfg, m_get_subnet):
+        m_cfg.neutron_defaults.pod_subnet = None
+        driver = default_subnet.DefaultPodSubnetDriver()
+
+        driver.warm_up()
+
+        m_get_subnet.assert_not_called()
+
     @mock.patch('kuryr_kubernetes.controller.drivers'
                 '.default_subnet._get_subnet')
     def test_get_subnets_not_set(self, m_get_subnet):
@@ -72,6 +99,20 @@ class TestDefaultServiceSubnetDriver(test_base.TestCase):
         self.assertEqual({subnet_id: subnet}, subnets)
         m_get_subnet.assert_called_once_with(subnet_id)
 
+    @mock.patch('kuryr_kubernetes.controller.drivers'
+                '.default_subnet._get_subnet')
+    @mock.patch('kuryr_kubernetes.config.CONF')
+    def test_warm_up(self, m_cfg, m_get_subnet):
+        subnet_id = mock.sentinel.subnet_id
+        m_cfg.neutron_defaults.service_subnet = subnet_id
+        m_get_subnet.return_value = mock.sentinel.subnet
+        driver = default_subnet.DefaultServiceSubnetDriver()
+
+        driver.warm_up()
+        driver.get_subnets(mock.sentinel.service, mock.sentinel.project_id)
+
+        m_get_subnet.assert_called_once_with(subnet_id)
+
     @mock.patch('kuryr_kubernetes.controller.drivers'
                 '.default_subnet._get_subnet')
     def test_get_subnets_not_set(self, m_get_subnet):
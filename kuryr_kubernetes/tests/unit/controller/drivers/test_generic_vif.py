@@ -124,7 +124,7 @@ class GenericPodVIFDriver(test_base.TestCase):
         port.__getitem__.return_value = kl_const.PORT_STATUS_DOWN
         neutron.show_port.return_value = {'port': port}
 
-        self.assertRaises(k_exc.ResourceNotReady, cls.activate_vif,
+        self.assertRaises(k_exc.PortNotReady, cls.activate_vif,
                           m_driver, pod, vif)
 
     def _test_get_port_request(self, m_to_fips, security_groups):
@@ -238,6 +238,23 @@ class TestLBaaSv2Driver(test_base.TestCase):
                              getattr(ret, attr))
         self.assertEqual(loadbalancer_id, ret.id)
 
+    @mock.patch('kuryr_kubernetes.config.CONF')
+    def test_create_loadbalancer_description(self, m_cfg):
+        m_cfg.neutron_defaults.resource_description = 'kuryr-cluster'
+        neutron = self.useFixture(k_fix.MockNeutronClient()).client
+        cls = d_lbaasv2.LBaaSv2Driver
+        m_driver = mock.Mock(spec=d_lbaasv2.LBaaSv2Driver)
+        loadbalancer = obj_lbaas.LBaaSLoadBalancer(
+            name='TEST_NAME', project_id='TEST_PROJECT', ip='1.2.3.4',
+            subnet_id='D3FA400A-F543-4B91-9CD3-047AF0CE42D1')
+        neutron.create_loadbalancer.return_value = {
+            'loadbalancer': {'id': '00EE9E11-91C2-41CF-8FD4-7970579E5C4C'}}
+
+        cls._create_loadbalancer(m_driver, loadbalancer)
+
+        req = neutron.create_loadbalancer.call_args[0][0]
+        self.assertEqual('kuryr-cluster', req['loadbalancer']['description'])
+
     def test_find_loadbalancer(self):
         neutron = self.useFixture(k_fix.MockNeutronClient()).client
         cls = d_lbaasv2.LBaaSv2Driver
@@ -587,7 +604,7 @@ class TestLBaaSv2Driver(test_base.TestCase):
         m_driver._provisioning_timer.return_value = timer
         m_driver._ensure.return_value = None
 
-        self.assertRaises(k_exc.ResourceNotReady, cls._ensure_provisioned,
+        self.assertRaises(k_exc.LoadBalancerNotReady, cls._ensure_provisioned,
                           m_driver,
                           loadbalancer, obj, create, find)
 
@@ -651,7 +668,7 @@ class TestLBaaSv2Driver(test_base.TestCase):
         m_driver._provisioning_timer.return_value = timer
         m_delete.side_effect = n_exc.StateInvalidClient
 
-        self.assertRaises(k_exc.ResourceNotReady, cls._release, m_driver,
+        self.assertRaises(k_exc.LoadBalancerNotReady, cls._release, m_driver,
                           loadbalancer, obj, m_delete)
 
         call_count = len(timer)
@@ -685,8 +702,9 @@ class TestLBaaSv2Driver(test_base.TestCase):
         resp = {'loadbalancer': {'provisioning_status': 'NOT_ACTIVE'}}
         neutron.show_loadbalancer.return_value = resp
 
-        self.assertRaises(k_exc.ResourceNotReady, cls._wait_for_provisioning,
-                          m_driver, loadbalancer, timeout)
+        self.assertRaises(k_exc.LoadBalancerNotReady,
+                          cls._wait_for_provisioning, m_driver, loadbalancer,
+                          timeout)
 
         self.assertEqual(len(timer), neutron.show_loadbalancer.call_count)
 
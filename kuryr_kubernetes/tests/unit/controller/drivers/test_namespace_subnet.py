@@ -0,0 +1,260 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import fixtures
+import mock
+from neutronclient.common import exceptions as n_exc
+from oslo_config import cfg
+
+from kuryr_kubernetes.controller.drivers import namespace_subnet
+from kuryr_kubernetes import exceptions as k_exc
+from kuryr_kubernetes.tests import base as test_base
+from kuryr_kubernetes.tests.unit import kuryr_fixtures as k_fix
+
+_POOL_ID = 'pool'
+_ROUTER_ID = 'router'
+_NET_ID = '00000000-0000-0000-0000-000000000001'
+_NET2_ID = '00000000-0000-0000-0000-000000000002'
+_NET3_ID = '00000000-0000-0000-0000-000000000003'
+_NS_PATH = '/api/v1/namespaces/ns'
+_ANNOTATION = 'openstack.org/kuryr-namespace-subnet'
+
+
+def _n_subnet(subnet_id, namespace, network_id=_NET_ID,
+              created_at='2017-01-01T00:00:00'):
+    return {'id': subnet_id, 'name': 'ns/%s-subnet' % namespace,
+            'network_id': network_id, 'cidr': '10.0.0.0/24',
+            'dns_nameservers': [], 'host_routes': [],
+            'gateway_ip': '10.0.0.1', 'created_at': created_at}
+
+
+def _n_network(network_id=_NET_ID, namespace='ns'):
+    return {'id': network_id, 'name': 'ns/%s-net' % namespace, 'mtu': 1450}
+
+
+def _namespace(name='ns', subnet_id=None, version='1'):
+    annotations = {_ANNOTATION: subnet_id} if subnet_id else {}
+    return {'metadata': {'name': name, 'resourceVersion': version,
+                         'annotations': annotations}}
+
+
+def _pod(namespace='ns'):
+    return {'metadata': {'namespace': namespace, 'name': 'pod'}}
+
+
+class TestNamespacePodSubnetDriver(test_base.TestCase):
+    def setUp(self):
+        super(TestNamespacePodSubnetDriver, self).setUp()
+        m_cfg = self.useFixture(fixtures.MockPatch(
+            'kuryr_kubernetes.config.CONF')).mock
+        m_cfg.namespace_subnet.pod_subnet_pool = _POOL_ID
+        m_cfg.namespace_subnet.pod_router = _ROUTER_ID
+        self.m_cfg = m_cfg
+        self.k8s = self.useFixture(k_fix.MockK8sClient()).client
+        self.k8s.get.return_value = _namespace()
+        self.neutron = self.useFixture(k_fix.MockNeutronClient()).client
+        self.neutron.list_subnets.return_value = {'subnets': []}
+        self.neutron.show_network.return_value = {'network': _n_network()}
+        self.driver = namespace_subnet.NamespacePodSubnetDriver()
+
+    def test_warm_up(self):
+        self.k8s.get.return_value = {'items': [
+            _namespace('ns', 'old'), _namespace('other', 'other'),
+            _namespace('new'), _namespace('gone', 'gone')]}
+        self.neutron.list_subnets.return_value = {'subnets': [
+            _n_subnet('new', 'ns', _NET2_ID, '2017-01-02T00:00:00'),
+            _n_subnet('old', 'ns'),
+            _n_subnet('other', 'other', _NET3_ID)]}
+        self.neutron.list_networks.return_value = {'networks': [
+            _n_network(), _n_network(_NET3_ID, 'other')]}
+
+        self.driver.warm_up()
+        subnets = self.driver.get_subnets(_pod(), mock.sentinel.project_id)
+
+        self.k8s.get.assert_called_once_with('/api/v1/namespaces')
+        self.neutron.list_subnets.assert_called_once_with(
+            subnetpool_id=_POOL_ID)
+        self.assertEqual(['old'], list(subnets))
+        network = subnets['old']
+        self.assertEqual(_NET_ID, network.id)
+        self.assertEqual(1450, network.mtu)
+        self.assertEqual('10.0.0.0/24', str(network.subnets.objects[0].cidr))
+        self.assertEqual(['ns', 'other'], sorted(self.driver._subnets))
+        self.neutron.show_network.assert_not_called()
+        self.neutron.create_network.assert_not_called()
+
+    def test_warm_up_empty(self):
+        self.k8s.get.return_value = {'items': [_namespace()]}
+
+        self.driver.warm_up()
+
+        self.neutron.list_subnets.assert_not_called()
+
+    def test_warm_up_pool_not_set(self):
+        self.m_cfg.namespace_subnet.pod_subnet_pool = None
+
+        self.assertRaises(cfg.RequiredOptError, self.driver.warm_up)
+
+    def test_get_subnets_annotated(self):
+        self.k8s.get.return_value = _namespace(subnet_id='subnet')
+        self.neutron.show_subnet.return_value = {
+            'subnet': _n_subnet('subnet', 'ns')}
+
+        subnets = self.driver.get_subnets(_pod(), mock.sentinel.project_id)
+        self.driver.get_subnets(_pod(), mock.sentinel.project_id)
+
+        self.assertEqual(['subnet'], list(subnets))
+        self.k8s.get.assert_called_once_with(_NS_PATH)
+        self.neutron.show_subnet.assert_called_once_with('subnet')
+        self.neutron.show_network.assert_called_once_with(_NET_ID)
+        self.neutron.list_subnets.assert_not_called()
+        self.k8s.annotate.assert_not_called()
+        self.assertEqual({}, self.driver._locks)
+
+    def test_get_subnets_annotated_not_found(self):
+        n_subnet = _n_subnet('subnet', 'ns', _NET2_ID)
+        self.k8s.get.return_value = _namespace(subnet_id='deleted',
+                                               version='3')
+        self.neutron.show_subnet.side_effect = n_exc.NotFound
+        self.neutron.create_network.return_value = {
+            'network': _n_network(_NET2_ID)}
+        self.neutron.create_subnet.return_value = {'subnet': n_subnet}
+
+        subnets = self.driver.get_subnets(_pod(), mock.sentinel.project_id)
+
+        self.assertEqual(['subnet'], list(subnets))
+        self.neutron.show_subnet.assert_called_once_with('deleted')
+        self.k8s.annotate.assert_called_once_with(
+            _NS_PATH, {_ANNOTATION: 'subnet'}, resource_version='3')
+        self.neutron.add_interface_router.assert_called_once_with(
+            _ROUTER_ID, {'subnet_id': 'subnet'})
+
+    def test_get_subnets_annotated_not_found_conflict(self):
+        self.k8s.get.side_effect = [
+            _namespace(subnet_id='deleted'),
+            _namespace(subnet_id='deleted', version='2')]
+        self.k8s.annotate.side_effect = k_exc.K8sClientException
+        self.neutron.show_subnet.side_effect = n_exc.NotFound
+        self.neutron.create_network.return_value = {'network': _n_network()}
+        self.neutron.create_subnet.return_value = {
+            'subnet': _n_subnet('subnet', 'ns')}
+
+        self.assertRaises(k_exc.K8sClientException, self.driver.get_subnets,
+                          _pod(), mock.sentinel.project_id)
+
+        # NOTE: the Namespace still has the deleted subnet, the created one
+        # is kept to be found and claimed again when the Pod is retried
+        self.neutron.show_subnet.assert_called_once_with('deleted')
+        self.neutron.delete_network.assert_not_called()
+        self.assertEqual({}, self.driver._subnets)
+        self.assertIn('ns', self.driver._locks)
+
+    def test_get_subnets_create(self):
+        n_subnet = _n_subnet('subnet', 'ns')
+        self.neutron.create_network.return_value = {'network': _n_network()}
+        self.neutron.create_subnet.return_value = {'subnet': n_subnet}
+        project_id = mock.sentinel.project_id
+
+        subnets = self.driver.get_subnets(_pod(), project_id)
+
+        self.assertEqual(['subnet'], list(subnets))
+        self.neutron.list_subnets.assert_called_once_with(
+            name='ns/ns-subnet', subnetpool_id=_POOL_ID)
+        self.neutron.create_network.assert_called_once_with(
+            {'network': {'name': 'ns/ns-net', 'project_id': project_id}})
+        self.neutron.create_subnet.assert_called_once_with(
+            {'subnet': {'name': 'ns/ns-subnet', 'network_id': _NET_ID,
+                        'project_id': project_id, 'subnetpool_id': _POOL_ID,
+                        'ip_version': 4}})
+        self.k8s.annotate.assert_called_once_with(
+            _NS_PATH, {_ANNOTATION: 'subnet'}, resource_version='1')
+        self.neutron.add_interface_router.assert_called_once_with(
+            _ROUTER_ID, {'subnet_id': 'subnet'})
+
+    def test_get_subnets_found(self):
+        self.neutron.list_subnets.return_value = {'subnets': [
+            _n_subnet('new', 'ns', _NET2_ID, '2017-01-02T00:00:00'),
+            _n_subnet('old', 'ns')]}
+        self.neutron.add_interface_router.side_effect = n_exc.BadRequest
+
+        subnets = self.driver.get_subnets(_pod(), mock.sentinel.project_id)
+
+        self.assertEqual(['old'], list(subnets))
+        self.neutron.create_network.assert_not_called()
+        self.k8s.annotate.assert_called_once_with(
+            _NS_PATH, {_ANNOTATION: 'old'}, resource_version='1')
+
+    def test_get_subnets_created_concurrently(self):
+        n_subnet = _n_subnet('subnet', 'ns')
+        winner = _n_subnet('winner', 'ns', _NET2_ID)
+        self.k8s.get.side_effect = [
+            _namespace(), _namespace(subnet_id='winner', version='2')]
+        self.k8s.annotate.side_effect = k_exc.K8sClientException
+        self.neutron.create_network.return_value = {'network': _n_network()}
+        self.neutron.create_subnet.return_value = {'subnet': n_subnet}
+        self.neutron.show_subnet.return_value = {'subnet': winner}
+        self.neutron.show_network.return_value = {
+            'network': _n_network(_NET2_ID)}
+
+        subnets = self.driver.get_subnets(_pod(), mock.sentinel.project_id)
+
+        self.assertEqual(['winner'], list(subnets))
+        self.neutron.delete_network.assert_called_once_with(_NET_ID)
+        self.neutron.add_interface_router.assert_not_called()
+        self.neutron.show_subnet.assert_called_once_with('winner')
+        self.neutron.show_network.assert_called_once_with(_NET2_ID)
+
+    def test_get_subnets_annotate_failed(self):
+        n_subnet = _n_subnet('subnet', 'ns')
+        self.k8s.annotate.side_effect = k_exc.K8sClientException
+        self.neutron.create_network.return_value = {'network': _n_network()}
+        self.neutron.create_subnet.return_value = {'subnet': n_subnet}
+
+        self.assertRaises(k_exc.K8sClientException, self.driver.get_subnets,
+                          _pod(), mock.sentinel.project_id)
+
+        self.neutron.delete_network.assert_not_called()
+        self.assertEqual({}, self.driver._subnets)
+
+    def test_get_subnets_create_failed(self):
+        self.neutron.create_network.return_value = {'network': _n_network()}
+        self.neutron.create_subnet.side_effect = n_exc.Conflict
+
+        self.assertRaises(n_exc.Conflict, self.driver.get_subnets, _pod(),
+                          mock.sentinel.project_id)
+
+        self.neutron.delete_network.assert_called_once_with(_NET_ID)
+        self.k8s.annotate.assert_not_called()
+        self.assertEqual({}, self.driver._subnets)
+
+    def test_get_subnets_failed_lock(self):
+        self.k8s.get.side_effect = [k_exc.K8sClientException, _namespace(
+            subnet_id='subnet')]
+        self.neutron.show_subnet.return_value = {
+            'subnet': _n_subnet('subnet', 'ns')}
+
+        self.assertRaises(k_exc.K8sClientException, self.driver.get_subnets,
+                          _pod(), mock.sentinel.project_id)
+        # NOTE: the Pods waiting for the failed attempt and the new ones
+        # share the same lock
+        lock = self.driver._locks['ns']
+        self.assertIs(lock, self.driver._get_lock('ns'))
+        self.driver.get_subnets(_pod(), mock.sentinel.project_id)
+
+        self.assertEqual({}, self.driver._locks)
+        self.assertIn('ns', self.driver._subnets)
+
+    def test_get_lock(self):
+        lock = self.driver._get_lock('ns')
+
+        self.assertIs(lock, self.driver._get_lock('ns'))
+        self.assertIsNot(lock, self.driver._get_lock('other'))
@@ -13,6 +13,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import functools
 import itertools
 import mock
 import os_vif.objects.network as osv_network
@@ -325,6 +326,53 @@ class TestLBaaSSpecHandler(test_base.TestCase):
         self.skipTest("skipping until generalised annotation handling is "
                       "implemented")
 
+    @mock.patch('kuryr_kubernetes.config.CONF')
+    @mock.patch('kuryr_kubernetes.clients.get_kubernetes_client')
+    def test_set_lbaas_spec_crd(self, m_get_k8s, m_cfg):
+        m_cfg.kubernetes.lbaas_state_storage = 'crd'
+        m_cfg.kubernetes.annotation_format = 'legacy'
+        k8s = m_get_k8s.return_value
+        service = {'metadata': {'name': 'svc', 'namespace': 'ns',
+                                'selfLink': '/api/v1/namespaces/ns/'
+                                            'services/svc',
+                                'resourceVersion': '1'}}
+        lbaas_spec = obj_lbaas.LBaaSServiceSpec(ip='1.2.3.4')
+        m_handler = mock.Mock(spec=h_lbaas.LBaaSSpecHandler)
+        m_handler._set_crd_lbaas_spec.side_effect = functools.partial(
+            h_lbaas.LBaaSSpecHandler._set_crd_lbaas_spec, m_handler)
+
+        h_lbaas.LBaaSSpecHandler._set_lbaas_spec(m_handler, service,
+                                                 lbaas_spec)
+
+        k8s.patch_crd.assert_called_once_with(
+            'spec', '/apis/openstack.org/v1/namespaces/ns/'
+                    'kuryrloadbalancers/svc', lbaas_spec.obj_to_primitive())
+        k8s.post.assert_not_called()
+        k8s.annotate.assert_called_once_with(
+            service['metadata']['selfLink'],
+            {k_const.K8S_ANNOTATION_LBAAS_SPEC: mock.ANY},
+            resource_version='1')
+
+    @mock.patch('kuryr_kubernetes.config.CONF')
+    @mock.patch('kuryr_kubernetes.clients.get_kubernetes_client')
+    def test_set_crd_lbaas_spec_create(self, m_get_k8s, m_cfg):
+        m_cfg.kubernetes.annotation_format = 'legacy'
+        k8s = m_get_k8s.return_value
+        k8s.patch_crd.side_effect = k_exc.K8sResourceNotFound('crd')
+        service = {'metadata': {'name': 'svc', 'namespace': 'ns'}}
+        lbaas_spec = obj_lbaas.LBaaSServiceSpec(ip='1.2.3.4')
+        m_handler = mock.Mock(spec=h_lbaas.LBaaSSpecHandler)
+
+        h_lbaas.LBaaSSpecHandler._set_crd_lbaas_spec(m_handler, service,
+                                                     lbaas_spec)
+
+        k8s.post.assert_called_once_with(
+            '/apis/openstack.org/v1/namespaces/ns/kuryrloadbalancers', {
+                'apiVersion': 'openstack.org/v1',
+                'kind': 'KuryrLoadBalancer',
+                'metadata': {'name': 'svc', 'namespace': 'ns'},
+                'spec': lbaas_spec.obj_to_primitive()})
+
 
 class FakeLBaaSDriver(drv_base.LBaaSDriver):
     def ensure_loadbalancer(self, endpoints, project_id, subnet_id, ip,
@@ -408,14 +456,76 @@ class TestLoadBalancerHandler(test_base.TestCase):
 
         h_lbaas.LoadBalancerHandler.on_present(m_handler, endpoints)
 
-        m_handler._get_lbaas_spec.assert_called_once_with(endpoints)
+        m_handler._get_lbaas_spec.assert_called_once_with(endpoints, None)
         m_handler._should_ignore.assert_called_once_with(endpoints, lbaas_spec)
-        m_handler._get_lbaas_state.assert_called_once_with(endpoints)
+        m_handler._get_lbaas_state.assert_called_once_with(endpoints, None)
         m_handler._sync_lbaas_members.assert_called_once_with(
             endpoints, lbaas_state, lbaas_spec)
         m_handler._set_lbaas_state.assert_called_once_with(
             endpoints, lbaas_state)
 
+    @mock.patch('kuryr_kubernetes.config.CONF')
+    @mock.patch('kuryr_kubernetes.clients.get_kubernetes_client')
+    def test_on_present_crd(self, m_get_k8s, m_cfg):
+        m_cfg.kubernetes.lbaas_state_storage = 'crd'
+        lbaas_spec = obj_lbaas.LBaaSServiceSpec(ip='1.2.3.4')
+        lbaas_state = obj_lbaas.LBaaSState()
+        crd = {'spec': lbaas_spec.obj_to_primitive(),
+               'status': lbaas_state.obj_to_primitive()}
+        k8s = m_get_k8s.return_value
+        k8s.get.return_value = crd
+        endpoints = {'metadata': {'name': 'svc', 'namespace': 'ns'}}
+        m_handler = mock.Mock(spec=h_lbaas.LoadBalancerHandler)
+        m_handler._get_lbaas_spec.side_effect = functools.partial(
+            h_lbaas.LoadBalancerHandler._get_lbaas_spec, m_handler)
+        m_handler._get_lbaas_state.side_effect = functools.partial(
+            h_lbaas.LoadBalancerHandler._get_lbaas_state, m_handler)
+        m_handler._should_ignore.return_value = False
+        m_handler._sync_lbaas_members.return_value = False
+
+        h_lbaas.LoadBalancerHandler.on_present(m_handler, endpoints)
+
+        k8s.get.assert_called_once_with(
+            '/apis/openstack.org/v1/namespaces/ns/kuryrloadbalancers/svc')
+        m_handler._should_ignore.assert_called_once_with(endpoints,
+                                                         lbaas_spec)
+        m_handler._sync_lbaas_members.assert_called_once_with(
+            endpoints, lbaas_state, lbaas_spec)
+
+    @mock.patch('kuryr_kubernetes.config.CONF')
+    def test_prefilter(self, m_cfg):
+        m_cfg.kubernetes.lbaas_state_storage = 'annotation'
+        m_handler = mock.Mock(spec=h_lbaas.LoadBalancerHandler)
+        m_handler._has_pods.return_value = True
+        endpoints = {'metadata': {'annotations': {
+            k_const.K8S_ANNOTATION_LBAAS_SPEC: 'spec'}}}
+
+        self.assertTrue(h_lbaas.LoadBalancerHandler.prefilter(
+            m_handler, {'type': 'MODIFIED', 'object': endpoints}))
+        m_handler._has_pods.assert_called_once_with(endpoints)
+
+    @mock.patch('kuryr_kubernetes.config.CONF')
+    def test_prefilter_no_spec(self, m_cfg):
+        m_cfg.kubernetes.lbaas_state_storage = 'annotation'
+        m_handler = mock.Mock(spec=h_lbaas.LoadBalancerHandler)
+        m_handler._has_pods.return_value = True
+        endpoints = {'metadata': {}}
+
+        self.assertFalse(h_lbaas.LoadBalancerHandler.prefilter(
+            m_handler, {'type': 'ADDED', 'object': endpoints}))
+        self.assertTrue(h_lbaas.LoadBalancerHandler.prefilter(
+            m_handler, {'type': 'DELETED', 'object': endpoints}))
+
+    @mock.patch('kuryr_kubernetes.config.CONF')
+    def test_prefilter_crd_no_pods(self, m_cfg):
+        m_cfg.kubernetes.lbaas_state_storage = 'crd'
+        m_handler = mock.Mock(spec=h_lbaas.LoadBalancerHandler)
+        m_handler._has_pods.return_value = False
+        endpoints = {'metadata': {}}
+
+        self.assertFalse(h_lbaas.LoadBalancerHandler.prefilter(
+            m_handler, {'type': 'MODIFIED', 'object': endpoints}))
+
     @mock.patch('kuryr_kubernetes.objects.lbaas'
                 '.LBaaSServiceSpec')
     def test_on_deleted(self, m_svc_spec_ctor):
@@ -624,3 +734,175 @@ class TestLoadBalancerHandler(test_base.TestCase):
     def test_set_lbaas_state(self):
         self.skipTest("skipping until generalised annotation handling is "
                       "implemented")
+
+    @mock.patch('kuryr_kubernetes.config.CONF')
+    @mock.patch('kuryr_kubernetes.clients.get_kubernetes_client')
+    def test_get_lbaas_state_crd(self, m_get_k8s, m_cfg):
+        m_cfg.kubernetes.lbaas_state_storage = 'crd'
+        lbaas_state = obj_lbaas.LBaaSState(members=[
+            obj_lbaas.LBaaSMember(port=80)])
+        lbaas_state.obj_reset_changes(recursive=True)
+        m_get_k8s.return_value.get.return_value = {
+            'status': lbaas_state.obj_to_primitive()}
+        endpoints = {'metadata': {'name': 'svc', 'namespace': 'ns'}}
+        m_handler = mock.Mock(spec=h_lbaas.LoadBalancerHandler)
+
+        ret = h_lbaas.LoadBalancerHandler._get_lbaas_state(m_handler,
+                                                           endpoints)
+
+        self.assertEqual(lbaas_state, ret)
+        m_get_k8s.return_value.get.assert_called_once_with(
+            '/apis/openstack.org/v1/namespaces/ns/kuryrloadbalancers/svc')
+
+    @mock.patch('kuryr_kubernetes.config.CONF')
+    @mock.patch('kuryr_kubernetes.clients.get_kubernetes_client')
+    def test_get_lbaas_spec_crd_not_found(self, m_get_k8s, m_cfg):
+        m_cfg.kubernetes.lbaas_state_storage = 'crd'
+        m_get_k8s.return_value.get.side_effect = k_exc.K8sResourceNotFound(
+            'crd')
+        endpoints = {'metadata': {'name': 'svc', 'namespace': 'ns'}}
+        m_handler = mock.Mock(spec=h_lbaas.LoadBalancerHandler)
+
+        self.assertIsNone(h_lbaas.LoadBalancerHandler._get_lbaas_spec(
+            m_handler, endpoints))
+
+    @mock.patch('kuryr_kubernetes.config.CONF')
+    @mock.patch('kuryr_kubernetes.clients.get_kubernetes_client')
+    def test_set_lbaas_state_crd(self, m_get_k8s, m_cfg):
+        m_cfg.kubernetes.lbaas_state_storage = 'crd'
+        m_cfg.kubernetes.annotation_format = 'legacy'
+        lbaas_state = obj_lbaas.LBaaSState()
+        endpoints = {'metadata': {'name': 'svc', 'namespace': 'ns'}}
+        m_handler = mock.Mock(spec=h_lbaas.LoadBalancerHandler)
+
+        h_lbaas.LoadBalancerHandler._set_lbaas_state(m_handler, endpoints,
+                                                     lbaas_state)
+
+        k8s = m_get_k8s.return_value
+        k8s.patch_crd.assert_called_once_with(
+            'status', '/apis/openstack.org/v1/namespaces/ns/'
+                      'kuryrloadbalancers/svc',
+            lbaas_state.obj_to_primitive())
+        k8s.annotate.assert_not_called()
+
+    @mock.patch('kuryr_kubernetes.config.CONF')
+    @mock.patch('kuryr_kubernetes.clients.get_kubernetes_client')
+    def test_on_deleted_crd(self, m_get_k8s, m_cfg):
+        m_cfg.kubernetes.lbaas_state_storage = 'crd'
+        endpoints = {'metadata': {'name': 'svc', 'namespace': 'ns'}}
+        m_handler = mock.Mock(spec=h_lbaas.LoadBalancerHandler)
+        m_handler._get_lbaas_state.return_value = None
+
+        h_lbaas.LoadBalancerHandler.on_deleted(m_handler, endpoints)
+
+        m_handler._sync_lbaas_members.assert_not_called()
+        m_get_k8s.return_value.delete.assert_called_once_with(
+            '/apis/openstack.org/v1/namespaces/ns/kuryrloadbalancers/svc')
+
+
+class TestKuryrLoadBalancerHandler(test_base.TestCase):
+
+    @mock.patch('kuryr_kubernetes.clients.get_kubernetes_client')
+    @mock.patch.object(h_lbaas.LoadBalancerHandler, 'on_present')
+    def test_on_present(self, m_on_present, m_get_k8s):
+        crd = {'metadata': {'name': 'svc', 'namespace': 'ns'},
+               'spec': {'ip': '1.2.3.4'}}
+        m_handler = mock.Mock(spec=h_lbaas.KuryrLoadBalancerHandler)
+        m_handler._specs = {}
+
+        h_lbaas.KuryrLoadBalancerHandler.on_present(m_handler, crd)
+
+        m_get_k8s.return_value.get.assert_called_once_with(
+            '/api/v1/namespaces/ns/endpoints/svc')
+        m_on_present.assert_called_once_with(
+            m_get_k8s.return_value.get.return_value)
+        self.assertEqual({('ns', 'svc'): {'ip': '1.2.3.4'}},
+                         m_handler._specs)
+
+    @mock.patch('kuryr_kubernetes.config.CONF')
+    @mock.patch('kuryr_kubernetes.clients.get_kubernetes_client')
+    def test_on_present_stale_status(self, m_get_k8s, m_cfg):
+        m_cfg.kubernetes.lbaas_state_storage = 'crd'
+        lbaas_spec = obj_lbaas.LBaaSServiceSpec(ip='1.2.3.4')
+        stale_state = obj_lbaas.LBaaSState()
+        lbaas_state = obj_lbaas.LBaaSState(
+            loadbalancer=obj_lbaas.LBaaSLoadBalancer(
+                id='00EE9E11-91C2-41CF-8FD4-7970579E5C4C'))
+        metadata = {'name': 'svc', 'namespace': 'ns'}
+        crd = {'metadata': metadata,
+               'spec': lbaas_spec.obj_to_primitive(),
+               'status': stale_state.obj_to_primitive()}
+        endpoints = {'metadata': metadata}
+        k8s = m_get_k8s.return_value
+        k8s.get.side_effect = {
+            '/api/v1/namespaces/ns/endpoints/svc': endpoints,
+            '/apis/openstack.org/v1/namespaces/ns/kuryrloadbalancers/svc': {
+                'metadata': metadata,
+                'spec': lbaas_spec.obj_to_primitive(),
+                'status': lbaas_state.obj_to_primitive()},
+        }.get
+        m_handler = mock.Mock(spec=h_lbaas.KuryrLoadBalancerHandler)
+        m_handler._specs = {}
+        m_handler._get_lbaas_spec.side_effect = functools.partial(
+            h_lbaas.LoadBalancerHandler._get_lbaas_spec, m_handler)
+        m_handler._get_lbaas_state.side_effect = functools.partial(
+            h_lbaas.LoadBalancerHandler._get_lbaas_state, m_handler)
+        m_handler._should_ignore.return_value = False
+        m_handler._sync_lbaas_members.return_value = True
+
+        h_lbaas.KuryrLoadBalancerHandler.on_present(m_handler, crd)
+
+        m_handler._sync_lbaas_members.assert_called_once_with(
+            endpoints, lbaas_state, lbaas_spec)
+        m_handler._set_lbaas_state.assert_called_once_with(
+            endpoints, lbaas_state)
+        self.assertEqual({('ns', 'svc'): crd['spec']}, m_handler._specs)
+
+    @mock.patch('kuryr_kubernetes.clients.get_kubernetes_client')
+    @mock.patch.object(h_lbaas.LoadBalancerHandler, 'on_present')
+    def test_on_present_status_only(self, m_on_present, m_get_k8s):
+        crd = {'metadata': {'name': 'svc', 'namespace': 'ns'},
+               'spec': {'ip': '1.2.3.4'}, 'status': {'members': []}}
+        m_handler = mock.Mock(spec=h_lbaas.KuryrLoadBalancerHandler)
+        m_handler._specs = {('ns', 'svc'): {'ip': '1.2.3.4'}}
+
+        h_lbaas.KuryrLoadBalancerHandler.on_present(m_handler, crd)
+
+        m_get_k8s.return_value.get.assert_not_called()
+        m_on_present.assert_not_called()
+
+    @mock.patch('kuryr_kubernetes.clients.get_kubernetes_client')
+    @mock.patch.object(h_lbaas.LoadBalancerHandler, 'on_present')
+    def test_on_present_failed(self, m_on_present, m_get_k8s):
+        crd = {'metadata': {'name': 'svc', 'namespace': 'ns'},
+               'spec': {'ip': '1.2.3.4'}}
+        m_on_present.side_effect = k_exc.ResourceNotReady(crd)
+        m_handler = mock.Mock(spec=h_lbaas.KuryrLoadBalancerHandler)
+        m_handler._specs = {}
+
+        self.assertRaises(k_exc.ResourceNotReady,
+                          h_lbaas.KuryrLoadBalancerHandler.on_present,
+                          m_handler, crd)
+        self.assertEqual({}, m_handler._specs)
+
+    def test_on_deleted(self):
+        crd = {'metadata': {'name': 'svc', 'namespace': 'ns'}}
+        m_handler = mock.Mock(spec=h_lbaas.KuryrLoadBalancerHandler)
+        m_handler._specs = {('ns', 'svc'): {}}
+
+        h_lbaas.KuryrLoadBalancerHandler.on_deleted(m_handler, crd)
+
+        self.assertEqual({}, m_handler._specs)
+
+    @mock.patch('kuryr_kubernetes.clients.get_kubernetes_client')
+    @mock.patch.object(h_lbaas.LoadBalancerHandler, 'on_present')
+    def test_on_present_no_endpoints(self, m_on_present, m_get_k8s):
+        crd = {'metadata': {'name': 'svc', 'namespace': 'ns'}}
+        m_get_k8s.return_value.get.side_effect = k_exc.K8sResourceNotFound(
+            'ep')
+        m_handler = mock.Mock(spec=h_lbaas.KuryrLoadBalancerHandler)
+        m_handler._specs = {}
+
+        h_lbaas.KuryrLoadBalancerHandler.on_present(m_handler, crd)
+
+        m_on_present.assert_not_called()
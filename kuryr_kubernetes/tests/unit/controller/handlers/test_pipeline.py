@@ -16,6 +16,7 @@
 import mock
 
 from kuryr_kubernetes.controller.handlers import pipeline as h_pipeline
+from kuryr_kubernetes import exceptions
 from kuryr_kubernetes.handlers import dispatch as h_dis
 from kuryr_kubernetes.handlers import k8s_base as h_k8s
 from kuryr_kubernetes.tests import base as test_base
@@ -34,19 +35,29 @@ class TestControllerPipeline(test_base.TestCase):
 
         with mock.patch.object(h_dis.EventPipeline, '__init__'):
             pipeline = h_pipeline.ControllerPipeline(thread_group)
+            pipeline._async = mock.Mock()
             ret = pipeline._wrap_consumer(consumer)
 
         self.assertEqual(logging_handler, ret)
         m_logging_type.assert_called_with(retry_handler)
-        m_retry_type.assert_called_with(consumer, exceptions=mock.ANY)
+        m_retry_type.assert_called_with(
+            mock.ANY, exceptions=mock.ANY,
+            requeue=pipeline._async.requeue, policies=mock.ANY)
 
     @mock.patch('kuryr_kubernetes.handlers.logging.LogExceptions')
+    @mock.patch('kuryr_kubernetes.handlers.echo.EchoFilter')
+    @mock.patch('kuryr_kubernetes.handlers.dispatch.Prefilter')
     @mock.patch('kuryr_kubernetes.handlers.asynchronous.Async')
-    def test_wrap_dispatcher(self, m_async_type, m_logging_type):
+    def test_wrap_dispatcher(self, m_async_type, m_prefilter_type,
+                             m_echo_type, m_logging_type):
         dispatcher = mock.sentinel.dispatcher
         async_handler = mock.sentinel.async_handler
+        prefilter_handler = mock.Mock()
+        echo_handler = mock.Mock()
         logging_handler = mock.sentinel.logging_handler
         m_async_type.return_value = async_handler
+        m_prefilter_type.return_value = prefilter_handler
+        m_echo_type.return_value = echo_handler
         m_logging_type.return_value = logging_handler
         thread_group = mock.sentinel.thread_group
 
@@ -55,6 +66,76 @@ class TestControllerPipeline(test_base.TestCase):
             ret = pipeline._wrap_dispatcher(dispatcher)
 
         self.assertEqual(logging_handler, ret)
-        m_logging_type.assert_called_with(async_handler)
+        m_logging_type.assert_called_with(echo_handler)
+        m_echo_type.assert_called_with(prefilter_handler)
+        m_prefilter_type.assert_called_with(async_handler)
         m_async_type.assert_called_with(dispatcher, thread_group,
-                                        h_k8s.object_link)
+                                        h_pipeline._group_by)
+        self.assertEqual(echo_handler.stats.return_value,
+                         pipeline.get_echo_stats())
+        self.assertEqual(prefilter_handler.stats.return_value,
+                         pipeline.get_prefilter_stats())
+        self.assertEqual(async_handler, pipeline._async)
+
+    @mock.patch('kuryr_kubernetes.handlers.logging.LogExceptions')
+    @mock.patch('kuryr_kubernetes.handlers.shard.ShardFilter')
+    @mock.patch('kuryr_kubernetes.handlers.echo.EchoFilter')
+    @mock.patch('kuryr_kubernetes.handlers.dispatch.Prefilter')
+    @mock.patch('kuryr_kubernetes.handlers.asynchronous.Async')
+    def test_wrap_dispatcher_sharded(self, m_async_type, m_prefilter_type,
+                                     m_echo_type, m_shard_type,
+                                     m_logging_type):
+        shard_handler = mock.Mock()
+        m_shard_type.return_value = shard_handler
+        owns = mock.sentinel.owns
+
+        with mock.patch.object(h_dis.EventPipeline, '__init__'):
+            pipeline = h_pipeline.ControllerPipeline(mock.sentinel.tg, owns)
+            self.assertEqual({'dropped': 0, 'passed': 0},
+                             pipeline.get_shard_stats())
+            ret = pipeline._wrap_dispatcher(mock.sentinel.dispatcher)
+
+        self.assertEqual(m_logging_type.return_value, ret)
+        m_logging_type.assert_called_with(shard_handler)
+        m_shard_type.assert_called_with(m_echo_type.return_value, owns)
+        self.assertEqual(shard_handler.stats.return_value,
+                         pipeline.get_shard_stats())
+
+    @mock.patch.object(h_dis.EventPipeline, 'register')
+    def test_register(self, m_register):
+        consumer = mock.Mock()
+        consumer.consumes = {mock.sentinel.key_fn: mock.sentinel.key}
+
+        with mock.patch.object(h_dis.EventPipeline, '__init__'):
+            pipeline = h_pipeline.ControllerPipeline(mock.sentinel.tg)
+        pipeline._prefilter = mock.Mock()
+        pipeline.register(consumer)
+
+        m_register.assert_called_once_with(consumer)
+        pipeline._prefilter.register.assert_called_once_with(
+            mock.sentinel.key_fn, mock.sentinel.key, consumer)
+
+    def test_get_retry_policies(self):
+        policies = h_pipeline._get_retry_policies()
+
+        self.assertLess(policies[exceptions.PortNotReady].interval,
+                        policies[exceptions.LoadBalancerNotReady].interval)
+        self.assertIsNot(policies[exceptions.PortNotReady],
+                         h_pipeline._get_retry_policies()[
+                             exceptions.PortNotReady])
+
+    def test_group_by(self):
+        event = {'object': {'kind': 'Endpoints', 'metadata': {
+            'selfLink': '/api/v1/namespaces/ns/endpoints/svc'}}}
+
+        self.assertEqual(h_k8s.object_link(event),
+                         h_pipeline._group_by(event))
+
+    def test_group_by_kuryrloadbalancer(self):
+        event = {'object': {'kind': 'KuryrLoadBalancer', 'metadata': {
+            'namespace': 'ns', 'name': 'svc',
+            'selfLink': '/apis/openstack.org/v1/namespaces/ns/'
+                        'kuryrloadbalancers/svc'}}}
+
+        self.assertEqual('/api/v1/namespaces/ns/endpoints/svc',
+                         h_pipeline._group_by(event))
@@ -175,6 +175,26 @@ class TestVIFHandler(test_base.TestCase):
         self._release_vif.assert_called_once_with(self._pod, self._vif)
         self._activate_vif.assert_not_called()
 
+    def test_prefilter(self):
+        for event_type in ('ADDED', 'MODIFIED', 'DELETED'):
+            self.assertTrue(h_vif.VIFHandler.prefilter(
+                self._handler, {'type': event_type, 'object': self._pod}))
+
+    def test_prefilter_host_network(self):
+        self._is_host_network.return_value = True
+
+        for event_type in ('ADDED', 'MODIFIED', 'DELETED'):
+            self.assertFalse(h_vif.VIFHandler.prefilter(
+                self._handler, {'type': event_type, 'object': self._pod}))
+
+    def test_prefilter_not_pending(self):
+        self._is_pending.return_value = False
+
+        self.assertFalse(h_vif.VIFHandler.prefilter(
+            self._handler, {'type': 'MODIFIED', 'object': self._pod}))
+        self.assertTrue(h_vif.VIFHandler.prefilter(
+            self._handler, {'type': 'DELETED', 'object': self._pod}))
+
     def test_on_deleted(self):
         h_vif.VIFHandler.on_deleted(self._handler, self._pod)
 
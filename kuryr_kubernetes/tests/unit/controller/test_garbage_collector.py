@@ -0,0 +1,208 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import fixtures
+import mock
+from neutronclient.common import exceptions as n_exc
+
+from kuryr_kubernetes.controller import garbage_collector
+from kuryr_kubernetes import exceptions as k_exc
+from kuryr_kubernetes.objects import lbaas as obj_lbaas
+from kuryr_kubernetes.tests import base as test_base
+
+_LB_ID = '00000000-0000-0000-0000-0000000000aa'
+_OTHER_LB_ID = '00000000-0000-0000-0000-0000000000bb'
+_POOL_ID = '00000000-0000-0000-0000-0000000000cc'
+_LISTENER_ID = '00000000-0000-0000-0000-0000000000dd'
+_DESCRIPTION = 'kuryr-cluster'
+
+
+def _port(port_id, **kwargs):
+    port = {'id': port_id, 'device_owner': 'compute:kuryr',
+            'description': _DESCRIPTION}
+    port.update(kwargs)
+    return port
+
+
+def _lb(lb_id, name='ns/svc', **kwargs):
+    lb = {'id': lb_id, 'name': name, 'description': _DESCRIPTION}
+    lb.update(kwargs)
+    return lb
+
+
+class TestGarbageCollector(test_base.TestCase):
+    def setUp(self):
+        super(TestGarbageCollector, self).setUp()
+        m_cfg = self.useFixture(fixtures.MockPatch(
+            'kuryr_kubernetes.config.CONF')).mock
+        m_cfg.garbage_collector.dry_run = False
+        m_cfg.garbage_collector.batch_size = 10
+        m_cfg.garbage_collector.rate = 5.0
+        m_cfg.neutron_defaults.resource_description = _DESCRIPTION
+        self.m_cfg = m_cfg
+
+        self.neutron = self.useFixture(fixtures.MockPatch(
+            'kuryr_kubernetes.clients.get_neutron_client')).mock()
+        self.neutron.list_trunks.return_value = {'trunks': []}
+        self.neutron.list_lbaas_pools.return_value = {'pools': []}
+        self.neutron.list_listeners.return_value = {'listeners': []}
+        self.drv_lbaas = mock.Mock()
+        self.useFixture(fixtures.MockPatch(
+            'kuryr_kubernetes.controller.drivers.base.LBaaSDriver.'
+            'get_instance', return_value=self.drv_lbaas))
+        self.m_sleep = self.useFixture(fixtures.MockPatch('time.sleep')).mock
+        self.k8s = self.useFixture(fixtures.MockPatch(
+            'kuryr_kubernetes.clients.get_kubernetes_client')).mock()
+        self.k8s.get.side_effect = k_exc.K8sResourceNotFound('gone')
+
+    def test_collect_ports(self):
+        collector = garbage_collector.GarbageCollector()
+        self.neutron.list_trunks.return_value = {'trunks': [
+            {'id': 'trunk1', 'sub_ports': [
+                {'port_id': 'a', 'segmentation_id': 1},
+                {'port_id': 'used', 'segmentation_id': 2},
+                {'port_id': 'b', 'segmentation_id': 3}]},
+            {'id': 'trunk2', 'sub_ports': [
+                {'port_id': 'other', 'segmentation_id': 1}]}]}
+        ports = {port_id: _port(port_id) for port_id in ('a', 'b', 'c')}
+
+        report = collector.collect(ports, {})
+
+        self.assertEqual({'ports': ['a', 'b', 'c'], 'loadbalancers': []},
+                         report)
+        self.neutron.trunk_remove_subports.assert_called_once_with(
+            'trunk1', {'sub_ports': [{'port_id': 'a'}, {'port_id': 'b'}]})
+        self.neutron.delete_port.assert_has_calls(
+            [mock.call('a'), mock.call('b'), mock.call('c')])
+        self.m_sleep.assert_called_with(0.2)
+        self.assertEqual(4, self.m_sleep.call_count)
+        self.assertEqual({'sweeps': 1, 'ports': 3, 'loadbalancers': 0,
+                          'failures': 0}, collector.stats())
+
+    def test_collect_ports_failures(self):
+        collector = garbage_collector.GarbageCollector()
+        self.neutron.list_trunks.return_value = {'trunks': [
+            {'id': 'trunk', 'sub_ports': [{'port_id': 'a'}]}]}
+        self.neutron.trunk_remove_subports.side_effect = n_exc.Conflict
+        self.neutron.delete_port.side_effect = [
+            n_exc.PortNotFoundClient, n_exc.NeutronClientException]
+        ports = {port_id: _port(port_id) for port_id in ('a', 'b', 'c')}
+
+        report = collector.collect(ports, {})
+
+        self.assertEqual(['b'], report['ports'])
+        self.neutron.delete_port.assert_has_calls(
+            [mock.call('b'), mock.call('c')])
+        self.assertEqual(2, collector.stats()['failures'])
+
+    def test_collect_no_trunks(self):
+        collector = garbage_collector.GarbageCollector()
+        self.neutron.list_trunks.side_effect = n_exc.NotFound
+
+        report = collector.collect({'a': _port('a')}, {})
+
+        self.assertEqual(['a'], report['ports'])
+        self.neutron.trunk_remove_subports.assert_not_called()
+
+    def test_collect_loadbalancers(self):
+        collector = garbage_collector.GarbageCollector()
+        self.neutron.list_lbaas_pools.return_value = {'pools': [
+            {'id': _POOL_ID, 'loadbalancers': [{'id': _LB_ID}]},
+            {'id': 'other', 'loadbalancers': [{'id': 'used'}]}]}
+        self.neutron.list_listeners.return_value = {'listeners': [
+            {'id': _LISTENER_ID, 'loadbalancer_id': _LB_ID}]}
+        lbs = {_LB_ID: _lb(_LB_ID),
+               _OTHER_LB_ID: _lb(_OTHER_LB_ID, 'ns/other')}
+        self.drv_lbaas.release_loadbalancer.side_effect = [None, Exception]
+
+        report = collector.collect({}, lbs)
+
+        self.assertEqual([_LB_ID], report['loadbalancers'])
+        endpoints = {'metadata': {'namespace': 'ns', 'name': 'svc'}}
+        lb, pool = self.drv_lbaas.release_pool.call_args[0][1:]
+        self.assertEqual(_LB_ID, lb.id)
+        self.assertEqual(_POOL_ID, pool.id)
+        self.drv_lbaas.release_pool.assert_called_once_with(
+            endpoints, mock.ANY, mock.ANY)
+        self.drv_lbaas.release_listener.assert_called_once_with(
+            endpoints, mock.ANY, mock.ANY)
+        self.assertIsInstance(self.drv_lbaas.release_listener.call_args[0][2],
+                              obj_lbaas.LBaaSListener)
+        self.assertEqual(2, self.drv_lbaas.release_loadbalancer.call_count)
+        self.assertEqual({'sweeps': 1, 'ports': 0, 'loadbalancers': 1,
+                          'failures': 1}, collector.stats())
+
+    def test_collect_batch(self):
+        self.m_cfg.garbage_collector.batch_size = 2
+        collector = garbage_collector.GarbageCollector()
+        ports = {port_id: _port(port_id) for port_id in ('a', 'b', 'c')}
+        lbs = {_LB_ID: _lb(_LB_ID)}
+
+        report = collector.collect(ports, lbs)
+
+        self.assertEqual({'ports': ['a', 'b'], 'loadbalancers': []}, report)
+        self.drv_lbaas.release_loadbalancer.assert_not_called()
+
+    def test_collect_dry_run(self):
+        self.m_cfg.garbage_collector.dry_run = True
+        collector = garbage_collector.GarbageCollector()
+        lbs = {_LB_ID: _lb(_LB_ID)}
+
+        report = collector.collect({'a': _port('a', name='pod')}, lbs)
+
+        self.assertEqual({'ports': ['a'], 'loadbalancers': [_LB_ID]}, report)
+        self.neutron.delete_port.assert_not_called()
+        self.drv_lbaas.release_loadbalancer.assert_not_called()
+        self.assertEqual(0, collector.stats()['sweeps'])
+
+    def test_collect_not_leader(self):
+        collector = garbage_collector.GarbageCollector(
+            mock.Mock(return_value=False))
+
+        self.assertIsNone(collector.collect({'a': _port('a')}, {}))
+        self.neutron.delete_port.assert_not_called()
+
+    def test_collect_foreign(self):
+        collector = garbage_collector.GarbageCollector()
+        ports = {'a': _port('a', description='other-cluster'),
+                 'b': _port('b', device_owner='compute:nova'),
+                 'c': {'id': 'c', 'device_owner': 'compute:kuryr'}}
+        lbs = {_LB_ID: _lb(_LB_ID, description=None),
+               _OTHER_LB_ID: _lb(_OTHER_LB_ID, 'not-kuryr')}
+
+        report = collector.collect(ports, lbs)
+
+        self.assertEqual({'ports': [], 'loadbalancers': []}, report)
+        self.neutron.delete_port.assert_not_called()
+        self.k8s.get.assert_not_called()
+
+    def test_collect_loadbalancers_in_use(self):
+        collector = garbage_collector.GarbageCollector()
+        self.k8s.get.side_effect = [
+            {'kind': 'Endpoints'},
+            k_exc.K8sResourceNotFound('gone'), {'kind': 'Service'},
+            k_exc.K8sClientException(),
+            k_exc.K8sResourceNotFound('gone'),
+            k_exc.K8sResourceNotFound('gone')]
+        lb_ids = ['00000000-0000-0000-0000-00000000000%d' % i
+                  for i in range(4)]
+        lbs = {lb_id: _lb(lb_id, 'ns/%s' % name)
+               for lb_id, name in zip(lb_ids, 'abcd')}
+
+        report = collector.collect({}, lbs)
+
+        self.assertEqual([lb_ids[3]], report['loadbalancers'])
+        self.k8s.get.assert_has_calls([
+            mock.call('/api/v1/namespaces/ns/endpoints/a'),
+            mock.call('/api/v1/namespaces/ns/endpoints/b'),
+            mock.call('/api/v1/namespaces/ns/services/b')])
+        self.assertEqual(1, self.drv_lbaas.release_loadbalancer.call_count)
@@ -0,0 +1,292 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import fixtures
+import mock
+
+from kuryr_kubernetes.controller import reconciler
+from kuryr_kubernetes.objects import codec as obj_codec
+from kuryr_kubernetes.objects import lbaas as obj_lbaas
+from kuryr_kubernetes.tests import base as test_base
+
+_PORT_ID = '00000000-0000-0000-0000-000000000001'
+_LB_ID = '00000000-0000-0000-0000-0000000000aa'
+_OTHER_LB_ID = '00000000-0000-0000-0000-0000000000bb'
+_DESCRIPTION = 'kuryr-cluster'
+_KINDS = {'pods': 'PodList', 'services': 'ServiceList',
+          'endpoints': 'EndpointsList',
+          'kuryrloadbalancers': 'KuryrLoadBalancerList'}
+
+
+def _obj(kind, name, annotations=None, version='1', **fields):
+    obj = {'metadata': {
+        'namespace': 'ns', 'name': name, 'resourceVersion': version,
+        'selfLink': '/api/v1/namespaces/ns/%s/%s' % (kind, name),
+        'annotations': annotations or {}}}
+    obj.update(fields)
+    return obj
+
+
+def _pod(name, vif=None, phase='Pending', spec=None, **kwargs):
+    annotations = {'openstack.org/kuryr-vif': vif} if vif else {}
+    return _obj('pods', name, annotations,
+                spec=spec if spec is not None else {'nodeName': 'node'},
+                status={'phase': phase}, **kwargs)
+
+
+def _service(name, annotations=None):
+    return _obj('services', name, annotations,
+                spec={'type': 'ClusterIP', 'clusterIP': '10.0.0.1'})
+
+
+def _endpoints(name, annotations=None):
+    return _obj('endpoints', name, annotations, subsets=[{
+        'addresses': [{'targetRef': {'kind': 'Pod', 'name': 'pod'}}]}])
+
+
+def _state(lb_id=_LB_ID):
+    return obj_lbaas.LBaaSState(loadbalancer=obj_lbaas.LBaaSLoadBalancer(
+        id=lb_id, name='ns/svc'))
+
+
+class TestReconciler(test_base.TestCase):
+    def setUp(self):
+        super(TestReconciler, self).setUp()
+        m_cfg = self.useFixture(fixtures.MockPatch(
+            'kuryr_kubernetes.config.CONF')).mock
+        m_cfg.reconciler.interval = 60
+        m_cfg.reconciler.rate = 10.0
+        m_cfg.kubernetes.lbaas_state_storage = 'annotation'
+        m_cfg.neutron_defaults.resource_description = _DESCRIPTION
+        self.m_cfg = m_cfg
+
+        self.resources = {'pods': [], 'services': [], 'endpoints': [],
+                          'kuryrloadbalancers': []}
+        self.k8s = self.useFixture(fixtures.MockPatch(
+            'kuryr_kubernetes.clients.get_kubernetes_client')).mock()
+        self.k8s.get.side_effect = lambda path: {
+            'kind': _KINDS[path.split('/')[-1]],
+            'items': self.resources[path.split('/')[-1]]}
+        self.neutron = self.useFixture(fixtures.MockPatch(
+            'kuryr_kubernetes.clients.get_neutron_client')).mock()
+        self.neutron.list_ports.return_value = {'ports': []}
+        self.neutron.list_loadbalancers.return_value = {'loadbalancers': []}
+        # NOTE: the annotations hold the decoded objects in these tests
+        self.useFixture(fixtures.MockPatch(
+            'kuryr_kubernetes.annotations.get_object',
+            lambda resource, key, cls: resource['metadata'].get(
+                'annotations', {}).get(key)))
+        self.m_sleep = self.useFixture(fixtures.MockPatch('time.sleep')).mock
+
+        self.handler = mock.Mock()
+        self.reconciler = reconciler.Reconciler(self.handler)
+        self.reconciler._running = True
+
+    def test_reconcile_queues_divergent_twice(self):
+        pod = _pod('pod')
+        self.resources['pods'] = [pod]
+
+        self.reconciler.reconcile()
+        self.handler.assert_not_called()
+        self.assertEqual(1, self.reconciler.stats()['divergent'])
+
+        self.reconciler.reconcile()
+        self.handler.assert_called_once_with({'type': 'ADDED',
+                                              'object': pod})
+        self.assertEqual(1, self.reconciler.stats()['queued'])
+        self.m_sleep.assert_called_once_with(0.1)
+
+    def test_reconcile_changed(self):
+        self.resources['pods'] = [_pod('pod')]
+        self.reconciler.reconcile()
+        self.resources['pods'] = [_pod('pod', version='2')]
+
+        self.reconciler.reconcile()
+
+        self.handler.assert_not_called()
+
+    def test_reconcile_converged(self):
+        vif = mock.Mock(id=_PORT_ID, active=True)
+        self.resources['pods'] = [
+            _pod('pod', vif=vif),
+            _pod('host', spec={'hostNetwork': True, 'nodeName': 'node'}),
+            _pod('running', phase='Running'),
+            _pod('unscheduled', spec={})]
+        self.resources['services'] = [
+            _service('svc', {'openstack.org/kuryr-lbaas-spec': '{}'}),
+            _obj('services', 'headless',
+                 spec={'type': 'ClusterIP', 'clusterIP': 'None'})]
+        self.resources['endpoints'] = [
+            _endpoints('svc', {'openstack.org/kuryr-lbaas-spec': '{}',
+                               'openstack.org/kuryr-lbaas-state': _state()}),
+            _obj('endpoints', 'other')]
+        self.neutron.list_ports.return_value = {'ports': [{'id': _PORT_ID}]}
+        self.neutron.list_loadbalancers.return_value = {'loadbalancers': [
+            {'id': _LB_ID, 'name': 'ns/svc'}]}
+
+        self.reconciler.reconcile()
+        self.reconciler.reconcile()
+
+        self.handler.assert_not_called()
+        self.assertEqual({'runs': 2, 'failures': 0, 'queued': 0,
+                          'divergent': 0, 'stale': 0, 'in_flight': 0,
+                          'leaked_ports': 0, 'leaked_loadbalancers': 0},
+                         self.reconciler.stats())
+        self.neutron.list_ports.assert_called_with(
+            device_owner='compute:kuryr')
+
+    def test_reconcile_divergent(self):
+        self.resources['pods'] = [
+            _pod('inactive', vif=mock.Mock(id=_PORT_ID, active=False))]
+        self.resources['services'] = [_service('svc')]
+        self.resources['endpoints'] = [
+            _endpoints('svc', {'openstack.org/kuryr-lbaas-spec': '{}'})]
+        self.neutron.list_ports.return_value = {'ports': [{'id': _PORT_ID}]}
+
+        self.reconciler.reconcile()
+        self.reconciler.reconcile()
+
+        self.assertEqual(3, self.handler.call_count)
+        self.assertEqual(
+            {'Pod', 'Service', 'Endpoints'},
+            set(call[0][0]['object']['kind']
+                for call in self.handler.call_args_list))
+
+    def test_reconcile_stale_and_leaked(self):
+        self.resources['pods'] = [
+            _pod('pod', vif=mock.Mock(id=_PORT_ID, active=True))]
+        self.resources['endpoints'] = [
+            _endpoints('svc', {'openstack.org/kuryr-lbaas-spec': '{}',
+                               'openstack.org/kuryr-lbaas-state': _state()})]
+        leaked_port = {'id': 'port', 'description': _DESCRIPTION}
+        leaked_lb = {'id': 'lb', 'name': 'ns/gone',
+                     'description': _DESCRIPTION}
+        self.neutron.list_ports.return_value = {'ports': [
+            leaked_port, {'id': 'other', 'description': 'other-cluster'}]}
+        self.neutron.list_loadbalancers.return_value = {'loadbalancers': [
+            leaked_lb, {'id': 'other', 'name': 'ns/other'}]}
+
+        self.reconciler.reconcile()
+        self.assertEqual({}, self.reconciler.leaked_ports)
+        self.reconciler.reconcile()
+
+        stats = self.reconciler.stats()
+        self.assertEqual(2, stats['stale'])
+        self.assertEqual({'port': leaked_port}, self.reconciler.leaked_ports)
+        self.assertEqual({'lb': leaked_lb},
+                         self.reconciler.leaked_loadbalancers)
+
+    def test_reconcile_in_flight(self):
+        self.resources['services'] = [
+            _service('svc', {'openstack.org/kuryr-lbaas-spec': '{}'}),
+            _service('new')]
+        self.resources['endpoints'] = [
+            _endpoints('svc', {'openstack.org/kuryr-lbaas-spec': '{}'})]
+        self.neutron.list_loadbalancers.return_value = {'loadbalancers': [
+            {'id': 'lb', 'name': 'ns/svc', 'description': _DESCRIPTION},
+            {'id': 'new', 'name': 'ns/new', 'description': _DESCRIPTION}]}
+
+        self.reconciler.reconcile()
+        self.reconciler.reconcile()
+
+        self.assertEqual({}, self.reconciler.leaked_loadbalancers)
+        self.assertEqual(2, self.reconciler.stats()['in_flight'])
+
+    def test_reconcile_no_description(self):
+        self.m_cfg.neutron_defaults.resource_description = None
+        self.neutron.list_ports.return_value = {'ports': [{'id': 'port'}]}
+        self.neutron.list_loadbalancers.return_value = {'loadbalancers': [
+            {'id': 'lb', 'name': 'ns/gone'}]}
+
+        self.reconciler.reconcile()
+        self.reconciler.reconcile()
+
+        self.assertEqual({}, self.reconciler.leaked_ports)
+        self.assertEqual({}, self.reconciler.leaked_loadbalancers)
+
+    def test_reconcile_leak_resolved(self):
+        self.neutron.list_ports.return_value = {'ports': [
+            {'id': _PORT_ID, 'description': _DESCRIPTION}]}
+        self.reconciler.reconcile()
+        self.resources['pods'] = [
+            _pod('pod', vif=mock.Mock(id=_PORT_ID, active=True))]
+
+        self.reconciler.reconcile()
+
+        self.assertEqual({}, self.reconciler.leaked_ports)
+
+    def test_reconcile_collect(self):
+        collector = mock.Mock()
+        self.reconciler._collector = collector
+        port = {'id': 'port', 'description': _DESCRIPTION}
+        self.neutron.list_ports.return_value = {'ports': [port]}
+
+        self.reconciler.reconcile()
+        collector.collect.assert_called_once_with({}, {})
+        self.reconciler.reconcile()
+
+        collector.collect.assert_called_with({'port': port}, {})
+
+    def test_reconcile_not_owned(self):
+        self.resources['pods'] = [_pod('pod')]
+        self.reconciler._owns = mock.Mock(return_value=False)
+
+        self.reconciler.reconcile()
+        self.reconciler.reconcile()
+
+        self.handler.assert_not_called()
+        self.assertEqual(0, self.reconciler.stats()['divergent'])
+
+    def test_reconcile_crd(self):
+        self.m_cfg.kubernetes.lbaas_state_storage = 'crd'
+        self.resources['endpoints'] = [_endpoints('svc'), _endpoints('lb')]
+        self.resources['kuryrloadbalancers'] = [
+            _obj('kuryrloadbalancers', 'svc', spec={'ip': '10.0.0.1'}),
+            _obj('kuryrloadbalancers', 'lb', spec={'ip': '10.0.0.2'},
+                 status=obj_codec.to_primitive(_state())),
+            _obj('kuryrloadbalancers', 'deleted',
+                 status=obj_codec.to_primitive(_state(_OTHER_LB_ID)))]
+        self.neutron.list_loadbalancers.return_value = {'loadbalancers': [
+            {'id': _LB_ID, 'name': 'ns/lb'},
+            {'id': _OTHER_LB_ID, 'name': 'ns/deleted'}]}
+
+        self.reconciler.reconcile()
+        self.reconciler.reconcile()
+
+        self.handler.assert_called_once_with(
+            {'type': 'ADDED', 'object': self.resources['endpoints'][0]})
+        self.assertEqual({}, self.reconciler.leaked_loadbalancers)
+
+    def test_run(self):
+        def _sleep(interval):
+            if self.m_sleep.call_count > 2:
+                self.reconciler.stop()
+
+        self.m_sleep.side_effect = _sleep
+        self.k8s.get.side_effect = [Exception(), {'items': []},
+                                    {'items': []}, {'items': []}]
+
+        self.reconciler._run()
+
+        self.m_sleep.assert_called_with(60)
+        stats = self.reconciler.stats()
+        self.assertEqual(1, stats['failures'])
+        self.assertEqual(1, stats['runs'])
+
+    def test_start(self):
+        m_tg = mock.Mock()
+        self.reconciler._running = False
+
+        self.reconciler.start(m_tg)
+
+        m_tg.add_thread.assert_called_once_with(self.reconciler._run)
+        self.assertTrue(self.reconciler._running)
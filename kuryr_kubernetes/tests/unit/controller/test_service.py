@@ -13,9 +13,15 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import signal
+
+import eventlet
 import mock
 
+from kuryr_kubernetes.controller.drivers import base as drv_base
 from kuryr_kubernetes.controller import service
+from kuryr_kubernetes import metrics
+from kuryr_kubernetes import profiler
 from kuryr_kubernetes.tests import base as test_base
 
 
@@ -39,3 +45,121 @@ class TestControllerService(test_base.TestCase):
         m_svc.assert_called()
         m_oslo_launch.assert_called()
         m_launcher.wait.assert_called()
+
+    def test_register_metrics(self):
+        pipeline = mock.Mock()
+        pipeline.get_annotate_stats.return_value = {
+            'pods': {'patches': 3, 'conflicts': 1}}
+        pipeline.get_queue_stats.return_value = {'events': 2, 'groups': 1}
+        pipeline.get_echo_stats.return_value = {'suppressed': 4}
+        pipeline.get_prefilter_stats.return_value = {'dropped': 5}
+        pipeline.get_shard_stats.return_value = {'dropped': 7}
+        pipeline.get_retry_stats.return_value = {
+            'scheduled': 6, 'superseded': 1, 'requeued': 5, 'pending': 0}
+        pipeline.get_annotation_cache_stats.return_value = {
+            'hits': 9, 'misses': 2}
+
+        shards = mock.Mock()
+        shards.stats.return_value = {'members': 3, 'leader': True,
+                                     'rebalances': 2}
+        reconciler = mock.Mock()
+        reconciler.stats.return_value = {
+            'runs': 4, 'failures': 1, 'queued': 8, 'divergent': 2,
+            'stale': 0, 'in_flight': 1, 'leaked_ports': 3,
+            'leaked_loadbalancers': 1}
+
+        collector = mock.Mock()
+        collector.stats.return_value = {'sweeps': 1, 'ports': 5,
+                                        'loadbalancers': 2, 'failures': 0}
+
+        service._register_metrics(pipeline, shards, reconciler, collector)
+        rendered = metrics.REGISTRY.render()
+
+        self.assertIn('kuryr_k8s_annotate_patches_total{kind="pods"} 3.0',
+                      rendered)
+        self.assertIn('kuryr_k8s_annotate_retries_total{kind="pods"} 0.0',
+                      rendered)
+        self.assertIn('kuryr_event_queue_depth 2.0', rendered)
+        self.assertIn('kuryr_events_dropped_total{stage="echo"} 4.0',
+                      rendered)
+        self.assertIn('kuryr_events_dropped_total{stage="shard"} 7.0',
+                      rendered)
+        self.assertIn('kuryr_handler_retries_total{result="scheduled"} 6.0',
+                      rendered)
+        self.assertIn('kuryr_annotation_cache_total{result="hits"} 9.0',
+                      rendered)
+        self.assertIn('kuryr_shard_members 3.0', rendered)
+        self.assertIn('kuryr_shard_leader 1.0', rendered)
+        self.assertIn('kuryr_reconciler_runs_total{result="failure"} 1.0',
+                      rendered)
+        self.assertIn('kuryr_reconciler_queued_total 8.0', rendered)
+        self.assertIn('kuryr_reconciler_objects{state="leaked_ports"} 3.0',
+                      rendered)
+        self.assertIn('kuryr_gc_deleted_total{kind="ports"} 5.0', rendered)
+
+    @mock.patch('kuryr_kubernetes.config.CONF')
+    def test_on_profile_signal(self, m_cfg):
+        m_cfg.profiler.duration = 10
+        m_svc = mock.Mock()
+
+        service.KuryrK8sService._on_profile_signal(m_svc, signal.SIGUSR1,
+                                                   None)
+
+        m_svc.tg.add_thread.assert_called_once_with(
+            profiler.profile_to_file, 10, 'kuryr-controller')
+
+    @mock.patch('kuryr_kubernetes.clients.authenticate_neutron_client')
+    @mock.patch.object(drv_base.DriverBase, 'get_instance')
+    def test_warm_up(self, m_get_instance, m_authenticate):
+        m_driver = m_get_instance.return_value
+        m_driver.warm_up.side_effect = [Exception()] + [None] * 7
+
+        durations = service.warm_up(10)
+
+        m_authenticate.assert_called_once_with()
+        self.assertEqual(8, m_driver.warm_up.call_count)
+        self.assertEqual(
+            {'total', 'neutron_token', 'drivers', 'pod_project',
+             'pod_subnets', 'pod_security_groups', 'pod_vif',
+             'service_project', 'service_subnets', 'service_security_groups',
+             'endpoints_lbaas'}, set(durations))
+
+    @mock.patch('kuryr_kubernetes.clients.authenticate_neutron_client')
+    @mock.patch.object(drv_base, '_DRIVER_MANAGERS', {})
+    @mock.patch('stevedore.driver.DriverManager')
+    def test_warm_up_not_loaded(self, m_manager, m_authenticate):
+        drivers = {cls.ALIAS: mock.Mock(spec=cls)
+                   for cls in service._WARM_UP_DRIVERS}
+        loading = []
+        concurrent = []
+
+        def _load(namespace, name, invoke_on_load):
+            concurrent.append(len(loading))
+            loading.append(namespace)
+            # NOTE: the import of a driver module may switch greenthreads
+            eventlet.sleep(0)
+            loading.remove(namespace)
+            return mock.Mock(driver=drivers[namespace.rsplit('.', 1)[1]])
+
+        m_manager.side_effect = _load
+
+        durations = service.warm_up(10)
+
+        self.assertEqual([0] * 8, concurrent)
+        for driver in drivers.values():
+            driver.warm_up.assert_called_once_with()
+        self.assertIn('endpoints_lbaas', durations)
+
+    @mock.patch('kuryr_kubernetes.clients.authenticate_neutron_client')
+    @mock.patch.object(drv_base.DriverBase, 'get_instance')
+    def test_warm_up_timeout(self, m_get_instance, m_authenticate):
+        done = eventlet.event.Event()
+        m_get_instance.return_value.warm_up.side_effect = done.wait
+        # NOTE: let the tasks left running complete
+        self.addCleanup(eventlet.sleep, 0)
+        self.addCleanup(done.send)
+
+        durations = service.warm_up(0.01)
+
+        self.assertEqual({'total', 'neutron_token', 'drivers'},
+                         set(durations))
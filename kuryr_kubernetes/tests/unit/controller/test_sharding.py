@@ -0,0 +1,238 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import collections
+
+import fixtures
+import mock
+
+from kuryr_kubernetes.controller import sharding
+from kuryr_kubernetes import exceptions as k_exc
+from kuryr_kubernetes.tests import base as test_base
+
+_PATH = '/api/v1/namespaces/kube-system/configmaps/kuryr-shards'
+_PODS = '/api/v1/pods'
+
+
+def _pod(namespace, name):
+    return {'metadata': {'namespace': namespace, 'name': name}}
+
+
+def _event(namespace, name):
+    return {'type': 'MODIFIED', 'object': _pod(namespace, name)}
+
+
+class TestHashRing(test_base.TestCase):
+    def test_get(self):
+        ring = sharding.HashRing(['a', 'b', 'c'], 100)
+        keys = ['ns%d' % i for i in range(3000)]
+
+        owners = {key: ring.get(key) for key in keys}
+
+        counts = collections.Counter(owners.values())
+        self.assertEqual({'a', 'b', 'c'}, set(counts))
+        for count in counts.values():
+            self.assertGreater(count, 700)
+        self.assertEqual(owners, {key: ring.get(key) for key in keys})
+
+    def test_get_member_removed(self):
+        ring = sharding.HashRing(['a', 'b', 'c'], 100)
+        smaller = sharding.HashRing(['a', 'b'], 100)
+
+        for key in ('ns%d' % i for i in range(1000)):
+            if ring.get(key) != 'c':
+                self.assertEqual(ring.get(key), smaller.get(key))
+
+    def test_get_empty(self):
+        self.assertIsNone(sharding.HashRing([], 100).get('key'))
+
+
+class TestShardManager(test_base.TestCase):
+    def setUp(self):
+        super(TestShardManager, self).setUp()
+        m_cfg = self.useFixture(fixtures.MockPatch(
+            'kuryr_kubernetes.config.CONF')).mock
+        conf = m_cfg.sharding
+        conf.replica_id = 'b'
+        conf.shard_by = 'namespace'
+        conf.lease_duration = 15
+        conf.renew_interval = 5
+        conf.virtual_nodes = 100
+        conf.namespace = 'kube-system'
+        conf.config_map = 'kuryr-shards'
+
+        self.annotations = {}
+        self.k8s = self.useFixture(fixtures.MockPatch(
+            'kuryr_kubernetes.clients.get_kubernetes_client')).mock()
+        self.k8s.annotate.side_effect = self._annotate
+        self.k8s.get.return_value = {'kind': 'PodList', 'items': [
+            _pod('ns%d' % i, 'pod') for i in range(100)]}
+        self.m_time = self.useFixture(fixtures.MockPatch('time.time')).mock
+        self.m_time.return_value = 100.0
+        self.tg = mock.Mock()
+        self.handler = mock.Mock()
+        self.manager = sharding.ShardManager()
+
+    def _annotate(self, path, annotations, resource_version=None):
+        self.assertEqual(_PATH, path)
+        for key, value in annotations.items():
+            if value is None:
+                self.annotations.pop(key, None)
+            else:
+                self.annotations[key] = value
+        return dict(self.annotations)
+
+    def _set_lease(self, member, lease):
+        self.annotations[sharding._MEMBER_PREFIX + member] = lease
+
+    def _start(self):
+        self.manager.start(self.tg, self.handler, [_PODS])
+
+    def _owned(self):
+        return set(i for i in range(100)
+                   if self.manager.owns(_event('ns%d' % i, 'pod')))
+
+    def test_start(self):
+        self.k8s.get.side_effect = k_exc.K8sResourceNotFound(_PATH)
+
+        self._start()
+
+        self.k8s.post.assert_called_once_with(
+            '/api/v1/namespaces/kube-system/configmaps',
+            {'apiVersion': 'v1', 'kind': 'ConfigMap',
+             'metadata': {'name': 'kuryr-shards'}})
+        self.assertIn(sharding._MEMBER_PREFIX + 'b', self.annotations)
+        self.tg.add_thread.assert_called_once_with(self.manager._run)
+        self.assertEqual(set(range(100)), self._owned())
+        self.assertEqual({'members': 1, 'leader': True, 'rebalances': 1},
+                         self.manager.stats())
+        self.handler.assert_not_called()
+
+    def _replayed(self):
+        return set(int(c[0][0]['object']['metadata']['namespace'][2:])
+                   for c in self.handler.call_args_list)
+
+    def test_owns_by_object(self):
+        self.manager._shard_by = 'object'
+        self._start()
+        self._set_lease('a', 'lease')
+        self.m_time.return_value = 105.0
+        self.manager._sync()
+
+        owned = [name for name in ('pod%d' % i for i in range(100))
+                 if self.manager.owns(_event('ns', name))]
+
+        self.assertNotIn(len(owned), (0, 100))
+
+    def test_member_joins_and_leaves(self):
+        self._start()
+        self.assertTrue(self.manager.is_leader())
+
+        self._set_lease('a', 'lease1')
+        self.m_time.return_value = 105.0
+        self.manager._sync()
+
+        owned = self._owned()
+        self.assertNotIn(len(owned), (0, 100))
+        self.assertFalse(self.manager.is_leader())
+        self.handler.assert_not_called()
+
+        # NOTE: the lease of 'a' is not renewed anymore
+        self.m_time.return_value = 115.0
+        self.manager._sync()
+        self.assertEqual(owned, self._owned())
+        self.m_time.return_value = 121.0
+        self.manager._sync()
+
+        self.assertEqual(set(range(100)), self._owned())
+        self.assertTrue(self.manager.is_leader())
+        self.assertNotIn(sharding._MEMBER_PREFIX + 'a', self.annotations)
+        self.assertEqual(set(range(100)) - owned, self._replayed())
+        self.assertEqual('Pod', self.handler.call_args[0][0]['object']['kind'])
+        self.assertEqual(3, self.manager.stats()['rebalances'])
+
+    def test_join_waits_for_members(self):
+        self._set_lease('a', 'lease1')
+        self._start()
+
+        self.assertEqual(set(), self._owned())
+        self.assertFalse(self.manager.is_leader())
+        self.assertEqual(2, self.manager.stats()['members'])
+
+        self._set_lease('a', 'lease2')
+        self.m_time.return_value = 110.0
+        self.manager._sync()
+        self.assertEqual(set(), self._owned())
+        self.handler.assert_not_called()
+
+        self._set_lease('a', 'lease3')
+        self.m_time.return_value = 115.0
+        self.manager._sync()
+
+        owned = self._owned()
+        self.assertNotIn(len(owned), (0, 100))
+        self.assertEqual(owned, self._replayed())
+        self.assertFalse(self.manager.is_leader())
+
+    def test_gain_waits_for_members(self):
+        self.manager.replica_id = 'c'
+        self.manager._key = sharding._MEMBER_PREFIX + 'c'
+        self._start()
+        self._set_lease('a', 'lease1')
+        self._set_lease('b', 'lease1')
+        self.m_time.return_value = 105.0
+        self.manager._sync()
+        self._set_lease('a', 'lease2')
+        self._set_lease('b', 'lease2')
+        self.m_time.return_value = 120.0
+        self.manager._sync()
+        owned = self._owned()
+        self.assertNotIn(len(owned), (0, 100))
+        self.handler.reset_mock()
+
+        # NOTE: 'a' stops gracefully, 'b' may still handle the objects of
+        # 'a' until it observes the change
+        del self.annotations[sharding._MEMBER_PREFIX + 'a']
+        self._set_lease('b', 'lease3')
+        self.m_time.return_value = 125.0
+        self.manager._sync()
+        self.assertEqual(owned, self._owned())
+        self.handler.assert_not_called()
+
+        self._set_lease('b', 'lease4')
+        self.m_time.return_value = 140.0
+        self.manager._sync()
+
+        gained = self._owned() - owned
+        self.assertNotEqual(set(), gained)
+        self.assertEqual(gained, self._replayed())
+
+    def test_renew_failed(self):
+        self._start()
+        self.k8s.annotate.side_effect = k_exc.K8sClientException()
+
+        self.m_time.return_value = 110.0
+        self.manager._sync()
+        self.assertEqual(set(range(100)), self._owned())
+        self.m_time.return_value = 116.0
+        self.manager._sync()
+
+        self.assertEqual(set(), self._owned())
+        self.assertFalse(self.manager.is_leader())
+
+    def test_stop(self):
+        self._start()
+
+        self.manager.stop()
+
+        self.assertEqual({}, self.annotations)
+        self.assertFalse(self.manager._running)
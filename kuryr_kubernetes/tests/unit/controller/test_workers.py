@@ -0,0 +1,336 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import io
+import socket
+
+import mock
+
+from kuryr_kubernetes.controller import workers
+from kuryr_kubernetes import exceptions as k_exc
+from kuryr_kubernetes.tests import base as test_base
+
+
+def _event(namespace, name):
+    return {'type': 'MODIFIED',
+            'object': {'metadata': {'namespace': namespace, 'name': name}}}
+
+
+def _stream(*objs):
+    sock = mock.Mock()
+    sock.sendall.side_effect = lambda data: buf.write(data)
+    buf = io.BytesIO()
+    for obj in objs:
+        workers._send(sock, obj)
+    buf.seek(0)
+    return buf
+
+
+class TestWorkers(test_base.TestCase):
+    def test_send_recv(self):
+        sock, peer = socket.socketpair()
+        self.addCleanup(sock.close)
+        self.addCleanup(peer.close)
+        rfile = peer.makefile('rb')
+
+        workers._send(sock, _event('ns', 'a'))
+        workers._send(sock, {'stats': 1})
+        sock.close()
+
+        self.assertEqual(_event('ns', 'a'), workers._recv(rfile))
+        self.assertEqual({'stats': 1}, workers._recv(rfile))
+        self.assertIsNone(workers._recv(rfile))
+
+    def test_add(self):
+        total = workers._add({}, {'a': 1, 'b': {'c': 2}})
+        workers._add(total, {'a': 2, 'b': {'c': 1, 'd': 1.5}})
+
+        self.assertEqual({'a': 3, 'b': {'c': 3, 'd': 1.5}}, total)
+
+    def test_get_key(self):
+        self.assertEqual('ns/a', workers.get_key(_event('ns', 'a')))
+
+    @mock.patch('kuryr_kubernetes.controller.workers._run_worker')
+    @mock.patch('kuryr_kubernetes.controller.workers.signal')
+    @mock.patch('os._exit')
+    @mock.patch('os.fork')
+    def test_spawn_child(self, m_fork, m_exit, m_signal, m_run_worker):
+        m_fork.return_value = 0
+        create_pipeline = mock.Mock()
+        setup = mock.Mock()
+        pool = workers.WorkerPool(1, create_pipeline, setup=setup)
+        # NOTE: os._exit is mocked, so the parent code runs after the child
+        pool._tg = mock.Mock()
+
+        with mock.patch('eventlet.hubs.use_hub') as m_use_hub:
+            pool._spawn(pool._workers[0])
+
+        m_use_hub.assert_called_once_with()
+        m_run_worker.assert_called_once_with(mock.ANY, create_pipeline,
+                                             setup)
+        m_exit.assert_called_once_with(0)
+
+
+class TestWorkerPool(test_base.TestCase):
+    def setUp(self):
+        super(TestWorkerPool, self).setUp()
+        self.pool = workers.WorkerPool(3, mock.Mock())
+        self.pool._running = True
+        for worker in self.pool._workers:
+            worker.sock = mock.Mock()
+
+    @mock.patch('kuryr_kubernetes.controller.workers._send')
+    def test_dispatch(self, m_send):
+        for i in range(30):
+            self.pool(_event('ns', 'pod%d' % (i % 10)))
+
+        sent = {}
+        for call in m_send.call_args_list:
+            sock, (event, received) = call[0]
+            name = event['object']['metadata']['name']
+            sent.setdefault(name, set()).add(sock)
+        self.assertEqual(10, len(sent))
+        for socks in sent.values():
+            self.assertEqual(1, len(socks))
+        self.assertGreater(len(set.union(*sent.values())), 1)
+
+    @mock.patch('kuryr_kubernetes.controller.workers._send')
+    def test_dispatch_owns(self, m_send):
+        pool = workers.WorkerPool(1, mock.Mock(),
+                                  owns=lambda e: e['object']['metadata'][
+                                      'name'] == 'a')
+        pool._running = True
+        pool._workers[0].sock = mock.sentinel.sock
+
+        pool(_event('ns', 'a'))
+        pool(_event('ns', 'b'))
+
+        m_send.assert_called_once_with(mock.sentinel.sock,
+                                       (_event('ns', 'a'), None))
+        self.assertEqual({'dropped': 1, 'passed': 1}, pool.get_shard_stats())
+
+    @mock.patch('kuryr_kubernetes.tracing.pop_received')
+    @mock.patch('kuryr_kubernetes.controller.workers._send')
+    def test_dispatch_received(self, m_send, m_pop_received):
+        m_pop_received.return_value = 12.5
+        worker = self.pool._get_worker(_event('ns', 'a'))
+
+        self.pool(_event('ns', 'a'))
+
+        m_pop_received.assert_called_once_with(_event('ns', 'a'))
+        m_send.assert_called_once_with(worker.sock,
+                                       (_event('ns', 'a'), 12.5))
+
+    @mock.patch('kuryr_kubernetes.controller.workers._send')
+    def test_dispatch_failed(self, m_send):
+        m_send.side_effect = IOError()
+
+        self.pool(_event('ns', 'a'))
+
+    def test_get_stats(self):
+        self.pool._workers[0].stats = {
+            'queue': {'events': 2, 'groups': 1},
+            'annotate': {'pods': {'patches': 3}},
+            'neutron': {'create_port': {'calls': 4, 'errors': 1,
+                                        'time': 1.0, 'wait_time': 0.0}}}
+        self.pool._workers[1].stats = {
+            'queue': {'events': 1, 'groups': 1},
+            'annotate': {'pods': {'patches': 1, 'conflicts': 1}},
+            'neutron': {'create_port': {'calls': 4, 'errors': 0,
+                                        'time': 0.5, 'wait_time': 0.0}}}
+
+        self.assertEqual({'events': 3, 'groups': 2},
+                         self.pool.get_queue_stats())
+        self.assertEqual({'pods': {'patches': 4, 'conflicts': 1}},
+                         self.pool.get_annotate_stats())
+        self.assertEqual({'create_port': {'calls': 8, 'errors': 1,
+                                          'time': 1.5, 'wait_time': 0.0,
+                                          'error_rate': 0.125}},
+                         self.pool.get_neutron_call_stats())
+        self.assertEqual(0, self.pool.get_retry_stats()['scheduled'])
+        self.assertEqual({'suppressed': 0, 'passed': 0},
+                         self.pool.get_echo_stats())
+        self.assertEqual({'dropped': 0, 'passed': 0},
+                         self.pool.get_shard_stats())
+        self.assertEqual(0, self.pool.get_annotation_cache_stats()['hits'])
+
+    def test_get_metric_snapshots(self):
+        self.pool._workers[0].stats = {'metrics': {'test_total': {(): 1}}}
+        self.pool._workers[2].stats = {'metrics': {}}
+
+        self.assertEqual([{'test_total': {(): 1}}, {}],
+                         self.pool.get_metric_snapshots())
+
+    @mock.patch('os.waitpid')
+    def test_read_reports(self, m_waitpid):
+        worker = self.pool._workers[0]
+        worker.pid = 123
+        worker.sock.makefile.return_value = _stream({'queue': {'events': 1}})
+
+        with mock.patch.object(self.pool, '_spawn') as m_spawn, \
+                mock.patch.object(self.pool, '_replay') as m_replay:
+            self.pool._read_reports(worker, worker.sock)
+
+        self.assertEqual({'queue': {'events': 1}}, worker.stats)
+        m_waitpid.assert_called_once_with(123, 0)
+        m_spawn.assert_called_once_with(worker)
+        m_replay.assert_called_once_with(worker)
+
+    @mock.patch('kuryr_kubernetes.controller.workers._send')
+    @mock.patch('kuryr_kubernetes.clients.get_kubernetes_client')
+    def test_replay(self, m_get_k8s, m_send):
+        k8s = m_get_k8s.return_value
+        pods = [_event('ns', 'pod%d' % i)['object'] for i in range(30)]
+        k8s.get.side_effect = [k_exc.K8sClientException(),
+                               {'kind': 'PodList', 'items': pods}]
+        self.pool._resources = ['/api/v1/services', '/api/v1/pods']
+        worker = self.pool._workers[1]
+
+        self.pool._replay(worker)
+
+        self.assertNotIn(m_send.call_count, (0, 30))
+        for call in m_send.call_args_list:
+            sock, (event, received) = call[0]
+            self.assertIs(worker.sock, sock)
+            self.assertEqual('ADDED', event['type'])
+            self.assertEqual('Pod', event['object']['kind'])
+
+    def test_read_reports_profile(self):
+        self.pool._running = False
+        worker = self.pool._workers[0]
+        worker.profile = waiter = mock.Mock()
+        worker.stats = {'queue': {'events': 1}}
+        worker.sock.makefile.return_value = _stream({'profile': 'a;b 1\n'})
+
+        self.pool._read_reports(worker, worker.sock)
+
+        waiter.send.assert_called_once_with('a;b 1\n')
+        self.assertIsNone(worker.profile)
+        self.assertEqual({'queue': {'events': 1}}, worker.stats)
+
+    @mock.patch('kuryr_kubernetes.controller.workers._PROFILE_TIMEOUT', 0)
+    @mock.patch('kuryr_kubernetes.controller.workers._send')
+    def test_profile(self, m_send):
+        def _send(sock, obj):
+            # NOTE: worker 1 fails and worker 2 does not answer
+            if sock is self.pool._workers[1].sock:
+                raise IOError()
+            if sock is self.pool._workers[0].sock:
+                self.pool._workers[0].profile.send('a;b 1\n')
+
+        m_send.side_effect = _send
+        for i, worker in enumerate(self.pool._workers):
+            worker.pid = 100 + i
+
+        self.assertEqual([('worker-0', 'a;b 1\n')], self.pool.profile(0))
+        for worker in self.pool._workers:
+            m_send.assert_any_call(worker.sock, {'profile': 0})
+
+    def test_read_reports_stopped(self):
+        self.pool._running = False
+        worker = self.pool._workers[0]
+        worker.sock.makefile.return_value = _stream()
+
+        with mock.patch.object(self.pool, '_spawn') as m_spawn:
+            self.pool._read_reports(worker, worker.sock)
+
+        m_spawn.assert_not_called()
+
+    @mock.patch('os.waitpid')
+    @mock.patch('os.kill')
+    def test_stop(self, m_kill, m_waitpid):
+        for i, worker in enumerate(self.pool._workers):
+            worker.pid = 100 + i
+        socks = [worker.sock for worker in self.pool._workers]
+
+        self.pool.stop()
+
+        for sock in socks:
+            sock.close.assert_called_once_with()
+        self.assertEqual(3, m_kill.call_count)
+        m_waitpid.assert_called_with(102, 0)
+        self.assertFalse(self.pool._running)
+
+
+class TestRunWorker(test_base.TestCase):
+    @mock.patch('oslo_service.threadgroup.ThreadGroup')
+    @mock.patch('kuryr_kubernetes.controller.workers.signal')
+    @mock.patch('kuryr_kubernetes.annotations.reset')
+    @mock.patch('kuryr_kubernetes.metrics.REGISTRY.clear')
+    def test_run_worker(self, m_clear, m_reset, m_signal, m_tg_type):
+        sock = mock.Mock()
+        sock.makefile.return_value = _stream((_event('ns', 'a'), None),
+                                             (_event('ns', 'b'), None))
+        pipeline = mock.Mock()
+        create_pipeline = mock.Mock(return_value=pipeline)
+        setup = mock.Mock()
+
+        workers._run_worker(sock, create_pipeline, setup)
+
+        setup.assert_called_once_with()
+        m_clear.assert_called_once_with()
+        m_reset.assert_called_once_with()
+        create_pipeline.assert_called_once_with(m_tg_type.return_value)
+        m_tg_type.return_value.add_thread.assert_called_once_with(
+            workers._report, mock.ANY, pipeline)
+        self.assertEqual([mock.call(_event('ns', 'a')),
+                          mock.call(_event('ns', 'b'))],
+                         pipeline.call_args_list)
+
+    @mock.patch('oslo_service.threadgroup.ThreadGroup')
+    @mock.patch('kuryr_kubernetes.controller.workers.signal')
+    @mock.patch('kuryr_kubernetes.tracing.set_received')
+    @mock.patch('kuryr_kubernetes.annotations.reset')
+    @mock.patch('kuryr_kubernetes.metrics.REGISTRY.clear')
+    def test_run_worker_received(self, m_clear, m_reset, m_set_received,
+                                 m_signal, m_tg_type):
+        sock = mock.Mock()
+        sock.makefile.return_value = _stream((_event('ns', 'a'), 12.5))
+        calls = []
+        m_set_received.side_effect = lambda *args: calls.append(
+            ('set_received',) + args)
+        pipeline = mock.Mock(side_effect=lambda event: calls.append(
+            ('pipeline', event)))
+
+        workers._run_worker(sock, mock.Mock(return_value=pipeline),
+                            mock.Mock())
+
+        self.assertEqual([('set_received', _event('ns', 'a'), 12.5),
+                          ('pipeline', _event('ns', 'a'))], calls)
+
+    @mock.patch('oslo_service.threadgroup.ThreadGroup')
+    @mock.patch('kuryr_kubernetes.controller.workers.signal')
+    @mock.patch('kuryr_kubernetes.profiler.reset')
+    @mock.patch('kuryr_kubernetes.annotations.reset')
+    @mock.patch('kuryr_kubernetes.metrics.REGISTRY.clear')
+    def test_run_worker_profile(self, m_clear, m_reset, m_profiler_reset,
+                                m_signal, m_tg_type):
+        sock = mock.Mock()
+        sock.makefile.return_value = _stream({'profile': 5})
+        pipeline = mock.Mock()
+
+        workers._run_worker(sock, mock.Mock(return_value=pipeline),
+                            mock.Mock())
+
+        m_profiler_reset.assert_called_once_with()
+        m_tg_type.return_value.add_thread.assert_called_with(
+            workers._profile, mock.ANY, 5)
+        pipeline.assert_not_called()
+
+    @mock.patch('kuryr_kubernetes.profiler.profile')
+    def test_profile(self, m_profile):
+        send = mock.Mock()
+
+        workers._profile(send, 5)
+
+        m_profile.assert_called_once_with(5)
+        send.assert_called_once_with({'profile': m_profile.return_value})
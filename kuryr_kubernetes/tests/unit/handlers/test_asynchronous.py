@@ -133,3 +133,82 @@ class TestAsyncHandler(test_base.TestCase):
         async_handler._done(mock.Mock(), group)
 
         m_critical.assert_called_once()
+
+    @mock.patch('time.time')
+    def test_requeue(self, m_time):
+        event = mock.sentinel.event
+        group = mock.sentinel.group
+        m_handler = mock.Mock()
+        m_tg = mock.Mock()
+        m_time.return_value = 100
+        async_handler = h_async.Async(m_handler, m_tg,
+                                      mock.Mock(return_value=group))
+
+        async_handler.requeue(event, mock.sentinel.retry, 4)
+
+        m_tg.add_thread.assert_called_once_with(async_handler._run_retries)
+        m_time.return_value = 103
+        with mock.patch('time.sleep') as m_sleep:
+            m_sleep.side_effect = lambda _: m_time.configure_mock(
+                return_value=m_time.return_value + 1)
+            with mock.patch.object(async_handler, '_put') as m_put:
+                async_handler._run_retries()
+
+        m_put.assert_called_once_with(group, mock.ANY)
+        item = m_put.call_args[0][1]
+        self.assertEqual(mock.sentinel.retry, item.handler)
+        self.assertEqual(event, item.event)
+        stats = async_handler.retry_stats()
+        self.assertEqual(1, stats['scheduled'])
+        self.assertEqual(1, stats['requeued'])
+        self.assertEqual(0, stats['pending'])
+        self.assertEqual(1, stats['delays'][5])
+        self.assertIsNone(async_handler._retry_thread)
+
+    def test_requeue_superseded(self):
+        group = mock.sentinel.group
+        async_handler = h_async.Async(mock.Mock(), mock.Mock(),
+                                      mock.Mock(return_value=group))
+
+        async_handler.requeue(mock.sentinel.event1, mock.Mock(), 3)
+        with mock.patch.object(async_handler, '_put') as m_put:
+            async_handler(mock.sentinel.event2)
+            with mock.patch('time.time', return_value=float('inf')):
+                async_handler._run_retries()
+
+        m_put.assert_called_once_with(group, mock.sentinel.event2)
+        stats = async_handler.retry_stats()
+        self.assertEqual(1, stats['superseded'])
+        self.assertEqual(0, stats['requeued'])
+
+    def test_requeue_queued(self):
+        group = mock.sentinel.group
+        m_queue = mock.Mock()
+        m_queue.empty.return_value = False
+        m_tg = mock.Mock()
+        async_handler = h_async.Async(mock.Mock(), m_tg,
+                                      mock.Mock(return_value=group))
+        async_handler._queues[group] = m_queue
+
+        async_handler.requeue(mock.sentinel.event, mock.Mock(), 3)
+
+        m_tg.add_thread.assert_not_called()
+        self.assertEqual(1, async_handler.retry_stats()['superseded'])
+
+    @mock.patch('itertools.count')
+    def test_run_requeued(self, m_count):
+        group = mock.sentinel.group
+        m_retry = mock.Mock()
+        m_queue = mock.Mock()
+        m_queue.empty.return_value = True
+        m_queue.get.return_value = h_async._Requeued(m_retry,
+                                                     mock.sentinel.event)
+        m_handler = mock.Mock()
+        m_count.return_value = [1]
+        async_handler = h_async.Async(m_handler, mock.Mock(), mock.Mock())
+
+        with mock.patch('time.sleep'):
+            async_handler._run(group, m_queue)
+
+        m_retry.assert_called_once_with(mock.sentinel.event)
+        m_handler.assert_not_called()
@@ -59,6 +59,82 @@ class TestDispatch(test_base.TestCase):
         for key, handler in handlers.items():
             handler.assert_called_once_with(events[key])
 
+    def test_dispatch_multiple_key_fns(self):
+        handler1 = mock.Mock()
+        handler2 = mock.Mock()
+        dispatcher = h_dis.Dispatcher()
+        dispatcher.register(lambda e: e % 2, 0, handler1)
+        dispatcher.register(lambda e: e % 3, 0, handler1)
+        dispatcher.register(lambda e: e % 3, 0, handler2)
+
+        for event in range(6):
+            dispatcher(event)
+
+        handler1.assert_has_calls([mock.call(e) for e in (0, 2, 3, 4)])
+        self.assertEqual(4, handler1.call_count)
+        handler2.assert_has_calls([mock.call(e) for e in (0, 3)])
+        self.assertEqual(2, handler2.call_count)
+
+    def test_dispatch_registration_order(self):
+        calls = []
+        handlers = [mock.Mock(side_effect=lambda e, i=i: calls.append(i))
+                    for i in range(5)]
+        dispatcher = h_dis.Dispatcher()
+        dispatcher(mock.sentinel.event)
+        for handler in handlers:
+            dispatcher.register(lambda e: True, True, handler)
+        dispatcher.register(lambda e: True, True, handlers[0])
+
+        dispatcher(mock.sentinel.event)
+
+        self.assertEqual(list(range(5)), calls)
+
+
+class TestPrefilter(test_base.TestCase):
+    def _consumer(self, accepts):
+        consumer = mock.Mock(spec=h_dis.EventConsumer)
+        consumer.prefilter.return_value = accepts
+        return consumer
+
+    def test_accept(self):
+        handler = mock.Mock()
+        prefilter = h_dis.Prefilter(handler)
+        rejecting = self._consumer(False)
+        accepting = self._consumer(True)
+        prefilter.register(lambda e: e, 'k', rejecting)
+        prefilter.register(lambda e: e, 'k', accepting)
+
+        prefilter('k')
+
+        handler.assert_called_once_with('k')
+        rejecting.prefilter.assert_called_once_with('k')
+        accepting.prefilter.assert_called_once_with('k')
+        self.assertEqual(0, prefilter.stats()['dropped'])
+
+    def test_drop(self):
+        handler = mock.Mock()
+        prefilter = h_dis.Prefilter(handler)
+        consumer = self._consumer(False)
+        prefilter.register(lambda e: e, 'k', consumer)
+
+        prefilter('k')
+
+        handler.assert_not_called()
+        self.assertEqual({'events': 1, 'dropped': 1, 'consumers': {
+            'EventConsumer': {'checked': 1, 'rejected': 1}}},
+            prefilter.stats())
+
+    def test_unregistered(self):
+        handler = mock.Mock()
+        prefilter = h_dis.Prefilter(handler)
+        consumer = self._consumer(False)
+        prefilter.register(lambda e: e, 'k', consumer)
+
+        prefilter('other')
+
+        handler.assert_called_once_with('other')
+        consumer.prefilter.assert_not_called()
+
 
 class _TestEventPipeline(h_dis.EventPipeline):
     def _wrap_dispatcher(self, dispatcher):
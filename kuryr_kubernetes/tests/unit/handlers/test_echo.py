@@ -0,0 +1,82 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import fixtures
+import mock
+
+from kuryr_kubernetes.handlers import echo as h_echo
+from kuryr_kubernetes.tests import base as test_base
+
+_LINK = '/api/v1/namespaces/default/pods/test'
+
+
+def _event(event_type, version, link=_LINK):
+    return {'type': event_type, 'object': {'metadata': {
+        'selfLink': link, 'resourceVersion': version}}}
+
+
+class TestEchoFilter(test_base.TestCase):
+    def setUp(self):
+        super(TestEchoFilter, self).setUp()
+        self.written = {}
+        m_get_k8s = self.useFixture(fixtures.MockPatch(
+            'kuryr_kubernetes.clients.get_kubernetes_client')).mock
+        m_get_k8s.return_value.pop_written_version.side_effect = (
+            lambda link: self.written.pop(link, None))
+        self.handler = mock.Mock()
+        self.echo = h_echo.EchoFilter(self.handler)
+
+    def test_suppress_echo(self):
+        self.echo(_event('ADDED', '1'))
+        self.written[_LINK] = ('1', '2')
+        self.echo(_event('MODIFIED', '2'))
+
+        self.handler.assert_called_once_with(_event('ADDED', '1'))
+        self.assertEqual({'suppressed': 1, 'passed': 1}, self.echo.stats())
+
+    def test_pass_changed_in_between(self):
+        self.echo(_event('ADDED', '1'))
+        self.echo(_event('MODIFIED', '2'))
+        self.written[_LINK] = ('1', '3')
+        self.echo(_event('MODIFIED', '3'))
+
+        self.assertEqual(3, self.handler.call_count)
+        self.assertEqual({'suppressed': 0, 'passed': 3}, self.echo.stats())
+
+    def test_pass_not_written(self):
+        self.echo(_event('ADDED', '1'))
+        self.echo(_event('MODIFIED', '2'))
+
+        self.assertEqual(2, self.handler.call_count)
+
+    def test_pass_untracked(self):
+        self.written[_LINK] = ('1', '2')
+        self.echo(_event('MODIFIED', '2'))
+
+        self.handler.assert_called_once_with(_event('MODIFIED', '2'))
+
+    def test_pass_deleted(self):
+        self.echo(_event('ADDED', '1'))
+        self.written[_LINK] = ('1', '2')
+        self.echo(_event('DELETED', '2'))
+
+        self.assertEqual(2, self.handler.call_count)
+        self.assertEqual({}, dict(self.echo._versions))
+
+    def test_max_tracked(self):
+        echo = h_echo.EchoFilter(self.handler, max_tracked=1)
+        echo(_event('ADDED', '1'))
+        echo(_event('ADDED', '1', link='/other'))
+        self.written[_LINK] = ('1', '2')
+        echo(_event('MODIFIED', '2'))
+
+        self.assertEqual(3, self.handler.call_count)
@@ -0,0 +1,40 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import mock
+
+from kuryr_kubernetes.handlers import metrics as h_metrics
+from kuryr_kubernetes.tests import base as test_base
+
+
+class TestInstrumented(test_base.TestCase):
+    def test_call(self):
+        event = {'type': 'ADDED', 'object': {'kind': 'Pod'}}
+        m_handler = mock.Mock()
+        handler = h_metrics.Instrumented(m_handler, name='TestCall')
+
+        handler(event)
+
+        m_handler.assert_called_once_with(event)
+        self.assertEqual(1, h_metrics._DURATION.get(('TestCall', 'Pod'))[0])
+
+    def test_call_error(self):
+        event = {'type': 'ADDED', 'object': {'kind': 'Pod'}}
+        m_handler = mock.Mock(side_effect=ValueError())
+        handler = h_metrics.Instrumented(m_handler, name='TestCallError')
+
+        self.assertRaises(ValueError, handler, event)
+
+        self.assertEqual(1, h_metrics._DURATION.get(
+            ('TestCallError', 'Pod'))[0])
+        self.assertEqual(1, h_metrics._ERRORS.get(
+            ('TestCallError', 'Pod', 'ValueError')))
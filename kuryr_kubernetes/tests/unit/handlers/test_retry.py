@@ -33,6 +33,33 @@ class _EX2(Exception):
     pass
 
 
+class TestRetryPolicy(test_base.TestCase):
+    def test_interval(self):
+        policy = h_retry.RetryPolicy(interval=3)
+
+        policy.observe(False)
+
+        self.assertEqual(3, policy.interval)
+
+    def test_adaptive_interval(self):
+        policy = h_retry.RetryPolicy(interval=4, min_interval=1,
+                                     max_interval=16, factor=2)
+        self.assertEqual(4, policy.interval)
+
+        policy.observe(False)
+        self.assertEqual(8, policy.interval)
+        policy.observe(False)
+        policy.observe(False)
+        self.assertEqual(16, policy.interval)
+        policy.observe(True)
+        self.assertEqual(8, policy.interval)
+        for _ in range(10):
+            policy.observe(True)
+        self.assertEqual(1, policy.interval)
+        self.assertEqual({'interval': 1, 'observations': 14, 'ready': 11},
+                         policy.stats())
+
+
 class TestRetryHandler(test_base.TestCase):
 
     def setUp(self):
@@ -148,3 +175,116 @@ class TestRetryHandler(test_base.TestCase):
 
         m_handler.assert_called_once_with(event)
         m_sleep.assert_not_called()
+
+    @mock.patch.object(h_retry.Retry, '_get_interval')
+    def test_call_requeue(self, m_get_interval):
+        event = mock.sentinel.event
+        failure = _EX1()
+        m_handler = mock.Mock()
+        m_handler.side_effect = [failure, None]
+        m_requeue = mock.Mock()
+        m_get_interval.return_value = 3
+        retry = h_retry.Retry(m_handler, timeout=10, exceptions=_EX1,
+                              requeue=m_requeue)
+
+        retry(event)
+
+        m_handler.assert_called_once_with(event)
+        m_get_interval.assert_called_once_with(self.now + 10, 1, failure)
+        m_requeue.assert_called_once_with(event, mock.ANY, 3)
+
+        retry_fn = m_requeue.call_args[0][1]
+        retry_fn(event)
+
+        m_handler.assert_has_calls([mock.call(event)] * 2)
+        m_requeue.assert_called_once()
+
+    @mock.patch.object(h_retry.Retry, '_get_interval')
+    def test_call_requeue_timeout(self, m_get_interval):
+        event = mock.sentinel.event
+        m_handler = mock.Mock()
+        m_handler.side_effect = _EX1()
+        m_requeue = mock.Mock()
+        m_get_interval.side_effect = [3, 0]
+        retry = h_retry.Retry(m_handler, timeout=10, exceptions=_EX1,
+                              requeue=m_requeue)
+
+        retry(event)
+        retry_fn = m_requeue.call_args[0][1]
+        with mock.patch.object(h_retry.LOG, 'exception') as m_log:
+            retry_fn(event)
+
+        m_log.assert_called_once()
+        m_get_interval.assert_called_with(self.now + 10, 2, mock.ANY)
+        m_requeue.assert_called_once()
+
+    def test_call_requeue_not_retried(self):
+        m_handler = mock.Mock()
+        m_handler.side_effect = _EX2()
+        m_requeue = mock.Mock()
+        retry = h_retry.Retry(m_handler, exceptions=_EX1, requeue=m_requeue)
+
+        self.assertRaises(_EX2, retry, mock.sentinel.event)
+        m_requeue.assert_not_called()
+
+    @mock.patch('time.sleep')
+    def test_call_policy(self, m_sleep):
+        m_handler = mock.Mock()
+        m_handler.side_effect = [_EX11(), None]
+        policy = h_retry.RetryPolicy(timeout=10, interval=1, min_interval=1,
+                                     max_interval=5)
+        retry = h_retry.Retry(m_handler, exceptions=_EX1, interval=7,
+                              policies={_EX1: policy})
+
+        with mock.patch('random.randint', return_value=1):
+            retry(mock.sentinel.event)
+
+        m_sleep.assert_called_once_with(1)
+        self.assertEqual({'interval': 1, 'observations': 1, 'ready': 1},
+                         policy.stats())
+        self.assertEqual(0, retry.get_policy_stats()['default'][
+            'observations'])
+
+    @mock.patch('time.sleep')
+    def test_call_policy_not_ready(self, m_sleep):
+        m_handler = mock.Mock()
+        m_handler.side_effect = [_EX11(), _EX11(), _EX11(), None]
+        policy = h_retry.RetryPolicy(timeout=100, interval=2, min_interval=1,
+                                     max_interval=5, factor=2)
+        retry = h_retry.Retry(m_handler, exceptions=_EX1,
+                              policies={_EX1: policy})
+
+        with mock.patch('random.randint', return_value=1):
+            retry(mock.sentinel.event)
+
+        m_sleep.assert_has_calls([mock.call(2), mock.call(4), mock.call(4)])
+        self.assertEqual({'interval': 4, 'observations': 1, 'ready': 0},
+                         policy.stats())
+
+    @mock.patch('time.sleep')
+    def test_call_default_policy(self, m_sleep):
+        m_handler = mock.Mock()
+        m_handler.side_effect = [_EX2(), None]
+        retry = h_retry.Retry(m_handler, interval=7, policies={
+            _EX1: h_retry.RetryPolicy(interval=1)})
+
+        with mock.patch('random.randint', return_value=1):
+            retry(mock.sentinel.event)
+
+        m_sleep.assert_called_once_with(7)
+
+    @mock.patch.object(h_retry.Retry, '_get_interval')
+    def test_call_requeue_observe(self, m_get_interval):
+        m_handler = mock.Mock()
+        m_handler.side_effect = [_EX1(), None]
+        m_requeue = mock.Mock()
+        m_get_interval.return_value = 1
+        policy = h_retry.RetryPolicy(timeout=20)
+        retry = h_retry.Retry(m_handler, exceptions=_EX1, requeue=m_requeue,
+                              policies={_EX1: policy})
+
+        retry(mock.sentinel.event)
+        m_get_interval.assert_called_once_with(self.now + 20, 1, mock.ANY)
+        m_requeue.call_args[0][1](mock.sentinel.event)
+
+        self.assertEqual(1, policy.stats()['ready'])
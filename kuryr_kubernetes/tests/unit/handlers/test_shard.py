@@ -0,0 +1,31 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import mock
+
+from kuryr_kubernetes.handlers import shard as h_shard
+from kuryr_kubernetes.tests import base as test_base
+
+
+class TestShardFilter(test_base.TestCase):
+    def test_call(self):
+        handler = mock.Mock()
+        owned = {'type': 'ADDED', 'object': {'metadata': {'name': 'a'}}}
+        other = {'type': 'ADDED', 'object': {'metadata': {'name': 'b'}}}
+        shard_filter = h_shard.ShardFilter(handler,
+                                           lambda event: event is owned)
+
+        shard_filter(owned)
+        shard_filter(other)
+
+        handler.assert_called_once_with(owned)
+        self.assertEqual({'dropped': 1, 'passed': 1}, shard_filter.stats())
@@ -0,0 +1,91 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import mock
+from os_vif import objects as osv_objects
+from os_vif.objects import fixed_ip as osv_fixed_ip
+from os_vif.objects import network as osv_network
+from os_vif.objects import route as osv_route
+from os_vif.objects import subnet as osv_subnet
+from os_vif.objects import vif as osv_vif
+from oslo_serialization import jsonutils
+
+from kuryr_kubernetes.objects import codec
+from kuryr_kubernetes.objects import lbaas as obj_lbaas
+from kuryr_kubernetes.tests import base as test_base
+
+
+class TestCodec(test_base.TestCase):
+
+    def setUp(self):
+        super(TestCodec, self).setUp()
+        osv_objects.register_all()
+        subnet = osv_subnet.Subnet(
+            cidr='10.0.0.0/24',
+            gateway='10.0.0.1',
+            dns=[],
+            ips=osv_fixed_ip.FixedIPList(objects=[
+                osv_fixed_ip.FixedIP(address='10.0.0.5')]),
+            routes=osv_route.RouteList(objects=[]))
+        self.vif = osv_vif.VIFOpenVSwitch(
+            id='4a2f25d5-3f5c-4e8a-9b59-25aa4a3a1a4e',
+            address='fa:16:3e:00:00:01',
+            active=True,
+            network=osv_network.Network(
+                id='8d2c8b2a-5d6b-4d43-9d3a-3fd2d0c5d0ef',
+                subnets=osv_subnet.SubnetList(objects=[subnet])))
+        self.vif.obj_reset_changes(recursive=True)
+        self.lbaas_state = obj_lbaas.LBaaSState(members=[
+            obj_lbaas.LBaaSMember(
+                id='6d6d4f3b-1c5e-4d9e-8d8f-6e6a1b0e5c%02d' % i,
+                project_id='project', name='member', port=8080,
+                pool_id='2f8c6f1e-8c5f-4b7e-9a86-8b4c5a3e1d2f',
+                subnet_id='9a5b1c7e-2d4f-4e8a-b6c3-1f2e3d4c5b6a',
+                ip='10.0.1.%d' % i)
+            for i in range(10)])
+        self.lbaas_state.obj_reset_changes(recursive=True)
+
+    def test_legacy(self):
+        annotation = codec.dumps(self.vif, codec.FORMAT_LEGACY)
+
+        self.assertEqual(jsonutils.dumps(self.vif.obj_to_primitive(),
+                                         sort_keys=True), annotation)
+        self.assertEqual(self.vif,
+                         codec.loads(osv_vif.VIFBase, annotation))
+
+    def test_compact(self):
+        annotation = codec.dumps(self.vif, codec.FORMAT_COMPACT)
+        primitive = jsonutils.loads(annotation)
+
+        self.assertEqual(codec.COMPACT_VERSION, primitive['v'])
+        self.assertEqual(['os_vif', 'VIFOpenVSwitch', '1.0'],
+                         primitive['c'][primitive['o']['_'][0]][:3])
+        self.assertNotIn('versioned_object', annotation)
+        self.assertEqual(self.vif,
+                         codec.loads(osv_vif.VIFBase, annotation))
+
+    def test_compact_shares_classes(self):
+        annotation = codec.dumps(self.lbaas_state, codec.FORMAT_COMPACT)
+        primitive = jsonutils.loads(annotation)
+
+        self.assertEqual(2, len(primitive['c']))
+        self.assertLess(len(annotation), len(codec.dumps(
+            self.lbaas_state, codec.FORMAT_LEGACY)))
+        self.assertEqual(self.lbaas_state,
+                         codec.loads(obj_lbaas.LBaaSState, annotation))
+
+    @mock.patch('kuryr_kubernetes.config.CONF')
+    def test_dumps_configured_format(self, m_cfg):
+        m_cfg.kubernetes.annotation_format = codec.FORMAT_COMPACT
+
+        self.assertEqual(codec.dumps(self.vif, codec.FORMAT_COMPACT),
+                         codec.dumps(self.vif))
@@ -0,0 +1,109 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import mock
+
+from kuryr_kubernetes import annotations
+from kuryr_kubernetes.objects import codec as obj_codec
+from kuryr_kubernetes.objects import lbaas as obj_lbaas
+from kuryr_kubernetes.tests import base as test_base
+
+_KEY = 'openstack.org/kuryr-lbaas-state'
+
+
+class TestAnnotationCache(test_base.TestCase):
+
+    def setUp(self):
+        super(TestAnnotationCache, self).setUp()
+        self.state = obj_lbaas.LBaaSState(members=[
+            obj_lbaas.LBaaSMember(
+                id='6d6d4f3b-1c5e-4d9e-8d8f-6e6a1b0e5c%02d' % i,
+                project_id='project', name='member', port=8080,
+                pool_id='2f8c6f1e-8c5f-4b7e-9a86-8b4c5a3e1d2f',
+                subnet_id='9a5b1c7e-2d4f-4e8a-b6c3-1f2e3d4c5b6a',
+                ip='10.0.1.%d' % i)
+            for i in range(3)])
+        self.state.obj_reset_changes(recursive=True)
+        self.cache = annotations.AnnotationCache(2)
+
+    def _resource(self, state, link='/api/v1/endpoints/svc'):
+        return {'metadata': {
+            'selfLink': link,
+            'annotations': {_KEY: obj_codec.dumps(state, 'legacy')}}}
+
+    def test_get_missing(self):
+        self.assertIsNone(self.cache.get({'metadata': {}}, _KEY,
+                                         obj_lbaas.LBaaSState))
+
+    @mock.patch('kuryr_kubernetes.objects.codec.loads',
+                wraps=obj_codec.loads)
+    def test_get_cached(self, m_loads):
+        resource = self._resource(self.state)
+
+        first = self.cache.get(resource, _KEY, obj_lbaas.LBaaSState)
+        second = self.cache.get(resource, _KEY, obj_lbaas.LBaaSState)
+
+        self.assertEqual(self.state, first)
+        self.assertEqual(self.state, second)
+        self.assertIsNot(first, second)
+        self.assertIsNot(first.members[0], second.members[0])
+        self.assertEqual(1, m_loads.call_count)
+        stats = self.cache.stats()
+        self.assertEqual((1, 1), (stats['hits'], stats['misses']))
+
+    def test_get_modified_clone(self):
+        resource = self._resource(self.state)
+
+        obj = self.cache.get(resource, _KEY, obj_lbaas.LBaaSState)
+        obj.members[0].port = 80
+        del obj.members[1]
+
+        self.assertEqual(self.state,
+                         self.cache.get(resource, _KEY, obj_lbaas.LBaaSState))
+
+    def test_get_changed_annotation(self):
+        self.cache.get(self._resource(self.state), _KEY,
+                       obj_lbaas.LBaaSState)
+        self.state.members = self.state.members[:1]
+        self.state.obj_reset_changes(recursive=True)
+
+        obj = self.cache.get(self._resource(self.state), _KEY,
+                             obj_lbaas.LBaaSState)
+
+        self.assertEqual(self.state, obj)
+        self.assertEqual(2, self.cache.stats()['misses'])
+        self.assertEqual(1, self.cache.stats()['size'])
+
+    def test_get_bounded(self):
+        for link in ('a', 'b', 'c'):
+            self.cache.get(self._resource(self.state, link), _KEY,
+                           obj_lbaas.LBaaSState)
+
+        self.assertEqual([('b', _KEY), ('c', _KEY)],
+                         list(self.cache._entries))
+
+
+class TestClone(test_base.TestCase):
+
+    def test_clone(self):
+        member = obj_lbaas.LBaaSMember(port=8080, ip='10.0.0.1')
+        state = obj_lbaas.LBaaSState(members=[member])
+        state.obj_reset_changes(recursive=True)
+
+        clone = annotations.clone(state)
+
+        self.assertEqual(state, clone)
+        self.assertIsNot(state.members, clone.members)
+        self.assertIsNot(member, clone.members[0])
+        clone.members[0].port = 80
+        self.assertEqual(8080, member.port)
+        self.assertEqual(set(), state.members[0].obj_what_changed())
@@ -31,6 +31,8 @@ class TestK8sClient(test_base.TestCase):
         k8s_dummy = object()
 
         m_cfg.kubernetes.api_root = k8s_api_root
+        m_cfg.neutron.rate_limit = 0
+        m_cfg.neutron.max_concurrent_requests = 0
         m_neutron.return_value = neutron_dummy
         m_k8s.return_value = k8s_dummy
 
@@ -38,4 +40,100 @@ class TestK8sClient(test_base.TestCase):
 
         m_k8s.assert_called_with(k8s_api_root)
         self.assertIs(k8s_dummy, clients.get_kubernetes_client())
-        self.assertIs(neutron_dummy, clients.get_neutron_client())
+        self.assertIs(neutron_dummy, clients.get_neutron_client()._client)
+
+    @mock.patch('kuryr_kubernetes.clients.get_neutron_client')
+    def test_authenticate_neutron_client(self, m_get_neutron):
+        httpclient = m_get_neutron.return_value.httpclient
+
+        clients.authenticate_neutron_client()
+
+        httpclient.get_token.assert_called_once_with()
+        httpclient.get_endpoint.assert_called_once_with()
+
+
+class TestNeutronClientProxy(test_base.TestCase):
+
+    def test_call(self):
+        neutron = mock.Mock()
+        neutron.show_port.return_value = mock.sentinel.port
+        proxy = clients._NeutronClientProxy(neutron)
+        count, _ = clients._NEUTRON_DURATION.get(('show_port',))
+
+        self.assertEqual(mock.sentinel.port, proxy.show_port('id'))
+        neutron.show_port.assert_called_once_with('id')
+        self.assertEqual(count + 1,
+                         clients._NEUTRON_DURATION.get(('show_port',))[0])
+        self.assertIs(proxy.show_port, proxy.show_port)
+
+    def test_call_error(self):
+        neutron = mock.Mock()
+        neutron.delete_port.side_effect = ValueError()
+        proxy = clients._NeutronClientProxy(neutron)
+        errors = clients._NEUTRON_ERRORS.get(('delete_port', 'ValueError'))
+
+        self.assertRaises(ValueError, proxy.delete_port, 'id')
+        self.assertEqual(errors + 1, clients._NEUTRON_ERRORS.get(
+            ('delete_port', 'ValueError')))
+
+    def test_attribute(self):
+        neutron = mock.Mock()
+        neutron.format = 'json'
+        proxy = clients._NeutronClientProxy(neutron)
+
+        self.assertEqual('json', proxy.format)
+
+    def test_get_call_stats(self):
+        neutron = mock.Mock()
+        neutron.delete_port.side_effect = [None, ValueError()]
+        proxy = clients._NeutronClientProxy(neutron)
+
+        proxy.delete_port('id1')
+        self.assertRaises(ValueError, proxy.delete_port, 'id2')
+        proxy.show_port('id1')
+
+        stats = proxy.get_call_stats()
+        self.assertEqual({'delete_port', 'show_port'}, set(stats))
+        self.assertEqual(2, stats['delete_port']['calls'])
+        self.assertEqual(1, stats['delete_port']['errors'])
+        self.assertEqual(0.5, stats['delete_port']['error_rate'])
+        self.assertEqual(0, stats['show_port']['errors'])
+        self.assertIn('time', stats['show_port'])
+        self.assertIn('wait_time', stats['show_port'])
+
+    @mock.patch('time.sleep')
+    @mock.patch('time.time')
+    def test_rate_limit(self, m_time, m_sleep):
+        now = [100.0]
+        m_time.side_effect = lambda: now[0]
+        m_sleep.side_effect = lambda s: now.__setitem__(0, now[0] + s)
+        neutron = mock.Mock()
+        proxy = clients._NeutronClientProxy(neutron, rate_limit=2,
+                                            rate_limit_burst=2)
+
+        proxy.show_port('id')
+        proxy.show_port('id')
+        m_sleep.assert_not_called()
+        proxy.show_port('id')
+
+        m_sleep.assert_called_once_with(0.5)
+        self.assertEqual(3, neutron.show_port.call_count)
+        self.assertEqual(0.5, proxy.get_call_stats()['show_port']['wait_time'])
+
+    def test_max_concurrent_requests(self):
+        neutron = mock.Mock()
+        proxy = clients._NeutronClientProxy(neutron,
+                                            max_concurrent_requests=1)
+
+        def _show_port(port_id):
+            # NOTE: the semaphore is held during the call
+            self.assertFalse(proxy._semaphore.acquire(False))
+            self.assertEqual(1, clients._NEUTRON_IN_FLIGHT.get())
+        neutron.show_port.side_effect = _show_port
+
+        proxy.show_port('id')
+        neutron.show_port.side_effect = ValueError()
+        self.assertRaises(ValueError, proxy.show_port, 'id')
+
+        self.assertTrue(proxy._semaphore.acquire(False))
+        self.assertEqual(0, clients._NEUTRON_IN_FLIGHT.get())
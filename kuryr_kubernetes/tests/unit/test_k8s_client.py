@@ -74,7 +74,8 @@ class TestK8sClient(test_base.TestCase):
 
         self.assertEqual(ret, self.client.get(path))
         m_get.assert_called_once_with(self.base_url + path,
-                                      cert=(None, None), verify=False)
+                                      cert=(None, None), verify=False,
+                                      headers={})
 
     @mock.patch('requests.get')
     def test_get_exception(self, m_get):
@@ -86,6 +87,84 @@ class TestK8sClient(test_base.TestCase):
 
         self.assertRaises(exc.K8sClientException, self.client.get, path)
 
+    @mock.patch('requests.get')
+    def test_get_not_found(self, m_get):
+        m_resp = mock.MagicMock()
+        m_resp.ok = False
+        m_resp.status_code = requests.codes.not_found
+        m_get.return_value = m_resp
+
+        self.assertRaises(exc.K8sResourceNotFound, self.client.get, '/test')
+
+    @mock.patch('kuryr_kubernetes.config.CONF')
+    @mock.patch('requests.get')
+    def test_get_token(self, m_get, m_cfg):
+        m_cfg.kubernetes.ssl_verify_server_crt = False
+        m_cfg.kubernetes.token_file = 'token_file'
+        with mock.patch('six.moves.builtins.open',
+                        mock.mock_open(read_data='token\n')):
+            client = k8s_client.K8sClient(self.base_url)
+
+        client.get('/test')
+
+        m_get.assert_called_once_with(
+            self.base_url + '/test', cert=mock.ANY, verify=False,
+            headers={'Authorization': 'Bearer token'})
+
+    @mock.patch('requests.post')
+    def test_post(self, m_post):
+        path = '/test'
+        body = {'metadata': {'name': 'test'}}
+        m_resp = mock.MagicMock()
+        m_resp.ok = True
+        m_post.return_value = m_resp
+
+        self.assertEqual(m_resp.json.return_value,
+                         self.client.post(path, body))
+        m_post.assert_called_once_with(self.base_url + path,
+                                       data=jsonutils.dumps(body),
+                                       headers=mock.ANY,
+                                       cert=(None, None), verify=False)
+
+    @mock.patch('requests.patch')
+    def test_patch_crd(self, m_patch):
+        path = '/test'
+        m_resp = mock.MagicMock()
+        m_resp.ok = True
+        m_patch.return_value = m_resp
+
+        self.client.patch_crd('status', path, {'a': 'b'})
+
+        m_patch.assert_called_once_with(
+            self.base_url + path,
+            data=jsonutils.dumps([{'op': 'add', 'path': '/status',
+                                   'value': {'a': 'b'}}]),
+            headers={'Content-Type': 'application/json-patch+json',
+                     'Accept': 'application/json'},
+            cert=(None, None), verify=False)
+
+    @mock.patch('requests.patch')
+    def test_patch_crd_not_found(self, m_patch):
+        m_resp = mock.MagicMock()
+        m_resp.ok = False
+        m_resp.status_code = requests.codes.not_found
+        m_patch.return_value = m_resp
+
+        self.assertRaises(exc.K8sResourceNotFound, self.client.patch_crd,
+                          'spec', '/test', {})
+
+    @mock.patch('requests.delete')
+    def test_delete(self, m_delete):
+        path = '/test'
+        m_resp = mock.MagicMock()
+        m_resp.ok = True
+        m_delete.return_value = m_resp
+
+        self.client.delete(path)
+
+        m_delete.assert_called_once_with(self.base_url + path, headers={},
+                                         cert=(None, None), verify=False)
+
     @mock.patch('itertools.count')
     @mock.patch('requests.patch')
     def test_annotate(self, m_patch, m_count):
@@ -237,6 +316,69 @@ class TestK8sClient(test_base.TestCase):
                                         headers=mock.ANY,
                                         cert=(None, None), verify=False)
 
+    @mock.patch('requests.patch')
+    def test_annotate_own_value_conflict(self, m_patch):
+        path = '/api/v1/namespaces/default/pods/test'
+        m_resp_good = mock.MagicMock()
+        m_resp_good.ok = True
+        m_resp_conflict = mock.MagicMock()
+        m_resp_conflict.ok = False
+        m_resp_conflict.status_code = requests.codes.conflict
+        m_patch.side_effect = [m_resp_good, m_resp_conflict]
+
+        self.client.annotate(path, {'a1': 'v0'}, resource_version='1')
+        with mock.patch.object(self.client, 'get') as m_get:
+            m_get.return_value = {'metadata': {
+                'annotations': {'a1': 'v0'}, 'resourceVersion': '2'}}
+            self.assertRaises(exc.K8sClientException, self.client.annotate,
+                              path, {'a1': 'v1'}, resource_version='1')
+
+        self.assertEqual(2, m_patch.call_count)
+        self.assertEqual({'pods': {'patches': 2, 'conflicts': 1}},
+                         self.client.get_annotate_stats())
+
+    @mock.patch('requests.patch')
+    def test_annotate_conflict_retries_bounded(self, m_patch):
+        path = '/api/v1/namespaces/default/endpoints/test'
+        m_resp_conflict = mock.MagicMock()
+        m_resp_conflict.ok = False
+        m_resp_conflict.status_code = requests.codes.conflict
+        m_patch.return_value = m_resp_conflict
+
+        with mock.patch.object(self.client, 'get') as m_get:
+            m_get.side_effect = [
+                {'metadata': {'resourceVersion': str(version)}}
+                for version in range(2, 6)]
+            self.assertRaises(exc.K8sClientException, self.client.annotate,
+                              path, {'a1': 'v1'}, resource_version='1')
+
+        self.assertEqual(['1', '2', '3', '4'], [
+            jsonutils.loads(call[1]['data'])['metadata']['resourceVersion']
+            for call in m_patch.call_args_list])
+        self.assertEqual({'endpoints': {'patches': 4, 'conflicts': 4,
+                                        'retries': 3}},
+                         self.client.get_annotate_stats())
+
+    @mock.patch('requests.patch')
+    def test_annotate_suppress_echo(self, m_patch):
+        path = '/api/v1/namespaces/default/pods/test'
+        m_resp = mock.MagicMock()
+        m_resp.ok = True
+        m_resp.json.return_value = {'metadata': {
+            'annotations': {'a1': 'v1'}, 'resourceVersion': '2'}}
+        m_patch.return_value = m_resp
+
+        self.client.annotate(path, {'a1': 'v1'}, resource_version='1')
+        self.assertIsNone(self.client.pop_written_version(path))
+
+        self.client.annotate(path, {'a1': 'v1'}, resource_version='1',
+                             suppress_echo=True)
+        self.assertEqual(('1', '2'), self.client.pop_written_version(path))
+        self.assertIsNone(self.client.pop_written_version(path))
+
+        self.client.annotate(path, {'a1': 'v1'}, suppress_echo=True)
+        self.assertIsNone(self.client.pop_written_version(path))
+
     @mock.patch('requests.get')
     def test_watch(self, m_get):
         path = '/test'
@@ -258,7 +400,7 @@ class TestK8sClient(test_base.TestCase):
         self.assertEqual(cycles, m_resp.close.call_count)
         m_get.assert_called_with(self.base_url + path, stream=True,
                                  params={'watch': 'true'}, cert=(None, None),
-                                 verify=False)
+                                 verify=False, headers={})
 
     @mock.patch('requests.get')
     def test_watch_exception(self, m_get):
@@ -59,3 +59,15 @@ class LinuxNetworkUtilsTestCase(test_base.TestCase):
         with mock.patch.object(utils, 'execute', return_value=('', '')) as ex:
             linux_net.delete_ovs_vif_port('fake-bridge', 'fake-dev')
             ex.assert_has_calls(calls)
+
+    def test_create_ovs_vif_ports_vsctl_batch(self):
+        ports = [('fake-bridge', 'fake-dev%s' % i, 'fake-iface-id%s' % i,
+                  'fake-mac%s' % i, 'fake-instance-uuid')
+                 for i in range(2)]
+        expected = ['ovs-vsctl']
+        for port in ports:
+            expected += linux_net._create_ovs_vif_cmd(*port)
+
+        with mock.patch.object(utils, 'execute', return_value=('', '')) as ex:
+            linux_net.create_ovs_vif_ports(ports)
+            ex.assert_called_once_with(*expected, run_as_root=True)
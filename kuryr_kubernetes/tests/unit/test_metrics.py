@@ -0,0 +1,177 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import threading
+
+import requests
+
+from kuryr_kubernetes import metrics
+from kuryr_kubernetes.tests import base as test_base
+
+
+class TestRegistry(test_base.TestCase):
+    def setUp(self):
+        super(TestRegistry, self).setUp()
+        self.registry = metrics.Registry()
+
+    def test_counter(self):
+        counter = self.registry.counter('test_total', "Test", ['a', 'b'])
+        counter.inc(('x', 'y'))
+        counter.inc(('x', 'y'), 2)
+        counter.inc(('x', 'z"'))
+
+        self.assertEqual(3, counter.get(('x', 'y')))
+        self.assertEqual('# HELP test_total Test\n'
+                         '# TYPE test_total counter\n'
+                         'test_total{a="x",b="y"} 3.0\n'
+                         'test_total{a="x",b="z\\""} 1.0\n',
+                         self.registry.render())
+
+    def test_gauge_function(self):
+        gauge = self.registry.gauge('test', "Test")
+        gauge.set_function(lambda: {(): 5})
+
+        self.assertEqual('# HELP test Test\n'
+                         '# TYPE test gauge\n'
+                         'test 5.0\n', self.registry.render())
+
+    def test_histogram(self):
+        histogram = self.registry.histogram('test_seconds', "Test", ['a'],
+                                            buckets=(0.1, 1))
+        histogram.observe(0.05, ('x',))
+        histogram.observe(0.5, ('x',))
+        histogram.observe(5, ('x',))
+
+        self.assertEqual((3, 5.55), histogram.get(('x',)))
+        self.assertEqual('# HELP test_seconds Test\n'
+                         '# TYPE test_seconds histogram\n'
+                         'test_seconds_bucket{a="x",le="0.1"} 1.0\n'
+                         'test_seconds_bucket{a="x",le="1.0"} 2.0\n'
+                         'test_seconds_bucket{a="x",le="+Inf"} 3.0\n'
+                         'test_seconds_sum{a="x"} 5.55\n'
+                         'test_seconds_count{a="x"} 3.0\n',
+                         self.registry.render())
+
+    def test_histogram_set_function(self):
+        histogram = self.registry.histogram('test_seconds', "Test")
+
+        self.assertRaises(TypeError, histogram.set_function, lambda: {})
+
+    def test_get_existing(self):
+        counter = self.registry.counter('test_total', "Test")
+
+        self.assertIs(counter, self.registry.counter('test_total', "Test"))
+        self.assertRaises(ValueError, self.registry.gauge, 'test_total',
+                          "Test")
+        self.assertRaises(ValueError, self.registry.counter, 'test_total',
+                          "Test", ['a'])
+
+    def test_snapshot_collector(self):
+        other = metrics.Registry()
+        other.counter('test_total', "Test", ['a']).inc(('x',), 2)
+        other.histogram('test_seconds', "Test", buckets=(1,)).observe(0.5)
+        other.gauge('test', "Test").set_function(lambda: {(): 5})
+        counter = self.registry.counter('test_total', "Test", ['a'])
+        counter.inc(('x',))
+        counter.inc(('y',))
+        self.registry.histogram('test_seconds', "Test",
+                                buckets=(1,)).observe(2)
+        self.registry.gauge('test', "Test").set_function(lambda: {(): 1})
+        snapshot = other.snapshot()
+
+        self.registry.add_collector(lambda: [snapshot, snapshot])
+
+        self.assertEqual(['test_seconds', 'test_total'], sorted(snapshot))
+        self.assertEqual('# HELP test_total Test\n'
+                         '# TYPE test_total counter\n'
+                         'test_total{a="x"} 5.0\n'
+                         'test_total{a="y"} 1.0\n'
+                         '# HELP test_seconds Test\n'
+                         '# TYPE test_seconds histogram\n'
+                         'test_seconds_bucket{le="1.0"} 2.0\n'
+                         'test_seconds_bucket{le="+Inf"} 3.0\n'
+                         'test_seconds_sum 3.0\n'
+                         'test_seconds_count 3.0\n'
+                         '# HELP test Test\n'
+                         '# TYPE test gauge\n'
+                         'test 1.0\n', self.registry.render())
+        self.assertEqual(1, counter.get(('x',)))
+
+    def test_clear(self):
+        self.registry.counter('test_total', "Test").inc()
+
+        self.registry.clear()
+
+        self.assertEqual({}, self.registry.snapshot())
+
+    def test_render_failure(self):
+        self.registry.gauge('test1', "Test").set_function(lambda: 1 / 0)
+        self.registry.gauge('test2', "Test").set(1)
+
+        self.assertEqual('# HELP test2 Test\n'
+                         '# TYPE test2 gauge\n'
+                         'test2 1.0\n', self.registry.render())
+
+
+class TestMetricsServer(test_base.TestCase):
+    def test_serve(self):
+        registry = metrics.Registry()
+        registry.counter('test_total', "Test").inc()
+        server = metrics.MetricsServer('127.0.0.1', 0, registry)
+        server.add_route('/other', lambda query: (
+            200, 'text/plain', query['a'][0]))
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(server.shutdown)
+        base_url = 'http://127.0.0.1:%s' % server.port
+
+        response = requests.get(base_url + '/metrics')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(metrics.CONTENT_TYPE,
+                         response.headers['Content-Type'])
+        self.assertIn('test_total 1.0', response.text)
+        self.assertEqual('b', requests.get(base_url + '/other?a=b').text)
+        self.assertEqual(404, requests.get(base_url + '/none').status_code)
+
+    def test_serve_concurrently(self):
+        server = metrics.MetricsServer('127.0.0.1', 0, metrics.Registry())
+        started = threading.Event()
+        release = threading.Event()
+
+        def _slow(query):
+            started.set()
+            release.wait(5)
+            return 200, 'text/plain', 'done'
+
+        server.add_route('/slow', _slow)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(server.shutdown)
+        base_url = 'http://127.0.0.1:%s' % server.port
+        responses = []
+        slow = threading.Thread(target=lambda: responses.append(
+            requests.get(base_url + '/slow')))
+        slow.start()
+        self.addCleanup(slow.join)
+        self.addCleanup(release.set)
+        self.assertTrue(started.wait(5))
+
+        # NOTE: '/metrics' is served while '/slow' is still in progress
+        self.assertEqual(200, requests.get(base_url + '/metrics',
+                                           timeout=5).status_code)
+        self.assertEqual([], responses)
+
+        release.set()
+        slow.join(5)
+        self.assertEqual('done', responses[0].text)
@@ -0,0 +1,158 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import os
+import shutil
+import tempfile
+
+import greenlet
+import mock
+
+from kuryr_kubernetes import profiler
+from kuryr_kubernetes.tests import base as test_base
+
+
+def _waiting():
+    greenlet.getcurrent().parent.switch()
+
+
+class TestSamplingProfiler(test_base.TestCase):
+
+    def test_sample(self):
+        prof = profiler.SamplingProfiler()
+
+        prof.sample()
+
+        self.assertEqual(1, prof.samples)
+        stacks = prof.collapsed().splitlines()
+        self.assertEqual(1, len(stacks))
+        frames, count = stacks[0].rsplit(' ', 1)
+        self.assertEqual('1', count)
+        self.assertIn('test_sample (', frames.split(';')[-2])
+        self.assertIn('sample (', frames.split(';')[-1])
+
+    def test_sample_all_greenthreads(self):
+        waiting = greenlet.greenlet(_waiting)
+        waiting.switch()
+        self.addCleanup(waiting.throw, greenlet.GreenletExit)
+
+        prof = profiler.SamplingProfiler(all_greenthreads=True)
+        prof.sample()
+        prof.sample()
+
+        self.assertIn('_waiting (', prof.collapsed())
+        for stack in prof.collapsed().splitlines():
+            self.assertTrue(stack.endswith(' 2'))
+
+        prof = profiler.SamplingProfiler()
+        prof.sample()
+
+        self.assertNotIn('_waiting (', prof.collapsed())
+
+    def test_start_stop(self):
+        prof = profiler.SamplingProfiler(interval=0.001)
+
+        prof.start()
+        profiler._time.sleep(0.05)
+        stacks = prof.stop()
+
+        self.assertGreater(prof.samples, 0)
+        self.assertEqual(prof.samples, sum(stacks.values()))
+
+
+class TestProfiler(test_base.TestCase):
+
+    def test_profile(self):
+        collapsed = profiler.profile(0.05, interval=0.001,
+                                     all_greenthreads=False)
+
+        self.assertIn('test_profile (', collapsed)
+        self.assertIsNone(profiler._active)
+
+    def test_profile_collectors(self):
+        self.addCleanup(profiler.reset)
+        collector = mock.Mock(return_value=[('worker-0', 'a;b 2\nc 1\n')])
+        profiler.add_collector(collector)
+        profiler.add_collector(mock.Mock(side_effect=Exception()))
+
+        collapsed = profiler.profile(0.05, interval=0.001,
+                                     all_greenthreads=False)
+
+        collector.assert_called_once_with(0.05)
+        self.assertIn('test_profile_collectors (', collapsed)
+        self.assertTrue(collapsed.endswith('worker-0;a;b 2\nworker-0;c 1\n'))
+
+    def test_reset(self):
+        profiler._active = mock.sentinel.profiler
+        profiler.add_collector(mock.Mock())
+
+        profiler.reset()
+
+        self.assertIsNone(profiler._active)
+        self.assertEqual([], profiler._collectors)
+
+    def test_profile_running(self):
+        self.addCleanup(setattr, profiler, '_active', None)
+        profiler._active = mock.sentinel.profiler
+
+        self.assertIsNone(profiler.profile(1, interval=0.001,
+                                           all_greenthreads=False))
+
+    @mock.patch('kuryr_kubernetes.profiler.profile')
+    @mock.patch('kuryr_kubernetes.config.CONF')
+    def test_profile_to_file(self, m_cfg, m_profile):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        m_cfg.profiler.output_dir = tmp_dir
+        m_profile.return_value = 'a;b 2\n'
+
+        path = profiler.profile_to_file(10, 'kuryr-controller')
+
+        m_profile.assert_called_once_with(10)
+        self.assertEqual(tmp_dir, os.path.dirname(path))
+        self.assertTrue(os.path.basename(path).startswith(
+            'kuryr-controller-%d-' % os.getpid()))
+        with open(path) as f:
+            self.assertEqual('a;b 2\n', f.read())
+
+    @mock.patch('kuryr_kubernetes.profiler.profile')
+    def test_profile_to_file_running(self, m_profile):
+        m_profile.return_value = None
+
+        self.assertIsNone(profiler.profile_to_file(10, 'kuryr-controller'))
+
+    @mock.patch('kuryr_kubernetes.profiler.profile')
+    @mock.patch('kuryr_kubernetes.config.CONF')
+    def test_handle_request(self, m_cfg, m_profile):
+        m_cfg.profiler.duration = 30
+        m_cfg.profiler.max_duration = 60
+        m_profile.return_value = 'a;b 2\n'
+
+        self.assertEqual((200, 'text/plain', 'a;b 2\n'),
+                         profiler.handle_request({'seconds': ['2.5']}))
+        m_profile.assert_called_once_with(2.5)
+        profiler.handle_request({})
+        m_profile.assert_called_with(30.0)
+
+    @mock.patch('kuryr_kubernetes.profiler.profile')
+    @mock.patch('kuryr_kubernetes.config.CONF')
+    def test_handle_request_invalid(self, m_cfg, m_profile):
+        m_cfg.profiler.max_duration = 60
+
+        for seconds in ('foo', '0', '61'):
+            status, _, _ = profiler.handle_request({'seconds': [seconds]})
+            self.assertEqual(400, status)
+        m_profile.assert_not_called()
+
+        m_profile.return_value = None
+        status, _, _ = profiler.handle_request({'seconds': ['1']})
+        self.assertEqual(409, status)
@@ -0,0 +1,166 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import os
+import shutil
+import tempfile
+
+import mock
+
+from kuryr_kubernetes.tests import base as test_base
+from kuryr_kubernetes import tracing
+
+
+def _event(uid, version, kind='Pod'):
+    return {'type': 'MODIFIED',
+            'object': {'kind': kind,
+                       'metadata': {'uid': uid,
+                                    'resourceVersion': version}}}
+
+
+class TestTracing(test_base.TestCase):
+    def setUp(self):
+        super(TestTracing, self).setUp()
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        self.path = os.path.join(tmp_dir, 'trace.json')
+        self.addCleanup(tracing.shutdown)
+
+    def _setup(self, service_name='kuryr-controller'):
+        with mock.patch('kuryr_kubernetes.config.CONF') as m_cfg:
+            m_cfg.tracing.trace_file = self.path
+            tracing.setup(service_name)
+
+    def _load(self):
+        with open(self.path) as f:
+            return tracing.load_spans(f)
+
+    @mock.patch('kuryr_kubernetes.config.CONF')
+    def test_disabled(self, m_cfg):
+        m_cfg.tracing.trace_file = None
+        tracing.setup('kuryr-controller')
+
+        with tracing.span('stage', 'uid'):
+            pass
+        tracing.received(_event('uid', '1'))
+
+        self.assertFalse(tracing.is_enabled())
+        self.assertFalse(os.path.exists(self.path))
+
+    @mock.patch('time.time')
+    def test_span(self, m_time):
+        m_time.side_effect = [10.0, 10.5]
+        self._setup()
+
+        with tracing.span('stage', 'uid', foo='bar'):
+            pass
+
+        spans = self._load()
+        self.assertEqual(1, len(spans))
+        self.assertEqual({'trace': spans[0]['trace'],
+                          'service': 'kuryr-controller',
+                          'name': 'stage',
+                          'start': 10.0,
+                          'end': 10.5,
+                          'attributes': {'foo': 'bar',
+                                         'k8s.pod.uid': 'uid'}},
+                         spans[0])
+        self.assertEqual(32, len(spans[0]['trace']))
+
+    def test_span_error(self):
+        self._setup()
+
+        def _fail():
+            with tracing.span('stage', 'uid'):
+                raise ValueError()
+        self.assertRaises(ValueError, _fail)
+
+        with open(self.path) as f:
+            self.assertIn('"message": "ValueError"', f.read())
+
+    def test_span_correlation(self):
+        self._setup('kuryr-controller')
+        with tracing.span('stage1', 'uid1'):
+            pass
+        with tracing.span('stage2', 'uid2'):
+            pass
+        tracing.shutdown()
+        self._setup('kuryr-cni')
+        with tracing.span('stage3', 'uid1'):
+            pass
+
+        spans = self._load()
+        self.assertEqual(['kuryr-controller', 'kuryr-controller',
+                          'kuryr-cni'], [s['service'] for s in spans])
+        self.assertEqual(spans[0]['trace'], spans[2]['trace'])
+        self.assertNotEqual(spans[0]['trace'], spans[1]['trace'])
+
+    @mock.patch('time.time')
+    def test_received_dequeued(self, m_time):
+        m_time.side_effect = [1.0, 2.0, 4.0]
+        self._setup()
+
+        tracing.received(_event('uid', '1'))
+        tracing.received(_event('uid', '2'))
+        tracing.dequeued(_event('uid', '2'))
+        tracing.dequeued(_event('uid', '3'))
+        tracing.received(_event('uid', '3', kind='Service'))
+
+        spans = self._load()
+        self.assertEqual(['watch.receive', 'watch.receive', 'async.queue'],
+                         [s['name'] for s in spans])
+        self.assertEqual((2.0, 4.0), (spans[2]['start'], spans[2]['end']))
+        self.assertEqual('2', spans[2]['attributes']['resource_version'])
+
+    @mock.patch('time.time')
+    def test_pop_set_received(self, m_time):
+        m_time.side_effect = [1.0, 4.0]
+        self._setup()
+
+        tracing.received(_event('uid', '1'))
+        start = tracing.pop_received(_event('uid', '1'))
+        self.assertIsNone(tracing.pop_received(_event('uid', '1')))
+        # NOTE: as done by the worker the event is passed to
+        tracing.set_received(_event('uid', '1'), start)
+        tracing.dequeued(_event('uid', '1'))
+
+        spans = self._load()
+        self.assertEqual(['watch.receive', 'async.queue'],
+                         [s['name'] for s in spans])
+        self.assertEqual((1.0, 4.0), (spans[1]['start'], spans[1]['end']))
+        self.assertEqual({}, tracing._received)
+
+    def test_get_breakdown(self):
+        spans = [
+            {'trace': 't1', 'service': 'ctrl', 'name': 'a', 'start': 0.0,
+             'end': 1.0},
+            {'trace': 't1', 'service': 'cni', 'name': 'b', 'start': 2.0,
+             'end': 4.0},
+            {'trace': 't1', 'service': 'cni', 'name': 'b', 'start': 5.0,
+             'end': 5.5},
+            {'trace': 't2', 'service': 'ctrl', 'name': 'a', 'start': 10.0,
+             'end': 13.0},
+        ]
+
+        breakdown = tracing.get_breakdown(spans)
+
+        self.assertEqual(2, breakdown['pods'])
+        self.assertEqual(2, breakdown['total']['count'])
+        self.assertEqual(5.5, breakdown['total']['max'])
+        self.assertEqual({'ctrl/a', 'cni/b'}, set(breakdown['stages']))
+        stage = breakdown['stages']['cni/b']
+        self.assertEqual(2, stage['duration']['count'])
+        self.assertEqual(1.25, stage['duration']['mean'])
+        self.assertEqual(1, stage['offset']['count'])
+        self.assertEqual(2.0, stage['offset']['mean'])
+        stage = breakdown['stages']['ctrl/a']
+        self.assertEqual(2.0, stage['duration']['mean'])
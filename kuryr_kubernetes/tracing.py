@@ -0,0 +1,298 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Tracing of the pod networking setup.
+
+The stages a pod goes through between its scheduling and its networking
+(receipt of the watch events by the controller and the CNI, the wait in the
+handler queue, the driver calls, the annotation and the plugging) are
+recorded as spans correlated by the pod UID: the spans of a pod share the
+trace ID derived from its UID in both the controller and the CNI.
+
+Tracing is enabled by `setup` when the `[tracing]trace_file` option is set.
+Each span is appended to that file as an OTLP JSON export request on its own
+line, which the OpenTelemetry collector can ingest (e.g. with its
+'otlpjsonfile' receiver) and `get_breakdown` summarizes offline (see
+'tools/trace_report.py').
+"""
+
+import binascii
+import collections
+import contextlib
+import hashlib
+import os
+import time
+
+from oslo_log import log as logging
+from oslo_serialization import jsonutils
+
+from kuryr_kubernetes import config
+from kuryr_kubernetes import constants
+
+LOG = logging.getLogger(__name__)
+
+_MAX_RECEIVED = 4096
+_SPAN_KIND_INTERNAL = 1
+_STATUS_ERROR = 2
+_POD_UID = 'k8s.pod.uid'
+_SERVICE_NAME = 'service.name'
+
+_exporter = None
+_received = collections.OrderedDict()
+
+
+def _to_attributes(attributes):
+    return [{'key': k, 'value': {'stringValue': str(v)}}
+            for k, v in sorted(attributes.items())]
+
+
+def _from_attributes(attributes):
+    return {a['key']: list(a['value'].values())[0] for a in attributes}
+
+
+class FileExporter(object):
+    """Appends the spans to a file as OTLP JSON export requests."""
+
+    def __init__(self, path, service_name):
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+                           0o644)
+        self._resource = {
+            'attributes': _to_attributes({_SERVICE_NAME: service_name})}
+
+    def export(self, span):
+        request = {'resourceSpans': [{
+            'resource': self._resource,
+            'scopeSpans': [{'scope': {'name': 'kuryr_kubernetes'},
+                            'spans': [span]}],
+        }]}
+        # NOTE: each line is written at once so that the lines of concurrent
+        # processes (i.e. the CNI) are not interleaved
+        os.write(self._fd, (jsonutils.dumps(request) + '\n').encode('utf-8'))
+
+    def close(self):
+        os.close(self._fd)
+
+
+def setup(service_name):
+    """Enables tracing if the `[tracing]trace_file` option is set.
+
+    :param service_name: name of the process recorded with its spans
+    """
+    global _exporter
+    path = config.CONF.tracing.trace_file
+    if path:
+        _exporter = FileExporter(path, service_name)
+
+
+def shutdown():
+    global _exporter
+    if _exporter is not None:
+        _exporter.close()
+        _exporter = None
+    _received.clear()
+
+
+def is_enabled():
+    return _exporter is not None
+
+
+def get_uid(pod):
+    """Returns the UID of the pod dict."""
+    return pod.get('metadata', {}).get('uid')
+
+
+def _get_event_uid(event):
+    obj = event.get('object', {})
+    if obj.get('kind') != constants.K8S_OBJ_POD:
+        return None
+    return get_uid(obj)
+
+
+def record(name, uid, start, end, **attributes):
+    """Exports a span of the pod's trace.
+
+    :param name: name of the stage
+    :param uid: pod UID
+    :param start: start time of the stage (as returned by `time.time`)
+    :param end: end time of the stage
+    :param attributes: additional attributes of the span
+    """
+    if _exporter is None or not uid:
+        return
+    error = attributes.pop('error', None)
+    attributes[_POD_UID] = uid
+    span = {
+        'traceId': hashlib.md5(uid.encode('utf-8')).hexdigest(),
+        'spanId': binascii.hexlify(os.urandom(8)).decode('ascii'),
+        'name': name,
+        'kind': _SPAN_KIND_INTERNAL,
+        'startTimeUnixNano': str(int(start * 1e9)),
+        'endTimeUnixNano': str(int(end * 1e9)),
+        'attributes': _to_attributes(attributes),
+    }
+    if error:
+        span['status'] = {'code': _STATUS_ERROR, 'message': error}
+    try:
+        _exporter.export(span)
+    except Exception:
+        LOG.exception("Failed to export span %s", name)
+
+
+@contextlib.contextmanager
+def span(name, uid, **attributes):
+    """Records the enclosed block as a span of the pod's trace."""
+    if _exporter is None or not uid:
+        yield
+        return
+    start = time.time()
+    try:
+        yield
+    except Exception as ex:
+        attributes['error'] = ex.__class__.__name__
+        raise
+    finally:
+        record(name, uid, start, time.time(), **attributes)
+
+
+def _set_received(uid, version, start):
+    _received[(uid, version)] = start
+    if len(_received) > _MAX_RECEIVED:
+        _received.popitem(last=False)
+
+
+def received(event):
+    """Records the receipt of a pod's watch event."""
+    if _exporter is None:
+        return
+    uid = _get_event_uid(event)
+    if not uid:
+        return
+    now = time.time()
+    version = event['object']['metadata'].get('resourceVersion')
+    _set_received(uid, version, now)
+    record('watch.receive', uid, now, now, type=event.get('type'),
+           resource_version=version)
+
+
+def pop_received(event):
+    """Returns and forgets the time a pod's watch event was received.
+
+    Used to pass the time along with the event to another process, which
+    records it with `set_received`.
+    """
+    if _exporter is None:
+        return None
+    uid = _get_event_uid(event)
+    if not uid:
+        return None
+    version = event['object']['metadata'].get('resourceVersion')
+    return _received.pop((uid, version), None)
+
+
+def set_received(event, start):
+    """Records that a pod's watch event was received at `start`."""
+    if _exporter is None or start is None:
+        return
+    uid = _get_event_uid(event)
+    if not uid:
+        return
+    _set_received(uid, event['object']['metadata'].get('resourceVersion'),
+                  start)
+
+
+def dequeued(event):
+    """Records the time a pod's watch event waited before being handled."""
+    start = pop_received(event)
+    if start is not None:
+        record('async.queue', _get_event_uid(event), start, time.time(),
+               resource_version=event['object']['metadata'].get(
+                   'resourceVersion'))
+
+
+def load_spans(lines):
+    """Parses the spans exported by `FileExporter`.
+
+    :param lines: iterable of the lines of the trace file
+    :return: list of dicts with the 'trace', 'service', 'name', 'start',
+             'end' (in seconds) and 'attributes' of the spans
+    """
+    spans = []
+    for line in lines:
+        if not line.strip():
+            continue
+        for resource_spans in jsonutils.loads(line)['resourceSpans']:
+            service = _from_attributes(
+                resource_spans['resource']['attributes']).get(_SERVICE_NAME)
+            for scope_spans in resource_spans['scopeSpans']:
+                for span in scope_spans['spans']:
+                    spans.append({
+                        'trace': span['traceId'],
+                        'service': service,
+                        'name': span['name'],
+                        'start': int(span['startTimeUnixNano']) / 1e9,
+                        'end': int(span['endTimeUnixNano']) / 1e9,
+                        'attributes': _from_attributes(span['attributes']),
+                    })
+    return spans
+
+
+def _summarize(values):
+    values = sorted(values)
+
+    def _percentile(p):
+        return values[min(int(len(values) * p), len(values) - 1)]
+
+    return {'count': len(values),
+            'mean': sum(values) / len(values),
+            'p50': _percentile(0.5),
+            'p90': _percentile(0.9),
+            'p99': _percentile(0.99),
+            'max': values[-1]}
+
+
+def get_breakdown(spans):
+    """Summarizes the latency of the pods' networking stages.
+
+    :param spans: spans as returned by `load_spans`
+    :return: dict with the number of traced pods ('pods'), the summary of
+             the time between the first and the last span of each pod
+             ('total') and, for each stage named '<service>/<span name>'
+             ('stages'), the summaries of its durations ('duration') and of
+             the time from the first span of the pod to its first occurrence
+             ('offset'). Summaries are dicts with the 'count', 'mean',
+             'p50', 'p90', 'p99' and 'max' values in seconds.
+    """
+    traces = collections.defaultdict(list)
+    for span in spans:
+        traces[span['trace']].append(span)
+
+    totals = []
+    durations = collections.defaultdict(list)
+    offsets = collections.defaultdict(list)
+    for trace in traces.values():
+        start = min(s['start'] for s in trace)
+        totals.append(max(s['end'] for s in trace) - start)
+        first = {}
+        for span in trace:
+            stage = '%s/%s' % (span['service'], span['name'])
+            durations[stage].append(span['end'] - span['start'])
+            first[stage] = min(first.get(stage, span['start']), span['start'])
+        for stage, stage_start in first.items():
+            offsets[stage].append(stage_start - start)
+
+    return {
+        'pods': len(traces),
+        'total': _summarize(totals) if totals else None,
+        'stages': {stage: {'duration': _summarize(durations[stage]),
+                           'offset': _summarize(offsets[stage])}
+                   for stage in durations},
+    }
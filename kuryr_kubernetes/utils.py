@@ -12,6 +12,8 @@
 
 from oslo_serialization import jsonutils
 
+from kuryr_kubernetes import config
+
 
 def utf8_json_decoder(byte_data):
     """Deserializes the bytes into UTF-8 encoded JSON.
@@ -20,3 +22,26 @@ def utf8_json_decoder(byte_data):
     :returns: The UTF-8 encoded JSON represented by Python dictionary format.
     """
     return jsonutils.loads(byte_data.decode('utf8'))
+
+
+def set_resource_description(request):
+    """Marks the Neutron resource request as created by this cluster.
+
+    :param request: attributes of the Neutron resource to create, updated
+                    with `[neutron_defaults]resource_description` if set
+    """
+    description = config.CONF.neutron_defaults.resource_description
+    if description:
+        request['description'] = description
+
+
+def is_cluster_resource(resource):
+    """Returns whether the Neutron resource was created by this cluster.
+
+    :param resource: Neutron resource dict
+    :returns: whether the resource has the
+              `[neutron_defaults]resource_description` description, always
+              False if it is not set
+    """
+    description = config.CONF.neutron_defaults.resource_description
+    return bool(description) and resource.get('description') == description
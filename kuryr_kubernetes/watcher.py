@@ -16,9 +16,15 @@
 from oslo_log import log as logging
 
 from kuryr_kubernetes import clients
+from kuryr_kubernetes import metrics
+from kuryr_kubernetes import tracing
 
 LOG = logging.getLogger(__name__)
 
+_EVENTS = metrics.counter('kuryr_watch_events_total',
+                          "K8s events received by the watcher",
+                          ['resource', 'type'])
+
 
 class Watcher(object):
     """Observes K8s resources' events using K8s '?watch=true' API.
@@ -136,6 +142,8 @@ class Watcher(object):
         try:
             LOG.info("Started watching '%s'", path)
             for event in self._client.watch(path):
+                _EVENTS.inc((path, event.get('type')))
+                tracing.received(event)
                 self._idle[path] = False
                 self._handler(event)
                 self._idle[path] = True
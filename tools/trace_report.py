@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Reports the pod networking latency breakdown from trace files.
+
+Reads the files written by the controller and the CNI with the
+`[tracing]trace_file` option and prints, for each stage in the order it
+starts, when it starts relative to the first span of the pod and how long
+it takes:
+
+    tools/trace_report.py /var/log/kuryr/trace.json
+"""
+
+import argparse
+import itertools
+
+from kuryr_kubernetes import tracing
+
+
+def _format(summary, key):
+    return ' '.join('%8.3f' % summary[key][p]
+                    for p in ('mean', 'p50', 'p90', 'p99'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('files', nargs='+', help="trace files")
+    args = parser.parse_args()
+
+    files = [open(path) for path in args.files]
+    try:
+        spans = tracing.load_spans(itertools.chain(*files))
+    finally:
+        for f in files:
+            f.close()
+    breakdown = tracing.get_breakdown(spans)
+    if not breakdown['pods']:
+        print("No spans found")
+        return
+
+    total = breakdown['total']
+    print("%d pods, end to end (s): mean %.3f p50 %.3f p90 %.3f p99 %.3f "
+          "max %.3f" % (breakdown['pods'], total['mean'], total['p50'],
+                        total['p90'], total['p99'], total['max']))
+    print("")
+    print("%-36s %6s  %-35s  %-35s" % (
+        'stage', 'count', 'offset (s) mean/p50/p90/p99',
+        'duration (s) mean/p50/p90/p99'))
+    stages = sorted(breakdown['stages'].items(),
+                    key=lambda item: item[1]['offset']['mean'])
+    for stage, summary in stages:
+        print("%-36s %6d  %s  %s" % (stage, summary['duration']['count'],
+                                     _format(summary, 'offset'),
+                                     _format(summary, 'duration')))
+
+
+if __name__ == '__main__':
+    main()